@@ -9,15 +9,26 @@ Pitch-A-Seat 應用程式主入口
 
 # =======================================
 # 第一區塊：Import（載入工具）
+import asyncio
 import logging                                      
+from contextlib import asynccontextmanager
 from fastapi import FastAPI                         # 載入 FastAPI 這個「類別」，用來建立應用程式
 from fastapi.middleware.cors import CORSMiddleware  # 載入 CORS 中介層工具
 from fastapi.staticfiles import StaticFiles         # 載入靜態檔案服務工具
 
 from config.settings import CORS_ORIGINS            # 從設定檔 (config/settings.py) 載入允許的網域清單
 from config.settings import DEBUG, LOG_LEVEL
-
-from routes import (pages, auth, users, games, tickets, orders, reviews, reservations, notifications)  # 載入各個路由模組
+from config.settings import QUERY_STATS_DUMP_SECONDS, QUERY_STATS_TOP_N, DB_POOL_SWEEP_SECONDS
+from config.settings import OUTBOX_POLL_SECONDS, OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS
+
+from routes import (pages, auth, users, games, tickets, orders, reviews, reservations, notifications, metrics)  # 載入各個路由模組
+from utils.metrics import MetricsMiddleware        # 每個請求的延遲 / DB / Redis 時間 (GET /metrics)
+from utils.read_your_writes import ReadYourWritesMiddleware   # 有唯讀副本時：寫入請求 / 剛寫入的使用者讀主庫
+from utils.query_stats import run_periodic_dump     # 定期把 SQL 指紋 top-N 寫進 log
+from config.database import maintain_pools, fill_pools, close_pools   # MySQL 主庫 + 副本連線池 (預熱、背景巡檢、關閉)
+from config.db_pool import run_periodic_sweep
+from utils.notification_stream import notification_hub   # 通知推播 (SSE) 的 Redis 訂閱，第一個連線進來時才啟動
+from utils.outbox_dispatcher import run_outbox_dispatcher   # 背景寄出 notification_outbox 裡的信 (API 只負責寫入)
 # =======================================
 
 
@@ -47,9 +58,31 @@ logging.basicConfig(
 
 
 
+# =======================================
+# 應用程式生命週期：啟動時開背景工作，關閉時收掉
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(fill_pools)            # 預先建好 DB_POOL_MIN_SIZE 條連線 (失敗只記 log，借用時再建)
+    tasks = []
+    if QUERY_STATS_DUMP_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodic_dump(QUERY_STATS_DUMP_SECONDS, QUERY_STATS_TOP_N)))
+    if DB_POOL_SWEEP_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodic_sweep(maintain_pools, DB_POOL_SWEEP_SECONDS)))
+    if OUTBOX_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_outbox_dispatcher(OUTBOX_POLL_SECONDS, OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS)))
+    yield
+    for task in tasks:
+        task.cancel()
+    await notification_hub.close()
+    close_pools()
+# =======================================
+
+
+
 # =======================================
 # 第三區塊：建立應用程式實例 (建立 FastAPI 應用程式)
 app = FastAPI(
+    lifespan=lifespan,
     title="中華職棒二手票交易平台 API",
     description="Pitch-A-Seat",
     version="1.0.0",
@@ -78,6 +111,19 @@ app.add_middleware(
 
 
 
+# =======================================
+# 讀寫分離中介層 (有設定 DB_REPLICA_HOSTS 才有作用)：寫入請求、或剛寫入過的使用者，這個請求的唯讀查詢走主庫
+app.add_middleware(ReadYourWritesMiddleware)
+# =======================================
+
+
+# =======================================
+# 指標中介層 (最後加入 = 最外層)：量到的延遲包含 CORS 等其他中介層，最接近使用者實際等待的時間
+app.add_middleware(MetricsMiddleware)
+# =======================================
+
+
+
 # =======================================
 # 第五區塊：註冊路由
 # 把 主 app 這個 application instance 加入「路由」
@@ -93,6 +139,8 @@ app.include_router(orders.router)
 app.include_router(reviews.router)
 app.include_router(reservations.router)
 app.include_router(notifications.router)
+# 3.監控 (GET /metrics)
+app.include_router(metrics.router)
 
 # 以 app.include_router(auth.router) 為例, 就是「把 auth.py 裡 router 收集的所有路由，全部註冊到 app 上，讓 app 知道這些 API 端點存在」
 # =======================================
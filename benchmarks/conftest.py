@@ -0,0 +1,99 @@
+# benchmarks/conftest.py
+# 微基準 (pytest-benchmark) 的共用設定與假資料。只量不碰 DB 的 CPU 熱路徑，資料量抓「一次請求的實際規模」的上緣。
+# 跑法與歷史比較見 benchmarks/README.md
+
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# import config.settings 時 validate_all_settings() 會檢查所有必要的環境變數，缺一個就 sys.exit(1)；
+# 微基準不連 DB / SMTP / S3，比照 CI (.github/workflows/deploy.yml) 填假值，沒設定的才補 (已設定的不覆蓋)
+for key, value in {
+    "JWT_SECRET_KEY": "benchmark-secret-key-0123456789abcdef",
+    "DB_USER": "bench_user", "DB_PASSWORD": "bench_password", "DB_HOST": "localhost", "DB_NAME": "bench_db",
+    "SMTP_HOST": "smtp.bench.local", "SMTP_USER": "bench@bench.local", "SMTP_PASS": "bench_password",
+    "AWS_ACCESS_KEY_ID": "bench_access_key", "AWS_SECRET_ACCESS_KEY": "bench_secret_key",
+    "S3_BUCKET_NAME": "bench-bucket", "CLOUDFRONT_URL": "https://bench.cloudfront.net",
+}.items():
+    os.environ.setdefault(key, value)
+
+TEAMS = ["中信兄弟", "樂天桃猿", "統一7-ELEVEn獅", "富邦悍將", "味全龍", "台鋼雄鷹"]
+STADIUMS = ["大巨蛋", "樂天桃園", "台南", "天母", "新莊", "澄清湖", "洲際"]
+TODAY = date(2026, 6, 28)
+
+
+# 一位活躍會員的行為紀錄：n 筆交易 / 預約，分散在過去 180 天
+def make_behaviors(rng, n):
+    out = []
+    for _ in range(n):
+        home, away = rng.sample(TEAMS, 2)
+        out.append({"team_home": home, "team_away": away,
+                    "created_at": datetime(2026, 6, 28) - timedelta(days=rng.randint(0, 180))})
+    return out
+
+
+# 候選賽事 (未來有票的場次)
+def make_games(rng, n, start_id=1):
+    out = []
+    for i in range(n):
+        home, away = rng.sample(TEAMS, 2)
+        out.append({"game_id": start_id + i, "game_date": TODAY + timedelta(days=rng.randint(1, 60)),
+                    "start_time": timedelta(hours=18, minutes=35), "team_home": home, "team_away": away,
+                    "stadium": rng.choice(STADIUMS), "ticket_count": rng.randint(1, 40),
+                    "trade_count": rng.randint(0, 200)})
+    return out
+
+
+# 同一場次的預約 (與 models/ticket_model.py 的 SELECT 欄位相同)
+def make_reservations(rng, n):
+    choices = ['["0-0"]', '["0-400"]', '["401-699"]', '["700-999"]', '["401-699", "700-999"]', '["1000-10000"]']
+    return [{"id": i, "member_id": i, "price_ranges": rng.choice(choices),
+             "seat_area": rng.choice(["none", "內野", "外野"]), "email": f"user{i}@example.com"}
+            for i in range(1, n + 1)]
+
+
+# DB 回傳的訂單列 (與 get_buyer_orders 的 SELECT 欄位相同)
+def make_order_rows(rng, n):
+    return [{"order_id": i, "order_status": "媒合成功", "payment_status": "已付款", "shipment_status": "未出貨",
+             "ticket_id": i, "price": 800, "seat_number": "3排12號", "seat_area": "內野", "note": None,
+             "image_urls": '["https://cdn.example.com/tickets/a.jpg", "https://cdn.example.com/tickets/b.jpg"]',
+             "game_date": TODAY + timedelta(days=rng.randint(1, 60)), "start_time": timedelta(hours=18, minutes=35),
+             "team_home": "中信兄弟", "team_away": "味全龍", "stadium": rng.choice(STADIUMS),
+             "seller_id": 7, "seller_rating": Decimal("4.50") if i % 3 else None}
+            for i in range(1, n + 1)]
+
+
+# ==================== fixtures：固定種子，每次跑的資料都一樣 ====================
+@pytest.fixture
+def trades():
+    return make_behaviors(random.Random(1), 60)
+
+
+@pytest.fixture
+def reservations_history():
+    return make_behaviors(random.Random(2), 30)
+
+
+@pytest.fixture
+def candidate_games():
+    return make_games(random.Random(3), 120)
+
+
+@pytest.fixture
+def hot_games():
+    return make_games(random.Random(4), 10, start_id=1000)
+
+
+@pytest.fixture
+def reservations():
+    return make_reservations(random.Random(5), 2000)
+
+
+@pytest.fixture
+def order_rows():
+    return lambda: make_order_rows(random.Random(6), 200)     # format_order_rows 會就地改列 → 每一輪都要新的
@@ -0,0 +1,31 @@
+# benchmarks/test_bench_auth.py
+# utils/auth_utils.verify_token：每一支需要登入的 API 都會先跑一次 (JWT 解碼 + HMAC 驗簽)。
+# 一般情況是快取命中 (同一個 token 在一次頁面載入內重複使用)；cold 是第一次看到這個 token 的成本。
+
+from datetime import timedelta
+
+from utils.auth_utils import clear_token_cache, create_access_token, get_current_user, verify_token
+
+
+def make_token():
+    return create_access_token({"id": 123, "email": "user123@example.com", "name": "user123"},
+                               expires_delta=timedelta(hours=1))
+
+
+def test_verify_token(benchmark):
+    token = make_token()
+    user = benchmark(verify_token, token)
+    assert user["user_id"] == 123
+
+
+def test_verify_token_cold(benchmark):
+    token = make_token()
+    user = benchmark.pedantic(verify_token, args=(token,), setup=clear_token_cache, rounds=2000)
+    assert user["user_id"] == 123
+
+
+# FastAPI 的 auth dependency 整體成本 (Header 檢查 + 去掉 Bearer 前綴 + verify_token)
+def test_get_current_user(benchmark):
+    header = f"Bearer {make_token()}"
+    user = benchmark(get_current_user, header)
+    assert user["user_id"] == 123
@@ -0,0 +1,24 @@
+# benchmarks/test_bench_recommender.py
+# services/recommender.py：/api/recommendations 每次請求都會跑一次 recommend()；離線評估 / sweep 則是 × cohort × 參數組合。
+
+from conftest import TODAY
+
+from services.recommender import build_team_scores, rank_candidate_games, recommend
+
+FAVORITES = ["中信兄弟", "味全龍"]
+
+
+def test_build_team_scores(benchmark, trades, reservations_history):
+    scores = benchmark(build_team_scores, FAVORITES, trades, reservations_history, TODAY)
+    assert scores
+
+
+def test_rank_candidate_games(benchmark, trades, reservations_history, candidate_games):
+    scores = build_team_scores(FAVORITES, trades, reservations_history, TODAY)
+    top = benchmark(rank_candidate_games, scores, candidate_games, FAVORITES)
+    assert len(top) == 5
+
+
+def test_recommend(benchmark, trades, reservations_history, candidate_games, hot_games):
+    top = benchmark(recommend, FAVORITES, trades, reservations_history, candidate_games, hot_games, TODAY)
+    assert len(top) == 5
@@ -0,0 +1,21 @@
+# benchmarks/test_bench_tickets_orders.py
+# 上架票券時的「票券 × 預約」比對 (services/reservation_matcher.py)，與訂單列表每一列的格式整理 (services/order_rows.py)。
+
+from services.order_rows import format_order_rows
+from services.reservation_matcher import match_reservations
+
+# 一次上架 10 張票：價格 / 區域分散，對上 2000 筆同場次預約
+TICKETS = [{"price": 300 + 150 * i, "seat_area": "內野" if i % 2 else "外野", "seat_number": f"{i}排1號"}
+           for i in range(10)]
+
+
+def test_match_reservations(benchmark, reservations):
+    matches = benchmark(match_reservations, TICKETS, reservations)
+    assert matches
+
+
+def test_format_order_rows(benchmark, order_rows):
+    # pedantic + setup：每一輪拿一份新的列 (被計時的只有 format_order_rows 本身)
+    rows = benchmark.pedantic(format_order_rows, setup=lambda: ((order_rows(),), {"rating_key": "seller_rating"}),
+                              rounds=200)
+    assert rows[0]["weekday"] in "一二三四五六日"
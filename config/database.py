@@ -1,9 +1,18 @@
 # 資料庫連線池初始化設置 
 
 
-import mysql.connector.pooling        # 匯入 MySQL 官方的連線池模組     
+import mysql.connector                 # 匯入 MySQL 官方的連線模組
+from mysql.connector.errors import InterfaceError, OperationalError
+from contextvars import ContextVar
 from contextlib import contextmanager # 匯入 contextmanager 裝飾器 (就可以用 yield 語法建立 context manager（可搭配 with 使用的物件）)
+from time import perf_counter
 from config.settings import DB_USER, DB_PASSWORD, DB_HOST, DB_NAME, DB_PORT    # 從第一層環境設定匯入資料庫設定值
+from config.settings import DB_POOL_IDLE_CHECK_SECONDS, DB_POOL_MAX_LIFETIME_SECONDS
+from config.settings import DB_POOL_MIN_SIZE, DB_POOL_SIZE, DB_POOL_MAX_OVERFLOW, DB_POOL_ACQUIRE_TIMEOUT
+from config.settings import DB_REPLICA_HOSTS, DB_REPLICA_MAX_LAG_SECONDS, DB_REPLICA_RETRY_SECONDS
+from config.db_pool import ConnectionPool, ReplicaSet                       # 自製連線池: 閒置才檢查、最長存活時間回收 (取代每次借用都 ping)；唯讀副本輪流使用
+from utils.metrics import instrument_connection, observe_db_pool_wait       # 計時: 借連線等待時間、每條 SQL 的時間 (/metrics)
+from utils.metrics import DB_READONLY_ROUTED
 
 
 # =======================================
@@ -23,15 +32,106 @@ db_config = {
 
 # =======================================
 # 建立資料庫連線池物件 : database.py 模組載入時執行一次
-# 根據 db_config 的參數，預先建立 20 條資料庫連線, 這 20 條連線存在連線池裡，等待被借用
-# database.py 模組載入時執行一次，之後 cnxpool 這個物件就一直存在
-cnxpool = mysql.connector.pooling.MySQLConnectionPool(
-    pool_name="mypool",      # 連線池的識別名稱
-    pool_size=20,            # 池中預先建立 20 條連線
-    autocommit=False,        # 預設不自動提交 SQL
-    pool_reset_session=True, # 連線歸還池中時, 自動執行清除該連線的所有舊狀態
-    **db_config              # 將原本裝成字典的 db_config 展開成關鍵字參數
-)    
+# 常駐 DB_POOL_SIZE 條 + 尖峰時最多多開 DB_POOL_MAX_OVERFLOW 條；模組載入時不連 MySQL，
+# app 啟動時 (lifespan) 才預先建立 DB_POOL_MIN_SIZE 條，其餘在第一次被需要時才建立，之後重複使用
+def _connect():
+    return mysql.connector.connect(autocommit=False, **db_config)   # 預設不自動提交 SQL
+
+
+cnxpool = ConnectionPool(
+    _connect,
+    size=DB_POOL_SIZE,                                    # 常駐連線數上限
+    min_size=DB_POOL_MIN_SIZE,                            # 預先建立的連線數
+    max_overflow=DB_POOL_MAX_OVERFLOW,                    # 尖峰時可多開的臨時連線
+    acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,              # 借光時排隊 (先來先借) 最多等幾秒, 逾時丟 PoolError
+    idle_check_seconds=DB_POOL_IDLE_CHECK_SECONDS,        # 閒置超過這個秒數的連線, 借出前才 ping
+    max_lifetime_seconds=DB_POOL_MAX_LIFETIME_SECONDS,    # 連線最長存活時間, 到期就關掉重建
+)
+# 歸還時若還在交易中會自動 rollback (取代原本的 pool_reset_session=True；主庫用過的連線都算在交易中), 見 config/db_pool.py
+# =======================================
+
+
+
+
+# =======================================
+# 唯讀副本 (read replica) 連線池：DB_REPLICA_HOSTS 每個 host 一個池 (沒設定就是空的, 所有查詢走主庫)
+# 副本連線用 autocommit=True：唯讀查詢不開交易, 歸還時不用 rollback, 也不會讀到舊的交易快照
+def _replica_connect(host: str, port: int):
+    def connect():
+        return mysql.connector.connect(autocommit=True, **{**db_config, "host": host, "port": port})
+    return connect
+
+
+def _parse_host(spec: str):
+    host, _, port = spec.partition(":")
+    return host, int(port) if port else DB_PORT
+
+
+# 背景健康檢查：複寫停了 (Seconds_Behind_Source 是 NULL) 或延遲太大 → 暫停使用這個副本
+# 帳號沒有 REPLICATION CLIENT 權限 (SHOW REPLICA STATUS 失敗) → 只檢查連得上
+def _replica_lag_ok(conn) -> bool:
+    with conn.cursor(dictionary=True) as cursor:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            rows = cursor.fetchall()
+        except mysql.connector.Error:
+            return True
+    if not rows:
+        return True
+    lag = rows[0].get("Seconds_Behind_Source")
+    return lag is not None and lag <= DB_REPLICA_MAX_LAG_SECONDS
+
+
+replicas = ReplicaSet(
+    [
+        ConnectionPool(
+            _replica_connect(*_parse_host(spec)),
+            size=DB_POOL_SIZE,
+            min_size=DB_POOL_MIN_SIZE,
+            max_overflow=DB_POOL_MAX_OVERFLOW,
+            idle_check_seconds=DB_POOL_IDLE_CHECK_SECONDS,
+            max_lifetime_seconds=DB_POOL_MAX_LIFETIME_SECONDS,
+            name=f"mysql-replica-{i}",
+        )
+        for i, spec in enumerate(DB_REPLICA_HOSTS)
+    ],
+    retry_seconds=DB_REPLICA_RETRY_SECONDS,
+    health_check=_replica_lag_ok,
+)
+
+
+# read-your-writes：這個請求 (或這個使用者剛寫入後的短時間內) 的唯讀查詢也要走主庫
+# 由 utils/read_your_writes.py 的 middleware 設定；sync 路由在 threadpool 執行時會複製同一份 context
+_primary_only: ContextVar[bool] = ContextVar("db_primary_only", default=False)
+
+
+def pin_to_primary(value: bool = True):
+    return _primary_only.set(value)
+
+
+def unpin(token) -> None:
+    _primary_only.reset(token)
+
+
+# 背景維護 (app lifespan 定期呼叫)：主庫 + 副本的閒置連線巡檢、副本健康檢查；回傳關閉的連線數
+def maintain_pools() -> int:
+    closed = cnxpool.sweep()
+    for pool in replicas.pools:
+        closed += pool.sweep()
+    replicas.check_health()
+    return closed
+
+
+def fill_pools() -> None:
+    cnxpool.fill()
+    for pool in replicas.pools:
+        pool.fill()
+
+
+def close_pools() -> None:
+    cnxpool.close_all()
+    for pool in replicas.pools:
+        pool.close_all()
 # =======================================
 
 
@@ -44,36 +144,53 @@ cnxpool = mysql.connector.pooling.MySQLConnectionPool(
 # 使用裝飾器 @contextmanager ，把 get_connection 函數變成可以用 with 的形式 (@contextmanager 這個裝飾器物件可以搭配 with 使用)
 # 在商業邏輯函數中要操作資料庫時，會先寫 「with get_connection() as conn:」 來取得連線 
 
-# 「with get_connection() as conn:」觸發步驟 1, 2, 3
+# 只有 SELECT 的 model 函數寫「with get_connection(readonly=True) as conn:」→ 有設定副本時改借副本的連線
+# (這個請求是寫入請求、或使用者剛寫入過 → 仍走主庫；副本都不能用 → 退回主庫)
+
+# 「with get_connection() as conn:」觸發步驟 1, 2
 @contextmanager
-def get_connection():                           # 角色: 從「已存在的連線池」借出連線: 每次有商業邏輯程式碼呼叫 with get_connection() as conn: 時, 就執行  get_connection 函數
-    conn = cnxpool.get_connection()             # 步驟 1：從連線池借出一條連線
+def get_connection(readonly: bool = False):     # 角色: 從「已存在的連線池」借出連線: 每次有商業邏輯程式碼呼叫 with get_connection() as conn: 時, 就執行  get_connection 函數
+    start = perf_counter()
+    picked = None
+    if readonly and len(replicas):
+        if _primary_only.get():
+            DB_READONLY_ROUTED.inc("primary_sticky")
+        else:
+            picked = replicas.acquire()
+            DB_READONLY_ROUTED.inc("replica" if picked else "primary_fallback")
+    pool, entry = picked or (cnxpool, None)
+    if entry is None:
+        entry = cnxpool.acquire()               # 步驟 1：從連線池借出一條健康連線 (閒置太久的連線池會先 ping；剛用過的直接借出, 不多打一次 MySQL；借光時排隊等)
+    observe_db_pool_wait(perf_counter() - start)   # 借連線 (+ 必要時的 ping / 建立連線) 的時間 (連線池等待)
+    discard = False
     try:
-        conn.ping(reconnect=True)               # 步驟 2：檢查這條連線是否健康: 用 ping()送一個小封包給 MySQL, 檢查確認連線還活著，如果 ping 失敗（連線斷了）就自動重新建立連線 
-        yield conn                              # 步驟 3：將連線交給呼叫者使用: 暫停這個 get_connection 函數，把 conn 連線交出去給呼叫者使用: (1)暫停這個函數，等呼叫者的 with 區塊執行完再繼續 (2) 把 conn 交給呼叫者的 with 區塊使用
+        yield instrument_connection(entry.raw)  # 步驟 2：將連線交給呼叫者使用: 暫停這個 get_connection 函數，把 conn 連線交出去給呼叫者使用: (1)暫停這個函數，等呼叫者的 with 區塊執行完再繼續 (2) 把 conn 交給呼叫者的 with 區塊使用
 
         # =========== 暫停在這裡 =============
         # 等呼叫者的 with 區塊執行完才會繼續往下, with 區塊是指例如: 
-        # with conn.cursor() as cursor:         # 步驟 4：呼叫者的資料庫操作邏輯程式碼
+        # with conn.cursor() as cursor:         # 步驟 3：呼叫者的資料庫操作邏輯程式碼
         #     cursor.execute("SELECT ...")
         #     result = cursor.fetchone()
         # ==================================
-                                                # 步驟 5：
+                                                # 步驟 4：
                                                 # 離開內層 with 區塊 -> cursor 關閉
-                                                # 離開外層 with -> 控制權回到 get_connection -> 觸發步驟 6
-        
+                                                # 離開外層 with -> 控制權回到 get_connection -> 觸發步驟 5
+
+    except (InterfaceError, OperationalError):
+        discard = True                          # 連線層級的錯誤 (斷線、逾時...)：這條連線可能已經壞了，不放回池子
+        raise
     finally:
-        conn.close()                            # 步驟 6： 歸還連線到池中, 不是真的關閉連線 (無論呼叫者的 with 區塊是正常結束還是出錯，都會執行這個歸還動作)
+        pool.release(entry, discard=discard)    # 步驟 5： 歸還連線到池中, 不是真的關閉連線 (無論呼叫者的 with 區塊是正常結束還是出錯，都會執行這個歸還動作)
 
 
 # finally 確保連線一定會被歸還，無論呼叫者的 with 區塊有沒有出錯。
-# 有 finally 的情況: 不管呼叫者的 with 區塊有沒有出錯, 一定會執行conn.close()這行。就算呼叫者的 with 區塊出錯, finally 區塊的 conn.close() 還是會執行, 正常歸還連線
-# 沒有 finally 的情況: 如果呼叫者的 with 區塊出錯, conn.close()這行不會執行，這樣連線永遠不會歸還 -> 連線池慢慢耗盡
+# 有 finally 的情況: 不管呼叫者的 with 區塊有沒有出錯, 一定會執行pool.release()這行。就算呼叫者的 with 區塊出錯, finally 區塊的 pool.release() 還是會執行, 正常歸還連線
+# 沒有 finally 的情況: 如果呼叫者的 with 區塊出錯, pool.release()這行不會執行，這樣連線永遠不會歸還 -> 連線池慢慢耗盡
 
 
 # 「關掉 cursor 之後，執行完 finally 才真的歸還連線」。
 
-# @contextmanager def get_connection() 做的事: 取得健康的資料庫連線: 會 - 自動檢查連線是否存活 - 自動歸還連線 - 不自動 commit 資料庫指令, 而是讓呼叫者 (商業邏輯程式碼) 決定 commit 的時機
+# @contextmanager def get_connection() 做的事: 取得健康的資料庫連線: 會 - 連線池負責檢查連線是否存活 (閒置太久才 ping) - 自動歸還連線 - 不自動 commit 資料庫指令, 而是讓呼叫者 (商業邏輯程式碼) 決定 commit 的時機
 
 
 # =======================================
@@ -103,16 +220,18 @@ def get_connection():                           # 角色: 從「已存在的連
 
 
 # --------------------------
-# 「pool_reset_session=True」:
-# 連線歸還池中時, 自動執行清除該連線的所有舊狀態, 否則下一位借到這條連線的呼叫者會繼承前一位使用連線者留下的垃圾. 垃圾例如: 
-# 未完成的交易(忘記commit或rollback),透過這行可以自動把已歸還連線中未完成的交易直接rollback清掉，避免污染下一個借用連線的呼叫者; 
-# 也能自動清除該連線上一位呼叫者的「查詢快取」、「session變數」;
-# 也能自動釋放「所有鎖」(避免下一位呼叫者被前一位呼叫者的鎖卡住無法動彈)
+# 「歸還時 rollback」(原本是 pool_reset_session=True):
+# 連線歸還池中時, 若還有未完成的交易(忘記commit或rollback), 連線池會直接 rollback 清掉，避免污染下一個借用連線的呼叫者, 也會一併釋放交易中持有的鎖 (SELECT ... FOR UPDATE)。
+# 原本的 pool_reset_session 每次歸還都送一次 COM_RESET_CONNECTION (多一個 RTT)；本專案沒有使用 session 變數 / GET_LOCK，
+# 所以改成「只有 in_transaction 才 rollback」(in_transaction 是 client 端已知的狀態)。
+# 注意：主庫連線是 autocommit=False，借出後只要執行過任何 SQL (連 SELECT 也算) 就會開啟交易，
+# 所以主庫上「有用過」的連線歸還時一定會 rollback (一次 RTT，跟原本的 COM_RESET_CONNECTION 一樣)；
+# 省下來的只有兩種：借了但沒執行 SQL 的連線，以及副本連線 (autocommit=True，不會留下交易)
 # --------------------------
 
 
 # --------------------------   
-# 「**」 做的事: 把字典的 key 變成參數名稱，value 變成參數值，然後一個一個「攤開」傳進去. 所以「**db_config」就是「將原本裝成字典的db_config展開成關鍵字參數，展開成類似這樣: MySQLConnectionPool(user="abc", password="def", host="localhost")」
+# 「**」 做的事: 把字典的 key 變成參數名稱，value 變成參數值，然後一個一個「攤開」傳進去. 所以「**db_config」就是「將原本裝成字典的db_config展開成關鍵字參數，展開成類似這樣: mysql.connector.connect(user="abc", password="def", host="localhost")」
 # --------------------------    
 
 
@@ -122,7 +241,7 @@ def get_connection():                           # 角色: 從「已存在的連
 # 程式啟動 -> 載入 app.py -> 執行 from routes import games 來載入 games.py -> games.py中的「from config.database import」載入database.py, 這時候就建立連線池了                       
 # 1. from config.settings import ...    ← 載入設定                   
 # 2. db_config = {...}                  ← 建立參數字典                
-# 3. cnxpool = MySQLConnectionPool(...) ← 建立連線池，預建 20 條連線  
+# 3. cnxpool = ConnectionPool(...)      ← 建立連線池 (大小見 config/settings.py，此時還沒連線)
 # 4. def get_connection(): ...          ← 定義好 get_connection 函數（但還沒執行 get_connection 函數內容）  
 
 
@@ -0,0 +1,389 @@
+# 資料庫連線池 (自製)：取代 mysql.connector 內建的 MySQLConnectionPool
+#
+# 內建連線池 + 每次借用都 conn.ping(reconnect=True) 的問題：每一次 model 呼叫都多一個到 MySQL 的來回 (RTT)，
+# 一個 API 請求通常會呼叫好幾個 model 函數，RTT 就疊好幾次；歸還時 pool_reset_session 的 COM_RESET_CONNECTION 又是一次。
+#
+# 這裡改成「池子層級」的健康檢查：
+# - 借出時只有「閒置超過 idle_check_seconds」的連線才 ping (剛用過的連線幾乎不可能斷)
+# - 連線活超過 max_lifetime_seconds 就關掉重建 (避開 MySQL wait_timeout / RDS failover / 代理層的連線回收)
+# - 背景定期 sweep()：把閒置太久的連線先 ping 過、過期的先關掉，讓請求路徑上幾乎不用做任何檢查
+# - 歸還時只有「還在交易中」才 rollback (in_transaction 是 client 端已知的狀態)：autocommit=False 的連線執行過
+#   任何 SQL (包括 SELECT) 都算在交易中，一定會 rollback；只有 autocommit 的連線 / 沒執行 SQL 的借用才省下這次 RTT
+# - 呼叫端出錯且連線可能已壞 (discard=True) → 直接丟掉，不放回池子
+#
+# 另外是可調大小的彈性連線池 (內建連線池固定 20 條、借光了立刻丟例外)：
+# - min_size / size / max_overflow 由 config/settings.py 設定，依 uvicorn worker 數調整 (每個 worker 各自一個池)
+# - 借光時依先來後到排隊 (FIFO)，最多等 acquire_timeout 秒；借用中 / 閒置數、逾時次數都會出現在 /metrics
+# - 只有 threadpool (sync 路由、asyncio.to_thread) 裡的借用會排隊；async 路由直接在 event loop 上呼叫 model，
+#   在那裡等待會卡住整個 worker 的所有請求，所以 event loop 上借光就立刻丟 PoolError (同 timeout=0)
+#
+# 不碰 MySQL：連線由呼叫端傳入的 factory 建立，tests/ 用假連線直接測。
+
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from mysql.connector.errors import PoolError       # 池子用完時丟出與內建連線池相同的例外，呼叫端的錯誤處理不用改
+
+from utils.metrics import (DB_POOL_CONNECTIONS_CLOSED, DB_POOL_CONNECTIONS_OPENED,
+                           POOL_ACQUIRE_TIMEOUTS, POOL_CONNECTIONS_IDLE, POOL_CONNECTIONS_IN_USE)
+
+logger = logging.getLogger(__name__)
+
+
+# =======================================
+# 目前這個 thread 是否正在跑 asyncio event loop (async 路由 / 背景 task 直接呼叫 model 的情況)
+def on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+# =======================================
+
+
+
+
+# =======================================
+# 池子裡的一條連線：真正的連線物件 + 建立時間 + 最後一次歸還時間
+class PooledConnection:
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw: Any, now: float):
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+# =======================================
+
+
+
+
+# =======================================
+# 等待中的借用者：連線 (或建立新連線的名額) 由歸還的人直接交到手上，依排隊順序 (FIFO)，不會被後來的人插隊
+class _Waiter:
+    __slots__ = ("event", "entry")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry: Optional[PooledConnection] = None     # None + event 已 set = 拿到「建立新連線」的名額
+# =======================================
+
+
+
+
+# =======================================
+# 連線數：
+# - min_size：啟動 / 背景巡檢時預先建好的連線數 (冷啟動的第一批請求不用等建連線)
+# - size：常駐連線數上限，歸還後留在池裡重複使用
+# - max_overflow：尖峰時可以多開的臨時連線，歸還時若沒人在等就直接關掉
+# - acquire_timeout：全部借光時最多排隊等幾秒，逾時丟 PoolError (0 = 不等，與內建連線池相同；event loop 上一律不等)
+class ConnectionPool:
+    def __init__(self, factory: Callable[[], Any], size: int,
+                 idle_check_seconds: float = 30, max_lifetime_seconds: float = 1800,
+                 min_size: int = 0, max_overflow: int = 0, acquire_timeout: float = 0,
+                 name: str = "mysql", clock: Callable[[], float] = time.monotonic):
+        self._factory = factory
+        self.size = size
+        self.min_size = min(min_size, size)
+        self.max_overflow = max_overflow
+        self.acquire_timeout = acquire_timeout
+        self.idle_check_seconds = idle_check_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self._clock = clock
+        self._idle: Deque[PooledConnection] = deque()   # 右邊 = 最近歸還 (借出時從右邊拿，熱的連線一直被重用)
+        self._waiters: Deque[_Waiter] = deque()
+        self._total = 0                                 # 已建立 (閒置 + 借出中) + 正在建立的連線數
+        self._lock = threading.Lock()
+
+        POOL_CONNECTIONS_IDLE.set_function(name, fn=lambda: self.idle_count)
+        POOL_CONNECTIONS_IN_USE.set_function(name, fn=lambda: self.in_use_count)
+        self._name = name
+
+    # ----- 狀態 (測試 / 監控用) -----
+    @property
+    def max_size(self) -> int:
+        return self.size + self.max_overflow
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    @property
+    def total_count(self) -> int:
+        return self._total
+
+    @property
+    def in_use_count(self) -> int:
+        return self._total - len(self._idle)
+
+    @property
+    def waiting_count(self) -> int:
+        return len(self._waiters)
+
+    def _expired(self, entry: PooledConnection, now: float) -> bool:
+        return self.max_lifetime_seconds > 0 and now - entry.created_at >= self.max_lifetime_seconds
+
+    def _needs_check(self, entry: PooledConnection, now: float) -> bool:
+        return now - entry.last_used >= self.idle_check_seconds
+
+    # ----- 名額 (slot) 管理：_total 在「決定要建連線」時就先加，關閉連線時交給下一位排隊者或減回去 -----
+    def _free_slot(self) -> None:
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()     # 名額直接給排最前面的人，由他自己建連線
+                waiter.event.set()
+            else:
+                self._total -= 1
+
+    def _open(self) -> PooledConnection:
+        try:
+            raw = self._factory()
+        except Exception:
+            self._free_slot()           # 名額是借出前先佔的，建立失敗要還回去
+            raise
+        DB_POOL_CONNECTIONS_OPENED.inc()
+        return PooledConnection(raw, self._clock())
+
+    def _close_raw(self, entry: PooledConnection, reason: str) -> None:
+        DB_POOL_CONNECTIONS_CLOSED.inc(reason)
+        try:
+            entry.raw.close()
+        except Exception:
+            pass                        # 已經斷掉的連線 close 也可能出錯，名額另外處理即可
+
+    def _close(self, entry: PooledConnection, reason: str) -> None:
+        self._close_raw(entry, reason)
+        self._free_slot()
+
+    # 失效 / 過期的連線：關掉後用同一個名額重建 (借用者不用重新排隊)
+    def _reopen(self, entry: PooledConnection, reason: str) -> PooledConnection:
+        self._close_raw(entry, reason)
+        return self._open()
+
+    @staticmethod
+    def _is_alive(raw: Any) -> bool:
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    # ----- 借出 -----
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if timeout > 0 and on_event_loop():
+            timeout = 0                 # threading.Event.wait 會卡住 event loop，借光就立刻失敗
+        waiter = None
+        entry = None
+        with self._lock:
+            if self._idle and not self._waiters:
+                entry = self._idle.pop()
+            elif self._total < self.max_size and not self._waiters:
+                self._total += 1
+            elif timeout <= 0:
+                POOL_ACQUIRE_TIMEOUTS.inc(self._name)
+                raise PoolError("Failed getting connection; pool exhausted")
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            waiter.event.wait(timeout)
+            with self._lock:
+                if not waiter.event.is_set():       # 在鎖裡再確認一次：逾時的同時剛好被交棒，就算拿到
+                    self._waiters.remove(waiter)
+                    POOL_ACQUIRE_TIMEOUTS.inc(self._name)
+                    raise PoolError(f"Failed getting connection; pool exhausted (waited {timeout}s)")
+            entry = waiter.entry
+
+        if entry is None:
+            return self._open()
+
+        now = self._clock()
+        if self._expired(entry, now):
+            return self._reopen(entry, "lifetime")
+        if self._needs_check(entry, now) and not self._is_alive(entry.raw):
+            return self._reopen(entry, "stale")
+        return entry
+
+    # ----- 歸還 -----
+    # discard=True：呼叫端遇到連線層級的錯誤 (斷線、逾時)，這條連線不能再給別人用
+    def release(self, entry: PooledConnection, discard: bool = False) -> None:
+        if discard:
+            self._close(entry, "broken")
+            return
+
+        # 沒 commit 的交易不能留給下一位 (原本由 pool_reset_session 處理)
+        if getattr(entry.raw, "in_transaction", True):
+            try:
+                entry.raw.rollback()
+            except Exception:
+                self._close(entry, "broken")
+                return
+
+        now = self._clock()
+        if self._expired(entry, now):
+            self._close(entry, "lifetime")
+            return
+        entry.last_used = now
+        with self._lock:
+            if self._waiters:                       # 有人在排隊 → 直接交給排最前面的人
+                waiter = self._waiters.popleft()
+                waiter.entry = entry
+                waiter.event.set()
+                return
+            if self._total <= self.size:
+                self._idle.append(entry)
+                return
+            self._total -= 1                        # 尖峰時多開的臨時連線，沒人等就關掉
+        self._close_raw(entry, "overflow")
+
+    # ----- 背景維護 -----
+    # 從最久沒用的 (左邊) 開始：過期的關掉、閒置超過門檻的先 ping；遇到還新鮮的就停 (右邊只會更新鮮)
+    # 一次只拿一條出來檢查，其餘連線照常可以被借走；最後把連線數補回 min_size
+    def sweep(self) -> int:
+        closed = 0
+        while True:
+            now = self._clock()
+            with self._lock:
+                if not self._idle:
+                    break
+                oldest = self._idle[0]
+                if not (self._expired(oldest, now) or self._needs_check(oldest, now)):
+                    break
+                self._idle.popleft()
+
+            if self._expired(oldest, now):
+                self._close(oldest, "lifetime")
+                closed += 1
+            elif not self._is_alive(oldest.raw):
+                self._close(oldest, "stale")
+                closed += 1
+            else:
+                self.release(oldest)
+        self.fill()
+        return closed
+
+    # 預先建立連線到 min_size (啟動時、sweep 後呼叫)；建立失敗就留給下次，借用時會再試
+    def fill(self) -> int:
+        opened = 0
+        while True:
+            with self._lock:
+                if self._total >= self.min_size or self._waiters:
+                    return opened
+                self._total += 1
+            try:
+                entry = self._open()
+            except Exception as e:
+                logger.warning(f"db pool 預先建立連線失敗: {e}")
+                return opened
+            self.release(entry)
+            opened += 1
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self._total -= len(idle)
+        for entry in idle:
+            self._close_raw(entry, "shutdown")
+# =======================================
+
+
+
+
+# =======================================
+# 唯讀副本 (read replica) 群組：每個副本一個 ConnectionPool，借連線時輪流 (round-robin)
+# 健康檢查：
+# - 借連線時連不上 (建立連線失敗) → 標記為不健康，retry_seconds 內跳過，改借下一個副本
+# - check_health()：背景定期對每個副本跑 health_check(conn) (eg. 複寫延遲太大) → 不健康就暫停使用
+# 副本都不能用 (不健康或借光) → acquire() 回傳 None，由呼叫端改用主庫
+class ReplicaSet:
+    def __init__(self, pools: List[ConnectionPool], retry_seconds: float = 30,
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.pools = pools
+        self.retry_seconds = retry_seconds
+        self._health_check = health_check
+        self._clock = clock
+        self._down_until: Dict[int, float] = {}     # 副本 index → 這個時間點之前不使用
+        self._next = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def is_healthy(self, index: int) -> bool:
+        return self._down_until.get(index, 0) <= self._clock()
+
+    def mark_down(self, index: int, reason: str) -> None:
+        self._down_until[index] = self._clock() + self.retry_seconds
+        logger.warning(f"read replica #{index} 暫停使用 {self.retry_seconds:.0f} 秒: {reason}")
+
+    # 回傳 (副本所屬的 pool, 連線)；不等待 (timeout=0)：這個副本借光了就換下一個
+    def acquire(self) -> Optional[Tuple[ConnectionPool, PooledConnection]]:
+        count = len(self.pools)
+        if not count:
+            return None
+        start = next(self._next)
+        for offset in range(count):
+            index = (start + offset) % count
+            if not self.is_healthy(index):
+                continue
+            pool = self.pools[index]
+            try:
+                return pool, pool.acquire(timeout=0)
+            except PoolError:
+                continue                            # 借光了：不算不健康
+            except Exception as e:
+                self.mark_down(index, str(e))
+        return None
+
+    def check_health(self) -> int:
+        unhealthy = 0
+        for index, pool in enumerate(self.pools):
+            try:
+                entry = pool.acquire(timeout=0)
+            except PoolError:
+                continue                            # 忙碌中 = 連得上
+            except Exception as e:
+                self.mark_down(index, str(e))
+                unhealthy += 1
+                continue
+
+            discard = False
+            try:
+                ok = self._health_check(entry.raw) if self._health_check else True
+            except Exception as e:
+                ok, discard = False, True
+                logger.warning(f"read replica #{index} 健康檢查失敗: {e}")
+            finally:
+                pool.release(entry, discard=discard)
+
+            if ok:
+                self._down_until.pop(index, None)
+            else:
+                self.mark_down(index, "health check failed")
+                unhealthy += 1
+        return unhealthy
+# =======================================
+
+
+
+
+# =======================================
+# app lifespan 啟動的背景工作：每 interval 秒在 threadpool 跑一次 sweep (ping 是 blocking I/O，不能卡住 event loop)
+# sweep：pool.sweep，或 config.database.maintain_pools (主庫 + 所有副本 + 副本健康檢查)
+async def run_periodic_sweep(sweep: Callable[[], int], interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            closed = await asyncio.to_thread(sweep)
+            if closed:
+                logger.info(f"db pool sweep: 關閉 {closed} 條過期 / 失效連線")
+        except Exception as e:        # 維護失敗不影響服務，借出時仍有閒置檢查
+            logger.warning(f"db pool sweep 失敗: {e}")
+# =======================================
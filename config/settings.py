@@ -53,7 +53,19 @@ else:
 # ===== JWT 設定 =====
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7    # 7 天
+# access token 短效 (預設 15 分鐘)，每次請求只驗簽不查任何儲存；過期後前端用 refresh token 換新的 (POST /api/user/refresh)
+# refresh token 存在 Redis (utils/refresh_tokens.py)，每次換發都會輪替；登出 / 撤銷全部裝置都是刪 Redis 的 refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 10))   # 兩個分頁同時換發：這段時間內的重複使用不算盜用
+# 驗證過的 token 快取 (utils/auth_utils.py)：最多幾筆 (每個 worker)，0 = 不快取，每次都完整解碼驗簽
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+
+# ===== 密碼雜湊 (bcrypt) 設定 =====
+# BCRYPT_ROUNDS：新雜湊的成本 (2^rounds 次運算；12 約 250ms CPU)。已存的雜湊帶有自己的成本，驗證時照舊
+# BCRYPT_MAX_CONCURRENCY：同時最多幾個 bcrypt 運算 (專用執行緒池大小，建議 <= 每個 worker 可用的 CPU 核心數)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_MAX_CONCURRENCY = int(os.getenv("BCRYPT_MAX_CONCURRENCY", 2))
 
 
 # ===== 資料庫設定 =====
@@ -63,6 +75,29 @@ DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 DB_PORT = int(os.getenv("DB_PORT", 3306))
 
+# 連線池健康檢查 (config/db_pool.py)：閒置超過 DB_POOL_IDLE_CHECK_SECONDS 的連線借出前才 ping；
+# 連線活超過 DB_POOL_MAX_LIFETIME_SECONDS 就重建 (要小於 MySQL wait_timeout)；背景每 DB_POOL_SWEEP_SECONDS 秒巡一次 (0 = 不巡)
+DB_POOL_IDLE_CHECK_SECONDS = float(os.getenv("DB_POOL_IDLE_CHECK_SECONDS", 30))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", 1800))
+DB_POOL_SWEEP_SECONDS = float(os.getenv("DB_POOL_SWEEP_SECONDS", 60))
+
+# 連線池大小 (每個 uvicorn worker 各一個池，總連線數 = worker 數 × (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW)，要小於 MySQL max_connections)
+# DB_POOL_MIN_SIZE：預先建好的連線；DB_POOL_SIZE：常駐上限；DB_POOL_MAX_OVERFLOW：尖峰時多開、用完就關的臨時連線
+# DB_POOL_ACQUIRE_TIMEOUT：全部借光時排隊等幾秒 (0 = 不等，立刻失敗)；只適用 threadpool 裡的借用，event loop 上一律不等
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 5))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 10))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 5))
+
+# 唯讀副本 (read replica)：逗號分隔的 host 或 host:port (沒設定 = 所有查詢都走主庫)
+# 每個副本一個連線池 (大小同 DB_POOL_*)；get_connection(readonly=True) 輪流使用
+# DB_REPLICA_MAX_LAG_SECONDS：背景健康檢查時複寫延遲超過這個秒數就暫停使用該副本，DB_REPLICA_RETRY_SECONDS 秒後再試
+# DB_REPLICA_STICKY_SECONDS：使用者自己寫入 (POST / PUT / PATCH / DELETE) 後，這段時間內他的讀取都走主庫 (read-your-writes)
+DB_REPLICA_HOSTS = [h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 5))
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", 30))
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+
 
 # ===== SMTP 設定 =====
 SMTP_HOST = os.getenv("SMTP_HOST")
@@ -75,12 +110,23 @@ SMTP_PASS = os.getenv("SMTP_PASS")
 TAPPAY_PARTNER_KEY = os.getenv("TAPPAY_PARTNER_KEY")
 TAPPAY_MERCHANT_ID = os.getenv("TAPPAY_MERCHANT_ID")
 TAPPAY_ENV = os.getenv("TAPPAY_ENV", "sandbox")
+# 付款 API 網址：預設依 TAPPAY_ENV 決定 sandbox / prod；壓測時指到 loadtest/tappay_stub.py，不會真的打到 TapPay
+TAPPAY_API_URL = os.getenv("TAPPAY_API_URL") or (
+    "https://sandbox.tappaysdk.com/tpc/payment/pay-by-prime"
+    if TAPPAY_ENV == "sandbox"
+    else "https://prod.tappaysdk.com/tpc/payment/pay-by-prime"
+)
 
 
 # ===== Redis 連線設定 =====
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None  # 若沒在 Redis 伺服器設定密碼，可設為 None (加上 or None 是防禦性程式設計: 可以把空字串統一轉成 None。確保無論 .env 的 REDIS_PASSWORD 怎麼寫，程式都能正確處理)
+# Redis 連線池：最多 REDIS_POOL_MAX_CONNECTIONS 條 (每個 worker)，借光時最多等 REDIS_POOL_TIMEOUT 秒 (event loop 上不等)
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", 20))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 2))
+# 會員資料快取 (utils/profile_cache.py)：/api/user/auth 與 /api/user/profile 共用；更新個人資料時寫入、收到新評分時清除
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_TTL_SECONDS", 3600))
 
 
 # ===== AWS S3 設定 =====
@@ -97,6 +143,23 @@ CLOUDFRONT_URL = os.getenv("CLOUDFRONT_URL", "").rstrip("/")  # 移除尾部斜
 
 # ===== AWS SQS 設定 =====
 SQS_EMAIL_QUEUE_URL = os.getenv("SQS_EMAIL_QUEUE_URL")
+# 通知 outbox (utils/outbox_dispatcher.py)：API 只在 transaction 內寫入寄信意圖，每個 worker 的背景迴圈負責送出
+# 每次取 OUTBOX_BATCH_SIZE 筆、取到的項目鎖 OUTBOX_LEASE_SECONDS 秒 (寄送中每 1/3 租約續租一次)；outbox 清空時每 OUTBOX_POLL_SECONDS 秒檢查一次 (0 = 不啟動)
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 1))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 60))
+
+
+# ===== 監控 (/metrics) 設定 =====
+# 有設定時 /metrics 需帶 Authorization: Bearer <METRICS_TOKEN> (Prometheus 的 bearer_token 設定)；
+# 沒設定時正式環境回 404 (不開放)，開發環境 (ENV=development) 不驗證
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+# SQL 指紋統計 (utils/query_stats.py)：超過 SLOW_QUERY_MS 的單筆 SQL 立即記 warning (0 = 關閉)；
+# 每 QUERY_STATS_DUMP_SECONDS 秒把 top-N 寫進 log 並開新視窗 (0 = 不定期輸出，只能從 /debug/query_stats 看)
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 200))
+QUERY_STATS_DUMP_SECONDS = int(os.getenv("QUERY_STATS_DUMP_SECONDS", 300))
+QUERY_STATS_TOP_N = int(os.getenv("QUERY_STATS_TOP_N", 10))
 
 # =======================================
 
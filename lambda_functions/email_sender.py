@@ -3,6 +3,9 @@
 
 # Trigger: AWS SQS (automatically triggered when messages arrive in queue)
 # Function: Parse SQS messages and send emails via SMTP
+# - One authenticated SMTP session per invocation, reused for every record (reconnects once if the server drops it)
+# - Returns batchItemFailures (SQS partial batch response): only the failed records go back to the queue
+#   (requires ReportBatchItemFailures on the event source mapping)
 
 # Deployment:
 # - This file runs on AWS Lambda, independent of FastAPI
@@ -41,196 +44,242 @@ SMTP_HOST = os.environ.get('SMTP_HOST')
 SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
 SMTP_USER = os.environ.get('SMTP_USER')      
 SMTP_PASS = os.environ.get('SMTP_PASS')      
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() != 'false'   # 本機 SMTP 替身 (scripts/bench_lambda_smtp.py) 沒有 TLS 時設 false
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', 10))
 
 
 
 # ================================================
-# 實際寄送 Email 的函數
-# 參數: (1) to: 收件人 Email; (2) subject: 信件主旨; (3) body: 信件內容
-# 無回傳值: 這個函數只負責「執行寄信動作」，成功就正常結束，失敗就拋出例外讓 lambda_handler 處理。不需要回傳值 
-def send_email(to: str, subject: str, body: str) -> None:
-    msg = EmailMessage()                          # 建立一個新的 EmailMessage 物件, 代表「一封信」
-    msg["From"] = f"Pitch-A-Seat <{SMTP_USER}>"   # 設定信件的「From」欄位
-    msg["To"] = to
-    msg["Subject"] = subject
-    msg.set_content(body)                         # 設定信件內容（純文字）, body 是內容 (字串)
-    
-    # 呼叫 SMTP 伺服器: 建立一個到 SMTP 伺服器的連線，啟用 TLS
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as smtp:
-        smtp.ehlo()                       # 對 SMTP 伺服器送出 EHLO 指令
-        smtp.starttls()                   # 對伺服器送出 STARTTLS 指令
-        smtp.login(SMTP_USER, SMTP_PASS)  # 登入 SMTP 伺服器，取得寄信權限
-        smtp.send_message(msg)            # 把前面組好的 EmailMessage 物件送出去, 實際寄出信件給收件人
+# SMTP 連線 (每次 Lambda 執行只建立一次，整批 Records 共用)
+# 原本每封信都重新 連線 → EHLO → STARTTLS → LOGIN → 寄信 → QUIT，真正寄信只佔一小部分時間 (TLS 交握 + 登入就要好幾個來回)
+# 現在整批共用同一個已登入的連線，每封信只剩 MAIL FROM / RCPT TO / DATA
+
+# 建立一條已登入的 SMTP 連線
+def open_smtp() -> smtplib.SMTP:
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        smtp.ehlo()                           # 對 SMTP 伺服器送出 EHLO 指令
+        if SMTP_STARTTLS:
+            smtp.starttls()                   # 對伺服器送出 STARTTLS 指令，把連線升級為加密的 TLS 連線
+            smtp.ehlo()                       # TLS 之後要重新 EHLO (smtplib 也會自動補，這裡寫明)
+        if SMTP_USER and SMTP_PASS:           # 本機 SMTP 替身不需要登入 (不設 SMTP_PASS)
+            smtp.login(SMTP_USER, SMTP_PASS)  # 登入 SMTP 伺服器，取得寄信權限
+    except Exception:
+        smtp.close()
+        raise
+    return smtp
+
+
+# 連線斷掉時才會出現的錯誤：重新連線再寄一次就可能成功
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+# SMTP 伺服器整個不能用 (連不上、登入失敗、重連後又斷線)：跟哪一封信無關，lambda_handler 收到後剩下的訊息都不再嘗試
+class SMTPUnavailable(Exception):
+    pass
+
+
+class SMTPSession:
+    def __init__(self, opener=None):
+        self._opener = opener or open_smtp
+        self._smtp = None
+        self.connects = 0                     # 這次執行建立了幾次連線 (正常是 1；寫進 log 方便觀察)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # 實際寄送 Email
+    # 參數: (1) to: 收件人 Email; (2) subject: 信件主旨; (3) body: 信件內容
+    # 無回傳值: 成功就正常結束，失敗就拋出例外讓 lambda_handler 處理
+    # 第一次寄信時才連線；連線被伺服器關掉 (閒置逾時、伺服器重啟) 就重新連線再寄一次，第二次還是失敗才拋出
+    def send(self, to: str, subject: str, body: str) -> None:
+        msg = EmailMessage()                          # 建立一個新的 EmailMessage 物件, 代表「一封信」
+        msg["From"] = f"Pitch-A-Seat <{SMTP_USER}>"   # 設定信件的「From」欄位
+        msg["To"] = to
+        msg["Subject"] = subject
+        msg.set_content(body)                         # 設定信件內容（純文字）, body 是內容 (字串)
+
+        for attempt in (1, 2):
+            if self._smtp is None:
+                try:
+                    self._smtp = self._opener()
+                except Exception as e:
+                    raise SMTPUnavailable(f"無法連線 / 登入 SMTP: {e!r}") from e
+                self.connects += 1
+            try:
+                self._smtp.send_message(msg)          # 把前面組好的 EmailMessage 物件送出去, 實際寄出信件給收件人
+                return
+            except CONNECTION_ERRORS as e:
+                self.close()
+                if attempt == 2:
+                    raise SMTPUnavailable(f"SMTP 重新連線後仍中斷: {e!r}") from e
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()                        # 連線已經斷了，QUIT 送不出去就直接關 socket
+        self._smtp = None
 
 
 # ---------------------------    
 
 
-# 1. 如果上面寄信動作的任何一步失敗，會拋出 smtplib.SMTPException, 由 lambda_handler 函數接住這個錯誤
-# 2. 此函數和 email_utils.py 裡的 send_email 函數幾乎一樣 (都是實際執行寄信動作),
-# 但此函數是獨立的: 因為此Lambda 函數在 AWS 上執行, 無法 import 專案其他模組（Lambda 環境獨立於 FastAPI），所以必須在此重新實作這個獨立的 send_email 函數
-# 3. 兩個函數的錯誤處理策略不同:     
+# 1. 寄這一封信失敗會拋出 smtplib.SMTPException；連線 / 登入本身失敗會拋出 SMTPUnavailable, 都由 lambda_handler 函數接住
+# 2. 此類別和 email_utils.py 裡的 send_email 函數做的事幾乎一樣 (都是實際執行寄信動作),
+# 但此檔案是獨立的: 因為此Lambda 函數在 AWS 上執行, 無法 import 專案其他模組（Lambda 環境獨立於 FastAPI），所以必須在此重新實作
+# 3. 兩邊的錯誤處理策略不同:     
 # (1) FastAPI 的 send_email 函數: 1.發生錯誤時只印 log, 不 raise, 不影響主流程 2.是 Fallback 的替代手段, 若這次再寄失敗就印 log 但不 raise   
-# (2) Lambda 的 send_email 函數: 
-# a. 發生錯誤時: 直接將錯誤拋出，讓外層 lambda_handler 決定要不要重試.
-# b. 設計成將錯誤拋出的原因: 不 try-except, 而是直接讓錯誤往上拋, 由 lambda_handler 函數裡的 try-except 接住並決定處理方式 
+# (2) Lambda 的 SMTPSession.send: 
+# a. 發生錯誤時: 直接將錯誤拋出，讓外層 lambda_handler 決定這筆訊息要不要重試.
+# b. 只在「連線斷掉」時自己重連一次 (同一封信不會因為連線被回收就失敗)；其他錯誤 (eg. 收件人被拒) 重連也沒用，直接拋出
 
 
 # --------------------------- 
 
 
-# ================================================
-
-
-
-
-
-
 # ================================================
 # Lambda 進入點的關鍵函數 (Lambda 需要知道「要執行哪個函數」，這個函數就叫做「進入點」（Entry Point）或「Handler」。在 Lambda Console 的設定中會指定 email_sender.lambda_handler) 
 # 功能: 解析訊息、實際寄送 Email
 # 參數: (1) event (SQS 訊息) (2) context (執行環境資訊)
-# 回傳值: 執行結果 dict (方便看 log 確認) (如果是由 API 觸發 Lambda, 這個執行結果才會用來判斷是成功或失敗)
-# 流程: 當 SQS Queue 有新訊息進來, (1) AWS 就會 自動觸發執行 lambda_handler 函數. (2) lambda_handler 函數會從 SQS Queue 取得任務, (3) 並實際在背景執行任務「寄信動作」(執行 send_email 函數)
+# 回傳值: 執行結果 dict，其中 batchItemFailures 列出要回到 Queue 重試的訊息 (SQS partial batch response)，其餘訊息由 SQS 刪除
+# 流程: 當 SQS Queue 有新訊息進來, (1) AWS 就會 自動觸發執行 lambda_handler 函數. (2) lambda_handler 函數會從 SQS Queue 取得任務, (3) 並實際在背景執行任務「寄信動作」(整批共用一個 SMTPSession)
+
+# 部署設定: Event Source Mapping 要勾選 ReportBatchItemFailures (FunctionResponseTypes)，AWS 才會讀 batchItemFailures；
+# 沒勾選時回傳值會被忽略，整批都當作成功刪除
 
 def lambda_handler(event, context):
+    records = event['Records']
+
     # 1. 在 lambda 啟動的一開始, 先印出 Lambda 啟動訊息 log, 方便有必要時查流程情形
-    print(f"Lambda 啟動，收到 {len(event['Records'])} 筆訊息")
+    print(f"Lambda 啟動，收到 {len(records)} 筆訊息")
     
-    # 2. 在 for loop 開始前宣告這兩個變數並將值預設為 0，之後要用這兩個變數記錄處理結果
+    # 2. 在 for loop 開始前宣告變數，之後要用這些變數記錄處理結果
     success_count = 0
     fail_count = 0
+    batch_item_failures = []   # 要回到 Queue 重試的訊息: [{"itemIdentifier": messageId}, ...]
+    smtp_down = None           # SMTP 整個不能用時記下原因：剩下的訊息不再嘗試，直接全部交回 Queue
     
     # 3. 用 for loop 遍歷所有 SQS 訊息 (任務), 原因: SQS 可能一次傳多筆訊息 (任務), 所以用 for loop 分批處理
     # 流程: 
     # (1) 解析 SQS 訊息內容 (當初發送任務進 Queue 時組裝的 message_body 內容)
     # (2) 檢查 SQS 訊息類型是否為 當初發送任務進 Queue 時設定的 type 
     # (3) 取出 Email 的實際資訊 (to: 收件人 email, subject: 信件主旨, body: 信件內容) 
-    # (4) 實際進行「寄送 Email」的動作 
+    # (4) 用這次執行共用的 SMTP 連線實際進行「寄送 Email」的動作 
     # (5) 印出任務執行成功訊息 log, 並將 success_count 加一
-    # (6) Lambda 成功完成任務 : lambda_handler 正常結束 -> SQS 刪除訊息
+    # (6) 沒有列在 batchItemFailures 的訊息 (成功、或永久性錯誤不重試) → SQS 刪除訊息
 
-    for record in event['Records']:
-        message_id = record['messageId']
-        
-        try:
-            # Step 1: 解析 SQS 訊息內容 (當初發送任務進 Queue 時組裝的 message_body 內容)           
-            raw_body = record['body'] # SQS 只接受字串，所以record['body']是字串，之後用json.loads轉為dict
-            print(f"處理訊息 {message_id}: {raw_body[:100]}...")  # 印出 body 內容的 log 確認: 只印 body 內容的前 100 字元
-            
-            message = json.loads(raw_body) # 因為之後要使用 .get() 取 type 檢查，所以要把原本是字串的raw_body轉成Python dict
-            
+    with SMTPSession() as session:
+        for record in records:
+            message_id = record['messageId']
 
-            # Step 2: 檢查訊息類型
-            # 當初在 send_email_to_queue 有設定 type 是 "email" (未來可能有其他類型（如 "sms", "push"）) 
-            # 若訊息類型不是 send_email_to_queue 函數設定的 email type, 就直接跳過這圈不執行, 繼續進行下一圈 for loop           
-            if message.get('type') != 'email':
-                print(f"未知的訊息類型: {message.get('type')}，跳過")  # 印出類型不符被跳過的訊息 log, 作為確認
+            if smtp_down is not None:
+                batch_item_failures.append({"itemIdentifier": message_id})
+                fail_count += 1
                 continue
-
-
-            # Step 3: 從 body 的 payload 取出 Email 的實際資訊 (to: 收件人 email, subject: 信件主旨, body: 信件內容) 
-            payload = message['payload']
-            to = payload['to']
-            subject = payload['subject']
-            body = payload['body']
             
-
-            print(f"準備發送 Email: to={to}, subject={subject}") # 印出 email收件人 和 信件主旨 log 作為確認
-
-
-            # Step 4: 呼叫此檔案的send_email函數, 實際進行「寄送 Email」的動作
-            send_email(to, subject, body)
+            try:
+                # Step 1: 解析 SQS 訊息內容 (當初發送任務進 Queue 時組裝的 message_body 內容)           
+                raw_body = record['body'] # SQS 只接受字串，所以record['body']是字串，之後用json.loads轉為dict
+                print(f"處理訊息 {message_id}: {raw_body[:100]}...")  # 印出 body 內容的 log 確認: 只印 body 內容的前 100 字元
+                
+                message = json.loads(raw_body) # 因為之後要使用 .get() 取 type 檢查，所以要把原本是字串的raw_body轉成Python dict
+                
+
+                # Step 2: 檢查訊息類型
+                # 當初在 send_email_to_queue 有設定 type 是 "email" (未來可能有其他類型（如 "sms", "push"）) 
+                # 若訊息類型不是 send_email_to_queue 函數設定的 email type, 就直接跳過這圈不執行, 繼續進行下一圈 for loop           
+                if message.get('type') != 'email':
+                    print(f"未知的訊息類型: {message.get('type')}，跳過")  # 印出類型不符被跳過的訊息 log, 作為確認
+                    continue
+
+
+                # Step 3: 從 body 的 payload 取出 Email 的實際資訊 (to: 收件人 email, subject: 信件主旨, body: 信件內容) 
+                payload = message['payload']
+                to = payload['to']
+                subject = payload['subject']
+                body = payload['body']
+                
+
+                print(f"準備發送 Email: to={to}, subject={subject}") # 印出 email收件人 和 信件主旨 log 作為確認
+
+
+                # Step 4: 用這次執行共用的 SMTP 連線, 實際進行「寄送 Email」的動作 (第一封信時才連線登入)
+                session.send(to, subject, body)
+                
+
+                # Step 5: 印出任務執行成功訊息 log (包含成功任務訊息的 message_id )作為確認, 並將 success_count 加一, 之後可以看 log 確認執行情形
+                print(f"Email 發送成功: {message_id}")
+                success_count += 1
             
 
-            # Step 5: 印出任務執行成功訊息 log (包含成功任務訊息的 message_id )作為確認, 並將 success_count 加一, 之後可以看 log 確認執行情形
-            print(f"Email 發送成功: {message_id}")
-            success_count += 1
-            
-
-            # 走到這邊, Lambda 就成功處理完寄信任務了. 
-            # 之後, Lambda 與 SQS 的整合機制 會自動做以下處理：
-            # (1) lambda_handler 正常結束 (return), 沒有 raise -> 視為 Lambda 成功完成任務 ->「Lambda 與 SQS 的整合機制」自動刪除這筆任務訊息, 不需要人手動刪除 (AWS Lambda Service 通知 SQS 刪除訊息)
-            # (2) lambda_handler 拋出例外 (raise) -> 視為 Lambda 任務失敗 -> 「Lambda 與 SQS 的整合機制」讓訊息回到 Queue 重試 (訊息在 visibility timeout 後重新可見，等待重試)
-        
-
-        # 若前面 Lambda 函數處理任務流程中的任一步發生錯誤, 就依不同情形進不同的 exception. 
-        # 兩種 Exception 情形: 
-        # (1) Lambda 函數 只印 log 不 raise: 一樣會 return result, 內含 200 和 fail_account, 視為 Lambda 成功完成任務, AWS Lambda Service 通知 SQS 刪除訊息
-        # (2) Lambda 函數 直接 raise: 拋出例外, 視為 Lambda 任務失敗, 訊息回到 Queue 裡重試 
-
-        # 錯誤情境一: SQS 訊息字串 的 JSON 解析失敗（ SQS 訊息格式錯誤）
-        # 作法: (1) 印出 JSON 解析失敗 log、失敗的任務 id、實際錯誤訊息. 不 raise 拋出例外 (2) fail_count加一 (可看 log 追蹤失敗情形)
-        except json.JSONDecodeError as e:            
-            print(f"JSON 解析失敗 {message_id}: {e}")
-            fail_count += 1
-
-
-        # --------------------    
-        # 只印 log 不 raise:
-        # (1) 效果: 這筆錯誤訊息會被視為「處理成功」而由 AWS Lambda Service 通知 SQS 自動刪除 (必須由開發者從 fail_count 紀錄並看 log 檢查失敗任務)
-        # (2) trade-off: 不會因一批任務裡的某一個任務 格式錯誤, 而導致整批執行失敗 (若某一筆有錯就 raise, 會整批任務（這次 Lambda 收到的所有 Records）都會被視為失敗，全部回到 Queue 重試; 若某一筆有錯但不 raise, 只有那筆不會重試（被視為成功刪除），其他正常處理. 也就是: 只會丟掉那一筆格式錯誤的訊息 (因為不 raise 會被視為任務成功), 而且可以看 CloudWatch Logs 有 fail_count 來輔助發現問題 (但就沒有機會當下被修復後重試)
-
-        # 若想讓格式錯誤的訊息重試: 
-        # 運作原理：
-        # 1. Lambda 拋出例外 -> AWS Lambda Service 不呼叫 SQS 的 DeleteMessage API
-        # 2. 訊息維持「處理中」狀態，visibility timeout 到期後重新可見
-        # 3. 下一個 Lambda instance 取走訊息，重試處理
-        # 4. 超過 maxReceiveCount（3 次）-> 訊息移到 DLQ
-        # -------------------- 
-        
-        
-
-        # 錯誤情境二: SMTP 發送失敗 (eg.網路問題、SMTP認證問題等)
-        # 作法: (1) 印出 SMTP 錯誤 log、失敗的任務 id、實際錯誤訊息. 不 raise 拋出例外 (2) fail_count加一 (可看 log 追蹤失敗情形)    
-        except smtplib.SMTPException as e:            
-            print(f"SMTP 錯誤 {message_id}: {e}")
-            fail_count += 1
-            # 只印 log，不 raise (避免一直重試寄信到無效的 Email)，因此這筆訊息會被 SQS 視為「處理成功」而刪除。實務上可根據錯誤類型決定要不要加 raise 來拋出例外讓訊息回到 Queue 裡重試
-        
-        # --------------------    
-        # 只印 log 不 raise:
-        # (1) 效果: 
-        # 這筆錯誤的任務訊息會被視為「任務處理成功」而被SQS刪除 (必須由開發者從 fail_count 紀錄並看 log 檢查失敗任務)
-  
-        # (2) trade-off: 
-        # 不會因一批任務裡的某一個任務 SMTP 錯誤 (eg. 永久性問題: 收件人email無效 這種無論重試幾次都不會修復的狀況), 而導致整批執行失敗 (若某一筆有錯就 raise, 會整批任務（這次 Lambda 收到的所有 Records）都會被視為失敗，全部回到 Queue 重試; 若某一筆有錯但不 raise, 只有那筆不會重試（被視為成功刪除），其他正常處理. 也就是說, 只會丟掉單一有問題的訊息 (eg.收件人email無效), 而且可以看 CloudWatch Logs 有 fail_count 來輔助發現問題 
-        # 但如果是暫時性網路問題 (eg. Gmail 伺服器暫時無回應而網路短暫中斷, 可能過一下重試就好了), 就沒有機會當下被修復後重試
-        # (3) 改善方式: 
-        # 分開不同錯誤類型, 暫時性網路問題使用 raise 拋出例外, 訊息就會回到 Queue 重試, 永久性問題就還是只印 log 不 raise
-
-        # --------------------
-
-
-
-        # 其他所有錯誤情境: 其他未預期的錯誤 
-        # 作法: 一律 (1) 印 log、失敗的任務 id、實際錯誤訊息 (2) fail_count加一 (可看 log 追蹤失敗情形) (3) raise 拋出例外讓 Queue 重試任務 
-        except Exception as e:            
-            print(f"未預期錯誤 {message_id}: {e}")
-            fail_count += 1
-            raise   # raise 拋出例外，讓訊息回到 Queue 去重試這筆訊息任務
-            # 不寫 raise e，而是寫 raise，能保留原始 stack trace, 更乾淨、更好追蹤原始錯誤
+            # 若前面處理流程中的任一步發生錯誤, 就依不同情形進不同的 exception. 
+            # 兩種處理方式 (不再 raise：raise 會讓整批訊息全部重試, 已經寄出的信也會再寄一次):
+            # (1) 只印 log: 這筆訊息視為處理完畢, SQS 刪除 (永久性問題, 重試也沒用)
+            # (2) 加進 batchItemFailures: 只有這筆訊息回到 Queue 重試 (暫時性問題), 超過 maxReceiveCount 後進 DLQ
+
+            # 錯誤情境一: SMTP 伺服器連不上 / 登入失敗 / 重連後仍斷線
+            # 作法: 這筆與剩下的所有訊息都交回 Queue (等 visibility timeout 後重試), 不再逐筆嘗試連線
+            except SMTPUnavailable as e:
+                print(f"SMTP 無法使用 {message_id}: {e}，剩下的訊息全部交回 Queue")
+                smtp_down = e
+                batch_item_failures.append({"itemIdentifier": message_id})
+                fail_count += 1
+
+            # 錯誤情境二: SQS 訊息格式錯誤 (JSON 解析失敗、缺欄位)
+            # 作法: 印出 log、失敗的任務 id、實際錯誤訊息, 不重試 (格式錯誤是永久性問題), fail_count加一
+            except (json.JSONDecodeError, KeyError, TypeError) as e:            
+                print(f"訊息格式錯誤 {message_id}: {e!r}")
+                fail_count += 1
+
+            # 錯誤情境三: SMTP 伺服器回了錯誤碼 (eg. 寄件者被拒、信件內容被拒)
+            # 作法: 4xx 是暫時性 (eg. 伺服器忙碌、寄送頻率限制) → 交回 Queue 重試；5xx 是永久性 → 只印 log
+            except smtplib.SMTPResponseException as e:
+                fail_count += 1
+                if 400 <= e.smtp_code < 500:
+                    print(f"SMTP 暫時性錯誤 {message_id}: {e.smtp_code} {e.smtp_error!r}，交回 Queue 重試")
+                    batch_item_failures.append({"itemIdentifier": message_id})
+                else:
+                    print(f"SMTP 錯誤 {message_id}: {e.smtp_code} {e.smtp_error!r}")
+
+            # 錯誤情境四: 其他 SMTP 錯誤 (eg. 收件人全部被拒 SMTPRecipientsRefused)
+            # 作法: 只印 log，不重試 (避免一直重試寄信到無效的 Email)
+            except smtplib.SMTPException as e:            
+                print(f"SMTP 錯誤 {message_id}: {e!r}")
+                fail_count += 1
+
+            # 其他所有錯誤情境: 其他未預期的錯誤 
+            # 作法: 印 log、fail_count加一, 只把這筆交回 Queue 重試 (可能是暫時性問題, 保守策略)
+            except Exception as e:            
+                print(f"未預期錯誤 {message_id}: {e!r}")
+                fail_count += 1
+                batch_item_failures.append({"itemIdentifier": message_id})
     
 
 
-    # 4. lambda 處理任務成功並順利寄出信件後, 組裝 lambda_handler 函數的處理結果, 並將這個結果回傳給 AWS Lambda Service
-    # Lambda 與 SQS 整合機制：
-    # - 正常結束（return）→ AWS Lambda Service 通知 SQS 刪除訊息
-    # - 拋出例外（raise）→ 訊息在 visibility timeout 後重新可見，等待重試
-    # 注意：SQS 觸發的 Lambda 是看「有沒有拋出例外」，不是看回傳值的 statusCode
-
+    # 4. 組裝 lambda_handler 函數的處理結果, 並將這個結果回傳給 AWS Lambda Service
+    # Lambda 與 SQS 整合機制 (ReportBatchItemFailures)：
+    # - batchItemFailures 裡的訊息 → visibility timeout 後重新可見，等待重試
+    # - 其他訊息 → AWS Lambda Service 通知 SQS 刪除
+    # - 拋出例外（raise）→ 整批重試 (本函數已不 raise)
 
-    # 這是 Lambda 的標準回傳格式 (statusCode 200 和 body內容), 回傳處理結果給 AWS Lambda Service 
-    # 雖然本例是 SQS 觸發, 所以 SQS 只看有沒有 raise 來判斷任務是否成功, 不看回傳值的 200 和 body (所以 status code 不重要, body內容不是字串也沒關係). 但固定標準格式可以提升一致性(好維護)、可讀性(看log很清楚)、可擴展性 (未來如果要加 API Gateway 觸發 Lambda 就可以直接沿用格式) 
-    # 若由 API Gateway 觸發 Lambda, Lambda回傳值會「直接變成 HTTP Response 回給使用者」, 所以必須有 StatusCode（HTTP 需要狀態碼）, body也必須是字串（HTTP body 是字串）
+    # statusCode / body 是 Lambda 的標準格式, 方便看 log; SQS 觸發時 AWS 只看 batchItemFailures
     result = {
         'statusCode': 200,                 
         'body': json.dumps({               
             'message': 'completed',        
             'success': success_count,
             'failed': fail_count,
-            'total': len(event['Records'])
-        })
+            'retry': len(batch_item_failures),
+            'total': len(records),
+            'smtp_connects': session.connects,
+        }),
+        'batchItemFailures': batch_item_failures,
     }
 
     # 5. 印出 lambda_handler 函數執行完畢的 log 資訊 (包含 result 內容) 作為確認
@@ -250,9 +299,12 @@ def lambda_handler(event, context):
 
 # ----------------------------
 # Exception 分不同種類的設計原則：已知的永久性問題不重試，未知問題預設重試（保守策略）. eg.
-# 1. JSONDecodeError: 不 raise. 原因: 格式錯誤是永久性問題，重試也沒用
-# 2. SMTPException:   不 raise. 原因: 可能是收件人無效，重試也沒用
-# 3. 未預期錯誤:        raise.   原因: 可能是暫時性問題（如記憶體不足），重試可能成功
+# 1. 格式錯誤 (JSONDecodeError 等): 不重試. 原因: 格式錯誤是永久性問題，重試也沒用
+# 2. SMTP 5xx / 收件人被拒:          不重試. 原因: 可能是收件人無效，重試也沒用
+# 3. SMTP 4xx:                       重試.   原因: 伺服器忙碌 / 限流，稍後重試可能成功
+# 4. SMTP 連不上 / 登入失敗:          這筆與剩下的全部重試. 原因: 跟訊息無關，每筆都會一樣失敗
+# 5. 未預期錯誤:                      重試.   原因: 可能是暫時性問題（如記憶體不足），重試可能成功
+# 「重試」= 放進 batchItemFailures，只有那一筆回到 Queue；不再用 raise (raise 會讓整批重試，已寄出的信會重複寄)
 # ----------------------------
 
 
@@ -0,0 +1,243 @@
+# loadtest/locustfile.py
+# 端到端 HTTP 壓測：模擬真實使用者的操作路徑，結束時印出每支 API 的 p50 / p95 / p99，超過門檻就讓 locust 以 exit code 1 結束。
+# 環境 (MySQL / Redis / TapPay stub / SQS) 與跑法見 loadtest/README.md；最簡單：
+#   locust -f loadtest/locustfile.py --headless -u 200 -r 20 -t 5m --host http://localhost:8080
+#
+# 兩種使用者 (比例約 6:1，對應「逛的人遠多於買的人」)：
+#   Visitor：首頁統計 → 月曆 (events / schedule) → 瀏覽某場比賽的票券 (排序、篩選、翻頁)
+#   Buyer  ：登入 → 挑別人的票送出媒合 → (切成賣家) 接受媒合 → (買家) 付款 → (賣家) 出貨
+#
+# 合成會員的帳密固定：user{id}@example.com / pitchaseat123 (recsys_offline/synthetic_data.py)，
+# 所以 Buyer 能從 buyerOrders 的 seller_id 推出賣家帳號，用賣家身分完成「接受媒合」與「出貨」。
+# access token 是短效的 (預設 15 分鐘)，壓測常跑得更久：每個身分記下 refresh_token，快到期前先呼叫 /api/user/refresh 換發
+# (換發失敗就重新登入)，跑多久都不會因為 token 過期而出現一片 401。
+#
+# 環境變數：
+#   LOADTEST_SEED_USERS   seed 的會員數 (Buyer 從 1..N 隨機挑身分，預設 10000)
+#   LOADTEST_THRESHOLDS   門檻檔 (預設 loadtest/thresholds.json)
+#   LOADTEST_BASELINE     上一次的摘要 JSON；有的話也檢查相對回歸
+#   LOADTEST_SUMMARY      本次摘要輸出位置 (預設 loadtest/results/summary.json，可當下一次的 baseline)
+
+import os
+import random
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+from locust import HttpUser, between, events, task
+from locust.runners import WorkerRunner
+
+from report import check, format_table, load_json, save_summary, summarize
+
+HERE = Path(__file__).resolve().parent
+SEED_USERS = int(os.getenv("LOADTEST_SEED_USERS", "10000"))
+SEED_PASSWORD = os.getenv("LOADTEST_PASSWORD", "pitchaseat123")
+THRESHOLDS_PATH = os.getenv("LOADTEST_THRESHOLDS", str(HERE / "thresholds.json"))
+BASELINE_PATH = os.getenv("LOADTEST_BASELINE")
+SUMMARY_PATH = os.getenv("LOADTEST_SUMMARY", str(HERE / "results" / "summary.json"))
+
+SEAT_AREA_FILTERS = ["", "內野", "外野", "內野,外野"]
+SORTS = [("created_at", "desc"), ("price", "asc"), ("price", "desc"), ("rating", "desc")]
+
+
+# ==================== 共用狀態 (同一個 locust 行程內的使用者共用) ====================
+# 有票在賣的比賽：第一次用到時向 /api/events 查當月 + 下個月，之後重用 (場次在壓測期間幾乎不變)
+_games_lock = threading.Lock()
+_open_games = []
+
+# 賣家身分快取：同一個賣家被很多買家媒合時只登入一次 (bcrypt 很貴，不是這次要量的重點)，之後靠 refresh token 續用
+_sessions_lock = threading.Lock()
+_seller_sessions = {}
+
+REFRESH_MARGIN_SECONDS = 60     # access token 到期前幾秒就先換發 (避免請求送到一半剛好過期)
+
+
+def _months_ahead(n: int):
+    today = date.today()
+    for i in range(n):
+        y, m = divmod(today.month - 1 + i, 12)
+        yield today.year + y, m + 1
+
+
+def open_games(client):
+    with _games_lock:
+        if not _open_games:
+            for year, month in _months_ahead(2):
+                resp = client.get(f"/api/events?year={year}&month={month}", name="/api/events")
+                if resp.ok:
+                    _open_games.extend(row["game_id"] for row in resp.json())
+        return list(_open_games)
+
+
+# 一個會員身分的 access / refresh token；token() 回傳可用的 access token (必要時先換發或重新登入)，失敗回 None
+class Session:
+    def __init__(self, member_id: int):
+        self.member_id = member_id
+        self.access_token = None
+        self.refresh_token = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()      # 多個使用者共用同一個賣家身分時，只讓一個去換發 (refresh token 是一次性的)
+
+    def _save(self, data):
+        self.access_token = data["access_token"]
+        self.refresh_token = data.get("refresh_token")
+        self.expires_at = time.monotonic() + data.get("expires_in", 900) - REFRESH_MARGIN_SECONDS
+
+    def token(self, client):
+        with self._lock:
+            if self.access_token and time.monotonic() < self.expires_at:
+                return self.access_token
+            if self.refresh_token:
+                resp = client.post("/api/user/refresh", name="/api/user/refresh",
+                                   json={"refresh_token": self.refresh_token})
+                if resp.ok:
+                    self._save(resp.json())
+                    return self.access_token
+            resp = client.post("/api/user/login", name="/api/user/login",
+                               json={"email": f"user{self.member_id}@example.com", "password": SEED_PASSWORD})
+            if resp.ok:
+                self._save(resp.json())
+                return self.access_token
+            self.access_token, self.refresh_token = None, None
+            return None
+
+
+def seller_token(client, seller_id: int):
+    with _sessions_lock:
+        session = _seller_sessions.setdefault(seller_id, Session(seller_id))
+    return session.token(client)
+
+
+def auth(token: str):
+    return {"Authorization": f"Bearer {token}"}
+# ================================================
+
+
+class Visitor(HttpUser):
+    weight = 6
+    wait_time = between(1, 4)
+
+    @task(3)
+    def homepage_stats(self):
+        for path in ("/api/total_trades", "/api/total_amount", "/api/top_games",
+                     "/api/top_games_median_prices", "/api/team_trade_rank"):
+            self.client.get(path)
+
+    @task(2)
+    def calendar(self):
+        year, month = random.choice(list(_months_ahead(2)))
+        self.client.get(f"/api/events?year={year}&month={month}", name="/api/events")
+        self.client.get(f"/api/schedule?year={year}&month={month}", name="/api/schedule")
+
+    @task(4)
+    def browse(self):
+        games = open_games(self.client)
+        if not games:
+            return
+        game_id = random.choice(games)
+        sort_by, sort_order = random.choice(SORTS)
+        params = {"game_id": game_id, "sort_by": sort_by, "sort_order": sort_order}
+        seat_areas = random.choice(SEAT_AREA_FILTERS)
+        if seat_areas:
+            params["seat_areas"] = seat_areas
+        resp = self.client.get("/api/browse_tickets", params=params, name="/api/browse_tickets")
+        # 約三分之一的人會翻到第二頁
+        if resp.ok and resp.json()["total_count"] > 6 and random.random() < 0.33:
+            self.client.get("/api/browse_tickets", params={**params, "page": 2}, name="/api/browse_tickets")
+
+
+class Buyer(HttpUser):
+    weight = 1
+    wait_time = between(2, 6)
+
+    def on_start(self):
+        self.member_id = random.randint(1, SEED_USERS)
+        self.name = f"user{self.member_id}"
+        self.session = Session(self.member_id)
+        self.session.token(self.client)             # 先登入 (登入成本算在開場，不算在第一次購買)
+
+    @task
+    def purchase(self):
+        self.token = self.session.token(self.client)
+        if not self.token:
+            return
+        games = open_games(self.client)
+        if not games:
+            return
+
+        # 1. 瀏覽並挑一張「不是自己賣的」票
+        resp = self.client.get("/api/browse_tickets", params={"game_id": random.choice(games)},
+                               name="/api/browse_tickets")
+        if not resp.ok:
+            return
+        tickets = [t for t in resp.json()["tickets"] if t["seller_name"] != self.name]
+        if not tickets:
+            return
+        ticket_id = random.choice(tickets)["id"]
+
+        # 2. 送出媒合：別的買家剛好先買走 (400 此票券已售出) 是正常的搶票，不算失敗
+        with self.client.post(f"/api/match_request?ticket_id={ticket_id}", headers=auth(self.token),
+                              name="/api/match_request", catch_response=True) as resp:
+            if resp.status_code == 400:
+                resp.success()
+                return
+        if not resp.ok:
+            return
+
+        # 3. match_request 不回 order_id → 從 buyerOrders 找這張票最新的一筆
+        resp = self.client.get("/api/buyerOrders", headers=auth(self.token), name="/api/buyerOrders")
+        if not resp.ok:
+            return
+        order = next((o for o in resp.json() if o["ticket_id"] == ticket_id), None)
+        if order is None:
+            return
+        order_id, seller_id = order["order_id"], order["seller_id"]
+
+        # 4. 賣家接受媒合
+        token = seller_token(self.client, seller_id)
+        if not token:
+            return
+        self.client.get("/api/sellerOrders", headers=auth(token), name="/api/sellerOrders")
+        with self.client.post("/api/order_status", headers=auth(token), name="/api/order_status",
+                              json={"order_id": order_id, "action": "accept"}, catch_response=True) as resp:
+            if resp.status_code == 400:       # 同一張票已被接受給別人
+                resp.success()
+                return
+        if not resp.ok:
+            return
+
+        # 5. 買家付款 (TapPay stub)；stub 設了 STUB_DECLINE_RATE 時的授權失敗 (400) 屬於預期結果
+        with self.client.post("/api/tappay_pay", headers=auth(self.token), name="/api/tappay_pay",
+                              json={"prime": "test_3a2fb2b7e892b914a03c95dd4dd5dc7970c908df67a49527c0a648b2bc9",
+                                    "order_id": order_id}, catch_response=True) as resp:
+            if resp.status_code == 400:
+                resp.success()
+                return
+        if not resp.ok:
+            return
+
+        # 6. 賣家出貨
+        self.client.post("/api/mark_shipped", headers=auth(token), name="/api/mark_shipped",
+                         json={"order_id": order_id})
+
+
+# ==================== 結束時：分位數摘要 + 門檻檢查 ====================
+@events.quitting.add_listener
+def check_thresholds(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):     # 分散式跑法只在 master 檢查 (worker 沒有彙總後的數字)
+        return
+
+    rows = summarize(environment.stats.entries.values())
+    print("\n" + format_table(rows))
+    save_summary(rows, SUMMARY_PATH)
+
+    thresholds = load_json(THRESHOLDS_PATH) or {}
+    violations = check(rows, thresholds, load_json(BASELINE_PATH))
+    if violations:
+        print("\n❌ 壓測未通過：")
+        for v in violations:
+            print(f"  {v}")
+        environment.process_exit_code = 1
+    else:
+        print(f"\n✅ 壓測通過 ({len(rows)} 支 API)，摘要 → {SUMMARY_PATH}")
@@ -0,0 +1,13 @@
+-- mysql-replica 第一次啟動 (空 data volume) 時執行：從 mysql 主庫以 GTID 自動定位開始複寫
+-- 主庫的建表、seed、pitchaseat 帳號都會從 binlog 複寫過來，所以這裡不用另外建
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'mysql',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = 'loadtest',
+    SOURCE_AUTO_POSITION = 1,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;
+
+-- 副本不接受一般寫入 (寫在 init 而不是 command 參數：初始化期間 entrypoint 還要設定 root 帳號)
+SET PERSIST super_read_only = ON;
@@ -0,0 +1,85 @@
+# loadtest/report.py
+# 壓測結果的「每支 API 分位數摘要」與「門檻 / 回歸檢查」。
+# 純函式、不 import locust → locustfile.py 結束時呼叫，tests/ 也能直接測。
+#
+# 檢查兩種退步：
+#   1. 絕對門檻：thresholds.json 的 default + endpoints[<METHOD name>] (p50_ms / p95_ms / p99_ms / fail_ratio)
+#   2. 相對回歸：有上一次的摘要 (baseline) 時，p95 / p99 比上次慢超過 regression_tolerance (且差距超過 regression_floor_ms) 也算失敗
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+MIN_SAMPLES = 20            # 樣本太少的 API 分位數沒意義，只檢查失敗率
+REGRESSION_TOLERANCE = 0.2  # 比 baseline 慢 20% 以上算回歸
+REGRESSION_FLOOR_MS = 20    # 但差距小於 20ms 不算 (幾 ms 的 API 抖一下就超過 20%)
+
+
+# locust 的 StatsEntry 轉成 [{name, requests, failures, p50, p95, p99}]，name = "METHOD /path"
+def summarize(entries: Iterable) -> List[Dict]:
+    rows = []
+    for entry in entries:
+        if not entry.num_requests:
+            continue
+        row = {"name": f"{entry.method} {entry.name}",
+               "requests": entry.num_requests,
+               "failures": entry.num_failures}
+        for key, q in PERCENTILES.items():
+            row[key] = entry.get_response_time_percentile(q)
+        rows.append(row)
+    return sorted(rows, key=lambda r: r["name"])
+
+
+# 回傳所有違規的說明文字；空 list = 通過
+def check(rows: List[Dict], thresholds: Dict, baseline: Optional[List[Dict]] = None) -> List[str]:
+    default = thresholds.get("default", {})
+    per_endpoint = thresholds.get("endpoints", {})
+    min_samples = thresholds.get("min_samples", MIN_SAMPLES)
+    tolerance = thresholds.get("regression_tolerance", REGRESSION_TOLERANCE)
+    floor_ms = thresholds.get("regression_floor_ms", REGRESSION_FLOOR_MS)
+    previous = {r["name"]: r for r in baseline or []}
+
+    violations = []
+    for row in rows:
+        name = row["name"]
+        limits = {**default, **per_endpoint.get(name, {})}
+
+        fail_ratio = row["failures"] / row["requests"]
+        if fail_ratio > limits.get("fail_ratio", 0.0):
+            violations.append(f"{name}: 失敗率 {fail_ratio:.2%} > {limits.get('fail_ratio', 0.0):.2%}")
+        if row["requests"] < min_samples:
+            continue
+
+        for key in PERCENTILES:
+            limit = limits.get(f"{key}_ms")
+            if limit is not None and row[key] > limit:
+                violations.append(f"{name}: {key} {row[key]:.0f}ms > 門檻 {limit}ms")
+
+        prev = previous.get(name)
+        if prev and prev["requests"] >= min_samples:
+            for key in ("p95", "p99"):
+                if row[key] > prev[key] * (1 + tolerance) and row[key] - prev[key] > floor_ms:
+                    # 上次是 0ms (次毫秒的 API / stub)：沒有相對比例可算，只報絕對差距
+                    slower = f"{row[key] / prev[key] - 1:.0%}" if prev[key] > 0 else f"{row[key] - prev[key]:.0f}ms"
+                    violations.append(f"{name}: {key} {row[key]:.0f}ms 比上次 {prev[key]:.0f}ms 慢 {slower}")
+    return violations
+
+
+def format_table(rows: List[Dict]) -> str:
+    lines = [f"{'endpoint':48s}{'reqs':>8s}{'fails':>7s}{'p50':>8s}{'p95':>8s}{'p99':>8s}"]
+    for r in rows:
+        lines.append(f"{r['name']:48s}{r['requests']:>8d}{r['failures']:>7d}"
+                     f"{r['p50']:>8.0f}{r['p95']:>8.0f}{r['p99']:>8.0f}")
+    return "\n".join(lines)
+
+
+def load_json(path: Optional[str]):
+    if not path or not Path(path).exists():
+        return None
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def save_summary(rows: List[Dict], path: str) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -0,0 +1,44 @@
+# loadtest/tappay_stub.py
+# 壓測用的 TapPay Pay By Prime 假服務：回應格式與官方相同，但不扣款、不連外網。
+# web 服務設 TAPPAY_API_URL=http://tappay-stub:8001/tpc/payment/pay-by-prime 就會打到這裡 (見 docker-compose.loadtest.yml)
+# 跑法：uvicorn tappay_stub:app --app-dir loadtest --port 8001
+# 環境變數：
+#   STUB_LATENCY_MS  模擬第三方延遲 (毫秒，預設 150，接近 sandbox 實測)；壓測時 /api/tappay_pay 的 p95 會包含這段
+#   STUB_DECLINE_RATE 回「授權失敗」的比例 (預設 0)，用來量付款失敗路徑
+
+import asyncio
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "150"))
+DECLINE_RATE = float(os.getenv("STUB_DECLINE_RATE", "0"))
+
+app = FastAPI(title="TapPay stub")
+
+
+@app.post("/tpc/payment/pay-by-prime")
+async def pay_by_prime(request: Request):
+    body = await request.json()
+    if LATENCY_MS > 0:
+        # 延遲加一點抖動 (±30%)，避免所有請求同時返回、讓分位數失真
+        await asyncio.sleep(LATENCY_MS * random.uniform(0.7, 1.3) / 1000)
+
+    if random.random() < DECLINE_RATE:
+        return {"status": 10003, "msg": "Card Error (stub)"}
+
+    return {
+        "status": 0,
+        "msg": "Success",
+        "rec_trade_id": f"STUB{uuid.uuid4().hex[:16].upper()}",
+        "bank_transaction_id": f"TP{uuid.uuid4().hex[:20].upper()}",
+        "amount": body.get("amount"),
+        "order_number": body.get("order_number"),
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
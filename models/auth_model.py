@@ -1,4 +1,6 @@
 from config.database import get_connection
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError
 
 from typing import Optional, Dict, List, Any
 from datetime import date, datetime
@@ -6,14 +8,14 @@ from datetime import date, datetime
 
 
 # ================================================
-# 根據 email 查詢會員資料
+# 根據 email 查詢會員資料 (登入用：只拿產生 token 與比對密碼需要的欄位; 走 uq_members_email 唯一索引)
 # 回傳值 : 會員資料 (Dict) 或 None
 
 def get_user_by_email(email: str) -> Optional[Dict]:
     with get_connection() as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(
-                "SELECT id, name, email, password_hash, phone, city, favorite_teams, created_at, updated_at FROM members WHERE email = %s",
+                "SELECT id, name, password_hash FROM members WHERE email = %s",
                 (email,)
             )
             return cursor.fetchone()
@@ -21,9 +23,6 @@ def get_user_by_email(email: str) -> Optional[Dict]:
 # Optional[Dict] : 「回傳值可以是 Dict 或 None」 , 不是指「回傳值可以是 dictionary 也可以是其他任意型別」
 # 若型別註記沒有寫 Optional、但實際回傳 None，不會報錯 (因為Python 的型別註記（type hint）不是強制檢查機制。)；若寫 Optional[Dict]，但回傳既不是 Dict 也不是 None，而是其他型別，也不會報錯。
 # 寫 Optional 的目的只是「未來維護時能更清楚程式意圖」
-
-
-# 若其他 API 都不會用到 phone, city, favorite_teams, created_at, updated_at , 建議刪掉, 不拿多餘不會用到的資料
 # ================================================
 
 
@@ -31,16 +30,23 @@ def get_user_by_email(email: str) -> Optional[Dict]:
 
 
 # ================================================
-# 根據 name 查詢會員資料
-# 回傳值 : 會員資料 (Dict) 或 None
-def get_user_by_name(name: str) -> Optional[Dict]:
-    with get_connection() as conn:
-        with conn.cursor(dictionary=True) as cursor:
-            cursor.execute(
-                "SELECT id, name, email, password_hash, phone, city, favorite_teams, created_at, updated_at FROM members WHERE name = %s",
-                (name,)
-            )
-            return cursor.fetchone()
+# email / name 是否重複不再先 SELECT 檢查，直接 INSERT / UPDATE，由唯一索引擋下 (schema/members_unique_keys.sql)
+# 撞到唯一索引時 MySQL 回 1062 (ER_DUP_ENTRY)，訊息裡帶索引名稱，eg. "Duplicate entry 'a@b.com' for key 'members.uq_members_email'"
+# 這裡把索引名稱對回欄位，讓 router 回傳對應的錯誤訊息
+DUPLICATE_KEY_FIELDS = {
+    "uq_members_email": "email",
+    "uq_members_name": "name",
+}
+
+
+# 回傳值 : 重複的欄位 ("email" / "name")；不是 members 唯一索引造成的錯誤 → None
+def duplicate_member_field(err: IntegrityError) -> Optional[str]:
+    if err.errno != errorcode.ER_DUP_ENTRY:
+        return None
+    for key, field in DUPLICATE_KEY_FIELDS.items():
+        if key in (err.msg or ""):
+            return field
+    return None
 # ================================================
 
 
@@ -51,6 +57,7 @@ def get_user_by_name(name: str) -> Optional[Dict]:
 # ================================================
 # 建立新註冊會員的資料
 # 回傳值 : 新會員的 id
+# email / name 重複 → 丟出 IntegrityError (1062)，由 router 用 duplicate_member_field 對應錯誤訊息
 def create_member(
     name: str,
     email: str,
@@ -83,27 +90,7 @@ def create_member(
 
 
 
-
-# ================================================
-# 根據 會員 id 查詢會員資料
-# 回傳值 : 會員資料 (Dict) 或 None
-def get_member_row_by_id(user_id:int)-> Optional[Dict[str, Any]]:
-    with get_connection() as conn:
-        with conn.cursor(dictionary=True) as cursor:            
-            cursor.execute("""
-                SELECT id, name, email, phone, city, favorite_teams, subscribe_newsletter, created_at, updated_at
-                FROM members WHERE id = %s
-                """,(user_id,))
-            row = cursor.fetchone()
-            return row
-
-# model 層只做資料庫查詢(或其他資料庫指令)，不做「json.loads / HTTPException 」等處理, 「json.loads / HTTPException 」統一到 router 層處理 
 # ================================================
-
-
-
-
+# GET /api/user/auth 與 GET /api/user/profile 共用 utils/profile_cache.py 的會員資料快取 (查詢為 models/user_model.py 的 get_user_profile)，
+# 所以 /api/user/auth 的 avg_rating 也會是實際的平均評分 (原本這裡的 get_member_row_by_id 不查 ratings，avg_rating 固定是 null)。
 # ================================================
-# GET /api/user/auth 本就沒打算回傳使用者的 avg_rating 給前端 (20250620 版就是這樣) (因為 GET api/user/auth 只是為了每次進頁面要驗證使用者身份時使用，但身份驗證這種動作不需要拿 avg_rating 也沒關係)，只是因為 auth.py 的 UserProfileOut pydantic model 不小心多寫了 avg_rating 欄位並允許 None，所以 devtool 中的 Response 才會出現 avg_rating:null。
-# 目前先這樣 (目前沒有負面影響)，但記得 avg_rating 只有在渲染個人資料頁時需要用到，會由 GET api/user/profile 去資料庫拿 avg_rating 並渲染。
-# ================================================
\ No newline at end of file
@@ -28,7 +28,7 @@ def get_events(year, month) -> List[Dict]:
         GROUP BY g.id
         ORDER BY g.game_date
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query,(
                 year,
@@ -51,7 +51,7 @@ def get_games_by_date_range(year, month) -> List[Dict]:
             ORDER BY game_date, start_time
         """
     # with 語法 = 自動資源管理
-    with get_connection() as conn:  # 從連線池中借出一條連線
+    with get_connection(readonly=True) as conn:  # 從連線池中借出一條連線
         # 進入時：自動從池中借出連線
         with conn.cursor(dictionary=True) as cursor:  # 建立cursor，回傳結果使用「字典格式」
             # 進入時：自動建立游標
@@ -86,7 +86,7 @@ def get_total_trades() -> int:
         WHERE shipment_status IN ('已出貨', '已結案')
     """
     # with 語法 = 自動資源管理
-    with get_connection() as conn:  # 進入時：自動從連線池中借出一條連線
+    with get_connection(readonly=True) as conn:  # 進入時：自動從連線池中借出一條連線
         with conn.cursor(dictionary=True) as cursor:  # 進入時：自動建立 cursor，回傳結果使用「字典格式」
             cursor.execute(query)
             result = cursor.fetchone()  # 取得一筆結果
@@ -114,7 +114,7 @@ def get_total_trading_amount() -> int:
         WHERE o.shipment_status = '已出貨'
         AND p.tappay_status = 'PAID'
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query)
             result = cursor.fetchone()
@@ -150,7 +150,7 @@ def get_top_games() -> List[Dict[str, Any]]:
         LIMIT 5
     """
 
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor: # 若資料庫查詢出錯，會拋出 Exception, 原樣拋回上層 Router 層統一處理
             cursor.execute(query)
             results = cursor.fetchall()   # cursor.fetchall()取得回傳值的 python list 
@@ -216,7 +216,7 @@ def get_top_games_with_median_prices() -> List[Dict[str, Any]]:
     LEFT JOIN median_calc mc ON tg.game_id = mc.game_id
     """
     
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query)
             results = cursor.fetchall()
@@ -263,7 +263,7 @@ def get_team_trade_rank() -> List[Dict[str, Any]]:
         GROUP BY team
         ORDER BY trade_count DESC
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query)
             results = cursor.fetchall()
@@ -283,7 +283,7 @@ def get_team_trade_rank() -> List[Dict[str, Any]]:
 # 查詢會員的喜愛球隊
 # 回傳值: 若會員有設定喜愛球隊, 回傳 ["中信兄弟", "富邦悍將"] 或 ["統一獅"] ; 若會員沒設定喜愛球隊, 回傳 []
 def get_member_favorite_teams(user_id: int) -> List[str]:
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(
                 "SELECT favorite_teams FROM members WHERE id = %s",
@@ -342,7 +342,7 @@ def get_trades_in_period(member_id: int, start_date: date) -> List[Dict]:
             AND o.buyer_id = %s
             AND o.created_at >= %s
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(trade_query, (member_id, start_date))
             trades = cursor.fetchall()
@@ -378,7 +378,7 @@ def get_reservations_in_period(member_id: int, start_date: date) -> List[Dict]:
         WHERE r.member_id = %s
             AND r.created_at >= %s
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(reservation_query, (member_id, start_date))
             reservations = cursor.fetchall()
@@ -405,7 +405,7 @@ def get_games_in_period(start_date: date, end_date: date) -> List[Dict]:
         WHERE g.game_date BETWEEN %s AND %s
         GROUP BY g.id
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(games_query, (start_date, end_date))
             games = cursor.fetchall()
@@ -438,7 +438,7 @@ def get_hot_games_in_period(start_date: date, end_date: date, limit: int) -> Lis
         ORDER BY trade_count DESC, g.game_date ASC
         LIMIT %s
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(hot_games_query, (start_date, end_date, limit)) 
             hot_games = cursor.fetchall()
@@ -1,20 +1,37 @@
 from config.database import get_connection
-from typing import Dict, List, Any
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
 
 
 # ================================================
-# 查詢會員的所有通知資料 (依通知建立時間, 由新到舊排序)
-def get_notifications(member_id: int) -> List[Dict]:
-    with get_connection() as conn:
+# 查詢會員的通知資料 (依通知建立時間, 由新到舊排序), 一次一頁
+# 分頁用 keyset (cursor)：before = 上一頁最後一筆的 (created_at, id)，只拿「比它更舊」的資料
+# 走 idx_member_time (member_id, created_at) 索引 (InnoDB 次要索引自帶 PK → 等同 (member_id, created_at, id))，
+# 不論翻到第幾頁都只讀 limit 筆，不像 OFFSET 要先掃過前面所有資料
+# 回傳值: 最多 limit 筆通知 (呼叫端多拿一筆來判斷有沒有下一頁)
+def get_notifications(member_id: int, limit: int, before: Optional[Tuple[datetime, int]] = None) -> List[Dict]:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
-            cursor.execute("""
-                SELECT id, message, url, is_read, created_at
-                FROM notifications
-                WHERE member_id = %s
-                ORDER BY created_at DESC
-            """, (member_id,))
-            return cursor.fetchall()    
-    
+            if before is None:
+                cursor.execute("""
+                    SELECT id, message, url, is_read, created_at
+                    FROM notifications
+                    WHERE member_id = %s
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (member_id, limit))
+            else:
+                before_time, before_id = before
+                cursor.execute("""
+                    SELECT id, message, url, is_read, created_at
+                    FROM notifications
+                    WHERE member_id = %s
+                      AND (created_at < %s OR (created_at = %s AND id < %s))
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (member_id, before_time, before_time, before_id, limit))
+            return cursor.fetchall()
+
     # 回傳值: 通知列表 (包含每一筆通知的相關資訊). 
     # eg. [{"id": 1, "message": "訂單 #1 已付款，請出貨", "url": "/member_sell", "is_read": 1, "created_at": "2025-02-05T21:53:16"}, {"id": 2, "message": "訂單 #2 已出貨，請確認物流", "url": "/member_buy", "is_read": 1, "created_at": "2025-02-04T21:51:27"}]
     # is_read 0 表示未讀，1 表示已讀
@@ -23,6 +40,21 @@ def get_notifications(member_id: int) -> List[Dict]:
 
 
 
+# ================================================
+# 計算會員的未讀通知筆數 (只在 Redis 未讀計數器不存在時呼叫，見 utils/notification_counter.py)
+def count_unread_notifications(member_id: int) -> int:
+    with get_connection(readonly=True) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) FROM notifications
+                WHERE member_id = %s AND is_read = FALSE
+            """, (member_id,))
+            return cursor.fetchone()[0]
+# ================================================
+
+
+
+
 # ================================================
 # 將所有所有未讀通知標記為已讀 API
 def mark_all_notifications_read(member_id: int) -> Dict[str, Any]:
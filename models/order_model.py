@@ -5,7 +5,8 @@ from datetime import date, datetime, timezone
 from fastapi import HTTPException
 import json
 
-from utils.email_utils import send_email_async
+from models.outbox_model import enqueue_emails
+from utils.notification_stream import push_notifications
 from utils.time_utils import utc_now 
 
 # 因為在 order_model.py 中的某些函數裡，有呼叫 get_member_email 函數，所以特別在 order_model.py 檔中，從 user_model 引入 get_member_email 函數
@@ -107,7 +108,7 @@ def get_buyer_orders(buyer_id: int) -> List[Dict]:
         WHERE o.buyer_id = %s
         ORDER BY o.id DESC
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query, (buyer_id,))
             rows = cursor.fetchall()
@@ -158,7 +159,7 @@ def get_seller_orders(seller_id: int) -> List[Dict]:
         WHERE o.seller_id = %s
         ORDER BY o.created_at DESC
     """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query,(seller_id,))
             rows = cursor.fetchall()
@@ -177,20 +178,16 @@ def get_seller_orders(seller_id: int) -> List[Dict]:
 # ================================================
 # 更新訂單狀態、更新票券販售狀態、插入通知、寄信通知
 # Database Transaction: 
-# (1)先 SELECT orders 確認訂單存在、有操作權限、且訂單狀態現為媒合中 (2) (決定要更新的訂單狀態是什麼,)再 UPDATE 訂單狀態為「媒合成功」或「媒合失敗」(3)若訂單狀態更新為媒合成功, 將票券 is_sold UPDATE 為 True (4) 然後 INSERT 一筆通知進通知資料表 (5) 最後 SELECT members 查詢買家資料(同時先暫存買家資料進 notification_data變數) (6) Commit (7) Commit 成功後，才寄信 (呼叫 send_email_async 發送 SQS 任務（或 fallback 同步寄信）)
+# (1)先 SELECT orders 確認訂單存在、有操作權限、且訂單狀態現為媒合中 (2) (決定要更新的訂單狀態是什麼,)再 UPDATE 訂單狀態為「媒合成功」或「媒合失敗」(3)若訂單狀態更新為媒合成功, 將票券 is_sold UPDATE 為 True (4) 然後 INSERT 一筆通知進通知資料表 (5) 最後 SELECT members 查詢買家資料, 把寄信意圖寫進 notification_outbox (6) Commit (7) Commit 成功後，才推播站內通知
 
 # 流程說明：
-# - conn.commit() 執行完畢後，才呼叫 send_email_async
-# - send_email_async 是同步函數，執行完畢後才會返回
-# - send_email_async 內部設計為「永不 raise」，無論成功或失敗都正常結束
-# - send_email_async 返回後，本函數到達尾端，流程返回 router 層
-# - 真正的「非同步」是 Lambda 從 SQS 取出任務並寄信，與本函數無關
+# - 寄信意圖跟訂單更新、站內通知在同一個 transaction 寫入：commit 成功才會寄信，rollback 就一起消失
+# - 本函數不做任何寄信 I/O：背景的 outbox dispatcher (utils/outbox_dispatcher.py) 取出後呼叫 send_email_async 發送 SQS 任務（或 fallback 同步寄信）
+# - 真正的「非同步」是 dispatcher 與 Lambda 在背景寄信，與本函數無關
 
 # 本函數無回傳值
 
 def update_order_and_ticket_status(order_id: int, seller_id: int, action: str) -> None:
-    notification_data = None       # 在 with conn 外面先初始化 notification_data (「先初始化」是防禦性設計)
-    
     with get_connection() as conn:
         with conn.cursor(dictionary=True) as cursor:
             # 1. 確認訂單存在、有操作權限(只有賣家可以更新訂單狀態)、且訂單狀態現為媒合中
@@ -236,30 +233,18 @@ def update_order_and_ticket_status(order_id: int, seller_id: int, action: str) -
             """, (order["buyer_id"], msg, "/member_buy"))
             
             
-            # 6. 查詢買家 Email (SELECT email FROM members)
+            # 6. 查詢買家 Email (SELECT email FROM members)，寄信意圖寫進 outbox (由背景寄出，不影響 API 回應時間)
             buyer_email = get_member_email(cursor, order["buyer_id"])
-            
-            # 暫存通知資料，等 commit 後再寄信 (提升 API 回應效率, 避免因寄信問題影響前述核心功能的操作)
-            notification_data = {
+            enqueue_emails(cursor, [{
                 "to": buyer_email,
                 "subject": "Pitch-A-Seat 訂單媒合結果通知",
                 "body": f"您的訂單 #{order_id} 媒合結果為：{'成功' if action=='accept' else '失敗'}\n請至我的購買頁查看詳情"
-            }
+            }])
 
         conn.commit()  # 7. 先 commit
 
-    # commit 成功後，才寄信 (發送任務到 SQS Queue 裡) 
-    if notification_data:
-        send_email_async(
-            to=notification_data["to"],
-            subject=notification_data["subject"],
-            body=notification_data["body"]
-        )
-    
-
-
-    # 在 with conn 外面初始化 notification_data (防禦性設計):
-    # 原寫法是「把 notification_data={...} 寫在 with 裡面」: 依目前的程式碼, 沒有先初始化也不會有問題. 但若之後修改 with 區塊裡的程式碼邏輯而發生「程式碼沒跑到 notification_data={...} 這行, 卻又在 commit之後走到 if notification_data:這行」的情形時, 就會發生 NameError, 因為這時候 notification_data 根本還沒被宣告(定義/賦值). 新寫法有先在with區塊外面初始化notification_data = None, 若發生前述情形, 也會因為有先初始化為None, 變成 if None, 也就是 if Falsy, 結果是「不進入 if 區塊」也「不報錯」)
+    # commit 成功後，才推播站內通知給買家 (含未讀計數器)；Email 已在 outbox 裡
+    push_notifications([{"member_id": order["buyer_id"], "message": msg, "url": "/member_buy"}])
 
 
 # ================================================
@@ -392,17 +377,15 @@ def mark_payment_failed_due_to_decline(payment_id: int, tappay_status_message:st
 # (1) 將 付款資料 的 tappay_status 欄位更新為 「PAID」、payed_at 欄位更新為「現在(UTC時間)」、tappay_transaction_id 欄位更新為「TapPay官方 rec 交易識別碼」、tappay_bank_transaction_id 欄位更新為「TapPay官方 bank 交易識別碼」、tappay_status_code 欄位更新為「TapPay官方付款結果碼」、tappay_status_message 欄位更新為「TapPay官方訊息內容 (非自定義內容)」(UPDATE payments)
 # (2) 將 訂單資料 的 payment_status 欄位更新為「已付款」、paid_at 欄位更新為「現在(UTC時間)」(UPDATE orders)
 # (3) 新增一筆通知 (INSERT INTO notifications)
-# (4) 取得賣家 email (SELECT email FROM members) & 暫存通知資訊到 notification_data 變數中
+# (4) 取得賣家 email (SELECT email FROM members) & 寄信意圖寫進 notification_outbox
 # (5) Transaction Commit
-# (6) Commit 成功後，才寄信 (發送任務到 SQS Queue 裡)
+# (6) Commit 成功後，才推播站內通知
 
 
 # 流程說明：
-# - conn.commit() 執行完畢後，才呼叫 send_email_async
-# - send_email_async 是同步函數，執行完畢後才會返回
-# - send_email_async 內部設計為「永不 raise」，無論成功或失敗都正常結束
-# - send_email_async 返回後，本函數到達尾端，流程返回 router 層
-# - 真正的「非同步」是 Lambda 從 SQS 取出任務並寄信，與本函數無關
+# - 寄信意圖跟付款、訂單更新在同一個 transaction 寫入：付款紀錄 commit 成功 ⇔ 賣家一定會收到付款通知信
+# - 本函數不做任何寄信 I/O：背景的 outbox dispatcher (utils/outbox_dispatcher.py) 取出後呼叫 send_email_async 寄出
+# - 真正的「非同步」是 dispatcher 與 Lambda 在背景寄信，與本函數無關
 
 # 此函數無回傳值
 
@@ -417,8 +400,6 @@ def commit_payment_success_tx(
     tappay_status_code:int, 
     tappay_official_msg:str 
 ) -> None:
-    
-    notification_data = None  # 在 with conn 外面先初始化 notification_data (「先初始化」是防禦性設計)
 
     with get_connection() as conn:
         try:
@@ -472,12 +453,12 @@ def commit_payment_success_tx(
                 # 4.1 查詢賣家 Email（在 commit 前查，因為 SELECT email FROM members 需要 cursor）
                 seller_email = get_member_email(cursor, order["seller_id"])
 
-                # 4.2 暫存通知資訊到 notification_data 變數中. Commit 成功後，才寄信
-                notification_data = {
+                # 4.2 寄信意圖寫進 notification_outbox (同一個 transaction，commit 後由背景寄出)
+                enqueue_emails(cursor, [{
                     "to": seller_email,
                     "subject": "Pitch-A-Seat 訂單付款通知",
                     "body": f"訂單 #{order_id} 已付款，金額：{amount} 元\n請盡快安排出貨，詳情請至：我的售票頁"
-                }
+                }])
             
             # 5. Transaction Commit
             conn.commit()
@@ -485,13 +466,8 @@ def commit_payment_success_tx(
             conn.rollback()
             raise
 
-    # 6. Commit 成功後，才寄信 (發送任務到 SQS Queue 裡)
-    if notification_data:
-        send_email_async(
-            to=notification_data["to"],
-            subject=notification_data["subject"],
-            body=notification_data["body"]
-        )        
+    # 6. Commit 成功後，才推播站內通知給賣家 (含未讀計數器)；Email 已在 outbox 裡
+    push_notifications([{"member_id": order["seller_id"], "message": msg, "url": "/member_sell"}])
 # ================================================
 
 
@@ -537,6 +513,7 @@ def get_order_by_id(cursor, order_id: int) -> Optional[Dict[str, Any]]:
 
 # ================================================
 # 新增一筆通知進資料表 (INSERT INTO notifications)
+# 在呼叫端的 transaction 內執行；呼叫端 commit 後要呼叫 push_notifications 更新未讀計數器並推播
 def notify_shipped(cursor, member_id: int, message: str, url: str) -> None:
     cursor.execute("""
         INSERT INTO notifications (member_id, message, url)
@@ -0,0 +1,144 @@
+from config.database import get_connection
+
+import json
+from typing import Dict, List, Any, Optional
+
+
+# ================================================
+# 寫入寄信意圖 (INSERT INTO notification_outbox)
+# 在呼叫端的 transaction 內執行 (跟 INSERT INTO notifications 用同一個 cursor)：
+# 業務資料 commit 成功 ⇔ 信一定會寄；rollback 就一起消失，不會寄出「其實沒成立」的通知
+# 真正寄信由 utils/outbox_dispatcher.py 在背景處理，API 不再等 SQS / SMTP
+# emails: [{"to": ..., "subject": ..., "body": ...}, ...]
+def enqueue_emails(cursor, emails: List[Dict[str, str]]) -> None:
+    if not emails:
+        return
+    cursor.executemany("""
+        INSERT INTO notification_outbox (kind, payload)
+        VALUES ('email', %s)
+    """, [(json.dumps(email, ensure_ascii=False),) for email in emails])
+# ================================================
+
+
+
+
+# ================================================
+# 取一批到期的待寄項目，並把 available_at 往後推 lease_seconds 秒 (租約)
+# FOR UPDATE SKIP LOCKED：多個 worker 同時取件時，已被別人鎖住的列直接跳過，不會互相等待或重複取到
+# 租約期間內其他 worker 看不到這些列；若取件的 worker 在 mark_outbox_sent 之前掛掉，租約到期後會被重新取出 (至少寄一次)
+# 時間一律用資料庫的 NOW()，不受各台機器時鐘差異影響
+# 回傳值: [{"id": 1, "kind": "email", "payload": {...}, "attempts": 1}, ...] (attempts 已含這一次)
+def claim_outbox_batch(limit: int, lease_seconds: int) -> List[Dict[str, Any]]:
+    with get_connection() as conn:
+        try:
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute("""
+                    SELECT id, kind, payload, attempts
+                    FROM notification_outbox
+                    WHERE status = 'pending' AND available_at <= NOW()
+                    ORDER BY available_at, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (limit,))
+                rows = cursor.fetchall()
+
+                if rows:
+                    placeholders = ", ".join(["%s"] * len(rows))
+                    cursor.execute(f"""
+                        UPDATE notification_outbox
+                        SET available_at = NOW() + INTERVAL %s SECOND, attempts = attempts + 1
+                        WHERE id IN ({placeholders})
+                    """, (lease_seconds, *[row["id"] for row in rows]))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    for row in rows:
+        if isinstance(row["payload"], (str, bytes, bytearray)):
+            row["payload"] = json.loads(row["payload"])
+        row["attempts"] += 1
+    return rows
+# ================================================
+
+
+
+
+# ================================================
+# 續租：寄送中的項目把 available_at 再往後推 lease_seconds 秒
+# SQS 故障時整批改走逐封 SMTP，可能比原本的租約還久；寄送期間定期續租，避免租約到期被別的 worker 重複取出
+# 只續還是 pending 的列 (已經 mark 過的不動)
+def extend_outbox_lease(ids: List[int], lease_seconds: int) -> None:
+    if not ids:
+        return
+    placeholders = ", ".join(["%s"] * len(ids))
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE notification_outbox
+                SET available_at = NOW() + INTERVAL %s SECOND
+                WHERE id IN ({placeholders}) AND status = 'pending'
+            """, (lease_seconds, *ids))
+        conn.commit()
+# ================================================
+
+
+
+
+# ================================================
+# 寄出成功：標記為 sent (保留紀錄方便查詢，由 purge_sent_outbox 定期清掉)
+def mark_outbox_sent(ids: List[int]) -> None:
+    if not ids:
+        return
+    placeholders = ", ".join(["%s"] * len(ids))
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE notification_outbox
+                SET status = 'sent', sent_at = NOW(), last_error = NULL
+                WHERE id IN ({placeholders})
+            """, tuple(ids))
+        conn.commit()
+# ================================================
+
+
+
+
+# ================================================
+# 寄出失敗：retry_in_seconds 秒後再試；retry_in_seconds = None 表示不再重試 (標記為 failed，留給人工查看)
+def mark_outbox_failed(outbox_id: int, error: str, retry_in_seconds: Optional[int]) -> None:
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            if retry_in_seconds is None:
+                cursor.execute("""
+                    UPDATE notification_outbox
+                    SET status = 'failed', last_error = %s
+                    WHERE id = %s
+                """, (error[:255], outbox_id))
+            else:
+                cursor.execute("""
+                    UPDATE notification_outbox
+                    SET available_at = NOW() + INTERVAL %s SECOND, last_error = %s
+                    WHERE id = %s
+                """, (retry_in_seconds, error[:255], outbox_id))
+        conn.commit()
+# ================================================
+
+
+
+
+# ================================================
+# 刪除 older_than_days 天前已寄出的紀錄 (一次最多 limit 筆，避免長時間鎖表)
+# 回傳值: 刪除筆數
+def purge_sent_outbox(older_than_days: int, limit: int = 1000) -> int:
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM notification_outbox
+                WHERE status = 'sent' AND sent_at < NOW() - INTERVAL %s DAY
+                LIMIT %s
+            """, (older_than_days, limit))
+            deleted = cursor.rowcount
+        conn.commit()
+    return deleted
+# ================================================
@@ -45,7 +45,7 @@ def get_user_reservations(member_id: int) -> List[Dict]:
             WHERE r.member_id = %s
             ORDER BY r.created_at DESC
         """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query, (member_id,))
             results = cursor.fetchall()
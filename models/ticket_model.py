@@ -4,7 +4,9 @@ from typing import Dict, List, Any
 from fastapi import HTTPException
 import json
 
-from utils.email_utils import send_email_async
+from models.outbox_model import enqueue_emails
+from utils.notification_stream import push_notifications
+from services.reservation_matcher import match_reservations
 
 
 # ================================================
@@ -31,7 +33,7 @@ def get_seller_tickets(seller_id: int) -> List[Dict]:
             WHERE t.seller_id = %s
             ORDER BY t.created_at DESC
         """
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(query, (seller_id,))
             rows = cursor.fetchall()
@@ -103,9 +105,9 @@ def remove_ticket(ticket_id: int, seller_id: int) -> Dict[str, Any]:
     #     - 信件標題
     #     - 信件內容：比賽編號(game_number)、座位區、價格 
 
-# - 6. 最後一起 commit
+# - 6. 收集到的 Email 寫進 notification_outbox (同一個 transaction)，最後一起 commit
 
-# - 7. commit 成功後，才使用send_email_async寄送所有email (發到 SQS Queue 裡)
+# - 7. commit 成功後，才推播站內通知；Email 由背景的 outbox dispatcher 寄出 (utils/outbox_dispatcher.py)，不佔用 API 回應時間
 
 
 
@@ -116,8 +118,9 @@ def create_tickets_and_collect_matches(
     img_map: Dict[str, List[str]]
 ) -> None:
 
+    site_notifications = []  # 本次新增的站內通知 (commit 後更新未讀計數器、推播給在線上的會員)
     email_notifications = [] # 在 with conn 外面先初始化 email_notifications (「先初始化」是防禦性設計)
-    # email_notifications 變數本身的目的: 收集所有需要發送的 Email 通知的相關資訊 (若有多筆預約符合這張上架票券, 需要收集各個不同預約者的 Email 資訊, 並使用 loop 一一發送 email)
+    # email_notifications 變數本身的目的: 收集所有需要發送的 Email 通知的相關資訊 (若有多筆預約符合這張上架票券, 需要收集各個不同預約者的 Email 資訊, 一次寫進 outbox)
 
     insert_sql = """
         INSERT INTO tickets_for_sale
@@ -157,54 +160,39 @@ def create_tickets_and_collect_matches(
             """, (game_id,))
             reservations = cursor.fetchall()
 
-            # 3. 針對每一張剛上架的票券，和每筆同場次的預約資料比對「價格與座位條件是否符合」（資料處理 + DB操作）
-            for ticket in ticket_list:
+            # 3. 針對每一張剛上架的票券，和每筆同場次的預約資料比對「價格與座位條件是否符合」(純邏輯在 services/reservation_matcher.py)
+            for r, ticket in match_reservations(ticket_list, reservations):
                 price = ticket["price"]
                 area  = ticket["seat_area"]
-                for r in reservations:
-                    price_ranges = json.loads(r["price_ranges"])
-
-                    # 檢查價格是否符合
-                    def in_range(pr: str) -> bool:
-                        lo, hi = map(int, pr.split("-"))
-                        # "0-0" 是「預約者沒設價格要求條件 (預約者接受所有價格) 」
-                        return (lo == hi == 0) or (lo <= price <= hi)
-
-                    matched_price = any(in_range(pr) for pr in price_ranges)
-                    # 檢查座位是否符合
-                    matched_area = (r["seat_area"] == "none") or (r["seat_area"] == area)
-
-                    if matched_price and matched_area:
-                        msg = f"賽事 {game_number} 有新票：{area} / {price} 元"
-
-                        # 4. 新增通知 (插入 notifications 資料表）
-                        cursor.execute("""
-                            INSERT INTO notifications (member_id, message, url)
-                            VALUES (%s, %s, %s)
-                        """, (r["member_id"], msg, "/buy"))
-
-                        # 5. 收集 Email 通知資料                        
-                        email_notifications.append({
-                            "to": r["email"],
-                            "subject": "Pitch-A-Seat 預約通知",
-                            "body": (
-                                f"您預約的場次 {game_number} 有新票：\n"
-                                f"座位：{area}\n價格：{price} 元"
-                            )
-                        })
-                        # 可能需要寄多封 Email（多筆預約都匹配本次上架票券條件的情形），所以用列表 email_notifications, 在loop內收集每一筆通知資料，commit 成功後再寄信
+                msg = f"賽事 {game_number} 有新票：{area} / {price} 元"
+
+                # 4. 新增通知 (插入 notifications 資料表）
+                cursor.execute("""
+                    INSERT INTO notifications (member_id, message, url)
+                    VALUES (%s, %s, %s)
+                """, (r["member_id"], msg, "/buy"))
+                site_notifications.append({"member_id": r["member_id"], "message": msg, "url": "/buy"})
+
+                # 5. 收集 Email 通知資料
+                email_notifications.append({
+                    "to": r["email"],
+                    "subject": "Pitch-A-Seat 預約通知",
+                    "body": (
+                        f"您預約的場次 {game_number} 有新票：\n"
+                        f"座位：{area}\n價格：{price} 元"
+                    )
+                })
+                # 可能需要寄多封 Email（多筆預約都匹配本次上架票券條件的情形），所以用列表 email_notifications, 在loop內收集每一筆通知資料
+
+            # 6. 寄信意圖寫進 notification_outbox：跟票券、通知同一個 transaction，commit 成功才會寄、rollback 就不會寄
+            enqueue_emails(cursor, email_notifications)
 
         # 最後一起 commit（前面任何地方丟 Exception，都不會執行到這行）
         conn.commit()
     
     
-    # 6. commit 成功後，才寄送所有 Email (發到 SQS Queue 裡)
-    for notification in email_notifications:
-        send_email_async(
-            to = notification["to"],
-            subject = notification["subject"],
-            body = notification["body"]
-        )
+    # 7. commit 成功後，才推播站內通知 (含未讀計數器)；Email 已在 outbox 裡，由背景 dispatcher 寄出
+    push_notifications(site_notifications)
 
 # ================================================
 
@@ -231,7 +219,7 @@ def count_browse_tickets(game_id: int, seat_filters: List[str]) -> int:
         count_query += f" AND t.seat_area IN ({placeholders})"
         count_params.extend(seat_filters)
 
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(count_query, tuple(count_params))
             row = cursor.fetchone()
@@ -288,7 +276,7 @@ def get_browse_tickets_page(
     data_params.extend([per_page, offset])
 
     # 執行客製化的 SQL 查詢指令
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute(data_query, tuple(data_params))  # 執行查詢（list 轉 tuple 作為參數化查詢的參數）
             rows = cursor.fetchall()
@@ -1,4 +1,5 @@
 from config.database import get_connection
+from mysql.connector.errors import IntegrityError
 
 from typing import Optional, Dict, List, Any
 from fastapi import HTTPException
@@ -28,7 +29,7 @@ def get_member_email(cursor, member_id: int) -> str:
 # 根據 user_id 查詢完整會員資料
 # 回傳值: 會員完整個人資料 (若會員存在) 或 None (若會員不存在)
 def get_user_profile(user_id: int) -> Optional[Dict]:
-    with get_connection() as conn:
+    with get_connection(readonly=True) as conn:
         with conn.cursor(dictionary=True) as cursor:
             cursor.execute("""
                 SELECT
@@ -48,56 +49,9 @@ def get_user_profile(user_id: int) -> Optional[Dict]:
 
 
 
-# ================================================
-# 檢查會員想更新的 email 是否已被其他帳號使用
-# 若有重複, 回傳 409 (HTTP 409 Conflict: 用戶端錯誤回應狀態碼, 表示「請求與目標資源的當前狀態存在衝突」)
-def ensure_email_unique_for_update(new_email: str, user_id: int) -> None:        
-    try:
-        with get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id FROM members WHERE email = %s AND id != %s",
-                    (new_email, user_id)
-                )
-                if cursor.fetchone():
-                    raise HTTPException(status_code=409, detail="此電子郵件已被其他帳號使用")
-    except HTTPException:
-        # 保留原本拋出的 409
-        raise
-    except Exception as e:
-        print("檢查 email 唯一性失敗：", e)
-        raise HTTPException(status_code=500, detail="伺服器錯誤")
-# ================================================
-
-
-
-
-# ================================================
-# 檢查會員想更新的 name 是否已被其他帳號使用
-# 若有重複, 回傳 409 (HTTP 409 Conflict: 用戶端錯誤回應狀態碼, 表示「請求與目標資源的當前狀態存在衝突」)
-def ensure_name_unique_for_update(new_name: str, user_id: int) -> None:
-    try:
-        with get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id FROM members WHERE name = %s AND id != %s",
-                    (new_name, user_id)
-                )
-                if cursor.fetchone():
-                    raise HTTPException(status_code=409, detail="此姓名已被其他帳號使用")
-    except HTTPException:
-        raise
-    except Exception as e:
-        print("檢查姓名唯一性失敗：", e)
-        raise HTTPException(status_code=500, detail="伺服器錯誤")
-# ================================================
-
-
-
-
-
 # ================================================
 # 更新資料庫內的會員個人資料
+# email / name 與其他會員重複 → 唯一索引擋下, IntegrityError (1062) 原樣丟出, 由 router 用 duplicate_member_field 轉成 409
 def update_member_profile(set_clause: str, values: List[Any]) -> None:
     try:
         with get_connection() as conn:
@@ -105,6 +59,8 @@ def update_member_profile(set_clause: str, values: List[Any]) -> None:
                 query = f"UPDATE members SET {set_clause}, updated_at = NOW() WHERE id = %s"
                 cursor.execute(query, tuple(values))
                 conn.commit()
+    except IntegrityError:
+        raise
     except Exception as e:
         print("更新個人資料失敗：", e)
         raise HTTPException(status_code=500, detail="更新失敗")
@@ -3,9 +3,17 @@
 # 誠實前提：這是模擬，結果是「使用者更愛點命中其偏好的推薦」這個點擊傾向模型的後果 (把 Step 3 量到的相關性優勢轉成 CTR 結論)。
 # 有真實流量(且樣本量夠大)時，改用 ctr_report.py 的真實數據。
 
+import argparse
 import math
 import random
+from dataclasses import dataclass
 from datetime import date
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from recsys_offline.member_index import EMPTY, build_member_index
+from recsys_offline.parallel import Shard, default_workers, make_shards, run_sharded
 from recsys_offline.snapshot_loader import load_snapshot
 from services.recommender import recommend, assign_variant, VARIANTS
 
@@ -18,6 +26,7 @@ BASE_CTR = 0.03           # 基線點擊率：即使推薦與偏好完全無關
 RELEVANCE_LIFT = 0.15     # 行為假設：推薦命中使用者真實偏好時，點擊率增加量: 點擊率加 15 個百分點(0.03→0.18)，是整個模型唯一的行為假設:相關性驅動點擊。抽成頂層常數、寫在輸出第一行,誠實可調。把這個假設做成參數,結論敘述永遠是『在此假設下』。改它會改效應大小與所需樣本,但分流、檢定、檢定力這套方法不隨假設變——方法才是這支腳本交付的東西
 VISITS_PER_USER = 4       # 流量假設：模擬實驗期間每位使用者平均到訪次數（代表實驗長度/累積流量）。控制模擬累積多少曝光,等同「實驗跑多久」。調大它,樣本變多、檢定更容易顯著。
 SEED = 7                  # 固定亂數種子：讓模擬「可重現」。任何人重跑都能得到一模一樣的 82/118、z=2.96。
+DEFAULT_SHARDS = 1        # 亂數種子綁定 shard → shard 數固定 (不跟 --workers 走)，數字才與單行程相同；1 = 歷史數字
 
 
 # 之後算 p 值時，要查「超過 |z| 的機率」(右側)：先用 _phi(x)算出左側安全區 0.975，再用 1-_phi(abs(z))算出右側值 超過 |z| 的機率)
@@ -37,66 +46,37 @@ def _phi(x):
     return 0.5 * (1 + math.erf(x / math.sqrt(2)))
 
 
+# 所有會員共用的模擬輸入 (父行程算一次，送進每個 shard)
+@dataclass
+class SimContext:
+    today: date
+    games: List[Dict]                    # 候選未來賽事
+    hot: List[Dict]                      # 冷啟動補位池
+    favorites: Dict[int, List[str]]
 
-def simulate():
-    # 載入凍結快照(events / games / favorites / meta)
-    snap = load_snapshot() 
-    
-    # 可重現性:「今天」讀快照凍結的參考日、不用 date.today()
-    # 設計差異: evaluate 的基準是切分點 T(回到過去驗證,要留一段歷史當答案);這裡直接用 today,因為 A/B 模擬的情境是「現在上線做實驗、模擬未來的點擊」,不需要留答案窗。時間軸設定不同,因為回答的問題不同
-    today = date.fromisoformat(snap.meta["reference_date"])
-    
-    # 取「事件表」的短別名
-    ev = snap.events
 
+# 模擬一個 shard 的會員：回傳 (counts, split)，由 simulate() 依 shard 順序加總
+# 只切 1 個 shard 時，shard.seed == SEED 且會員順序不變 → 與舊版單行程逐位元相同
+def simulate_shard(ev: pd.DataFrame, shard: Shard, ctx: SimContext):
     # 建立獨立的亂數產生器物件(不用全域 random)。這個 rng 專屬本次模擬,不被任何外部程式碼污染
-    # 可重現性，與 synthetic_data 同一手法
-    rng = random.Random(SEED)
+    # 可重現性，與 synthetic_data 同一手法；每個 shard 有自己的種子 (由 SEED 推導)，與 worker 數無關
+    rng = random.Random(shard.seed)
 
-    # 用 dict 列出「每一場比賽 (game_id): 對應的歷史交易次數」
-    tc = ev[ev["event_type"] == "trade"]["game_id"].value_counts().to_dict()
-
-    # 候選賽事: 未來的所有賽事 (今天之後的所有賽事)，因為推薦要推的是「還沒打的比賽」
-    future = snap.games[snap.games["game_date"] > today]
+    # 每人的行為只 groupby 一次 (prefs / own 都查它)，不再每人掃一次整張事件表
+    index = build_member_index(ev)
 
-    # 得出: 將未來所有的比賽一場一場拿出來，重新包裝成推薦系統演算法看得懂的公用格式。 同時利用剛算好的 tc 字典，去查出每場比賽的歷史交易次數（熱門度）
-    # eg.     
-    # [{
-    #     "game_id": 101,
-    #     "game_date": "2026-07-20",       # 格式為字串或日期物件
-    #     "start_time": "18:30:00",
-    #     "team_home": "中信兄弟",
-    #     "team_away": "統一獅",
-    #     "stadium": "台中洲際棒球場",
-    #     "ticket_count": 0,               # 固定初始化為 0 分
-    #     "trade_count": 145               # 查表得知：這場比賽 (認 games_id)歷史交易次數是 145 次
-    # }, ...]
-
-    games = [{"game_id": r.game_id, "game_date": r.game_date, "start_time": r.start_time,
-              "team_home": r.team_home, "team_away": r.team_away, "stadium": r.stadium,
-              "ticket_count": 0, "trade_count": int(tc.get(r.game_id, 0))}
-             for r in future.itertuples()]
-    
-    # 冷啟動補位池: 個人化湊不滿 5 場時從這裡補。
-    # sorted 回傳新 list，key=lambda 指定按人氣排;reverse=True 降冪;[:15] 取前 15
-    hot = sorted(games, key=lambda g: g["trade_count"], reverse=True)[:15]
-
-    
     # 使用者真實偏好 = 喜愛球隊 ∪ 互動過的球隊: 此使用者的「真實偏好球隊集合」= 明確設定的喜愛球隊 聯集 他行為碰過的所有球隊(主客都算)
     # 上帝視角 (prefs,決定點擊)
     # 上帝視角: 模擬世界的 ground truth,只拿來決定「他會不會點」。注意: 它用了這個使用者的全部行為、不切時間，因為prefs函數扮演「這人心裡真正喜歡什麼」，絕不餵給推薦工具
-    def prefs(uid):  
-        e = ev[ev["member_id"] == uid]
-        return set(snap.favorites[uid]) | set(e["team_home"]) | set(e["team_away"])
+    def prefs(uid):
+        return set(ctx.favorites[uid]) | index.get(uid, EMPTY).teams
     
     # 取出「使用者真實行為事件」，per-user 個人化的資料來源
     # 模型視角 (own,餵給推薦工具)
     # 若把 prefs 餵給模型,就是把答案洩漏給被測者,模擬就作弊了。這是模擬設計的核心紀律,對應離線評估的防洩漏思維
     def own(uid):
-        e = ev[ev["member_id"] == uid]
-        tr = e[e["event_type"] == "trade"][["team_home", "team_away", "created_at"]].to_dict("records")
-        rs = e[e["event_type"] == "reservation"][["team_home", "team_away", "created_at"]].to_dict("records")
-        return tr, rs
+        me = index.get(uid, EMPTY)
+        return me.trades, me.reservations
 
     # 計數器初始化
     # 兩臂各自的實驗結果累積器: 雙元素 list: [0] 位放曝光數、[1] 位放點擊數 (用 list 而非 tuple 因為要原地 += 1(tuple 不可變))
@@ -106,9 +86,9 @@ def simulate():
     # 跟 counts 分開記,因為「人數」和「曝光數」是不同單位。 (應用: SRM 重點是「分流單位是人,健康檢查要看人數」)
     split = {"personalized": 0, "popularity": 0}
 
-    # 迭代 dict 預設走 key: 遍歷全部 200 位會員 id
+    # 遍歷這個 shard 的會員 id (所有 shard 合起來 = 全部 200 位會員，順序與 snap.favorites 相同)
     # 所有人都進實驗,不像 evaluate 篩 cohort: 因為 A/B 模擬的是真實上線情境:上線後每個到訪者都會被分流、看到推薦,包括零行為的人(走冷啟動)。評估篩人、實驗不篩人,所以刻意設計「兩者的母體不同」
-    for uid in snap.favorites:
+    for uid in shard.members:
         # 呼叫線上真實分流函式: 對 uid 雜湊,回傳 "personalized" 或 "popularity"。同一人永遠同臂(穩定雜湊),分流可重現。(assign_variant 用 hash 不用 random 的原因: (1) 穩定:同一人每次到訪都在同一臂,不會這次個人化、下次純人氣(體驗一致、資料不污染);(2) 無狀態:不用存「誰在哪組」的表,uid 進來現算就好;(3) 可重現:任何人重算同一 uid 得到同一臂)
         # 然後把該臂人數 +1
         v = assign_variant(uid); split[v] += 1
@@ -117,7 +97,7 @@ def simulate():
         tr, rs = own(uid)
 
         # 用他被分到那一臂的參數產生推薦。VARIANTS[v]——個人化臂拿完整計分參數,純人氣臂拿個人權重歸零版。同一個 recommend、換參數變兩臂——與 evaluate 同一手法,保證兩臂唯一差異就是「有無個人化」,對照乾淨。
-        recs = recommend(snap.favorites[uid], tr, rs, games, hot, today, VARIANTS[v])
+        recs = recommend(ctx.favorites[uid], tr, rs, ctx.games, ctx.hot, ctx.today, VARIANTS[v])
 
         # 取他的真實偏好集合(上帝視角)，供下面判斷點不點
         p = prefs(uid)
@@ -137,6 +117,61 @@ def simulate():
                 if rng.random() < click_p:
                     counts[v][1] += 1
 
+    return counts, split
+
+
+def simulate(workers: int = 1, n_shards: Optional[int] = None):
+    # 載入凍結快照(events / games / favorites / meta)
+    snap = load_snapshot() 
+    
+    # 可重現性:「今天」讀快照凍結的參考日、不用 date.today()
+    # 設計差異: evaluate 的基準是切分點 T(回到過去驗證,要留一段歷史當答案);這裡直接用 today,因為 A/B 模擬的情境是「現在上線做實驗、模擬未來的點擊」,不需要留答案窗。時間軸設定不同,因為回答的問題不同
+    today = date.fromisoformat(snap.meta["reference_date"])
+    
+    # 取「事件表」的短別名
+    ev = snap.events
+
+    # 用 dict 列出「每一場比賽 (game_id): 對應的歷史交易次數」
+    tc = ev[ev["event_type"] == "trade"]["game_id"].value_counts().to_dict()
+
+    # 候選賽事: 未來的所有賽事 (今天之後的所有賽事)，因為推薦要推的是「還沒打的比賽」
+    future = snap.games[snap.games["game_date"] > today]
+
+    # 得出: 將未來所有的比賽一場一場拿出來，重新包裝成推薦系統演算法看得懂的公用格式。 同時利用剛算好的 tc 字典，去查出每場比賽的歷史交易次數（熱門度）
+    # eg.     
+    # [{
+    #     "game_id": 101,
+    #     "game_date": "2026-07-20",       # 格式為字串或日期物件
+    #     "start_time": "18:30:00",
+    #     "team_home": "中信兄弟",
+    #     "team_away": "統一獅",
+    #     "stadium": "台中洲際棒球場",
+    #     "ticket_count": 0,               # 固定初始化為 0 分
+    #     "trade_count": 145               # 查表得知：這場比賽 (認 games_id)歷史交易次數是 145 次
+    # }, ...]
+
+    games = [{"game_id": r.game_id, "game_date": r.game_date, "start_time": r.start_time,
+              "team_home": r.team_home, "team_away": r.team_away, "stadium": r.stadium,
+              "ticket_count": 0, "trade_count": int(tc.get(r.game_id, 0))}
+             for r in future.itertuples()]
+    
+    # 冷啟動補位池: 個人化湊不滿 5 場時從這裡補。
+    # sorted 回傳新 list，key=lambda 指定按人氣排;reverse=True 降冪;[:15] 取前 15
+    hot = sorted(games, key=lambda g: g["trade_count"], reverse=True)[:15]
+
+    # 分 shard 平行模擬，再依 shard 順序加總各臂曝光 / 點擊 / 人數 (整數加總，與順序無關)
+    # shard 數預設固定為 DEFAULT_SHARDS (不是 workers)：種子由 shard 決定，換 workers 數字也不變
+    n_shards = n_shards or DEFAULT_SHARDS
+    shards = make_shards(list(snap.favorites), n_shards, SEED)
+    ctx = SimContext(today=today, games=games, hot=hot, favorites=snap.favorites)
+    counts = {"personalized": [0, 0], "popularity": [0, 0]}   # [曝光, 點擊]
+    split = {"personalized": 0, "popularity": 0}
+    for shard_counts, shard_split in run_sharded(simulate_shard, ev, shards, ctx, workers):
+        for v in counts:
+            counts[v][0] += shard_counts[v][0]
+            counts[v][1] += shard_counts[v][1]
+            split[v] += shard_split[v]
+
     # list 解包。統計慣例: n=試驗數(曝光)、k=成功數(點擊);A=對照、B=實驗
     # 實跑值:nA=2360, kA=362;nB=1640, kB=310
     nA, kA = counts["popularity"]      
@@ -179,7 +214,7 @@ def simulate():
     need = (1.96 + 0.84) ** 2 * (ctrA * (1 - ctrA) + ctrB * (1 - ctrB)) / (ctrB - ctrA) ** 2
 
     # 先印假設: 看結果前先看前提
-    print(f"假設: 基線CTR={BASE_CTR}、命中偏好加成={RELEVANCE_LIFT}、每人{VISITS_PER_USER}次到訪、seed={SEED}")
+    print(f"假設: 基線CTR={BASE_CTR}、命中偏好加成={RELEVANCE_LIFT}、每人{VISITS_PER_USER}次到訪、seed={SEED}、shards={n_shards}")
     # 印人數分流(82/118)
     print(f"分流：個人化 {split['personalized']} 人 / 純人氣 {split['popularity']} 人")
     # 呈現比例時，必呈現「分子」與「分母」，0.15 是 15/100 或 1500/10000，可信度差很多
@@ -193,11 +228,19 @@ def simulate():
     print(f"雙比例 z 檢定: z={z:.2f}、雙尾 p={pval:.2e} → {'顯著' if pval < 0.05 else '不顯著'}(α=0.05)")
     # math.ceil: 無條件進位。樣本數不能有小數,且寧多勿少(向下取會讓 power 略低於 80%)
     print(f"檢定力：偵測此效應(80% power, α=0.05)需每臂約 {math.ceil(need)} 次曝光")
+    return {"split": split, "counts": counts, "z": z, "p": pval}
 
 # CLI 腳本標準收尾
 # 直接執行才跑模擬; 被 import 時不會跑
 if __name__ == "__main__":
-    simulate()
+    parser = argparse.ArgumentParser(description="A/B 反事實模擬")
+    parser.add_argument("--workers", type=int, default=1, help=f"平行行程數 (本機 CPU: {default_workers()})")
+    # 亂數種子綁定 shard → 數字只由 --shards 決定、與 --workers 無關；預設 DEFAULT_SHARDS (1 = 歷史數字 82/118、z=2.96)
+    # 與 evaluate.py 不同，預設不跟 workers 走：要平行跑需同時指定 --shards (eg. --workers 4 --shards 4)，數字以該 shard 數為準
+    parser.add_argument("--shards", type=int, default=None,
+                        help=f"會員切幾份 (決定各 shard 的種子；預設 {DEFAULT_SHARDS}，與 --workers 無關)")
+    args = parser.parse_args()
+    simulate(workers=args.workers, n_shards=args.shards)
 
 
 
@@ -0,0 +1,221 @@
+# recsys_offline/archive_events.py
+# recommendation_events 的保留期 (retention) job：
+#   1. 先確保未來幾個月的分區已存在 (從 p_future 切出來)
+#   2. 把超過保留期的月分區匯出成 Parquet (格式與快照一致，snapshot_loader 可直接讀)
+#   3. 確認匯出筆數 = 分區筆數後，才 DROP PARTITION
+# 執行：在專案根目錄跑 `python3 -m recsys_offline.archive_events` (可加 --dry-run 只印出計畫)
+# 建議：用 cron 每月初跑一次；重複執行是安全的 (已存在的分區 / 已匯出的檔案都會跳過或覆寫)。
+
+import argparse
+import os
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.database import get_connection   # 重用既有連線池 (DRY)
+from recsys_offline.snapshot_loader import ARCHIVE_DIR   # 歸檔位置與 loader 共用同一個常數
+
+TABLE = "recommendation_events"
+RETENTION_MONTHS = 6      # 線上只保留最近 6 個月 (含當月)，更早的搬到 Parquet
+MONTHS_AHEAD = 3          # 預先建立未來 3 個月的分區，避免資料落進 p_future
+FUTURE_PARTITION = "p_future"
+FETCH_BATCH = 50_000      # 匯出時每次 fetchmany 的筆數 → 記憶體只放一批
+
+# 匯出欄位 (順序即 Parquet 欄位順序)
+ARCHIVE_COLS = ["id", "request_id", "member_id", "game_id", "rank_pos", "variant",
+                "event_type", "recommendation_score", "created_at"]
+
+# 固定 schema：每一批 row group 型別一致；created_at 與其他快照一樣存字串，loader 再轉回 datetime
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("request_id", pa.string()),
+    ("member_id", pa.int64()),
+    ("game_id", pa.int64()),
+    ("rank_pos", pa.int64()),
+    ("variant", pa.string()),
+    ("event_type", pa.string()),
+    ("recommendation_score", pa.float64()),
+    ("created_at", pa.string()),
+])
+
+
+# ==================== 日期 / 分區命名 (純函式) ====================
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, n: int) -> date:
+    # 只用在「月初」日期上，不需要處理月底天數
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+# MySQL 的 TO_DAYS(date) = Python date.toordinal() + 365
+def to_days(d: date) -> int:
+    return d.toordinal() + 365
+
+
+def from_days(days: int) -> date:
+    return date.fromordinal(days - 365)
+
+
+# 保留「含當月」共 RETENTION_MONTHS 個月：上界 <= cutoff 的分區都已過期
+def retention_cutoff(today: date) -> date:
+    return add_months(month_start(today), -(RETENTION_MONTHS - 1))
+
+
+# ==================== 分區資訊 ====================
+# 回傳依邊界排序的分區：[{"name", "upper": date 或 None(MAXVALUE), "rows"}]
+def list_partitions() -> List[Dict]:
+    with get_connection() as conn:
+        with conn.cursor(dictionary=True) as cursor:
+            cursor.execute("""
+                SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS description,
+                       TABLE_ROWS AS est_rows
+                FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                  AND PARTITION_NAME IS NOT NULL
+                ORDER BY PARTITION_ORDINAL_POSITION
+            """, (TABLE,))
+            rows = cursor.fetchall()
+
+    partitions = []
+    for r in rows:
+        desc = r["description"]
+        upper = None if desc == "MAXVALUE" else from_days(int(desc))
+        partitions.append({"name": r["name"], "upper": upper, "rows": int(r["est_rows"] or 0)})
+    return partitions
+
+
+# 已過保留期的分區：上界 <= cutoff (整個分區都比 cutoff 舊)；p_future 永遠不會被選到
+def expired_partitions(partitions: List[Dict], cutoff: date) -> List[Dict]:
+    return [p for p in partitions if p["upper"] is not None and p["upper"] <= cutoff]
+
+
+# 還缺哪些月分區：從「現有最後一個有界分區」之後補到 horizon (不含)
+def missing_future_months(partitions: List[Dict], horizon: date) -> List[date]:
+    bounded = [p["upper"] for p in partitions if p["upper"] is not None]
+    if not bounded:
+        return []
+    month = max(bounded)          # 最後一個有界分區的上界 = 下一個要建的月份
+    months = []
+    while month < horizon:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+# ==================== 1. 建立未來分區 ====================
+def ensure_future_partitions(partitions: List[Dict], today: date, dry_run: bool = False) -> List[str]:
+    horizon = add_months(month_start(today), MONTHS_AHEAD + 1)
+    months = missing_future_months(partitions, horizon)
+    if not months:
+        return []
+
+    # 從 p_future 切出新的月分區；p_future 若已有資料，REORGANIZE 會自動搬到對應的新分區
+    defs = ",\n".join(
+        f"PARTITION {partition_name(m)} VALUES LESS THAN ({to_days(add_months(m, 1))})"
+        for m in months
+    )
+    sql = (f"ALTER TABLE {TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n"
+           f"{defs},\nPARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE)")
+    names = [partition_name(m) for m in months]
+    if dry_run:
+        print(f"[dry-run] 將建立分區: {names}")
+        return names
+
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql)     # DDL 會隱式 commit
+    print(f"✅ 已建立分區: {names}")
+    return names
+
+
+# ==================== 2. 匯出過期分區 ====================
+# 逐批 fetchmany 寫成 Parquet row group → 整個月的資料不必一次載入記憶體
+# 先寫到暫存檔、完成後再 rename，避免中途失敗留下半份檔案被誤認為已歸檔
+def export_partition(name: str, archive_dir: Path = ARCHIVE_DIR) -> int:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    final_path = archive_dir / f"{name}.parquet"
+    tmp_path = archive_dir / f"{name}.parquet.tmp"
+
+    n_rows = 0
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            # 分區名稱來自 information_schema，不是使用者輸入，可以直接組進 SQL
+            cursor.execute(f"SELECT {', '.join(ARCHIVE_COLS)} FROM {TABLE} PARTITION ({name}) ORDER BY id")
+            with pq.ParquetWriter(tmp_path, ARCHIVE_SCHEMA) as writer:
+                while True:
+                    rows = cursor.fetchmany(FETCH_BATCH)
+                    if not rows:
+                        break
+                    df = pd.DataFrame(rows, columns=ARCHIVE_COLS)
+                    df["created_at"] = pd.to_datetime(df["created_at"]).astype(str)
+                    writer.write_table(pa.Table.from_pandas(df, schema=ARCHIVE_SCHEMA, preserve_index=False))
+                    n_rows += len(rows)
+
+    os.replace(tmp_path, final_path)
+    return n_rows
+
+
+# 分區實際筆數 (information_schema 的 TABLE_ROWS 只是估計值，不能拿來核對)
+def count_partition(name: str) -> int:
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {TABLE} PARTITION ({name})")
+            return int(cursor.fetchone()[0])
+
+
+def drop_partition(name: str) -> None:
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {name}")
+
+
+# =======================================
+def archive_expired_partitions(today: Optional[date] = None, dry_run: bool = False,
+                               archive_dir: Path = ARCHIVE_DIR) -> List[str]:
+    today = today or date.today()
+    cutoff = retention_cutoff(today)
+
+    partitions = list_partitions()
+    if not partitions:
+        raise SystemExit(f"⚠️ {TABLE} 不是分區表，請先套用 schema/{TABLE}.sql 的分區設定。")
+
+    ensure_future_partitions(partitions, today, dry_run=dry_run)
+
+    archived = []
+    for p in expired_partitions(partitions, cutoff):
+        if dry_run:
+            print(f"[dry-run] 將匯出並刪除分區 {p['name']} (< {p['upper']}, 約 {p['rows']} 筆)")
+            continue
+
+        expected = count_partition(p["name"])
+        written = export_partition(p["name"], archive_dir)
+        # 核對筆數：不一致就停下來，寧可留著分區也不要丟資料
+        if written != expected:
+            raise RuntimeError(f"{p['name']} 匯出 {written} 筆，但分區有 {expected} 筆，已中止 (未刪除)")
+
+        drop_partition(p["name"])
+        archived.append(p["name"])
+        print(f"✅ {p['name']}: 匯出 {written} 筆 → {archive_dir / (p['name'] + '.parquet')}，已刪除分區")
+
+    if not archived and not dry_run:
+        print(f"沒有超過保留期 (< {cutoff}) 的分區")
+    return archived
+# =======================================
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"{TABLE} 分區保留 / 歸檔")
+    parser.add_argument("--dry-run", action="store_true", help="只印出計畫，不動資料")
+    args = parser.parse_args()
+    archive_expired_partitions(dry_run=args.dry_run)
@@ -1,14 +1,24 @@
 # recsys_offline/evaluate.py
 # Step 3 離線評估：時間切分 (temporal holdout)，量化「個人化 vs 純人氣」的 precision@K / hit-rate@K。
 # 跑法：專案根目錄 python3 -m recsys_offline.evaluate (需先有合成快照)
+#       多核心：python3 -m recsys_offline.evaluate --workers 8 (結果與單行程相同)
 
+import argparse
+from dataclasses import dataclass
 from datetime import date, timedelta
-from recsys_offline.snapshot_loader import load_snapshot
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from recsys_offline.member_index import EMPTY, build_member_index
+from recsys_offline.parallel import Shard, default_workers, make_shards, run_sharded
+from recsys_offline.snapshot_loader import Snapshot, load_snapshot
 from services.recommender import recommend, RecommenderParams, DEFAULT_PARAMS
 
 # 兩臂：實驗組(個人化)=預設；對照組(純人氣)=個人訊號權重全設 0
 PERSONALIZED    = DEFAULT_PARAMS
 POPULARITY_ONLY = RecommenderParams(favorite_base=0, trade_weight=0, reservation_weight=0)
+ARMS = [("純人氣", POPULARITY_ONLY), ("個人化", PERSONALIZED)]
 
 # 可調參數 (這四個就是上面的 ⭐ 決策)
 K = 5
@@ -16,24 +26,29 @@ TEST_WINDOW_DAYS = 30      # 測試窗口長度：最後幾天當「未來」
 MIN_TRAIN_EVENTS = 2       # cohort 門檻：切分點前至少幾筆行為
 
 
-# 把事件 DataFrame 轉成 recommend() 要的格式
-def _records(df):
-    return df[["team_home", "team_away", "created_at"]].to_dict("records")
+# 所有會員共用、與參數無關的評估輸入 (算一次，送進每個 shard)
+@dataclass
+class EvalContext:
+    T: date                              # 切分點
+    candidate_games: List[Dict]          # 候選未來賽事 (game_date > T)
+    hot_games: List[Dict]                # 冷啟動補位池
+    favorites: Dict[int, List[str]]
 
 
-def evaluate():
-    snap = load_snapshot()
+# 時間切分：T 之前建檔 (train)、T 之後當 ground truth (test)
+def split_train_test(events: pd.DataFrame, T: date) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    d = events["created_at"].dt.date
+    return events[d < T], events[d >= T]
+
+
+# 建立評估輸入與 cohort；快照沒有行為事件時回傳 None
+def prepare(snap: Snapshot) -> Optional[Tuple[EvalContext, List[int]]]:
     if len(snap.events) == 0:
-        print("⚠️ 快照沒有任何行為事件，無法評估。請先跑 python3 -m recsys_offline.synthetic_data")
-        return
+        return None
 
     ref = date.fromisoformat(snap.meta["reference_date"])
     T = ref - timedelta(days=TEST_WINDOW_DAYS)         # 切分點
-
-    ev = snap.events.copy()
-    ev["d"] = ev["created_at"].dt.date
-    train = ev[ev["d"] < T]                            # T 之前：建檔
-    test  = ev[ev["d"] >= T]                           # T 之後：當 ground truth
+    train, test = split_train_test(snap.events, T)
 
     # 候選未來賽事 (game_date > T) + as-of-T 人氣 (只用 train 的交易，避免未來洩漏)
     trade_count = train[train["event_type"] == "trade"]["game_id"].value_counts().to_dict()
@@ -45,29 +60,61 @@ def evaluate():
     hot_games = sorted(candidate_games, key=lambda g: g["trade_count"], reverse=True)[:15]
 
     # cohort：T 前 ≥ MIN_TRAIN_EVENTS 筆，且 T 後至少有 1 筆 (才有東西可預測)
+    # 只需要筆數 → 向量化 groupby.size，不必在父行程建完整索引
     train_counts = train.groupby("member_id").size()
     test_members = set(test["member_id"].unique())
     cohort = [m for m in snap.favorites
               if train_counts.get(m, 0) >= MIN_TRAIN_EVENTS and m in test_members]
 
-    # 對單一使用者、單一參數設定，算 precision@K 與是否命中
+    return EvalContext(T, candidate_games, hot_games, snap.favorites), cohort
+
+
+# 單一 shard：建一次這批會員的 train / test 索引，再對每組參數逐人算 (precision@K, 是否命中)
+# 回傳 {臂名: [(precision, hit), ...]}，順序與 shard.members 相同
+def score_shard(events: pd.DataFrame, shard: Shard, ctx: EvalContext,
+                arms: Sequence[Tuple[str, RecommenderParams]] = ARMS) -> Dict[str, List[Tuple[float, int]]]:
+    train, test = split_train_test(events, ctx.T)
+    train_index = build_member_index(train)
+    test_index = build_member_index(test)
+
     def eval_user(uid, params):
-        ut = train[train["member_id"] == uid]
-        tr = _records(ut[ut["event_type"] == "trade"])
-        rs = _records(ut[ut["event_type"] == "reservation"])
-        recs = recommend(snap.favorites[uid], tr, rs, candidate_games, hot_games, T, params)
+        ut = train_index.get(uid, EMPTY)
+        recs = recommend(ctx.favorites[uid], ut.trades, ut.reservations,
+                         ctx.candidate_games, ctx.hot_games, ctx.T, params)
 
-        ut_test = test[test["member_id"] == uid]
-        gt = set(ut_test["team_home"]) | set(ut_test["team_away"])   # 標準答案：他 T 後實際碰的球隊
+        gt = test_index.get(uid, EMPTY).teams                      # 標準答案：他 T 後實際碰的球隊
         if not recs:
             return 0.0, 0
         hits = sum(1 for g in recs if g["team_home"] in gt or g["team_away"] in gt)
         return hits / len(recs), (1 if hits > 0 else 0)
 
-    print(f"切分點 T={T} | 測試窗口 {TEST_WINDOW_DAYS} 天 | cohort {len(cohort)} 人 / 全體 {len(snap.favorites)} 人")
+    return {name: [eval_user(u, params) for u in shard.members] for name, params in arms}
+
+
+# 依 shard 順序串接各臂的逐人分數 → 與單行程逐人計算的順序一致 (加總順序也一致)
+def merge_scores(results: List[Dict[str, List[Tuple[float, int]]]]) -> Dict[str, List[Tuple[float, int]]]:
+    merged: Dict[str, List[Tuple[float, int]]] = {}
+    for res in results:
+        for name, scores in res.items():
+            merged.setdefault(name, []).extend(scores)
+    return merged
+
+
+def evaluate(workers: int = 1, n_shards: Optional[int] = None):
+    snap = load_snapshot()
+    prepared = prepare(snap)
+    if prepared is None:
+        print("⚠️ 快照沒有任何行為事件，無法評估。請先跑 python3 -m recsys_offline.synthetic_data")
+        return
+    ctx, cohort = prepared
+
+    shards = make_shards(cohort, n_shards or workers)
+    scores_by_arm = merge_scores(run_sharded(score_shard, snap.events, shards, ctx, workers))
+
+    print(f"切分點 T={ctx.T} | 測試窗口 {TEST_WINDOW_DAYS} 天 | cohort {len(cohort)} 人 / 全體 {len(snap.favorites)} 人")
     res = {}
-    for name, params in [("純人氣", POPULARITY_ONLY), ("個人化", PERSONALIZED)]:
-        scores = [eval_user(u, params) for u in cohort]
+    for name, _ in ARMS:
+        scores = scores_by_arm.get(name, [])
         prec = sum(p for p, _ in scores) / len(cohort)
         hr   = sum(h for _, h in scores) / len(cohort)
         res[name] = prec
@@ -77,4 +124,8 @@ def evaluate():
 
 
 if __name__ == "__main__":
-    evaluate()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="離線評估 (precision@K / hit-rate@K)")
+    parser.add_argument("--workers", type=int, default=1, help=f"平行行程數 (本機 CPU: {default_workers()})")
+    parser.add_argument("--shards", type=int, default=None, help="cohort 切幾份 (預設 = workers；評估無亂數，切法不影響結果)")
+    args = parser.parse_args()
+    evaluate(workers=args.workers, n_shards=args.shards)
@@ -1,31 +1,145 @@
 # recsys_offline/export_snapshot.py
 # 從 prod (唯讀) 匯出「去識別化」快照，格式與 synthetic_data.py 完全一致。
 # 去識別化：真實會員 id → 代理序號；只取必要欄位 (不取姓名/email/電話)；對照表不落地。
-# 執行：在專案根目錄跑 `python3 -m recsys_offline.export_snapshot`
+# 執行：在專案根目錄跑 `python3 -m recsys_offline.export_snapshot [--batch-size 50000]`
+#       每晚增量：`python3 -m recsys_offline.export_snapshot --delta` (只讀上次匯出之後的資料，寫成 delta part)
+#       delta 會一直累積 → 定期 (例如每週) 跑一次完整匯出，當新的 base 並清掉舊 delta。
+# delta 的限制：被取消 (刪除) 的預約、改期的賽事不會反映到舊資料；上次匯出後有會員被刪則拒絕執行 (代理序號會位移)；
+#             shipped_at 是 NULL 的已出貨訂單 (欄位加入前的舊資料) 沒有出貨時間可比對，只在完整匯出時納入。
+# 合併 base + delta 時 (load_snapshot)，早於最新一次匯出 90 天窗口的事件會被濾掉 → 窗口跟著每晚的 delta 往前移。
+# 大表 (members / orders / reservations) 以 keyset 分批讀、每批直接寫成 Parquet 的一個 row group → 事件與會員資料一次只在記憶體留一批；
+# 但會員 id 名單 (代理序號的依據，每位會員 8 bytes) 與每批的代理序號換算會隨會員數成長，不是固定大小。
+# 整個匯出在同一條連線、同一個 START TRANSACTION WITH CONSISTENT SNAPSHOT 裡讀 → 各表、各批次看到同一個時間點的資料，
+# 代價是整段匯出都佔著這條連線、且快照期間 InnoDB 要保留舊版本 (undo) → 有唯讀副本時自動改讀副本 (get_connection(readonly=True))。
 # 建議：用唯讀權限的 DB 帳號執行本腳本。
 
+import argparse
 import json
+import time
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
 from config.database import get_connection   # 重用既有連線池 (DRY)
+from recsys_offline.snapshot_loader import EVENT_COLS, SnapshotWriter
 
 OUTPUT_DIR = Path(__file__).parent / "data" / "snapshot"
+BATCH_SIZE = 50_000      # 每批筆數 = 每個 row group 的列數；每批的資料在寫出後就釋放
+WINDOW_DAYS = 90         # 行為事件窗口：reference_date 往前 90 天
+WATERMARK_LAG_SECONDS = 300
+MIN_TS = "1970-01-01 00:00:00"
 
-# 事件表的固定欄位：確保即使查詢回傳 0 筆，空表也帶正確 schema (避免 KeyError)
-EVENT_COLS = ["member_id", "event_type", "game_id", "team_home", "team_away", "created_at"]
 
+# 水位 (watermark)：每張表「已匯出到哪裡」，記在 snapshot_meta.json 的 "watermarks"
+#   orders        → (shipped_at, id)：訂單「出貨後」才成為交易事件，所以看出貨時間，不看建立時間
+#   reservations  → id；games → id (只會新增)
+#   members       → id (新會員) + (updated_at, updated_id) (改過喜愛球隊的舊會員) + count (用來偵測會員被刪)
+# 每次匯出先讀「目前水位」當上界，只匯出 (上次水位, 這次水位] 的資料 → 匯出期間新寫入的留給下一次，不漏也不重複
+# 水位往回退 WATERMARK_LAG_SECONDS 秒：id / 時間在寫入 (INSERT / UPDATE) 時就決定，交易卻可能晚一點才 commit；
+#   只取「夠舊」的最大值當水位，比它小、但匯出當下還沒 commit 的資料才不會永遠被跳過
+# 建議索引 (delta 才不必掃整張表)：schema/snapshot_watermark_indexes.sql
+EMPTY_WATERMARKS = {
+    "members": {"id": 0, "updated_at": MIN_TS, "updated_id": 0, "count": 0},
+    "orders": {"shipped_at": MIN_TS, "id": 0},
+    "reservations": {"id": 0},
+    "games": {"id": 0},
+}
 
-# 執行查詢並回傳 DataFrame
-def _fetch_df(query: str, params: tuple = ()) -> pd.DataFrame:
-    with get_connection() as conn:
+
+def _ts(v) -> str:
+    return v.strftime("%Y-%m-%d %H:%M:%S") if v else MIN_TS
+
+
+# id 水位：從最大的 id 往回找第一筆 created_at 夠舊的 (沿主鍵倒著掃，只掃最近 lag 秒內寫入的幾筆)
+# games 沒有 created_at，且只由後台匯入、不會與匯出同時寫入 → 直接取 MAX(id)
+def _read_watermarks(conn, lag_seconds: int = WATERMARK_LAG_SECONDS) -> Dict:
+    with conn.cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT id FROM members WHERE created_at <= NOW() - INTERVAL %s SECOND "
+                       "ORDER BY id DESC LIMIT 1", (lag_seconds,))
+        max_member = cursor.fetchone() or {"id": 0}
+        cursor.execute("SELECT updated_at, id FROM members WHERE updated_at <= NOW() - INTERVAL %s SECOND "
+                       "ORDER BY updated_at DESC, id DESC LIMIT 1", (lag_seconds,))
+        last_update = cursor.fetchone() or {"updated_at": None, "id": 0}
+        cursor.execute("""
+            SELECT shipped_at, id FROM orders
+            WHERE shipment_status = '已出貨' AND shipped_at <= NOW() - INTERVAL %s SECOND
+            ORDER BY shipped_at DESC, id DESC LIMIT 1
+        """, (lag_seconds,))
+        last_trade = cursor.fetchone() or {"shipped_at": None, "id": 0}
+        cursor.execute("SELECT id FROM reservations WHERE created_at <= NOW() - INTERVAL %s SECOND "
+                       "ORDER BY id DESC LIMIT 1", (lag_seconds,))
+        reservations = cursor.fetchone() or {"id": 0}
+        cursor.execute("SELECT COALESCE(MAX(id), 0) AS id FROM games")
+        games = cursor.fetchone()
+    return {
+        "members": {"id": int(max_member["id"]), "updated_at": _ts(last_update["updated_at"]),
+                    "updated_id": int(last_update["id"])},
+        "orders": {"shipped_at": _ts(last_trade["shipped_at"]), "id": int(last_trade["id"])},
+        "reservations": {"id": int(reservations["id"])},
+        "games": {"id": int(games["id"])},
+    }
+
+
+# 匯出用的連線：REPEATABLE READ + 一致性快照，唯讀交易；離開時 rollback (只讀，不需要 commit)
+# 有唯讀副本就借副本 (長時間的快照交易不佔主庫)，沒有才用主庫
+@contextmanager
+def _consistent_snapshot() -> Iterator[Any]:
+    with get_connection(readonly=True) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
+# 執行查詢並回傳 DataFrame (只用在小表：games)
+def _fetch_df(conn, query: str, params: tuple = ()) -> pd.DataFrame:
+    with conn.cursor(dictionary=True) as cursor:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    return pd.DataFrame(rows)
+
+
+# keyset 分批讀大表：query 結尾是「AND <keyset 條件> ORDER BY <key> LIMIT %s」，key 欄位以 row_ts / row_id 帶出
+#   單一 key   (keys=("row_id",))          → 條件 id > %s
+#   複合 key   (keys=("row_ts", "row_id")) → 條件 (ts > %s OR (ts = %s AND id > %s))
+# 所有批次共用同一條連線 (同一個一致性快照)；用索引範圍掃描，越後面的批次也不會變慢 (不用 OFFSET)
+def _iter_batches(conn, query: str, params: tuple = (), batch_size: int = BATCH_SIZE,
+                  start: Tuple = (0,), keys: Sequence[str] = ("row_id",)) -> Iterator[pd.DataFrame]:
+    last = tuple(start)
+    while True:
+        keyset = last if len(last) == 1 else (last[0], last[0], last[1])
         with conn.cursor(dictionary=True) as cursor:
-            cursor.execute(query, params)
+            cursor.execute(query, params + keyset + (batch_size,))
             rows = cursor.fetchall()
-    return pd.DataFrame(rows)
+        if not rows:
+            return
+        last = tuple(rows[-1][k] for k in keys)
+        yield pd.DataFrame(rows).drop(columns=list(keys))
+        if len(rows) < batch_size:
+            return
+
+
+# 進度 / 吞吐量回報：每批印一行 (覆寫同一行)，結束時換行
+class _Progress:
+    def __init__(self, label: str):
+        self.label, self.rows, self.t0 = label, 0, time.perf_counter()
+
+    def add(self, n: int) -> None:
+        self.rows += n
+        print(f"\r  {self.label}：{self.rows:,} 筆 ({self.rows / self._elapsed():,.0f} 筆/秒)", end="", flush=True)
+
+    def done(self) -> None:
+        print(f"\r  {self.label}：{self.rows:,} 筆，{self._elapsed():.1f} 秒 ({self.rows / self._elapsed():,.0f} 筆/秒)")
+
+    def _elapsed(self) -> float:
+        return max(time.perf_counter() - self.t0, 1e-9)
 
 
 # 把單一來源 (交易或預約) 整理成統一格式；空結果也保證欄位齊全
@@ -49,87 +163,205 @@ def _normalize_fav(v) -> str:
     return "[]"                                       # None / NaN / 空 → 空陣列
 
 
+# 去識別化：真實 member_id → 代理序號 = 在「依 id 排序的會員名單」(member_ids) 中的名次 (對照表只在記憶體，不落地)
+# 名次只由 member_ids 決定 → 完整匯出與 delta 算出的序號一致；members 查無的 id (會員已被刪) → 0
+def _surrogates(ids: pd.Series, member_ids: np.ndarray) -> pd.Series:
+    real = ids.to_numpy(dtype=np.int64)
+    pos = np.searchsorted(member_ids, real)
+    found = pos < len(member_ids)
+    found[found] = member_ids[pos[found]] == real[found]
+    return pd.Series(np.where(found, pos + 1, 0), index=ids.index)
+
+
+# 只讀 id 欄、依 id 排序的會員名單 (delta 用來還原舊會員的代理序號)
+def _member_ids(conn, upper_id: int, batch_size: int) -> np.ndarray:
+    chunks = [chunk["id"].to_numpy(dtype=np.int64) for chunk in _iter_batches(conn, """
+        SELECT id AS row_id, id FROM members
+        WHERE id <= %s AND id > %s ORDER BY id LIMIT %s
+    """, (upper_id,), batch_size)]
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+# 交易 / 預約事件，只取 (上次水位, 這次水位] 之間、且落在 90 天窗口內的
+# 回傳 [(event_type, query, params, keyset 起點 = 上次水位, keyset 欄位)]
+def _event_sources(past_start: date, prev: Dict, cur: Dict, delta: bool):
+    po, co = prev["orders"], cur["orders"]
+    if delta:
+        # --- 交易事件 (已出貨訂單)：帶出 buyer_id 作為 member_id；以 (shipped_at, id) 分批，只取上次之後出貨的 ---
+        trade = ("""
+            SELECT o.shipped_at AS row_ts, o.id AS row_id, o.buyer_id AS member_id, g.id AS game_id,
+                   g.team_home, g.team_away, o.created_at
+            FROM orders o
+            JOIN tickets_for_sale t ON o.ticket_id = t.id
+            JOIN games g ON t.game_id = g.id
+            WHERE o.shipment_status = '已出貨'
+                AND o.created_at >= %s
+                AND o.shipped_at IS NOT NULL
+                AND (o.shipped_at < %s OR (o.shipped_at = %s AND o.id <= %s))
+                AND (o.shipped_at > %s OR (o.shipped_at = %s AND o.id > %s))
+            ORDER BY o.shipped_at, o.id LIMIT %s
+        """, (past_start, co["shipped_at"], co["shipped_at"], co["id"]),
+            (po["shipped_at"], po["id"]), ("row_ts", "row_id"))
+    else:
+        # --- 交易事件 (已出貨訂單)：定義同原本的完整匯出 (90 天內建立的已出貨訂單，含 shipped_at 是 NULL 的)；
+        #     以 orders.id 分批，上界是這次的出貨水位 → 之後才出貨的留給下一次 delta，不會重複 ---
+        trade = ("""
+            SELECT o.id AS row_id, o.buyer_id AS member_id, g.id AS game_id,
+                   g.team_home, g.team_away, o.created_at
+            FROM orders o
+            JOIN tickets_for_sale t ON o.ticket_id = t.id
+            JOIN games g ON t.game_id = g.id
+            WHERE o.shipment_status = '已出貨'
+                AND o.created_at >= %s
+                AND (o.shipped_at IS NULL OR o.shipped_at < %s OR (o.shipped_at = %s AND o.id <= %s))
+                AND o.id > %s
+            ORDER BY o.id LIMIT %s
+        """, (past_start, co["shipped_at"], co["shipped_at"], co["id"]), (0,), ("row_id",))
+    return [
+        ("trade", *trade),
+        # --- 預約事件：帶出 member_id；以 reservations.id 分批 ---
+        ("reservation", """
+            SELECT r.id AS row_id, r.member_id, r.game_id, g.team_home, g.team_away, r.created_at
+            FROM reservations r
+            JOIN games g ON r.game_id = g.id
+            WHERE r.created_at >= %s
+                AND r.id <= %s
+                AND r.id > %s
+            ORDER BY r.id LIMIT %s
+        """, (past_start, cur["reservations"]["id"]), (prev["reservations"]["id"],), ("row_id",)),
+    ]
+
+
 # =======================================
-def export_snapshot(reference_date: date = None) -> None:
+# delta=False：完整匯出 (新的 base，舊的 delta part 作廢)
+# delta=True ：只匯出上次水位之後的資料，寫成一組 delta part；load_snapshot 會把 base 與所有 delta 合併
+def export_snapshot(reference_date: date = None, output_dir: Path = OUTPUT_DIR,
+                    batch_size: int = BATCH_SIZE, delta: bool = False) -> None:
     reference_date = reference_date or date.today()
-    past_start = reference_date - timedelta(days=90)
-
-    # --- 1. 交易事件 (已出貨訂單)：帶出 buyer_id 作為 member_id ---
-    trades = _fetch_df("""
-        SELECT o.buyer_id AS member_id, g.id AS game_id,
-               g.team_home, g.team_away, o.created_at
-        FROM orders o
-        JOIN tickets_for_sale t ON o.ticket_id = t.id
-        JOIN games g ON t.game_id = g.id
-        WHERE o.shipment_status = '已出貨'
-            AND o.created_at >= %s
-    """, (past_start,))
-
-    # --- 2. 預約事件：帶出 member_id ---
-    reservations = _fetch_df("""
-        SELECT r.member_id, r.game_id, g.team_home, g.team_away, r.created_at
-        FROM reservations r
-        JOIN games g ON r.game_id = g.id
-        WHERE r.created_at >= %s
-    """, (past_start,))
-
-    # 合併兩種事件 (透過 _tag 保證即使空結果也有正確 schema)
-    events = pd.concat([_tag(trades, "trade"), _tag(reservations, "reservation")],
-                       ignore_index=True)
-
-    # --- 3. games：靜態屬性 (人氣留到評估時以 T 為界動態算，避免未來洩漏) ---
-    games = _fetch_df("""
-        SELECT id AS game_id, game_date, start_time, team_home, team_away, stadium
-        FROM games
-    """)
-
-    # --- 4. member_favorites ---
-    favorites = _fetch_df("SELECT id AS member_id, favorite_teams FROM members")
-
-    # --- 防呆提示：資料為空時講清楚原因 ---
-    if favorites.empty:
-        raise SystemExit("⚠️ members 表查無資料，請確認 .env 連到的是正確且有資料的資料庫。")
-    if events.empty:
-        print("⚠️ 過去 90 天內沒有任何『已出貨交易』或『預約』 → 將輸出「只有會員與賽事、無行為事件」的快照。")
-        print("   （資料都在 90 天以前很正常；可改傳較早的 reference_date，或先用合成快照開發步驟 1~5。）")
-
-    # --- 去識別化：真實 member_id → 代理序號 (對照表只在記憶體，不落地) ---
-    real_ids = pd.unique(pd.concat(
-        [events["member_id"], favorites["member_id"]], ignore_index=True).dropna())
-    id_map: Dict[int, int] = {int(rid): i + 1 for i, rid in enumerate(sorted(real_ids))}
-    events["member_id"] = events["member_id"].map(id_map)
-    favorites["member_id"] = favorites["member_id"].map(id_map)
-
-    # favorite_teams 統一成 JSON 字串
-    favorites["favorite_teams"] = favorites["favorite_teams"].apply(_normalize_fav)
-
-    # 時間欄統一成字串輸出 (與合成快照一致；loader 會再轉回 datetime)
-    events["created_at"] = pd.to_datetime(events["created_at"]).astype(str)
-    games["game_date"] = pd.to_datetime(games["game_date"]).dt.date.astype(str)
-    games["start_time"] = games["start_time"].astype(str)
-
-    events = events[EVENT_COLS]   # 對齊契約順序 (已是此順序，保險用)
-
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    events.to_parquet(OUTPUT_DIR / "behavior_events.parquet", index=False)
-    games.to_parquet(OUTPUT_DIR / "games.parquet", index=False)
-    favorites.to_parquet(OUTPUT_DIR / "member_favorites.parquet", index=False)
-
-    meta = {
-        "source": "real_deidentified",
-        "reference_date": reference_date.isoformat(),
-        "n_users": len(id_map), "n_games": int(len(games)), "n_events": int(len(events)),
-        "exported_at": datetime.now().isoformat(timespec="seconds"),
-    }
-    (OUTPUT_DIR / "snapshot_meta.json").write_text(
-        json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"✅ 去識別化快照：會員 {len(id_map)}、賽事 {len(games)}、事件 {len(events)}")
+    past_start = reference_date - timedelta(days=WINDOW_DAYS)
+    t0 = time.perf_counter()
+
+    base_meta: Optional[Dict] = None
+    prev = EMPTY_WATERMARKS
+    if delta:
+        meta_path = output_dir / "snapshot_meta.json"
+        base_meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        if "watermarks" not in base_meta:
+            raise SystemExit("⚠️ 快照沒有水位紀錄 (還沒有完整匯出過，或是合成快照) → 請先跑一次完整匯出。")
+        prev = base_meta["watermarks"]
+
+    # 整個匯出在同一條連線、同一個一致性快照 (consistent snapshot) 裡讀：水位與各表看到的是同一個時間點的資料
+    with _consistent_snapshot() as conn:
+        cur = _read_watermarks(conn)
+
+        # --- 1. games：靜態屬性 (人氣留到評估時以 T 為界動態算，避免未來洩漏)；表小，一次讀完 ---
+        games = _fetch_df(conn, """
+            SELECT id AS game_id, game_date, start_time, team_home, team_away, stadium
+            FROM games
+            WHERE id > %s AND id <= %s
+        """, (prev["games"]["id"], cur["games"]["id"]))
+        if games.empty:
+            games = pd.DataFrame(columns=["game_id", "game_date", "start_time", "team_home", "team_away", "stadium"])
+
+        # --- 2. 會員名單 (代理序號的依據)：delta 先讀舊會員的 id，再接上這次新增的會員 ---
+        if delta:
+            member_ids = _member_ids(conn, prev["members"]["id"], batch_size)
+            if len(member_ids) != prev["members"]["count"]:
+                raise SystemExit("⚠️ 上次匯出後有會員被刪除 → 代理序號會位移，delta 無法沿用 → 請改跑完整匯出。")
+        else:
+            member_ids = np.empty(0, dtype=np.int64)
+
+        # part 名稱帶流水號 → 同一天 (甚至同一秒) 跑多次也不會互相覆蓋
+        part = f"delta-{len(base_meta.get('deltas', [])) + 1:04d}-{datetime.now():%Y%m%dT%H%M%S}" if delta else None
+        with SnapshotWriter(output_dir, games, part=part) as writer:
+            # --- 3. member_favorites：新會員 (依 id 遞增 → 順便接上名單) + delta 時再加「改過資料的舊會員」 ---
+            progress = _Progress("members")
+            new_ids, n_known = [], len(member_ids)
+            for chunk in _iter_batches(conn, """
+                SELECT id AS row_id, id AS member_id, favorite_teams FROM members
+                WHERE id <= %s AND id > %s ORDER BY id LIMIT %s
+            """, (cur["members"]["id"],), batch_size, start=(prev["members"]["id"],)):
+                new_ids.append(chunk["member_id"].to_numpy(dtype=np.int64))
+                chunk["member_id"] = np.arange(n_known + 1, n_known + len(chunk) + 1)   # 依 id 遞增 → 名次就是接著數
+                n_known += len(chunk)
+                chunk["favorite_teams"] = chunk["favorite_teams"].apply(_normalize_fav)   # 統一成 JSON 字串
+                writer.write_favorites(chunk)
+                progress.add(len(chunk))
+            member_ids = np.concatenate([member_ids, *new_ids])
+
+            if delta:
+                cm = cur["members"]
+                for chunk in _iter_batches(conn, """
+                    SELECT updated_at AS row_ts, id AS row_id, id AS member_id, favorite_teams FROM members
+                    WHERE id <= %s
+                        AND (updated_at < %s OR (updated_at = %s AND id <= %s))
+                        AND (updated_at > %s OR (updated_at = %s AND id > %s))
+                    ORDER BY updated_at, id LIMIT %s
+                """, (prev["members"]["id"], cm["updated_at"], cm["updated_at"], cm["updated_id"]), batch_size,
+                        start=(prev["members"]["updated_at"], prev["members"]["updated_id"]),
+                        keys=("row_ts", "row_id")):
+                    chunk["member_id"] = _surrogates(chunk["member_id"], member_ids)
+                    chunk["favorite_teams"] = chunk["favorite_teams"].apply(_normalize_fav)
+                    writer.write_favorites(chunk)
+                    progress.add(len(chunk))
+            progress.done()
+
+            # --- 防呆提示：資料為空時講清楚原因 ---
+            if len(member_ids) == 0:
+                raise SystemExit("⚠️ members 表查無資料，請確認 .env 連到的是正確且有資料的資料庫。")
+
+            # --- 4. 交易 / 預約事件 ---
+            for event_type, query, params, start, keys in _event_sources(past_start, prev, cur, delta):
+                progress = _Progress(event_type)
+                for chunk in _iter_batches(conn, query, params, batch_size, start, keys):
+                    events = _tag(chunk, event_type)        # 透過 _tag 保證欄位齊全、順序一致
+                    events["member_id"] = _surrogates(events["member_id"], member_ids)
+                    writer.write_events(events)
+                    progress.add(len(events))
+                progress.done()
+
+            if writer.n_events == 0 and not delta:
+                print("⚠️ 過去 90 天內沒有任何『已出貨交易』或『預約』 → 將輸出「只有會員與賽事、無行為事件」的快照。")
+                print("   （資料都在 90 天以前很正常；可改傳較早的 reference_date，或先用合成快照開發步驟 1~5。）")
+
+            cur["members"]["count"] = len(member_ids)
+            now = datetime.now().isoformat(timespec="seconds")
+            if delta:
+                # 型別與檔名統一由 SnapshotWriter 處理；meta 沿用 base，累加筆數、換上新水位、登記這個 part
+                meta = {**base_meta,
+                        "reference_date": reference_date.isoformat(),
+                        "window_start": past_start.isoformat(),     # load_snapshot 合併時濾掉比這更早的事件
+                        "n_users": len(member_ids),
+                        "n_games": base_meta["n_games"] + writer.n_games,
+                        "n_events": base_meta["n_events"] + writer.n_events,
+                        "watermarks": cur,
+                        "deltas": base_meta.get("deltas", []) + [{
+                            "part": part, "exported_at": now, "n_events": writer.n_events,
+                            "n_members": writer.n_favorites, "n_games": writer.n_games}]}
+            else:
+                # 型別 (categorical / timestamp / date) 與檔名統一由 SnapshotWriter 處理 (與合成快照一致)
+                meta = {
+                    "source": "real_deidentified",
+                    "reference_date": reference_date.isoformat(),
+                    "window_start": past_start.isoformat(),
+                    "n_users": len(member_ids), "n_games": writer.n_games, "n_events": writer.n_events,
+                    "exported_at": now,
+                    "watermarks": cur,
+                }
+            writer.commit(meta)
+
+    label = f"delta ({part})" if delta else "去識別化快照"
+    print(f"✅ {label}：會員 {writer.n_favorites}、賽事 {writer.n_games}、事件 {writer.n_events}"
+          f" ({time.perf_counter() - t0:.1f} 秒)")
 # =======================================
 
 
 if __name__ == "__main__":
-    export_snapshot()
-
+    parser = argparse.ArgumentParser(description="從 prod 匯出去識別化快照")
+    parser.add_argument("--delta", action="store_true", help="只匯出上次水位之後的資料 (每晚增量更新)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批 (row group) 筆數")
+    args = parser.parse_args()
+    export_snapshot(batch_size=args.batch_size, delta=args.delta)
 
 # 若之後想要一份「真實 coverage 數字」當佐證,就傳一個落在最後活動後 90 天內的 reference_date,讓窗口涵蓋到那批四個月前的資料。
 # 作法: 把 export_snapshot 的括號內容改成某日期(日期依實際活動時間微調). 舉例如下:
@@ -0,0 +1,56 @@
+# recsys_offline/member_index.py
+# 每位會員的行為索引：整張事件表只 groupby 一次，預先切好「交易 / 預約」兩份 records。
+# 為什麼：原本每個 uid 都跑一次 ev[ev["member_id"] == uid] → 每次都掃整張表，O(會員數 × 事件數)；
+#        會員數與事件數一起放大時 (10 萬人 × 500 萬筆) 會跑不完。建好索引後每人查詢 O(1)，整體線性。
+# evaluate / ab_test / scripts 共用這一份，保證三邊餵給 recommend() 的輸入格式一致。
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+import pandas as pd
+
+
+@dataclass
+class MemberEvents:
+    trades: List[Dict] = field(default_factory=list)        # recommend() 的 own_trades
+    reservations: List[Dict] = field(default_factory=list)  # recommend() 的 own_reservations
+    teams: Set[str] = field(default_factory=set)            # 行為碰過的所有球隊 (主客都算)
+
+    @property
+    def n_events(self) -> int:
+        return len(self.trades) + len(self.reservations)
+
+
+# 空物件：查無行為的會員共用 (唯讀，不要原地修改)
+EMPTY = MemberEvents()
+
+
+def build_member_index(events: pd.DataFrame) -> Dict[int, MemberEvents]:
+    index: Dict[int, MemberEvents] = {}
+    if events.empty:
+        return index
+
+    # records 只建一次，之後用 groupby 的位置索引取出各組 (不再逐人掃表)
+    # 不用 to_dict("records")：它會逐筆建 pd.Timestamp，百萬筆時是主要成本；
+    # 轉成原生 datetime 再 zip 快好幾倍，recommend() 只呼叫 .date()，兩者行為相同
+    teams_home = events["team_home"].tolist()
+    teams_away = events["team_away"].tolist()
+    created = events["created_at"]
+    if pd.api.types.is_datetime64_any_dtype(created):
+        created = created.dt.to_pydatetime()
+    records = [{"team_home": h, "team_away": a, "created_at": c}
+               for h, a, c in zip(teams_home, teams_away, created)]
+
+    # groupby(...).indices：{(member_id, event_type): 位置陣列}，組內保留原始列順序
+    # observed=True：event_type 是 categorical 時只列出實際出現的組合
+    groups = events.groupby(["member_id", "event_type"], sort=False, observed=True).indices
+    for (uid, event_type), pos in groups.items():
+        me = index.setdefault(int(uid), MemberEvents())
+        rows = [records[i] for i in pos]
+        if event_type == "trade":
+            me.trades.extend(rows)
+        elif event_type == "reservation":
+            me.reservations.extend(rows)
+        me.teams.update(teams_home[i] for i in pos)
+        me.teams.update(teams_away[i] for i in pos)
+    return index
@@ -0,0 +1,99 @@
+# recsys_offline/parallel.py
+# 離線評估 / A/B 模擬的多行程 (multiprocess) 執行器：把 cohort 切成 shard，丟給 process pool 平行計分。
+# 設計重點：
+#   1. 結果與「單行程」逐位元相同：shard 的切法與每個 shard 的亂數種子只由 (會員順序, n_shards, SEED) 決定，
+#      與 worker 數無關 → 同一個 n_shards 下 workers=1 與 workers=8 跑出同一份數字；合併時依 shard 順序串接。
+#   2. 事件表不 pickle：父行程把 DataFrame 寫成一份 Arrow IPC 檔，worker 以 memory-map 開啟 (零複製、
+#      共用 OS page cache)，只把「自己 shard 的會員」那幾列轉成 DataFrame。
+#   3. 每個 worker 只在啟動時載入一次 (initializer)，之後處理多個 shard 都重用。
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int              # 第幾個 shard (合併結果時的順序)
+    members: List[int]      # 這個 shard 負責的會員 (保留 cohort 原順序)
+    seed: int               # 這個 shard 專屬的亂數種子
+
+
+# 各 shard 的種子：由 SEED 決定性推導。只切 1 個 shard 時沿用 SEED 本身 → 與舊版單行程結果完全相同；
+# 多個 shard 用 SeedSequence(SEED).spawn()：子種子經過雜湊、彼此獨立 (不像 SEED + i，相鄰的 SEED 不會共用同一串種子)
+def shard_seeds(seed: int, n_shards: int) -> List[int]:
+    if n_shards == 1:
+        return [seed]
+    return [int(child.generate_state(1, np.uint64)[0]) for child in np.random.SeedSequence(seed).spawn(n_shards)]
+
+
+# 依原順序切成連續的 n_shards 段 (前面幾段多 1 人)；空段不產生
+def make_shards(members: Sequence[int], n_shards: int, seed: int = 0) -> List[Shard]:
+    n_shards = max(1, min(n_shards, len(members))) if members else 1
+    size, extra = divmod(len(members), n_shards)
+    shards, start = [], 0
+    for i, shard_seed in enumerate(shard_seeds(seed, n_shards)):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(Shard(index=i, members=list(members[start:end]), seed=shard_seed))
+        start = end
+    return [s for s in shards if s.members]
+
+
+# ==================== worker 端 ====================
+# 每個 worker 行程各一份 (initializer 設定)；fork 出來的子行程彼此不共用這些全域變數
+_TABLE: Optional[pa.Table] = None
+_FN: Optional[Callable] = None
+_CONTEXT: Any = None
+
+
+def _init_worker(arrow_path: str, fn: Callable, context: Any) -> None:
+    global _TABLE, _FN, _CONTEXT
+    source = pa.memory_map(arrow_path, "r")
+    _TABLE = pa.ipc.open_file(source).read_all()    # 指向 mmap 的零複製 table
+    _FN, _CONTEXT = fn, context
+
+
+def _shard_events(table: pa.Table, members: List[int]) -> pd.DataFrame:
+    mask = pc.is_in(table["member_id"], value_set=pa.array(members, type=table.schema.field("member_id").type))
+    return table.filter(mask).to_pandas()
+
+
+def _run_shard(shard: Shard) -> Any:
+    return _FN(_shard_events(_TABLE, shard.members), shard, _CONTEXT)
+
+
+# ==================== 父行程端 ====================
+# fn(shard_events, shard, context) 必須是模組層級函式 (才能送進子行程)；回傳值依 shard 順序排列
+# workers=1 時不開 process pool，直接在本行程跑 (除錯 / 對照用)，但資料一樣走 Arrow 表 → 輸入完全相同
+def run_sharded(fn: Callable, events: pd.DataFrame, shards: List[Shard],
+                context: Any = None, workers: int = 1) -> List[Any]:
+    if not shards:
+        return []       # 沒有會員：不開 process pool (max_workers=0 會丟 ValueError)
+    table = pa.Table.from_pandas(events, preserve_index=False)
+
+    if workers <= 1:
+        return [fn(_shard_events(table, s.members), s, context) for s in shards]
+
+    with tempfile.TemporaryDirectory(prefix="recsys_shared_") as tmp:
+        path = Path(tmp) / "events.arrow"
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        del table   # 父行程不再需要 Arrow 副本
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)),
+                                 initializer=_init_worker, initargs=(str(path), fn, context)) as pool:
+            return list(pool.map(_run_shard, shards))    # map 保證依輸入順序回傳
+
+
+# CLI 共用：--workers 預設用全部 CPU
+def default_workers() -> int:
+    return os.cpu_count() or 1
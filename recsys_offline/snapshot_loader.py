@@ -1,15 +1,31 @@
 # recsys_offline/snapshot_loader.py
 # 讀取「凍結快照」成結構化資料，供離線評估 / A/B 模擬共用。
 # 設計重點：下游只認這個 loader 的輸出，不直接碰檔案 → 來源(真實/合成)可隨時替換。
+# 快照 = base 檔 (<name>.parquet) + 0~多個 delta part (<name>.delta-<時間>.parquet，清單記在 meta["deltas"])，
+# 由 load_snapshot 合併：事件直接串接、賽事 / 會員以較新的 part 為準 (last wins)。
 
 import json
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 SNAPSHOT_DIR = Path(__file__).parent / "data" / "snapshot"
+ARCHIVE_DIR = Path(__file__).parent / "data" / "archive" / "recommendation_events"
+
+
+# 快照儲存型別 (寫入端 write_snapshot 與讀取端 load_snapshot 共用)：
+#   * 球隊 / 事件類型 / 球場 → dictionary-encoded (pandas categorical)，每列只存小整數 code，不再是一份份 Python 字串
+#   * created_at → timestamp、game_date → date32，讀進來不必再逐列解析字串
+#   * id 欄位 → int32 (會員 / 賽事數遠小於 21 億)
+EVENT_TYPES = ["trade", "reservation"]
+TEAM_COLS = ["team_home", "team_away"]
+EVENT_COLS = ["member_id", "event_type", "game_id", "team_home", "team_away", "created_at"]
+FAVORITE_COLS = ["member_id", "favorite_teams"]
 
 
 # 用 dataclass 把四份資料打包成一個物件，下游拿 snap.events / snap.favorites 即可
@@ -20,23 +36,205 @@ class Snapshot:
     favorites: Dict[int, List[str]] # {member_id: ["中信兄弟", ...]}
     meta: Dict
 
+    # 球隊的 int ID = 這個 list 的索引 (= events / games 的 team_home.cat.codes，兩張表共用同一份對照)
+    @property
+    def teams(self) -> List[str]:
+        return list(self.games["team_home"].cat.categories)
 
-def load_snapshot(snapshot_dir: Path = SNAPSHOT_DIR) -> Snapshot:
-    events = pd.read_parquet(snapshot_dir / "behavior_events.parquet")
-    games = pd.read_parquet(snapshot_dir / "games.parquet")
-    fav_df = pd.read_parquet(snapshot_dir / "member_favorites.parquet")
-    meta = json.loads((snapshot_dir / "snapshot_meta.json").read_text(encoding="utf-8"))
 
-    # 型別正規化：時間欄轉 datetime / date，後續才好做時間切分
-    events["created_at"] = pd.to_datetime(events["created_at"])
-    games["game_date"] = pd.to_datetime(games["game_date"]).dt.date
+# 球隊對照表：所有表格出現過的隊名排序後編號 → events 與 games 的 code 一致
+def _team_dtype(*frames: pd.DataFrame) -> pd.CategoricalDtype:
+    teams = set()
+    for df in frames:
+        for col in TEAM_COLS:
+            if col in df.columns:
+                teams.update(df[col].dropna().unique())
+    return pd.CategoricalDtype(sorted(teams))
+
+
+# 把 events / games 轉成快照的標準型別 (讀寫兩端共用；舊版「全字串」快照也會在這裡轉好)
+# team_dtype：分批寫入時由呼叫端固定 (每批的隊名 code 才一致)；不給就從這兩張表現算
+def normalize_types(events: pd.DataFrame, games: pd.DataFrame,
+                    team_dtype: Optional[pd.CategoricalDtype] = None) -> None:
+    team_dtype = team_dtype or _team_dtype(events, games)
+    for df in (events, games):
+        for col in TEAM_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype(team_dtype)
+        for col in ("member_id", "game_id"):
+            if col in df.columns:
+                df[col] = df[col].astype("int32")
+
+    if "event_type" in events.columns:
+        events["event_type"] = events["event_type"].astype(pd.CategoricalDtype(EVENT_TYPES))
+    if "created_at" in events.columns:
+        events["created_at"] = pd.to_datetime(events["created_at"])
+    if "stadium" in games.columns:
+        games["stadium"] = games["stadium"].astype("category")
+    if "game_date" in games.columns:
+        games["game_date"] = pd.to_datetime(games["game_date"]).dt.date    # 下游用 date 比較 / strftime
+
+
+# favorite_teams 在快照是 JSON 字串 (與 prod members 表一致) → 解析成 list
+# 不同字串的種類很少 (球隊組合有限)：每種只 json.loads 一次，同組合的會員共用同一個 list (唯讀，不要原地修改)
+def _parse_favorites(fav_df: pd.DataFrame) -> Dict[int, List[str]]:
+    parsed: Dict[str, List[str]] = {}
+    favorites = {}
+    for member_id, raw in zip(fav_df["member_id"].tolist(), fav_df["favorite_teams"].tolist()):
+        teams = parsed.get(raw)
+        if teams is None:
+            teams = parsed[raw] = json.loads(raw)
+        favorites[int(member_id)] = teams
+    return favorites
+
+
+# 某張表的所有 part：base 在前、delta 依匯出順序在後 (只認 meta 有記錄的 part → 寫到一半的 delta 不會被讀到)
+def _part_paths(snapshot_dir: Path, name: str, meta: Dict) -> List[Path]:
+    parts = [f"{name}.parquet"] + [f"{name}.{d['part']}.parquet" for d in meta.get("deltas", [])]
+    return [snapshot_dir / p for p in parts if (snapshot_dir / p).exists()]
+
+
+def _read_parts(paths: List[Path], **kwargs) -> pd.DataFrame:
+    frames = [pd.read_parquet(p, **kwargs) for p in paths]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+# 匯出快照的 meta 記有 window_start (最新一次匯出的 90 天窗口起點)：base 與舊 delta 裡更早的事件在讀取時濾掉
+# filters 可以是 AND 清單 [(...), (...)] 或 DNF [[...], [...]] (OR)，兩種都把窗口條件加進每一組
+def _with_window(filters: Optional[List], meta: Dict) -> Optional[List]:
+    if not meta.get("window_start"):
+        return filters
+    cond = ("created_at", ">=", pd.Timestamp(meta["window_start"]))
+    if not filters:
+        return [cond]
+    if isinstance(filters[0], list):
+        return [group + [cond] for group in filters]
+    return list(filters) + [cond]
+
+
+# columns：events 只讀這些欄位 (欄式儲存 → 沒讀的欄位完全不進記憶體)
+# filters：events 讀取時就過濾的條件 (pyarrow DNF 格式，會跳過不符合的 row group)，例如
+#          [("created_at", ">=", pd.Timestamp("2026-06-01"))]、[("member_id", "in", [1, 2, 3])]
+def load_snapshot(snapshot_dir: Path = SNAPSHOT_DIR, columns: Optional[List[str]] = None,
+                  filters: Optional[List] = None) -> Snapshot:
+    meta = json.loads((snapshot_dir / "snapshot_meta.json").read_text(encoding="utf-8"))
+    filters = _with_window(filters, meta)
+    events = _read_parts(_part_paths(snapshot_dir, "behavior_events", meta), columns=columns, filters=filters)
+    games = _read_parts(_part_paths(snapshot_dir, "games", meta))
+    fav_df = _read_parts(_part_paths(snapshot_dir, "member_favorites", meta))
+    if len(meta.get("deltas", [])):
+        games = games.drop_duplicates("game_id", keep="last").reset_index(drop=True)
 
-    # favorite_teams 在快照是 JSON 字串 (與 prod members 表一致) → 解析成 list
-    favorites = {int(r.member_id): json.loads(r.favorite_teams) for r in fav_df.itertuples()}
+    # 型別正規化：時間欄轉 datetime / date (後續才好做時間切分)、隊名轉共用的 categorical
+    normalize_types(events, games)
+    favorites = _parse_favorites(fav_df)          # 依 part 順序覆寫 → 同一會員以最新的 delta 為準
 
     return Snapshot(events=events, games=games, favorites=favorites, meta=meta)
 
 
+# 串流寫出快照 (write_snapshot / export_snapshot 共用)：events / favorites 可以分很多批寫，每批 = 一個 row group，
+# 記憶體只留當下這一批。檔案先寫成 .tmp，commit() 才換成正式檔名 → 匯出中途失敗不會留下半份快照。
+#   with SnapshotWriter(snapshot_dir, games) as writer:
+#       writer.write_favorites(chunk) ... writer.write_events(chunk) ...
+#       writer.commit(meta)
+# part="delta-<時間>"：改寫成 delta part (base 檔不動)；meta 要把這個 part 加進 meta["deltas"] 才會被讀到
+class SnapshotWriter:
+    def __init__(self, snapshot_dir: Path, games: pd.DataFrame,
+                 team_dtype: Optional[pd.CategoricalDtype] = None, part: Optional[str] = None):
+        self.snapshot_dir = snapshot_dir
+        self.part = part
+        if team_dtype is None:
+            # events 的隊名都來自 games → 以 games 為準；delta 的事件也會指到之前 part 的賽事，所以一併算進來
+            existing = [pd.read_parquet(p, columns=TEAM_COLS) for p in snapshot_dir.glob("games*.parquet")] if part else []
+            team_dtype = _team_dtype(games, *existing)
+        self.team_dtype = team_dtype
+        self.n_events = self.n_favorites = 0
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+        games = games.copy()
+        normalize_types(pd.DataFrame(), games, self.team_dtype)
+        games["start_time"] = games["start_time"].astype(str)
+        games.to_parquet(self._tmp("games"), index=False)
+        self.n_games = len(games)
+
+        # schema 由空表推出 → 0 筆事件也寫得出帶正確欄位的檔案；之後每批都 cast 成同一個 schema
+        self._event_schema = pa.Schema.from_pandas(self._event_frame(pd.DataFrame(columns=EVENT_COLS)),
+                                                   preserve_index=False)
+        self._fav_schema = pa.schema([("member_id", pa.int32()), ("favorite_teams", pa.string())])
+        self._events = pq.ParquetWriter(self._tmp("behavior_events"), self._event_schema)
+        self._favorites = pq.ParquetWriter(self._tmp("member_favorites"), self._fav_schema)
+
+    def _path(self, name: str) -> Path:
+        return self.snapshot_dir / (f"{name}.{self.part}.parquet" if self.part else f"{name}.parquet")
+
+    def _tmp(self, name: str) -> Path:
+        path = self._path(name)
+        return path.with_name(path.name + ".tmp")
+
+    def _event_frame(self, events: pd.DataFrame) -> pd.DataFrame:
+        events = events[EVENT_COLS].copy()
+        normalize_types(events, pd.DataFrame(), self.team_dtype)
+        events["created_at"] = events["created_at"].astype("datetime64[s]")    # 秒級即可 (來源是 DATETIME)
+        return events
+
+    def write_events(self, events: pd.DataFrame) -> None:
+        if len(events):
+            self._events.write_table(pa.Table.from_pandas(
+                self._event_frame(events), schema=self._event_schema, preserve_index=False))
+            self.n_events += len(events)
+
+    def write_favorites(self, favorites: pd.DataFrame) -> None:
+        if len(favorites):
+            self._favorites.write_table(pa.Table.from_pandas(
+                favorites[FAVORITE_COLS], schema=self._fav_schema, preserve_index=False))
+            self.n_favorites += len(favorites)
+
+    def commit(self, meta: Dict) -> None:
+        self._events.close()
+        self._favorites.close()
+        if self.part is None:
+            # 新的 base 取代舊快照 → 舊的 delta part 一併作廢
+            for old in self.snapshot_dir.glob("*.delta-*.parquet"):
+                old.unlink()
+        for name in ("behavior_events", "games", "member_favorites"):
+            os.replace(self._tmp(name), self._path(name))
+        (self.snapshot_dir / "snapshot_meta.json").write_text(
+            json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    # 沒 commit 就離開 (例外)：關掉 writer、刪掉暫存檔，正式檔維持上一份快照
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._events.close()
+        self._favorites.close()
+        for tmp in self.snapshot_dir.glob("*.parquet.tmp"):
+            tmp.unlink()
+
+
+# 一次寫出整份快照 (synthetic_data 用)，欄位型別統一由 normalize_types 決定
+def write_snapshot(snapshot_dir: Path, events: pd.DataFrame, games: pd.DataFrame,
+                   favorites: pd.DataFrame, meta: Dict) -> None:
+    with SnapshotWriter(snapshot_dir, games, _team_dtype(events, games)) as writer:
+        writer.write_events(events)
+        writer.write_favorites(favorites)
+        writer.commit(meta)
+
+
+# 讀取 archive_events.py 歸檔的 recommendation_events 月分區 (每月一個 Parquet)，合併成一張表
+# months 例如 ["p202601", "p202602"]；不給就讀全部
+def load_archived_events(archive_dir: Path = ARCHIVE_DIR, months: Optional[List[str]] = None) -> pd.DataFrame:
+    paths = sorted(archive_dir.glob("*.parquet"))
+    if months is not None:
+        paths = [p for p in paths if p.stem in set(months)]
+    if not paths:
+        return pd.DataFrame()
+
+    events = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+    events["created_at"] = pd.to_datetime(events["created_at"])    # 與快照一樣：字串 → datetime
+    return events
+
+
 if __name__ == "__main__":
     snap = load_snapshot()
     print("meta:", snap.meta)
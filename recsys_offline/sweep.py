@@ -0,0 +1,132 @@
+# recsys_offline/sweep.py
+# RecommenderParams 超參數掃描：grid search 或 random search，輸出依 precision@K / hit-rate@K 排序的結果表。
+# 跑法：專案根目錄 python3 -m recsys_offline.sweep                      (預設 grid，144 組)
+#       python3 -m recsys_offline.sweep --random 300 --workers 8 --out sweep.csv
+# 成本設計：快照只載入一次、evaluate.prepare() 只做一次 (候選賽事 / 人氣 / cohort 與參數無關)；
+#          每個 shard 的 train / test 索引只建一次，所有參數組合都重用 → 每多一組只多「recommend() × cohort」的成本。
+# 評估邏輯完全沿用 evaluate.py (同一個 score_shard)，掃出來的數字與 evaluate 的算法一致。
+
+import argparse
+import itertools
+import math
+import random
+from dataclasses import asdict, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from recsys_offline.evaluate import K, merge_scores, prepare, score_shard
+from recsys_offline.parallel import default_workers, make_shards, run_sharded
+from recsys_offline.snapshot_loader import load_snapshot
+from services.recommender import DEFAULT_PARAMS, RecommenderParams
+
+# 要掃的四個參數 (其餘欄位沿用 DEFAULT_PARAMS)
+SWEEP_FIELDS = ["decay_rate", "trade_weight", "reservation_weight", "popularity_weight"]
+
+# grid search 預設網格：4 × 3 × 3 × 4 = 144 組 (含目前的預設值)
+DEFAULT_GRID: Dict[str, List[float]] = {
+    "decay_rate":         [0.005, 0.01, 0.02, 0.05],
+    "trade_weight":       [0.8, 1.2, 2.0],
+    "reservation_weight": [0.5, 1.0, 1.5],
+    "popularity_weight":  [0.0, 0.05, 0.1, 0.2],
+}
+
+# random search 的範圍 (low, high, 是否取 log 均勻)：衰減率跨數量級，用 log 均勻抽才不會全擠在大值
+RANDOM_SPACE: Dict[str, Tuple[float, float, bool]] = {
+    "decay_rate":         (0.001, 0.1, True),
+    "trade_weight":       (0.0, 3.0, False),
+    "reservation_weight": (0.0, 3.0, False),
+    "popularity_weight":  (0.0, 0.5, False),
+}
+SEED = 11                  # random search 的種子 (可重現)
+
+
+# ==================== 產生參數組合 ====================
+def grid_configs(grid: Dict[str, Sequence[float]] = DEFAULT_GRID,
+                 base: RecommenderParams = DEFAULT_PARAMS) -> List[RecommenderParams]:
+    keys = list(grid)
+    return [replace(base, **dict(zip(keys, values)))
+            for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_configs(n: int, space: Dict[str, Tuple[float, float, bool]] = RANDOM_SPACE,
+                   seed: int = SEED, base: RecommenderParams = DEFAULT_PARAMS) -> List[RecommenderParams]:
+    rng = random.Random(seed)
+    configs = [base]                     # 一律把預設值放進去當基準線
+    for _ in range(n - 1):
+        values = {}
+        for key, (low, high, log) in space.items():
+            if log:
+                values[key] = round(math.exp(rng.uniform(math.log(low), math.log(high))), 5)
+            else:
+                values[key] = round(rng.uniform(low, high), 3)
+        configs.append(replace(base, **values))
+    return configs
+
+
+# 依 precision 由高到低排序 (同分再比 hit-rate)；回傳 DataFrame，第一欄是名次
+def rank_results(configs: List[RecommenderParams],
+                 scores_by_config: Dict[str, List[Tuple[float, int]]], n_users: int) -> pd.DataFrame:
+    rows = []
+    for i, params in enumerate(configs):
+        scores = scores_by_config[f"cfg{i}"]
+        row = {k: asdict(params)[k] for k in SWEEP_FIELDS}
+        row[f"precision@{K}"] = sum(p for p, _ in scores) / n_users if n_users else 0.0
+        row[f"hit_rate@{K}"] = sum(h for _, h in scores) / n_users if n_users else 0.0
+        row["is_default"] = params == DEFAULT_PARAMS
+        rows.append(row)
+
+    table = pd.DataFrame(rows).sort_values(
+        [f"precision@{K}", f"hit_rate@{K}"], ascending=False, kind="stable").reset_index(drop=True)
+    table.insert(0, "rank", range(1, len(table) + 1))
+    return table
+
+
+# =======================================
+def sweep(configs: List[RecommenderParams], workers: int = 1,
+          n_shards: Optional[int] = None) -> Optional[pd.DataFrame]:
+    snap = load_snapshot()
+    prepared = prepare(snap)
+    if prepared is None:
+        print("⚠️ 快照沒有任何行為事件，無法評估。請先跑 python3 -m recsys_offline.synthetic_data")
+        return None
+    ctx, cohort = prepared
+
+    # 去除重複組合 (grid 與預設值可能重疊)，保留第一次出現的順序
+    configs = list(dict.fromkeys(configs))
+    arms = [(f"cfg{i}", params) for i, params in enumerate(configs)]
+
+    # 平行單位是「cohort 的 shard」：每個 shard 建一次索引、跑完全部參數組合，再依 shard 順序合併
+    shards = make_shards(cohort, n_shards or workers)
+    results = run_sharded(_score_all_configs, snap.events, shards, (ctx, arms), workers)
+    table = rank_results(configs, merge_scores(results), len(cohort))
+
+    print(f"切分點 T={ctx.T} | cohort {len(cohort)} 人 | 參數組合 {len(configs)} 組")
+    return table
+
+
+# run_sharded 的 context 只能有一個參數 → 包成 (ctx, arms)
+def _score_all_configs(events, shard, context):
+    ctx, arms = context
+    return score_shard(events, shard, ctx, arms)
+# =======================================
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RecommenderParams 超參數掃描")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="改用 random search，抽 N 組 (預設 grid)")
+    parser.add_argument("--seed", type=int, default=SEED, help="random search 的種子")
+    parser.add_argument("--workers", type=int, default=1, help=f"平行行程數 (本機 CPU: {default_workers()})")
+    parser.add_argument("--shards", type=int, default=None, help="cohort 切幾份 (預設 = workers；評估無亂數，切法不影響結果)")
+    parser.add_argument("--top", type=int, default=20, help="印出前幾名")
+    parser.add_argument("--out", default=None, help="完整結果另存 CSV")
+    args = parser.parse_args()
+
+    configs = random_configs(args.random, seed=args.seed) if args.random else grid_configs()
+    table = sweep(configs, workers=args.workers, n_shards=args.shards)
+    if table is not None:
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print(table.head(args.top).to_string(index=False))
+        if args.out:
+            table.to_csv(args.out, index=False)
+            print(f"✅ 完整結果 ({len(table)} 組) → {args.out}")
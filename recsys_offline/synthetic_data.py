@@ -1,14 +1,23 @@
 # recsys_offline/synthetic_data.py
 # 合成資料產生器：產出與「快照契約」相同格式的測試資料 (固定 seed → 可重現)
 # 用途：(1) 真實資料稀疏時，讓離線評估有足夠 per-user 訊號 (2) 當作評估管線本身的測試 fixture
+#       (3) generate_scaled：可調規模 (百萬級會員 / 事件) 的向量化產生器，同時輸出快照與 MySQL seed，給壓測 / benchmark 用
+# 跑法：python3 -m recsys_offline.synthetic_data                 (預設小快照，與文件中的數字一致)
+#       python3 -m recsys_offline.synthetic_data --scale --users 1000000 --mysql-seed seed.sql --out data/large
 
+import argparse
 import json
 import random
+from dataclasses import asdict, dataclass
 from datetime import date, datetime, timedelta
 from pathlib import Path
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
+from recsys_offline.snapshot_loader import write_snapshot
+
 
 # =======================================
 # 常數設定 (TEAMS / STADIUMS 請對齊你 games 表的實際值)
@@ -31,7 +40,9 @@ def _rand_dt(start: date, end: date, rng: random.Random) -> datetime:
 
 # =======================================
 # 產生並寫出三份快照檔 + meta
-def generate_snapshot(reference_date: date = None) -> None:
+# n_users / n_games / output_dir 可覆寫 (效能量測用大快照)；預設值產出的快照與文件中的數字一致
+def generate_snapshot(reference_date: date = None, n_users: int = N_USERS, n_games: int = N_GAMES,
+                      output_dir: Path = OUTPUT_DIR) -> None:
     rng = random.Random(SEED)                       # 用獨立的 Random 物件帶 seed，不污染全域亂數
     reference_date = reference_date or date.today()
     past_start = reference_date - timedelta(days=90)
@@ -39,7 +50,7 @@ def generate_snapshot(reference_date: date = None) -> None:
 
     # --- 1. games：過去 90 天 ~ 未來 60 天的賽事 ---
     games = []
-    for gid in range(1, N_GAMES + 1):
+    for gid in range(1, n_games + 1):
         home, away = rng.sample(TEAMS, 2)           # sample 確保主客隊不同隊
         gdate = past_start + timedelta(days=rng.randint(0, (future_end - past_start).days))
         games.append({
@@ -55,21 +66,22 @@ def generate_snapshot(reference_date: date = None) -> None:
 
     # --- 2. member_favorites：每位會員 1~2 個喜愛球隊 (與 prod 一致，存成 JSON 字串) ---
     favorites, member_rows = {}, []
-    for uid in range(1, N_USERS + 1):
+    for uid in range(1, n_users + 1):
         fav = rng.sample(TEAMS, rng.choice([1, 1, 2]))   # 多數人 1 隊、少數 2 隊
         favorites[uid] = fav
         member_rows.append({"member_id": uid, "favorite_teams": json.dumps(fav, ensure_ascii=False)})
 
     # --- 3. behavior_events：交易 + 預約，偏向喜愛球隊以製造 per-user 訊號 ---
     events = []
-    for uid in range(1, N_USERS + 1):
+    for uid in range(1, n_users + 1):
         fav = favorites[uid]
+        # 「含喜愛球隊」的過去賽事：每人只算一次 (不消耗亂數，輸出與逐筆重算完全相同)
+        pool = [g for g in past_games
+                if any(f in (g["team_home"], g["team_away"]) for f in fav)]
         # 刻意製造稀疏性：部分會員 0 筆 (冷啟動 / coverage 測試)
         for _ in range(rng.choice([0, 0, 1, 2, 3, 5, 8])):
             if rng.random() < P_FAVORITE:
                 # 從「含喜愛球隊」的過去賽事中挑一場
-                pool = [g for g in past_games
-                        if any(f in (g["team_home"], g["team_away"]) for f in fav)]
                 game = rng.choice(pool) if pool else rng.choice(past_games)
             else:
                 game = rng.choice(past_games)        # 30% 機率隨機 (雜訊)
@@ -82,23 +94,316 @@ def generate_snapshot(reference_date: date = None) -> None:
                 "created_at": _rand_dt(past_start, reference_date, rng).isoformat(sep=" "),
             })
 
-    # --- 寫出快照 (parquet) + meta ---
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(games).to_parquet(OUTPUT_DIR / "games.parquet", index=False)
-    pd.DataFrame(member_rows).to_parquet(OUTPUT_DIR / "member_favorites.parquet", index=False)
-    pd.DataFrame(events).to_parquet(OUTPUT_DIR / "behavior_events.parquet", index=False)
-
+    # --- 寫出快照 (parquet) + meta：型別 (categorical / timestamp / date) 統一由 write_snapshot 處理 ---
     meta = {
         "source": "synthetic", "seed": SEED,
         "reference_date": reference_date.isoformat(),
-        "n_users": N_USERS, "n_games": N_GAMES, "n_events": len(events),
+        "n_users": n_users, "n_games": n_games, "n_events": len(events),
         "generated_at": datetime.now().isoformat(timespec="seconds"),
     }
-    (OUTPUT_DIR / "snapshot_meta.json").write_text(
-        json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"✅ 合成快照：會員 {N_USERS}、賽事 {N_GAMES}、事件 {len(events)}、ref={reference_date}")
+    events_df = pd.DataFrame(events, columns=["member_id", "event_type", "game_id",
+                                              "team_home", "team_away", "created_at"])
+    write_snapshot(output_dir, events_df, pd.DataFrame(games), pd.DataFrame(member_rows), meta)
+    print(f"✅ 合成快照：會員 {n_users}、賽事 {n_games}、事件 {len(events)}、ref={reference_date}")
+# =======================================
+
+
+# =======================================
+# 大規模資料集：numpy 向量化 (沒有逐筆 Python 迴圈)，規模與偏態都可調
+# 先產出「DB 形狀」的五張表 (members / games / tickets_for_sale / orders / reservations)，
+# 再用與 export_snapshot 相同的規則轉成快照 → 壓測用的 DB 與離線快照是同一份資料
+# =======================================
+@dataclass(frozen=True)
+class ScaleParams:
+    n_users: int = 100_000
+    n_games: int = 1_000
+    activity_zipf: float = 2.0             # 每人行為數 ~ Zipf(a) - 1：多數人 0~2 筆、少數重度使用者 (長尾)
+    max_events_per_user: int = 200         # 長尾上限
+    game_zipf: float = 1.1                 # 賽事熱門度 ∝ 1 / rank^a (少數熱門場次吃掉大部分交易)
+    team_zipf: float = 0.8                 # 球隊人氣 (決定誰被選為喜愛球隊)
+    loyalty_alpha: float = 4.0             # 每人忠誠度 ~ Beta(α, β)，平均 α/(α+β) ≈ 0.7 (= P_FAVORITE)
+    loyalty_beta: float = 1.7              #   → 死忠與隨興的會員混在一起 (team-loyalty mixture)
+    p_trade: float = 0.5                   # 行為是「交易」的比例，其餘為「預約」
+    open_tickets_per_game: float = 8.0     # 未來賽事平均待售票數 (瀏覽 / 媒合請求用)
+    future_reservation_rate: float = 0.05  # 多少比例的會員對未來賽事有預約 (上架媒合用)
+    seed: int = SEED
+
+
+SEAT_AREAS = ["內野", "外野"]
+RESERVATION_AREAS = ["none", "內野", "外野"]                  # none = 不限區域
+PRICE_RANGES = ['["0-0"]', '["0-400"]', '["401-699"]', '["700-999"]',
+                '["401-699", "700-999"]', '["1000-10000"]']    # 與預約頁的選項一致 ("0-0" = 不限價格)
+CITIES = ["台北市", "新北市", "桃園市", "台中市", "台南市", "高雄市"]
+START_TIMES = ["14:05:00", "17:05:00", "18:35:00"]
+SEED_PASSWORD = "pitchaseat123"    # 所有合成會員共用的登入密碼 (壓測腳本用)
+_SEED_PASSWORD_SALT = b"$2b$12$PitchASeatSyntheticDa."   # 固定 salt → seed 檔每次都一樣；只用在合成資料
+
+
+# 熱門度權重：隨機打散名次後取 1 / rank^a，正規化成機率
+def _zipf_weights(n: int, a: float, rng: np.random.Generator) -> np.ndarray:
+    w = (rng.permutation(n) + 1.0) ** -a
+    return w / w.sum()
+
+
+# 依權重從 candidates 抽 size 個 (可重複)：累積分布 + searchsorted，一次抽完
+def _sample_weighted(rng: np.random.Generator, candidates: np.ndarray,
+                     weights: np.ndarray, size: int) -> np.ndarray:
+    if size == 0:
+        return np.empty(0, dtype=np.int64)
+    cdf = np.cumsum(weights)
+    idx = np.searchsorted(cdf / cdf[-1], rng.random(size), side="right")
+    return candidates[np.minimum(idx, len(candidates) - 1)]
+
+
+# size 個介於 [low, high) 秒的隨機時間差
+def _seconds(rng: np.random.Generator, size: int, low: int, high: int) -> np.ndarray:
+    return rng.integers(low, high, size).astype("timedelta64[s]")
+
+
+def generate_dataset(params: ScaleParams = ScaleParams(), reference_date: date = None) -> Dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(params.seed)
+    reference_date = reference_date or date.today()
+    ref = np.datetime64(reference_date, "s")
+    past_start = ref - np.timedelta64(90, "D")
+    teams = np.array(TEAMS, dtype=object)
+    n_teams, n_u, n_g = len(TEAMS), params.n_users, params.n_games
+    if n_u < 2:
+        raise ValueError("n_users 至少要 2 (買家與賣家不能是同一人)")
+
+    # --- 1. games：過去 90 天 ~ 未來 60 天，熱門度 Zipf ---
+    game_date = past_start + (rng.integers(0, 151, n_g) * 86400).astype("timedelta64[s]")
+    home = rng.integers(0, n_teams, n_g)
+    away = (home + rng.integers(1, n_teams, n_g)) % n_teams        # 主客隊不同隊
+    game_pop = _zipf_weights(n_g, params.game_zipf, rng)
+    past = np.flatnonzero(game_date <= ref)
+    future = np.flatnonzero(game_date > ref)
+    if past.size == 0:
+        raise ValueError("n_games 太少，沒有任何已發生的賽事")
+    games = pd.DataFrame({
+        "id": np.arange(1, n_g + 1),
+        "game_date": game_date.astype("datetime64[s]"),
+        "stadium": np.array(STADIUMS, dtype=object)[rng.integers(0, len(STADIUMS), n_g)],
+        "game_number": [f"G{i:05d}" for i in range(1, n_g + 1)],
+        "team_home": teams[home],
+        "team_away": teams[away],
+        "start_time": np.array(START_TIMES, dtype=object)[rng.integers(0, len(START_TIMES), n_g)],
+        "note": None,
+    })
+
+    # --- 2. members：喜愛球隊 1~2 隊 (依球隊人氣抽)，每人一個忠誠度 ---
+    fav1 = rng.choice(n_teams, n_u, p=_zipf_weights(n_teams, params.team_zipf, rng))
+    fav2 = (fav1 + rng.integers(1, n_teams, n_u)) % n_teams
+    has2 = rng.random(n_u) < 1 / 3                                   # 多數人 1 隊、少數 2 隊 (同 generate_snapshot)
+    loyalty = rng.beta(params.loyalty_alpha, params.loyalty_beta, n_u)
+    # favorite_teams JSON：組合只有 n_teams² 種 → 先建對照表再查表，不逐人 json.dumps
+    fav_json = np.array([json.dumps([TEAMS[a]] if a == b else [TEAMS[a], TEAMS[b]], ensure_ascii=False)
+                         for a in range(n_teams) for b in range(n_teams)], dtype=object)
+    member_created = past_start - _seconds(rng, n_u, 0, 365 * 86400)
+    ids = np.arange(1, n_u + 1)
+    members = pd.DataFrame({
+        "id": ids,
+        "name": [f"user{i}" for i in ids],
+        "email": [f"user{i}@example.com" for i in ids],
+        "password_hash": None,                                         # 寫 seed 時才填 (bcrypt 只算一次)
+        "phone": [f"09{i:08d}" for i in ids],
+        "city": np.array(CITIES, dtype=object)[rng.integers(0, len(CITIES), n_u)],
+        "favorite_teams": fav_json[fav1 * n_teams + np.where(has2, fav2, fav1)],
+        "subscribe_newsletter": (rng.random(n_u) < 0.3).astype(int),
+        "created_at": member_created,
+        "updated_at": member_created,
+    })
+
+    # --- 3. 行為事件 (過去賽事)：忠誠 → 挑含喜愛球隊的場次，否則依熱門度隨機 ---
+    counts = np.minimum(rng.zipf(params.activity_zipf, n_u) - 1, params.max_events_per_user)
+    ev_member = np.repeat(np.arange(n_u), counts)                    # 0-based 會員索引
+    n_ev = ev_member.size
+    loyal = rng.random(n_ev) < loyalty[ev_member]
+    fav_team = np.where(has2[ev_member] & (rng.random(n_ev) < 0.5), fav2[ev_member], fav1[ev_member])
+    ev_game = np.empty(n_ev, dtype=np.int64)
+    ev_game[~loyal] = _sample_weighted(rng, past, game_pop[past], int((~loyal).sum()))
+    for t in range(n_teams):                                         # 只迴圈球隊數 (6 次)，組內向量化
+        sel = loyal & (fav_team == t)
+        pool = past[(home[past] == t) | (away[past] == t)]
+        pool = pool if pool.size else past
+        ev_game[sel] = _sample_weighted(rng, pool, game_pop[pool], int(sel.sum()))
+    # 行為發生在賽前 0~30 天，且不早於 90 天窗口 (與 export_snapshot 的窗口一致)
+    ev_created = np.maximum(game_date[ev_game] + np.timedelta64(9, "h") - _seconds(rng, n_ev, 0, 30 * 86400),
+                            past_start + np.timedelta64(9, "h"))
+    is_trade = rng.random(n_ev) < params.p_trade
+
+    # --- 4. 交易 → 已售出的票 + 已出貨訂單；未來賽事另有待售票 (熱門場次票多) ---
+    t_idx = np.flatnonzero(is_trade)
+    n_t = t_idx.size
+    buyer = ev_member[t_idx] + 1
+    seller = (buyer - 1 + rng.integers(1, n_u, n_t)) % n_u + 1     # 賣家 ≠ 買家
+    ordered = ev_created[t_idx]
+
+    if future.size:
+        lam = params.open_tickets_per_game * game_pop[future] / game_pop[future].mean()
+        open_game = np.repeat(future, rng.poisson(lam))
+    else:
+        open_game = np.empty(0, dtype=np.int64)
+    n_open = open_game.size
+    n_tk = n_t + n_open
+    tickets = pd.DataFrame({
+        "id": np.arange(1, n_tk + 1),
+        "seller_id": np.concatenate([seller, rng.integers(1, n_u + 1, n_open)]),
+        "game_id": np.concatenate([ev_game[t_idx], open_game]) + 1,
+        "price": rng.integers(6, 50, n_tk) * 50,                     # 300 ~ 2450 元
+        "seat_number": [f"{r}排{s}號" for r, s in zip(rng.integers(1, 40, n_tk), rng.integers(1, 30, n_tk))],
+        "seat_area": np.array(SEAT_AREAS, dtype=object)[rng.integers(0, 2, n_tk)],
+        "image_urls": "[]",
+        "note": "",
+        "is_sold": np.concatenate([np.ones(n_t, dtype=int), np.zeros(n_open, dtype=int)]),
+        "is_removed": 0,
+        "created_at": np.concatenate([ordered - _seconds(rng, n_t, 3600, 3 * 86400),
+                                      ref - _seconds(rng, n_open, 0, 14 * 86400)]),
+    })
+    orders = pd.DataFrame({
+        "id": np.arange(1, n_t + 1),
+        "ticket_id": np.arange(1, n_t + 1),                          # 前 n_t 張票就是這些交易的票
+        "buyer_id": buyer,
+        "seller_id": seller,
+        "status": "媒合成功",
+        "payment_status": "已付款",
+        "shipment_status": "已出貨",
+        "match_requested_at": ordered,
+        "matched_at": ordered + np.timedelta64(1, "h"),
+        "paid_at": ordered + np.timedelta64(2, "h"),
+        "shipped_at": ordered + np.timedelta64(1, "D"),
+        "closed_at": np.full(n_t, np.datetime64("NaT"), dtype="datetime64[s]"),
+        "created_at": ordered,
+    })
+
+    # --- 5. 預約：行為事件中的預約 + 一小批「未來賽事」的預約 (上架時才媒合得到) ---
+    r_idx = np.flatnonzero(~is_trade)
+    n_fr = int(n_u * params.future_reservation_rate) if future.size else 0
+    res_member = np.concatenate([ev_member[r_idx] + 1, rng.integers(1, n_u + 1, n_fr)])
+    res_game = np.concatenate([ev_game[r_idx],
+                               _sample_weighted(rng, future, game_pop[future], n_fr)]) + 1
+    n_r = res_member.size
+    reservations = pd.DataFrame({
+        "id": np.arange(1, n_r + 1),
+        "member_id": res_member,
+        "game_id": res_game,
+        "price_ranges": np.array(PRICE_RANGES, dtype=object)[rng.integers(0, len(PRICE_RANGES), n_r)],
+        "seat_area": np.array(RESERVATION_AREAS, dtype=object)[rng.integers(0, len(RESERVATION_AREAS), n_r)],
+        "created_at": np.concatenate([ev_created[r_idx], ref - _seconds(rng, n_fr, 0, 14 * 86400)]),
+    })
+
+    return {"members": members, "games": games, "tickets_for_sale": tickets,
+            "orders": orders, "reservations": reservations}
+
+
+# DB 形狀的資料集 → 快照 (規則同 export_snapshot：90 天內已出貨交易 + 90 天內預約；合成資料不需去識別化)
+def dataset_to_snapshot(ds: Dict[str, pd.DataFrame], reference_date: date,
+                        output_dir: Path, meta: Dict) -> int:
+    past_start = pd.Timestamp(reference_date - timedelta(days=90))
+    games = ds["games"]
+    home, away = games["team_home"].to_numpy(), games["team_away"].to_numpy()
+
+    orders = ds["orders"]
+    orders = orders[(orders["shipment_status"] == "已出貨") & (orders["created_at"] >= past_start)]
+    # id 連號 (1..n) → 直接用陣列索引 join，不必 merge
+    trade_game = ds["tickets_for_sale"]["game_id"].to_numpy()[orders["ticket_id"].to_numpy() - 1]
+    res = ds["reservations"]
+    res = res[res["created_at"] >= past_start]
+
+    game_id = np.concatenate([trade_game, res["game_id"].to_numpy()])
+    events = pd.DataFrame({
+        "member_id": np.concatenate([orders["buyer_id"].to_numpy(), res["member_id"].to_numpy()]),
+        "event_type": ["trade"] * len(orders) + ["reservation"] * len(res),
+        "game_id": game_id,
+        "team_home": home[game_id - 1],
+        "team_away": away[game_id - 1],
+        "created_at": np.concatenate([orders["created_at"].to_numpy(), res["created_at"].to_numpy()]),
+    })
+    snap_games = games.rename(columns={"id": "game_id"})[
+        ["game_id", "game_date", "start_time", "team_home", "team_away", "stadium"]].copy()
+    snap_games["game_date"] = snap_games["game_date"].dt.date
+    favorites = ds["members"].rename(columns={"id": "member_id"})[["member_id", "favorite_teams"]]
+
+    write_snapshot(output_dir, events, snap_games, favorites, {**meta, "n_events": len(events)})
+    return len(events)
+
+
+# ==================== MySQL seed dump ====================
+# 匯入順序 = 外鍵相依順序；匯入：mysql -h <host> -u <user> -p <db> < seed.sql
+SEED_TABLES = ["members", "games", "tickets_for_sale", "orders", "reservations"]
+DATE_COLS = {"game_date"}          # DATE 欄位 (其餘 datetime 欄位是 DATETIME)
+SEED_CHUNK_ROWS = 100_000          # 每次只把這麼多列轉成 SQL 字串 → 記憶體固定
+SEED_BATCH_ROWS = 1_000            # 每個 INSERT 帶幾列 (multi-row INSERT 比逐列快很多)
+
+
+# 一整欄轉成 SQL literal (向量化)：NULL / 數字 / 'YYYY-MM-DD HH:MM:SS' / 跳脫過的字串
+def _sql_literals(col: pd.Series) -> List[str]:
+    if pd.api.types.is_datetime64_any_dtype(col):
+        fmt = "%Y-%m-%d" if col.name in DATE_COLS else "%Y-%m-%d %H:%M:%S"
+        out = "'" + col.dt.strftime(fmt) + "'"
+    elif pd.api.types.is_numeric_dtype(col):
+        out = col.astype(str)
+    else:
+        text = col.astype(str).str.replace("\\", "\\\\", regex=False).str.replace("'", "\\'", regex=False)
+        out = "'" + text + "'"
+    return out.where(col.notna(), "NULL").tolist()
+
+
+def write_mysql_seed(ds: Dict[str, pd.DataFrame], path: Path) -> None:
+    import bcrypt   # 只有產生 seed 才需要 (requirements.txt 已有)；離線分析環境可以不裝
+
+    members = ds["members"].copy()
+    members["password_hash"] = bcrypt.hashpw(SEED_PASSWORD.encode(), _SEED_PASSWORD_SALT).decode()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("-- Pitch-A-Seat 合成資料 (recsys_offline/synthetic_data.py --scale 產生)\n"
+                f"-- 所有會員的密碼：{SEED_PASSWORD}\n"
+                "SET NAMES utf8mb4;\nSET FOREIGN_KEY_CHECKS = 0;\nSET UNIQUE_CHECKS = 0;\nSET autocommit = 0;\n")
+        for table in SEED_TABLES:
+            df = members if table == "members" else ds[table]
+            header = f"INSERT INTO {table} ({', '.join(df.columns)}) VALUES\n"
+            for start in range(0, len(df), SEED_CHUNK_ROWS):
+                chunk = df.iloc[start:start + SEED_CHUNK_ROWS]
+                rows = ["(" + ",".join(vals) + ")"
+                        for vals in zip(*(_sql_literals(chunk[c]) for c in chunk.columns))]
+                for i in range(0, len(rows), SEED_BATCH_ROWS):
+                    f.write(header + ",\n".join(rows[i:i + SEED_BATCH_ROWS]) + ";\n")
+            f.write("COMMIT;\n")
+        f.write("SET FOREIGN_KEY_CHECKS = 1;\nSET UNIQUE_CHECKS = 1;\n")
+
+
+# =======================================
+def generate_scaled(params: ScaleParams = ScaleParams(), reference_date: date = None,
+                    output_dir: Path = OUTPUT_DIR, mysql_seed: Optional[Path] = None) -> Dict[str, pd.DataFrame]:
+    reference_date = reference_date or date.today()
+    ds = generate_dataset(params, reference_date)
+
+    meta = {"source": "synthetic_scaled", **asdict(params),
+            "reference_date": reference_date.isoformat(),
+            "generated_at": datetime.now().isoformat(timespec="seconds")}
+    n_events = dataset_to_snapshot(ds, reference_date, output_dir, meta)
+    sizes = "、".join(f"{t} {len(ds[t]):,}" for t in SEED_TABLES)
+    print(f"✅ 合成快照 (scaled)：{sizes}、事件 {n_events:,}、ref={reference_date} → {output_dir}")
+
+    if mysql_seed:
+        write_mysql_seed(ds, mysql_seed)
+        print(f"✅ MySQL seed → {mysql_seed}")
+    return ds
 # =======================================
 
 
 if __name__ == "__main__":
-    generate_snapshot()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="合成資料產生器")
+    parser.add_argument("--scale", action="store_true", help="改用可調規模的向量化產生器 (預設：小快照)")
+    parser.add_argument("--users", type=int, default=ScaleParams.n_users)
+    parser.add_argument("--games", type=int, default=ScaleParams.n_games)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR, help="快照輸出目錄")
+    parser.add_argument("--mysql-seed", type=Path, default=None, help="同時輸出 MySQL seed (.sql)")
+    args = parser.parse_args()
+
+    if args.scale:
+        generate_scaled(ScaleParams(n_users=args.users, n_games=args.games, seed=args.seed),
+                        output_dir=args.out, mysql_seed=args.mysql_seed)
+    else:
+        generate_snapshot()
@@ -1,9 +1,12 @@
 """
 auth.py
-Member authentication APIs (register / login / auth check)
+Member authentication APIs (register / login / auth check / token refresh / logout)
 - POST /api/user/register
 - POST /api/user/login
 - GET /api/user/auth
+- POST /api/user/refresh
+- POST /api/user/logout
+- POST /api/user/logout_all
 """
 
 
@@ -15,8 +18,13 @@ import json
 
 from config.settings import ACCESS_TOKEN_EXPIRE_MINUTES
 
-from utils.auth_utils import (hash_password, verify_password, create_access_token,get_current_user)
-from models.auth_model import (get_user_by_email, get_user_by_name, create_member, get_member_row_by_id)
+from utils.auth_utils import (hash_password_async, verify_password_async, create_access_token,get_current_user)
+from utils.refresh_tokens import (issue_refresh_token, refresh_token_owner, rotate_refresh_token, revoke_refresh_token,
+                                  revoke_all_refresh_tokens)
+from mysql.connector.errors import IntegrityError
+
+from models.auth_model import (get_user_by_email, create_member, duplicate_member_field)
+from utils.profile_cache import get_member_profile
 
 
 # ================================================
@@ -58,9 +66,18 @@ class UserLoginIn(BaseModel):
 
 # JWT Token 回應資料模型
 # 登入或註冊成功後，回傳給前端的 JWT access token，讓前端存入 localStorage 用於後續 API 驗證
+# access token 是短效的 (expires_in 秒)；過期 (401) 時前端用 refresh_token 呼叫 /api/user/refresh 換一組新的
+# refresh_token 為 None：Redis 暫時無法使用，access token 過期後需重新登入
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: int = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
+# 換發 / 登出請求資料模型
+class RefreshIn(BaseModel):
+    refresh_token: str
 
 
 # 使用者資料回應模型
@@ -83,6 +100,25 @@ class UserProfileOut(BaseModel):
 
 
 
+# ================================================
+# 登入 / 註冊 / 換發共用：產生短效 access token + refresh token
+# refresh token 存 Redis；Redis 有問題時仍讓使用者登入 (只是沒有 refresh token)，不因此擋住登入
+def _issue_tokens(user_id: int, email: str, name: str) -> Dict[str, Any]:
+    access_token = create_access_token(
+        data={"id": user_id, "email": email, "name": name},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    try:
+        refresh_token = issue_refresh_token(user_id)
+    except Exception as e:
+        print(f"建立 refresh token 失敗 (Redis)：{e}")
+        refresh_token = None
+    return {"access_token": access_token, "refresh_token": refresh_token}
+# ================================================
+
+
+
+
 # API routes
 # ================================================
 # 會員註冊 API
@@ -92,18 +128,11 @@ async def user_register(data: UserRegisterIn):
     if data.password != data.confirm_password:
         raise HTTPException(status_code=400, detail="密碼與確認密碼不一致")
     try:
-        # 檢查 email 是否已存在（呼叫 get_user_by_email）
-        existing_useremail = get_user_by_email(data.email)
-        if existing_useremail:
-            raise HTTPException(status_code=400, detail="此電子郵件已被註冊")
-        
-        # 檢查 name 是否已存在（呼叫 get_user_by_name）
-        existing_username = get_user_by_name(data.name)
-        if existing_username:
-            raise HTTPException(status_code=400, detail="此姓名已被使用，請換一個")
-        
-        # 雜湊加密密碼（呼叫 hash_password）
-        hashed_password = hash_password(data.password)
+        # email / name 是否已存在不另外查詢：直接 INSERT，撞到唯一索引時在下面的 except IntegrityError 回 400
+        # (少兩次查詢，也不會有兩個請求同時通過檢查、寫入重複會員的競態)
+
+        # 雜湊加密密碼（bcrypt 在專用執行緒池跑, 不卡住其他請求）
+        hashed_password = await hash_password_async(data.password)
         
         # 新增會員到資料庫
         # 先將 Python 物件 轉成 JSON 字串
@@ -120,17 +149,21 @@ async def user_register(data: UserRegisterIn):
         )
 
     except HTTPException:
-        raise    
+        raise
+    except IntegrityError as e:
+        field = duplicate_member_field(e)
+        if field == "email":
+            raise HTTPException(status_code=400, detail="此電子郵件已被註冊")
+        if field == "name":
+            raise HTTPException(status_code=400, detail="此姓名已被使用，請換一個")
+        print(f"註冊時資料庫錯誤：{e}")
+        raise HTTPException(status_code=500, detail="註冊失敗，請稍後再試")
     except Exception as e:
         print(f"註冊時資料庫錯誤：{e}")
         raise HTTPException(status_code=500, detail="註冊失敗，請稍後再試")
     
-    # 生成 JWT token（呼叫 create_access_token）
-    access_token = create_access_token(
-        data={"id": user_id, "email": data.email, "name": data.name},
-        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    )    
-    return {"access_token": access_token}
+    # 生成 JWT token + refresh token
+    return _issue_tokens(user_id, data.email, data.name)
 # ================================================
 
 
@@ -151,7 +184,7 @@ async def user_login(data: UserLoginIn):
         
         # 2.比對密碼
         stored_hash = user["password_hash"]
-        if not verify_password(data.password, stored_hash):
+        if not await verify_password_async(data.password, stored_hash):   # bcrypt 在專用執行緒池跑, 不卡住其他請求
             raise HTTPException(status_code=400, detail="帳號或密碼錯誤")
         
         # 3.抓必要欄位以便之後生成 token
@@ -164,14 +197,9 @@ async def user_login(data: UserLoginIn):
         print(f"登入時資料庫錯誤：{e}")
         raise HTTPException(status_code=500, detail="系統錯誤，請稍後再試")
     
-    # 4. 生成 JWT token
-    access_token = create_access_token(
-        data={"id": user_id, "email": data.email, "name": name},
-        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    )
-    
+    # 4. 生成 JWT token (短效) + refresh token
     # 5. 通過身份驗證後, 將生成的 JWT token 回傳給前端, 讓前端使用者登入後帶著這個 token 在身上 (存在 local storage), 之後若要請求需要身份驗證的API, 就用這個 token 來驗證
-    return {"access_token": access_token}
+    return _issue_tokens(user_id, data.email, name)
 # ================================================
 
 
@@ -183,17 +211,12 @@ async def user_login(data: UserLoginIn):
 @router.get("/auth", response_model=Optional[UserProfileOut])
 async def check_auth(user: Dict[str, Any] = Depends(get_current_user)):
     # 1. 參數使用 get_current_user 函數依賴注入, 取得目前使用者的資訊 (user_id, name, email) 
-    # 2. 根據 user_id 查詢完整使用者的會員資料 
+    # 2. 根據 user_id 取得完整使用者的會員資料 (每個頁面載入都會呼叫 → 先查 Redis 會員資料快取, 與 GET /api/user/profile 共用)
     # 3. 回傳使用者的會員資料或 None
-    
-    user_id = user["user_id"]    
+
+    user_id = user["user_id"]
     try:
-        row = get_member_row_by_id(user_id)
-        if not row:
-            return None
-        row["favorite_teams"] = json.loads(row["favorite_teams"]) if row["favorite_teams"] else []
-        # 如果資料庫中存的 JSON 字串格式錯誤，會直接拋出 JSONDecodeError, 建議加上錯誤處理 except json.JSONDecodeError: row["favorite_teams"] = []
-        return row
+        return get_member_profile(user_id)
     except Exception as e:
         print("檢查登入狀態時錯誤：", e)
         raise HTTPException(status_code=500, detail="伺服器錯誤")
@@ -207,3 +230,55 @@ async def check_auth(user: Dict[str, Any] = Depends(get_current_user)):
 
 
 
+
+# ================================================
+# 換發 access token API
+# access token 過期 (401) 時, 前端用 refresh token 換一組新的 access token + refresh token (輪替: 舊的 refresh token 立即失效)
+# 已經用過的 refresh token 又被拿來換發 → 視為外洩, 撤銷這個會員所有裝置的 refresh token
+# refresh token 只記會員 id：email / name 每次換發時重新讀取 (會員資料快取), 改過個人資料後新的 access token 就是新的值
+# 先讀會員資料、成功後才輪替：讀取失敗 (500) 時舊的 refresh token 沒被用掉，前端重試不會被當成重複使用而撤銷所有裝置
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_token_api(data: RefreshIn):
+    user_id = refresh_token_owner(data.refresh_token)
+    if user_id is None:
+        rotate_refresh_token(data.refresh_token)        # token 不存在 / 已用過 → 401 (並做重複使用偵測)
+    try:
+        user = get_member_profile(user_id)
+    except Exception as e:
+        print("換發 token 時讀取會員資料錯誤：", e)
+        raise HTTPException(status_code=500, detail="伺服器錯誤")
+    if not user:
+        raise HTTPException(status_code=401, detail="登入已過期，請重新登入")
+    _, new_refresh_token = rotate_refresh_token(data.refresh_token)     # 同時有另一個請求先輪替 → 401
+    access_token = create_access_token(
+        data={"id": user["id"], "email": user["email"], "name": user["name"]},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "refresh_token": new_refresh_token}
+# ================================================
+
+
+
+
+# ================================================
+# 登出 API: 刪除這個裝置的 refresh token (access token 在短效期限到期後自然失效)
+@router.post("/logout")
+async def logout_api(data: RefreshIn):
+    try:
+        revoke_refresh_token(data.refresh_token)
+    except Exception as e:
+        print(f"登出時 Redis 錯誤：{e}")
+        raise HTTPException(status_code=503, detail="系統忙碌，請稍後再試")
+    return {"ok": True}
+
+
+# 登出所有裝置 API: 刪除這個會員的所有 refresh token (eg. 手機遺失、懷疑帳號被盜用)
+@router.post("/logout_all")
+async def logout_all_api(user: Dict[str, Any] = Depends(get_current_user)):
+    try:
+        revoked = revoke_all_refresh_tokens(user["user_id"])
+    except Exception as e:
+        print(f"登出所有裝置時 Redis 錯誤：{e}")
+        raise HTTPException(status_code=503, detail="系統忙碌，請稍後再試")
+    return {"ok": True, "revoked": revoked}
+# ================================================
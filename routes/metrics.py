@@ -0,0 +1,60 @@
+"""
+metrics.py
+Monitoring endpoint
+- GET /metrics             - Prometheus text-format metrics (per-route latency, DB / pool-wait / Redis time)
+- GET /debug/query_stats   - Top-N SQL fingerprints by total time / count / max time (current + previous window)
+"""
+
+
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from config.settings import DEBUG, METRICS_TOKEN
+from utils.metrics import render_metrics
+from utils.query_stats import top_queries
+
+
+
+# ================================================
+# 不加 /api 前綴 (Prometheus 預設抓 /metrics)，也不列入 /docs
+router = APIRouter(include_in_schema=False)
+# ================================================
+
+
+
+
+# 權限檢查 (兩支 API 共用)
+# 有設定 METRICS_TOKEN 時必須帶 Bearer token (用 compare_digest 比對, 避免 timing attack)
+# 正式環境沒設 METRICS_TOKEN 時不開放 (404)：路由、連線池、SQL 結構都不該公開；本機開發 (DEBUG) 才免驗證
+def require_metrics_token(authorization: str = Header(None)) -> None:
+    if not METRICS_TOKEN:
+        if not DEBUG:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return
+    expected = f"Bearer {METRICS_TOKEN}"
+    if not authorization or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+# ================================================
+
+
+
+
+# API routes
+# ================================================
+# 回傳所有指標 (Prometheus text exposition format 0.0.4)
+@router.get("/metrics", dependencies=[Depends(require_metrics_token)])
+def metrics_api():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+# ================================================
+
+
+
+
+# ================================================
+# SQL 指紋統計：目前視窗 + 上一個視窗的 top-N (指紋已去掉參數值，不含個資)
+@router.get("/debug/query_stats", dependencies=[Depends(require_metrics_token)])
+def query_stats_api(top: int = Query(10, ge=1, le=100)):
+    return top_queries(top)
+# ================================================
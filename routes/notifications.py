@@ -1,15 +1,38 @@
 """
 notifications.py
 User notification APIs
-- GET  /api/notifications             - Retrieve current user's notifications 
-- POST /api/mark_notifications_read   - mark all unread notifications as read
+- GET  /api/notifications               - Retrieve current user's notifications, one page at a time (cursor)
+- GET  /api/notifications/unread_count  - Number of unread notifications (Redis counter)
+- POST /api/notifications/stream_ticket - Trade the access token for a single-use stream ticket (30s)
+- GET  /api/notifications/stream        - Server-Sent Events: new notifications pushed as they happen (?ticket=)
+- POST /api/mark_notifications_read     - mark all unread notifications as read
+
+Pagination:
+- ?limit=20 (max 100); the response body is still a plain list (newest first)
+- If there are older notifications, the response carries an X-Next-Cursor header; pass it back as ?cursor=
+
+Push (SSE):
+- EventSource cannot send an Authorization header; the page first POSTs stream_ticket (with the header),
+  then opens the stream with ?ticket=. The JWT never appears in a URL, so it never lands in access logs
+- Events: "unread" {"unread"} once on connect, then "notification" {"message", "url", "unread"} per new notification
+- The stream ends at the access token's exp (not a fixed time after connecting); the browser refreshes
+  the token, gets a new ticket and reconnects
 """
 
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime
+import asyncio
+import base64
+import json
+import time
 
-from utils.auth_utils import get_current_user
+from config.settings import ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.auth_utils import get_current_user, token_expires_at
+from utils.notification_counter import get_unread_count, reset_unread
+from utils.notification_stream import issue_stream_ticket, notification_hub, redeem_stream_ticket
 from models.notification_model import (
     get_notifications, mark_all_notifications_read
 )
@@ -24,14 +47,43 @@ router = APIRouter(prefix="/api", tags=["notifications"])
 
 
 
+# ================================================
+# 分頁 cursor：上一頁最後一筆的 (created_at, id)，編成 base64 字串給前端 (前端不需要看懂，原樣帶回即可)
+def encode_cursor(created_at: datetime, notification_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{notification_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor 格式錯誤")
+# ================================================
+
+
+
+
 # API routes
 # ================================================
-# 取得通知列表 API
+# 取得通知列表 API (一次一頁，由新到舊)
 @router.get("/notifications")
-async def get_notifications_api(user: Dict[str, Any] = Depends(get_current_user)):
+async def get_notifications_api(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user: Dict[str, Any] = Depends(get_current_user)
+):
+    before = decode_cursor(cursor) if cursor else None
     try:
         member_id = user["user_id"] 
-        notifications = get_notifications(member_id)
+        notifications = get_notifications(member_id, limit + 1, before)   # 多拿一筆：拿得到就表示還有下一頁
+
+        if len(notifications) > limit:
+            notifications = notifications[:limit]
+            last = notifications[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["id"])
 
         return notifications
     except Exception as e:
@@ -44,6 +96,90 @@ async def get_notifications_api(user: Dict[str, Any] = Depends(get_current_user)
 
 
 
+# ================================================
+# 取得未讀通知筆數 API (導覽列的鈴鐺數字)
+# 讀 Redis 計數器 (每次新增通知時 +1、全部標記已讀時清除 → 下次讀取從主庫重算)，不用每次都 COUNT 整個會員的通知
+@router.get("/notifications/unread_count")
+async def get_unread_count_api(user: Dict[str, Any] = Depends(get_current_user)):
+    try:
+        return {"unread": get_unread_count(user["user_id"])}
+    except Exception as e:
+        print("查詢未讀通知數錯誤:", e)
+        raise HTTPException(status_code=500, detail="查詢通知失敗")
+# ================================================
+
+
+
+
+
+# ================================================
+# 通知推播 API (Server-Sent Events)
+# 前端用 EventSource 連上後保持連線；有新通知時 Redis pub/sub → 這個 worker 的 notification_hub → 這條連線，毫秒級送達
+# 取代「重新整理頁面 / 點鈴鐺才重新拉整個列表」：連線期間不查資料庫 (只在連上時讀一次未讀數)
+HEARTBEAT_SECONDS = 15                               # 沒有通知時定期送註解行，避免 proxy / 負載平衡器把閒置連線切斷
+STREAM_MAX_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60  # 連線最長存活時間的上限；實際在換票時 access token 的 exp 結束 (之後前端換新 token 重連，等於重新驗證)
+RETRY_MS = 5000                                      # 告訴瀏覽器斷線後幾毫秒重連
+
+
+def sse_event(event: str, data: Any) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+# 換票：用 Authorization header 的 access token 換一張一次性票券 (EventSource 不能帶 header，JWT 也不該放進 URL / access log)
+# 票券記下 access token 的 exp，推播連線在那個時間點結束
+@router.post("/notifications/stream_ticket")
+async def issue_stream_ticket_api(
+    authorization: str = Header(None),
+    user: Dict[str, Any] = Depends(get_current_user)
+):
+    expires_at = token_expires_at(authorization.replace("Bearer ", "").strip())
+    try:
+        return {"ticket": issue_stream_ticket(user["user_id"], expires_at)}
+    except Exception as e:
+        print("推播票券發放錯誤:", e)
+        raise HTTPException(status_code=503, detail="推播暫時無法使用")
+
+
+@router.get("/notifications/stream")
+async def notification_stream_api(request: Request, ticket: str = Query(...)):
+    try:
+        grant = redeem_stream_ticket(ticket)
+    except Exception as e:
+        print("推播票券驗證錯誤:", e)
+        raise HTTPException(status_code=503, detail="推播暫時無法使用")
+    if grant is None:                   # 不存在 / 過期 / 已用過
+        raise HTTPException(status_code=401, detail="無效的推播票券")
+    member_id, expires_at = grant
+    try:
+        unread = get_unread_count(member_id)
+    except Exception as e:
+        print("查詢未讀通知數錯誤:", e)
+        unread = None
+
+    async def events():
+        lifetime = STREAM_MAX_SECONDS if expires_at is None else min(expires_at - time.time(), STREAM_MAX_SECONDS)
+        deadline = time.monotonic() + lifetime
+        yield f"retry: {RETRY_MS}\n\n"
+        if unread is not None:
+            yield sse_event("unread", {"unread": unread})
+        async with notification_hub.listen(member_id) as queue:
+            while time.monotonic() < deadline and not await request.is_disconnected():
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield sse_event("notification", data)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",      # nginx 不要緩衝 (否則事件會卡在 proxy 直到緩衝區滿)
+    })
+# ================================================
+
+
+
 
 # ================================================
 # 標記所有未讀通知為已讀的 API
@@ -55,6 +191,7 @@ async def mark_all_notifications_read_api(
     try:
         member_id = user["user_id"]
         result = mark_all_notifications_read(member_id)
+        reset_unread(member_id)          # 清除未讀通知計數器 (不是設成 0：標記已讀之後才新增的通知也要算到)
         return result        
     except Exception as e:
         print("標記通知已讀失敗：", e)
@@ -15,20 +15,21 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 import httpx
-import json
-from datetime import date, datetime, timezone
+from datetime import datetime, timezone
 
-from config.settings import TAPPAY_PARTNER_KEY, TAPPAY_MERCHANT_ID, TAPPAY_ENV
+from config.settings import TAPPAY_PARTNER_KEY, TAPPAY_MERCHANT_ID, TAPPAY_API_URL
 from config.database import get_connection
 
 from utils.time_utils import utc_now 
 from utils.redis_utils import get_redis_client
 from utils.auth_utils import get_current_user
-from utils.email_utils import send_email_async
+from utils.notification_stream import push_notifications
+from services.order_rows import format_order_rows
 
 from redis.exceptions import ConnectionError, RedisError
 
 from models.user_model import get_member_email
+from models.outbox_model import enqueue_emails
 
 
 from models.order_model import (
@@ -89,40 +90,8 @@ async def get_buyer_orders_api(user: Dict[str, Any] = Depends(get_current_user))
     try:
         buyer_id = user["user_id"]
         rows = get_buyer_orders(buyer_id)
-        for row in rows:
-            row["start_time"] = str(row["start_time"])[:5]
-            
-            # 必須先計算 weekday()，再執行 strftime() 來格式化 game_date. 因為 strftime() 會把 date 物件變成字串，字串沒有 .weekday() 方法。
-            if isinstance(row["game_date"], date):
-                row["weekday"] = ["一", "二", "三", "四", "五", "六", "日"][row["game_date"].weekday()]
-                row["game_date"] = row["game_date"].strftime("%Y-%m-%d")
-            else:
-                row["weekday"] = "--"  # 若 game_date 不是 date 物件，給予預設值
-            
-            row["stadium_url"] = {
-                "大巨蛋": "https://maps.app.goo.gl/m53dt8TAUQkWXBvD9",
-                "樂天桃園": "https://maps.app.goo.gl/otKHfBHksTKJk8uV8",
-                "台南": "https://maps.app.goo.gl/Y4SgmRbEBCehqaH89",
-                "天母": "https://maps.app.goo.gl/WGsmw7y38Apdkcsm7",
-                "新莊": "https://maps.app.goo.gl/evnUECyJsLx3rkaE8",
-                "澄清湖": "https://maps.app.goo.gl/T4wG6E4ED5jKnxaz6",
-                "洲際": "https://maps.app.goo.gl/U6ZfbxwGp1t9APvN7",
-                "嘉義市": "https://maps.app.goo.gl/rv8mNF2bnW5xuFcZ8",                
-                "花蓮": "https://maps.app.goo.gl/UCvKfG29V7uEUc4G6",                                          
-                "斗六": "https://maps.app.goo.gl/VmwmTQKSVQ5SBPVFA",
-                "台東": "https://maps.app.goo.gl/9yAJEH2JvA5utWfx5",
-            }.get(row["stadium"], "#")
-
-            # 將 Decimal 轉成 float（ 因為 Decimal 無法 JSON 序列化 ）
-            # 雖然 FastAPI 內部會使用jsonable_encoder自動把 Decimal 轉成 float, 但這樣寫可以讓程式碼意圖更明確、不依賴 FastAPI隱性行為, 將來若換框架或直接用json.dumps()，就不會出錯
-            row["seller_rating"] = float(row["seller_rating"]) if row["seller_rating"] is not None else None
-            
-            # 將 JSON 字串轉成 list（資料庫存的是 JSON 字串）( 讓前端不用額外用JSON.parse()處理 JSON字串 )
-            row["image_urls"] = json.loads(row["image_urls"]) if row["image_urls"] else []
-
-            # 將 None 轉成空字串（ 讓前端不用額外處理 null ）
-            row["note"] = row["note"] if row["note"] else ""
-
+        # 每一列的格式整理 (時間、星期、球場網址、評分、圖片、備註) 在 services/order_rows.py
+        format_order_rows(rows, rating_key="seller_rating")
         return rows
     except Exception as e:
         logger.error(f"查詢買家訂單失敗：{e}")
@@ -142,49 +111,8 @@ async def get_seller_orders_api(user: Dict[str, Any] = Depends(get_current_user)
     try:
         seller_id = user["user_id"]
         rows = get_seller_orders(seller_id)
-        for row in rows:
-            # 將row["start_time"]這個資料庫回傳的 timedelta 物件(eg.timedelta(seconds=66600))轉成字串(eg."18:30:00"), 再取前 5 個字元 (eg."18:30")
-            row["start_time"] = str(row["start_time"])[:5] 
-            # 先計算 weekday，然後再格式化 game_date: 必須先計算 weekday()，再執行 strftime()。因為 strftime() 會把 date 物件變成字串，字串沒有 .weekday() 方法。
-            # 檢查 game_date 是否為 Python 的 date 物件。正常情況下資料庫回傳的一定是 date 物件，但加上檢查是防禦性程式設計。
-            if isinstance(row["game_date"], date):
-                # 先計算星期幾: eg. row["weekday"] = "二"
-                # 將row["game_date"]這個 date 物件 (eg. date(2026, 2, 12)) 用.weekday()回傳 0-6 的數字(週一=0，週日=6)
-                # 用前面 0-6 的數字當索引值, 對應取得["一", "二", "三", "四", "五", "六", "日"]
-                row["weekday"] = ["一", "二", "三", "四", "五", "六", "日"][row["game_date"].weekday()]
-                # 然後格式化 game_date
-                # row["game_date"]這個 date 物件 (eg.date(2026, 2, 12)), 用.strftime("%Y-%m-%d") 格式化成字串 (eg."2026-02-12")
-                row["game_date"] = row["game_date"].strftime("%Y-%m-%d")
-            else:
-                # 若 game_date 不是 date 物件（異常情況），給一個預設值 "--"，避免前端顯示錯誤。
-                row["weekday"] = "--"  
-            
-            # 建立一個球場名稱對應 URL 的字典, 然後用 .get(row["stadium"], "#")來用球場名稱查詢 URL，找不到就回傳 "#"
-            # eg. .get("大巨蛋", "#") → 回傳 "https://maps.app.goo.gl/m53dt8TAUQkWXBvD9"
-            # eg. .get("木柵", "#") → 字典裡沒有 "木柵"，回傳 "#"
-            row["stadium_url"] = {
-                "大巨蛋": "https://maps.app.goo.gl/m53dt8TAUQkWXBvD9",
-                "樂天桃園": "https://maps.app.goo.gl/otKHfBHksTKJk8uV8",
-                "台南": "https://maps.app.goo.gl/Y4SgmRbEBCehqaH89",
-                "天母": "https://maps.app.goo.gl/WGsmw7y38Apdkcsm7",
-                "新莊": "https://maps.app.goo.gl/evnUECyJsLx3rkaE8",
-                "澄清湖": "https://maps.app.goo.gl/T4wG6E4ED5jKnxaz6",
-                "洲際": "https://maps.app.goo.gl/U6ZfbxwGp1t9APvN7",
-                "嘉義市": "https://maps.app.goo.gl/rv8mNF2bnW5xuFcZ8",                
-                "花蓮": "https://maps.app.goo.gl/UCvKfG29V7uEUc4G6",                                          
-                "斗六": "https://maps.app.goo.gl/VmwmTQKSVQ5SBPVFA",
-                "台東": "https://maps.app.goo.gl/9yAJEH2JvA5utWfx5",      
-            }.get(row["stadium"], "#")
-            
-            # 將 Decimal 轉成 float（ 因為 Decimal 無法 JSON 序列化 ）
-            # 雖然 FastAPI 內部會使用jsonable_encoder自動把 Decimal 轉成 float, 但這樣寫可以讓程式碼意圖更明確、不依賴 FastAPI隱性行為, 將來若換框架或直接用json.dumps()，就不會出錯 
-            row["rating"] = float(row["rating"]) if row["rating"] is not None else None
-
-            # 將 JSON 字串轉成 list（資料庫存的是 JSON 字串）( 讓前端不用額外用JSON.parse()處理 JSON字串 )
-            row["image_urls"] = json.loads(row["image_urls"]) if row["image_urls"] else []
-
-            # 將 None 轉成空字串（ 讓前端不用額外處理 null ）
-            row["note"] = row["note"] if row["note"] else ""
+        # 每一列的格式整理 (時間、星期、球場網址、評分、圖片、備註) 在 services/order_rows.py
+        format_order_rows(rows, rating_key="rating")
         return rows
 
     except HTTPException:
@@ -277,11 +205,7 @@ async def tappay_pay_api(
     # except: 
     # 若 try 呼叫第三方 API 失敗 (eg. DNS問題、網路中斷、TapPay本身掛掉), (1) 將 付款資料 的 tappay_status 欄位設為 設為 FAILED (2) 將 付款資料 的 tappay_status_message 欄位更新為「"TapPay API 呼叫失敗"」(自定義的錯誤訊息) (3) 後端紀錄錯誤訊息(供排查) (4) 回給前端 500 及 detail:「呼叫 TapPay 金流失敗」
     # 目的: 看 log 就知道是第三方 API 掛掉造成的問題
-    tappay_api_url = (
-        "https://sandbox.tappaysdk.com/tpc/payment/pay-by-prime"
-        if TAPPAY_ENV == "sandbox"
-        else "https://prod.tappaysdk.com/tpc/payment/pay-by-prime"
-    )
+    tappay_api_url = TAPPAY_API_URL      # sandbox / prod 由 TAPPAY_ENV 決定 (見 config/settings.py)
 
     headers = {
         "Content-Type": "application/json",
@@ -393,14 +317,12 @@ async def tappay_pay_api(
 # 作法: 若要在 Router 層建立一個 Transaction, 並在這個 Transaction內執行多個 Model 層的 DB Query 函數, 就必須:
 # 先在 Router 層借用一條資料庫連線、共用同一個 cursor, 然後在 Transaction 內每次呼叫不同的 DB Query 函數時, 把同一個 cursor 作為參數傳入該特定 Query 函數, 這樣就能維持「每個資料庫函數操作時都是用同一條連線」, 這樣才能在同一個 Transaction 內操作不同資料庫函數. 否則, 若在每個不同的 DB Query 函數內各自借用連線, 那每個函數執行時就都是用不同的連線, 這樣就已經離開 Transaction. 可能在不同連線切換之間時, 就發生 race condition (eg. 有其他使用者發起新的 transaction 來操作資料)
 
-# 流程: (1) 原子更新訂單狀態 (防止 race condition) (UPDATE orders) (2) 查詢訂單資料, 用於後續通知 (SELECT orders) (3) 通知買家 (INSERT INTO notifications) 同時查詢並暫存email通知資訊 (4) Commit (5) Commit 後再發送SQS (6) Commit 後再無效化快取
+# 流程: (1) 原子更新訂單狀態 (防止 race condition) (UPDATE orders) (2) 查詢訂單資料, 用於後續通知 (SELECT orders) (3) 通知買家 (INSERT INTO notifications) 同時把寄信意圖寫進 notification_outbox (4) Commit (5) Commit 後再推播站內通知 (6) Commit 後再無效化快取
 
 # 流程說明：
-# - conn.commit() 執行完畢後，才呼叫 send_email_async
-# - send_email_async 是同步函數，執行完畢後才會返回
-# - send_email_async 內部設計為「永不 raise」，無論成功或失敗都正常結束
-# - send_email_async 返回後，進行無效化快取動作 (不 raise)，最後一定會執行到 return {"status": "success"}，本 API 回傳 success {"status": "success"} 給前端，API 結束
-# - 真正的「非同步」是 Lambda 從 SQS 取出任務並寄信，與本 API 無關
+# - 寄信意圖跟出貨狀態在同一個 transaction 寫入：出貨 commit 成功 ⇔ 買家一定會收到出貨通知信
+# - 本 API 不做任何寄信 I/O：背景的 outbox dispatcher (utils/outbox_dispatcher.py) 取出後呼叫 send_email_async 寄出
+# - 推播與無效化快取都不 raise，最後一定會執行到 return {"status": "success"}，本 API 回傳 success {"status": "success"} 給前端，API 結束
 
 @router.post("/mark_shipped")
 async def mark_shipped_api(
@@ -409,8 +331,6 @@ async def mark_shipped_api(
 ):    
     try:
         seller_id = user["user_id"]
-        
-        notification_data = None  # 在 with conn 外面先初始化 notification_data (「先初始化」是防禦性設計)
 
         with get_connection() as conn:
             with conn.cursor(dictionary=True) as cursor:            
@@ -451,25 +371,19 @@ async def mark_shipped_api(
                 notify_shipped(cursor, member_id, msg, url)
 
 
-                # 4. 查詢買家 Email （在 commit 前查，因為需要 cursor）
+                # 4. 查詢買家 Email （在 commit 前查，因為需要 cursor），寄信意圖寫進 outbox (同一個 transaction，commit 後由背景寄出)
                 buyer_email = get_member_email(cursor, order["buyer_id"])
-                # 暫存通知資料，commit 後再寄信
-                notification_data = {
+                enqueue_emails(cursor, [{
                     "to": buyer_email,
                     "subject": "Pitch-A-Seat 訂單出貨通知",
                     "body": f"訂單 #{order_id} 已出貨，請留意物流資訊\n詳情請至：我的購買頁"
-                }
+                }])
             
             # 5. Transaction Commit: Router 層決定何時 commit: 前述動作都做完，才一起 commit。
             conn.commit()   
         
-        # 6. Commit 成功後，才寄信 (發送任務到 SQS Queue 裡) 
-        if notification_data:
-            send_email_async(
-                to=notification_data["to"],
-                subject=notification_data["subject"],
-                body=notification_data["body"]
-            )
+        # 6. Commit 成功後，才推播站內通知給買家 (含未讀計數器)；Email 已在 outbox 裡
+        push_notifications([{"member_id": member_id, "message": msg, "url": url}])
         
 
         # 7. Commit成功後，才無效化快取 (要確保出貨狀態確實已更新為「已出貨」後 (才有清除快取的必要), 再清除快取)
@@ -492,7 +406,7 @@ async def mark_shipped_api(
 
 
         return {"status":"success"}  # 前述所有出貨動作做完，回傳結果告知前端，「出貨確認」動作已成功完成 (出貨 API 執行狀態為 success) 
-        # 只要 Transaction Commit 成功就一定會走到這行 return. 無論寄信和刪除快取是成功或失敗, 都不會 raise, 都會走到這行 return 
+        # 只要 Transaction Commit 成功就一定會走到這行 return. 無論推播和刪除快取是成功或失敗, 都不會 raise, 都會走到這行 return (寄信在背景, 與本 API 無關) 
         # return {"status":"success"} 這行程式碼位於 try 區塊內，所以只要前面的程式碼沒有 raise exception，就會執行到這行 return 
 
     except HTTPException:
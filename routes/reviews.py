@@ -11,6 +11,7 @@ from pydantic import BaseModel, Field
 
 from utils.auth_utils import get_current_user
 from models.review_model import create_rating
+from utils.profile_cache import invalidate_member_profile
 
 
 
@@ -57,7 +58,10 @@ async def submit_rating_api(
     try:
         # 2.新增評分到資料庫
         result = create_rating(rater_id, rating.ratee_id, rating.score, rating.order_id, rating.comment)
-        
+
+        # 賣家的平均評分變了 → 清除賣家的會員資料快取 (create_rating 已驗證 ratee_id 就是這筆訂單的賣家)
+        invalidate_member_profile(rating.ratee_id)
+
         # 3.回傳: 評分狀態為 success
         return result
     
@@ -9,11 +9,17 @@ Member profile management APIs
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Dict, Any, Union
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+from mysql.connector.errors import IntegrityError
 
-from utils.auth_utils import get_current_user, hash_password
-from models.user_model import (get_user_profile, ensure_email_unique_for_update, ensure_name_unique_for_update,update_member_profile)
+from config.settings import ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.auth_utils import create_access_token, get_current_user, hash_password_async
+
+from models.user_model import update_member_profile
+from models.auth_model import duplicate_member_field
+from utils.profile_cache import get_member_profile, refresh_member_profile
+from utils.refresh_tokens import issue_refresh_token, revoke_all_refresh_tokens
 
 
 
@@ -43,6 +49,13 @@ class UserProfileOut(BaseModel):
     avg_rating: Union[float, None] = None  # 明確允許 None
 
 
+# PUT /api/user/profile 的回應：改了密碼或 email 時，所有 refresh token 都已撤銷 (包含這個裝置)，
+# 所以順便發一組新的 access / refresh token 給這個裝置，前端用 saveAuthTokens 存起來，不會在 access token 到期後被登出
+class UserProfileUpdateOut(UserProfileOut):
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+
+
 
 # 會員個人資料更新請求模型 (用於 PUT /api/user/profile 的請求. 所有欄位皆為 Optional, 僅更新有傳入的欄位)
 class UserProfileUpdateIn(BaseModel):
@@ -66,20 +79,11 @@ async def get_profile(user: Dict[str, Any] = Depends(get_current_user)):
     # 1. 參數使用 get_current_user 函數依賴注入, 取得目前使用者的資訊 (user_id, name, email) 
     user_id = user["user_id"]
     try:
-        # 2. 根據 user_id 查詢會員的個人資料 
-        user_data = get_user_profile(user_id)
+        # 2. 根據 user_id 取得會員的個人資料 (先查 Redis 快取；favorite_teams / avg_rating 在寫入快取時就已轉好格式)
+        user_data = get_member_profile(user_id)
         if not user_data:
             raise HTTPException(status_code=404, detail="使用者不存在")
-        
-        try:
-            user_data["favorite_teams"] = json.loads(user_data["favorite_teams"]) if user_data["favorite_teams"] else []
-        except json.JSONDecodeError as e:
-            print(f"favorite_teams JSON 解析錯誤 (user_id={user_id}): {e}")  
-            user_data["favorite_teams"] = []
-        
-
-        user_data["avg_rating"] = float(user_data["avg_rating"]) if user_data["avg_rating"] is not None else None
-        
+
         # 3.回傳使用者的會員資料或 None
         return user_data
     
@@ -92,7 +96,7 @@ async def get_profile(user: Dict[str, Any] = Depends(get_current_user)):
 
 # 呼叫 GET /api/profile API 的地方:
 # (1) 前端個人資料頁: 載入渲染時呼叫一次。個人資料更新完成後會再呼叫一次。
-# (2) PUT /api/profile API: 更新個人資料 API 的 回傳值是呼叫 get_user(user)
+# (2) GET /api/user/auth: 每個頁面載入時呼叫，與這支 API 共用同一份會員資料快取 (utils/profile_cache.py)
 # ================================================
 
 
@@ -100,7 +104,7 @@ async def get_profile(user: Dict[str, Any] = Depends(get_current_user)):
 
 # ================================================
 # 更新會員個人資料 API 
-@router.put("/profile", response_model=UserProfileOut)
+@router.put("/profile", response_model=UserProfileUpdateOut)
 async def update_profile(
     data: UserProfileUpdateIn,
     user: Dict[str, Any] = Depends(get_current_user)
@@ -110,15 +114,8 @@ async def update_profile(
     update_vals = []
     
     try:
-        # 檢查會員想更新的 email 是否已被其他帳號使用
-        if data.email is not None and data.email != user["email"]:
-            ensure_email_unique_for_update(data.email, user_id)
-
-        # 檢查會員想更新的 name 是否已被其他帳號使用
-        if data.name is not None and data.name != user["name"]:
-            ensure_name_unique_for_update(data.name, user_id)
-
         # 建立要更新的會員資料內容
+        # email / name 是否已被其他帳號使用不另外查詢：UPDATE 撞到唯一索引時在下面的 except IntegrityError 回 409
         if data.name is not None:
             update_fields.append("name = %s")
             update_vals.append(data.name)
@@ -126,7 +123,7 @@ async def update_profile(
             update_fields.append("email = %s")
             update_vals.append(data.email)
         if data.password is not None:
-            pwd_hash = hash_password(data.password)
+            pwd_hash = await hash_password_async(data.password)   # bcrypt 在專用執行緒池跑, 不卡住其他請求
             update_fields.append("password_hash = %s")
             update_vals.append(pwd_hash)
         if data.phone is not None:
@@ -148,12 +145,45 @@ async def update_profile(
         update_vals_with_id = update_vals + [user_id]
         update_member_profile(set_clause, update_vals_with_id)
 
-        # 更新後回傳更新後的最新個人資料
-        return await get_profile(user)
+        # 更新後從主庫讀回最新個人資料、覆寫快取 (write-through)，並回傳給前端
+        profile = refresh_member_profile(user_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="使用者不存在")
+
+        # 改了密碼或 email：所有裝置 (可能包含盜用者) 的 refresh token 全部作廢, access token 到期後要重新登入
+        # 撤銷失敗不能當作成功回傳 (舊的 refresh token 還能用)：回 503, 使用者重送同一個修改時會再撤銷一次
+        if data.password is not None or data.email is not None:
+            try:
+                revoke_all_refresh_tokens(user_id)
+            except Exception as e:
+                print(f"撤銷 refresh token 時 Redis 錯誤 (user_id={user_id})：{e}")
+                raise HTTPException(status_code=503, detail="資料已更新，但登出其他裝置失敗，請稍後再試一次")
+            # 這個裝置的 refresh token 也被撤銷了 → 發一組新的給它 (新的 access token 也帶新的 email)
+            # 新 refresh token 建立失敗 (Redis) 時同登入：仍回傳 access token，到期後需重新登入
+            profile = dict(profile)
+            profile["access_token"] = create_access_token(
+                data={"id": user_id, "email": profile["email"], "name": profile["name"]},
+                expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+            )
+            try:
+                profile["refresh_token"] = issue_refresh_token(user_id)
+            except Exception as e:
+                print(f"建立 refresh token 失敗 (Redis)：{e}")
+        return profile
 
     except HTTPException:
         raise
-    
+
+    # HTTP 409 Conflict: 用戶端錯誤回應狀態碼, 表示「請求與目標資源的當前狀態存在衝突」
+    except IntegrityError as e:
+        field = duplicate_member_field(e)
+        if field == "email":
+            raise HTTPException(status_code=409, detail="此電子郵件已被其他帳號使用")
+        if field == "name":
+            raise HTTPException(status_code=409, detail="此姓名已被其他帳號使用")
+        print(f"更新個人資料時錯誤：{e}")
+        raise HTTPException(status_code=500, detail="更新失敗，請稍後再試")
+
     except Exception as e:
         print(f"更新個人資料時錯誤：{e}")
         raise HTTPException(status_code=500, detail="更新失敗，請稍後再試")
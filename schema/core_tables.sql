@@ -0,0 +1,138 @@
+-- 核心資料表 DDL：members / games / tickets_for_sale / orders / payments / reservations / notifications / notification_outbox / ratings
+-- 欄位依 models/ 的 SQL 與 recsys_offline/synthetic_data.py 的 seed 整理；正式 DB 早已建好，這支主要給「空的 MySQL」用
+-- (壓測環境 docker-compose.loadtest.yml 會自動執行，順序：本檔 → recommendation_events.sql → seed)
+-- 手動執行：mysql -h <host> -u <user> -p <db> < schema/core_tables.sql
+
+CREATE TABLE IF NOT EXISTS members (
+    id                   INT AUTO_INCREMENT PRIMARY KEY,
+    name                 VARCHAR(50)  NOT NULL,
+    email                VARCHAR(255) NOT NULL,
+    password_hash        VARCHAR(255) NOT NULL,
+    phone                VARCHAR(20)  NULL,
+    city                 VARCHAR(20)  NULL,
+    favorite_teams       JSON         NULL,                          -- eg. ["中信兄弟","樂天桃猿"]
+    subscribe_newsletter TINYINT(1)   NOT NULL DEFAULT 0,
+    created_at           DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at           DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_members_email (email),                            -- 註冊 / 更新靠唯一索引擋重複 (models/auth_model.py)
+    UNIQUE KEY uq_members_name (name)
+);
+
+CREATE TABLE IF NOT EXISTS games (
+    id          INT AUTO_INCREMENT PRIMARY KEY,
+    game_date   DATE        NOT NULL,
+    stadium     VARCHAR(20) NOT NULL,
+    game_number VARCHAR(20) NULL,
+    team_home   VARCHAR(20) NOT NULL,
+    team_away   VARCHAR(20) NOT NULL,
+    start_time  TIME        NOT NULL,
+    note        VARCHAR(255) NULL,
+    INDEX idx_game_date (game_date)
+);
+
+CREATE TABLE IF NOT EXISTS tickets_for_sale (
+    id          INT AUTO_INCREMENT PRIMARY KEY,
+    seller_id   INT          NOT NULL,
+    game_id     INT          NOT NULL,
+    price       INT          NOT NULL,
+    seat_number VARCHAR(50)  NOT NULL,
+    seat_area   VARCHAR(20)  NOT NULL,
+    image_urls  JSON         NULL,                                   -- S3 / CloudFront 網址陣列
+    note        VARCHAR(255) NULL,
+    is_sold     TINYINT(1)   NOT NULL DEFAULT 0,
+    is_removed  TINYINT(1)   NOT NULL DEFAULT 0,
+    created_at  DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_game_open (game_id, is_sold, is_removed),
+    INDEX idx_seller (seller_id),
+    FOREIGN KEY (seller_id) REFERENCES members(id),
+    FOREIGN KEY (game_id) REFERENCES games(id)
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id                 INT AUTO_INCREMENT PRIMARY KEY,
+    ticket_id          INT         NOT NULL,
+    buyer_id           INT         NOT NULL,
+    seller_id          INT         NOT NULL,
+    status             VARCHAR(10) NOT NULL DEFAULT '媒合中',          -- 媒合中 / 媒合成功 / 媒合失敗
+    payment_status     VARCHAR(10) NOT NULL DEFAULT '未付款',          -- 未付款 / 已付款
+    shipment_status    VARCHAR(10) NOT NULL DEFAULT '未出貨',          -- 未出貨 / 已出貨
+    match_requested_at DATETIME    NULL,
+    matched_at         DATETIME    NULL,
+    paid_at            DATETIME    NULL,
+    shipped_at         DATETIME    NULL,
+    closed_at          DATETIME    NULL,
+    created_at         DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_buyer (buyer_id),
+    INDEX idx_seller (seller_id),
+    INDEX idx_ticket (ticket_id),
+    FOREIGN KEY (ticket_id) REFERENCES tickets_for_sale(id),
+    FOREIGN KEY (buyer_id) REFERENCES members(id),
+    FOREIGN KEY (seller_id) REFERENCES members(id)
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id                         INT AUTO_INCREMENT PRIMARY KEY,
+    order_id                   INT          NOT NULL,
+    amount                     INT          NOT NULL,
+    tappay_status              VARCHAR(10)  NOT NULL DEFAULT 'UNPAID', -- UNPAID / PAID / FAILED
+    tappay_transaction_id      VARCHAR(64)  NULL,                      -- rec_trade_id
+    tappay_bank_transaction_id VARCHAR(64)  NULL,
+    tappay_status_code         INT          NULL,
+    tappay_status_message      VARCHAR(255) NULL,
+    payed_at                   DATETIME     NULL,
+    created_at                 DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_order (order_id),
+    FOREIGN KEY (order_id) REFERENCES orders(id)
+);
+
+CREATE TABLE IF NOT EXISTS reservations (
+    id           INT AUTO_INCREMENT PRIMARY KEY,
+    member_id    INT         NOT NULL,
+    game_id      INT         NOT NULL,
+    price_ranges JSON        NULL,
+    seat_area    VARCHAR(20) NULL,
+    created_at   DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_member (member_id),
+    INDEX idx_game (game_id),
+    FOREIGN KEY (member_id) REFERENCES members(id),
+    FOREIGN KEY (game_id) REFERENCES games(id)
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id         INT AUTO_INCREMENT PRIMARY KEY,
+    member_id  INT          NOT NULL,
+    message    VARCHAR(255) NOT NULL,
+    url        VARCHAR(255) NULL,
+    is_read    TINYINT(1)   NOT NULL DEFAULT 0,
+    created_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_member_time (member_id, created_at),
+    FOREIGN KEY (member_id) REFERENCES members(id)
+);
+
+-- 通知 outbox (寄信意圖)，說明見 notification_outbox.sql
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id           BIGINT AUTO_INCREMENT PRIMARY KEY,
+    kind         VARCHAR(20)  NOT NULL DEFAULT 'email',
+    payload      JSON         NOT NULL,
+    status       VARCHAR(10)  NOT NULL DEFAULT 'pending',    -- pending / sent / failed
+    attempts     INT          NOT NULL DEFAULT 0,
+    available_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at   DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at      DATETIME     NULL,
+    last_error   VARCHAR(255) NULL,
+    INDEX idx_status_available (status, available_at, id)
+);
+
+CREATE TABLE IF NOT EXISTS ratings (
+    id         INT AUTO_INCREMENT PRIMARY KEY,
+    rater_id   INT          NOT NULL,
+    ratee_id   INT          NOT NULL,
+    score      TINYINT      NOT NULL,
+    comment    VARCHAR(255) NULL,
+    order_id   INT          NOT NULL,
+    ticket_id  INT          NOT NULL,
+    created_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_ratee (ratee_id),
+    INDEX idx_order_rater (order_id, rater_id),
+    FOREIGN KEY (order_id) REFERENCES orders(id)
+);
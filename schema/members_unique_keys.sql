@@ -0,0 +1,13 @@
+-- members 的 email / name 唯一索引：註冊與更新個人資料改成「直接 INSERT / UPDATE，撞到唯一索引 (1062) 再回錯誤訊息」
+-- 取代原本「先 SELECT 檢查是否重複 → 再寫入」：少兩次查詢，也沒有兩個請求同時通過檢查、寫進重複資料的競態
+-- 部署時在正式 DB 執行一次：mysql -h <host> -u <user> -p <db> < schema/members_unique_keys.sql
+-- (core_tables.sql 新建的表已經有這兩個索引，不用再跑)
+-- 執行前先確認沒有重複資料 (有的話 ALTER 會失敗，需先人工處理)：
+--   SELECT email, COUNT(*) FROM members GROUP BY email HAVING COUNT(*) > 1;
+--   SELECT name,  COUNT(*) FROM members GROUP BY name  HAVING COUNT(*) > 1;
+-- 鍵名 uq_members_email / uq_members_name 要和 models/auth_model.py 的 DUPLICATE_KEY_FIELDS 一致
+
+ALTER TABLE members
+    ADD UNIQUE KEY uq_members_email (email),    -- 登入用 email 查詢也走這個索引
+    ADD UNIQUE KEY uq_members_name (name),
+    DROP INDEX idx_email;                       -- 被 uq_members_email 取代
@@ -0,0 +1,18 @@
+-- 通知 outbox：寄信意圖與 notifications 在同一個 transaction 寫入，commit 後由 utils/outbox_dispatcher.py 在背景批次送出
+-- 取件走 idx_status_available：WHERE status = 'pending' AND available_at <= NOW() ORDER BY available_at, id ... FOR UPDATE SKIP LOCKED
+-- (多個 uvicorn worker 同時取件時各拿各的，不會互相等鎖；需要 MySQL 8.0+)
+-- 部署時在正式 DB 執行一次：mysql -h <host> -u <user> -p <db> < schema/notification_outbox.sql
+-- (core_tables.sql 新建的環境已經有這張表)
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id           BIGINT AUTO_INCREMENT PRIMARY KEY,
+    kind         VARCHAR(20)  NOT NULL DEFAULT 'email',      -- 目前只有 email
+    payload      JSON         NOT NULL,                      -- eg. {"to": "...", "subject": "...", "body": "..."}
+    status       VARCHAR(10)  NOT NULL DEFAULT 'pending',    -- pending / sent / failed (寄 MAX_ATTEMPTS 次仍失敗，見 utils/outbox_dispatcher.py)
+    attempts     INT          NOT NULL DEFAULT 0,
+    available_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,   -- 下次可以取件的時間 (取件時往後推 = 租約；失敗時往後推 = 退避)
+    created_at   DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at      DATETIME     NULL,
+    last_error   VARCHAR(255) NULL,
+    INDEX idx_status_available (status, available_at, id)
+);
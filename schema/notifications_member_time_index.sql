@@ -0,0 +1,6 @@
+-- GET /api/notifications 的 keyset 分頁索引：WHERE member_id = ? AND (created_at, id) < 上一頁最後一筆 ORDER BY created_at DESC, id DESC
+-- InnoDB 次要索引本身就帶 PK (id) → (member_id, created_at) 等同 (member_id, created_at, id)，剛好對應分頁的排序，每頁只讀 limit 筆
+-- 部署時在正式 DB 執行一次：mysql -h <host> -u <user> -p <db> < schema/notifications_member_time_index.sql
+-- (core_tables.sql 新建的表已經有這個索引；可先用 SHOW INDEX FROM notifications 確認)
+
+CREATE INDEX idx_member_time ON notifications (member_id, created_at);
@@ -1,17 +1,48 @@
 -- 推薦事件表：記錄曝光(impression)與點擊(click)，供 CTR / A-B 分析
 -- 部署時在正式 DB 執行一次：mysql -h <host> -u <user> -p <db> < schema/recommendation_events.sql
+--
+-- 以 created_at 做「月分區」(RANGE partitioning)：
+--   * 每次 INSERT 只維護「當月分區」的索引 → 寫入成本與索引大小不會隨賽季累積而變大
+--   * 過期月份由 recsys_offline/archive_events.py 匯出成 Parquet 後 DROP PARTITION (秒級，不像 DELETE 會鎖表、產生大量 undo)
+--   * 未來月份由同一支 job 從 p_future 切出 (REORGANIZE PARTITION)，p_future 只是保險用的兜底分區
+-- MySQL 限制：分區鍵必須包含在每一個 UNIQUE KEY (含 PK) 裡 → PK 改為 (id, created_at)；id 仍是 AUTO_INCREMENT 且唯一
 
 CREATE TABLE IF NOT EXISTS recommendation_events (
-    id            BIGINT AUTO_INCREMENT PRIMARY KEY,
+    id            BIGINT AUTO_INCREMENT,
     request_id    CHAR(36) NOT NULL,                          -- 一次推薦的唯一 id (UUID)，綁定曝光與點擊
     member_id     INT NOT NULL,
     game_id       INT NOT NULL,
     rank_pos      TINYINT NOT NULL,                           -- 在推薦清單的名次 1~5 (rank 是 MySQL 保留字，所以用 rank_pos)
-    variant       VARCHAR(32) NOT NULL DEFAULT 'personalized',-- A/B 臂別 
+    variant       VARCHAR(32) NOT NULL DEFAULT 'personalized',-- A/B 臂別
     event_type    ENUM('impression','click') NOT NULL,
     recommendation_score FLOAT NULL,                          -- 曝光當下的分數 (分析用，可為 NULL)
     created_at    DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
     INDEX idx_request (request_id),
     INDEX idx_member_time (member_id, created_at),
     INDEX idx_type_variant (event_type, variant)
+)
+PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+    PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+    PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+    PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+    PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+    PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+    PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+    PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+    PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+    PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+    PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
 );
+
+-- 既有(未分區)的表升級：先換 PK，再套分區 (ALTER 會重建整張表，請在離峰執行)
+-- ALTER TABLE recommendation_events DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at);
+-- ALTER TABLE recommendation_events PARTITION BY RANGE (TO_DAYS(created_at)) (
+--     PARTITION p_old    VALUES LESS THAN (TO_DAYS('2026-01-01')),
+--     PARTITION p202601  VALUES LESS THAN (TO_DAYS('2026-02-01')),
+--     ...                                                         -- 同上，逐月列出
+--     PARTITION p_future VALUES LESS THAN MAXVALUE
+-- );
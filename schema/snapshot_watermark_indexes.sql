@@ -0,0 +1,6 @@
+-- export_snapshot --delta 用的索引：依水位 (watermark) 只讀「上次匯出之後」的資料，不必掃整張表
+-- 部署時在正式 DB 執行一次：mysql -h <host> -u <user> -p <db> < schema/snapshot_watermark_indexes.sql
+-- InnoDB 的次要索引本身就帶 PK (id) → (shipped_at) 等同 (shipped_at, id)，剛好對應 keyset 的排序
+
+CREATE INDEX idx_orders_shipped_at ON orders (shipped_at);      -- 交易事件：(shipped_at, id) > 上次水位
+CREATE INDEX idx_members_updated_at ON members (updated_at);    -- 改過喜愛球隊的舊會員：updated_at > 上次水位
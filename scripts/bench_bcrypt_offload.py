@@ -0,0 +1,105 @@
+# bench_bcrypt_offload.py
+# 效能量測：登入尖峰 (預設每秒 50 次登入) 期間，首頁類 API 的延遲。
+# 對照組：async 路由裡直接呼叫 verify_password (bcrypt 卡住 event loop)；實驗組：verify_password_async (專用執行緒池)。
+# 跑法：專案根目錄 PYTHONPATH=. python3 scripts/bench_bcrypt_offload.py [--rate 50] [--seconds 5] [--rounds 12]
+# (需要 .env 或環境變數通過 config/settings.py 的啟動檢查；不連 DB / Redis)
+# 請求直接用 httpx 的 ASGITransport 打進 app，和 uvicorn 一樣所有請求共用同一個 event loop。
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-0123456789abcdef")
+
+import bcrypt
+import httpx
+from fastapi import FastAPI
+
+from config.settings import BCRYPT_MAX_CONCURRENCY
+from utils.auth_utils import verify_password, verify_password_async
+
+PASSWORD = "pitchaseat123"
+PROBE_INTERVAL = 0.01           # 每 10ms 打一次首頁
+
+
+def make_app(stored_hash: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/home")
+    async def home():
+        return {"total_trades": 12345}          # 首頁統計 (快取命中時幾乎不花 CPU)
+
+    @app.post("/api/login/inline")
+    async def login_inline():
+        return {"ok": verify_password(PASSWORD, stored_hash)}
+
+    @app.post("/api/login/offload")
+    async def login_offload():
+        return {"ok": await verify_password_async(PASSWORD, stored_hash)}
+
+    return app
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def run(mode: str, app: FastAPI, rate: float, seconds: float):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        home_latency, login_latency = [], []
+        stop = time.perf_counter() + seconds
+
+        async def login():
+            start = time.perf_counter()
+            await client.post(f"/api/login/{mode}")
+            login_latency.append(time.perf_counter() - start)
+
+        async def burst():
+            tasks = []
+            interval = 1 / rate if rate else None
+            next_at = time.perf_counter()
+            while interval and time.perf_counter() < stop:
+                tasks.append(asyncio.create_task(login()))
+                next_at += interval
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            await asyncio.gather(*tasks)
+
+        # 延遲從「預定送出的時間」算起：event loop 被卡住時，探測請求晚送出的時間也算進去 (避免 coordinated omission)
+        async def probe():
+            scheduled = time.perf_counter()
+            while scheduled < stop:
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/api/home")
+                home_latency.append(time.perf_counter() - scheduled)
+                scheduled += PROBE_INTERVAL
+
+        await asyncio.gather(burst(), probe())
+        return home_latency, login_latency
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=50, help="每秒登入次數")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost (正式環境預設 12)")
+    args = parser.parse_args()
+
+    stored_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=args.rounds)).decode()
+    app = make_app(stored_hash)
+
+    print(f"bcrypt rounds={args.rounds}  登入 {args.rate:g}/s × {args.seconds:g}s  BCRYPT_MAX_CONCURRENCY={BCRYPT_MAX_CONCURRENCY}")
+    print(f"{'情境':<22}{'home p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'logins':>8}{'login p50':>11}")
+    for label, mode, rate in (("無登入 (基準)", "offload", 0),
+                              ("登入尖峰 / inline", "inline", args.rate),
+                              ("登入尖峰 / offload", "offload", args.rate)):
+        home, logins = asyncio.run(run(mode, app, rate, args.seconds))
+        login_p50 = f"{statistics.median(logins) * 1000:.0f}" if logins else "-"
+        print(f"{label:<22}{pct(home, .5):>9.1f}ms{pct(home, .95):>8.1f}ms{pct(home, .99):>8.1f}ms"
+              f"{max(home) * 1000:>8.1f}ms{len(logins):>8}{login_p50:>9}ms")
+
+
+if __name__ == "__main__":
+    main()
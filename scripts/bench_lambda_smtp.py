@@ -0,0 +1,104 @@
+# bench_lambda_smtp.py
+# 效能量測：Lambda 寄信 (lambda_functions/email_sender.py) 每次執行每秒能寄幾封。
+# 對照組：每封信各自 連線 → EHLO → 寄信 → QUIT (舊寫法)；實驗組：lambda_handler (整批共用一個 SMTPSession)。
+# 跑法：專案根目錄 PYTHONPATH=. python3 scripts/bench_lambda_smtp.py [--records 10] [--invocations 20] [--rtt-ms 5] [--handshake-ms 0]
+# (需要 aiosmtpd，見 requirements-perf.txt；在本機起一個 SMTP 替身，不會真的寄信)
+# 本機 loopback 幾乎沒有延遲，--rtt-ms 讓替身在每個 SMTP 指令 (EHLO / MAIL / RCPT / DATA) 回應前等一下，模擬到 SMTP 伺服器的網路來回；
+# 替身沒有 TLS / AUTH，正式環境每次連線還多 STARTTLS 交握 + LOGIN；--handshake-ms 在 EHLO 額外等待，模擬這段每條連線一次的成本。
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from aiosmtpd.controller import Controller
+
+HOST, PORT = "127.0.0.1", 8025
+
+os.environ.update({"SMTP_HOST": HOST, "SMTP_PORT": str(PORT), "SMTP_STARTTLS": "false",
+                   "SMTP_USER": "bench@pitchaseat.local"})
+os.environ.pop("SMTP_PASS", None)
+
+from lambda_functions import email_sender   # noqa: E402  (要先設好環境變數再 import)
+
+
+class CountingHandler:
+    def __init__(self, rtt: float, handshake: float):
+        self.rtt = rtt
+        self.handshake = handshake
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.rtt + self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        await asyncio.sleep(self.rtt)
+        envelope.mail_from = address
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        await asyncio.sleep(self.rtt)
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.rtt)
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def make_event(n: int) -> dict:
+    return {"Records": [
+        {"messageId": f"m{i}", "body": json.dumps({"type": "email", "payload": {
+            "to": f"user{i}@example.com", "subject": "Pitch-A-Seat 預約通知", "body": f"第 {i} 封"}}, ensure_ascii=False)}
+        for i in range(n)
+    ]}
+
+
+# 舊寫法：每封信一條新連線
+def per_message_handler(event, context):
+    for record in event["Records"]:
+        payload = json.loads(record["body"])["payload"]
+        with email_sender.SMTPSession() as session:
+            session.send(payload["to"], payload["subject"], payload["body"])
+    return {"batchItemFailures": []}
+
+
+def run(handler, event: dict, invocations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(invocations):
+        result = handler(event, None)
+        assert not result["batchItemFailures"], result
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=10, help="每次執行的 SQS 訊息數 (Lambda batch size)")
+    parser.add_argument("--invocations", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=5, help="模擬每個 SMTP 指令的網路來回 (ms)")
+    parser.add_argument("--handshake-ms", type=float, default=0, help="模擬每條連線的 STARTTLS + LOGIN (ms)")
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.rtt_ms / 1000, args.handshake_ms / 1000)
+    controller = Controller(handler, hostname=HOST, port=PORT)
+    controller.start()
+    email_sender.print = lambda *a, **k: None       # 關掉 lambda_handler 逐筆的 log，只量寄信本身
+    try:
+        event = make_event(args.records)
+        total = args.records * args.invocations
+        print(f"records/執行={args.records}  執行次數={args.invocations}  rtt={args.rtt_ms:g}ms  handshake={args.handshake_ms:g}ms")
+        print(f"{'情境':<20}{'emails/s':>10}{'每次執行':>12}{'收到':>8}")
+        for label, fn in (("每封信一條連線", per_message_handler), ("共用 SMTPSession", email_sender.lambda_handler)):
+            before = handler.received
+            seconds = run(fn, event, args.invocations)
+            print(f"{label:<20}{total / seconds:>10.1f}{seconds / args.invocations * 1000:>10.1f}ms"
+                  f"{handler.received - before:>8}")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
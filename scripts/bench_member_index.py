@@ -0,0 +1,79 @@
+# bench_member_index.py
+# 效能量測：每人事件「逐人過濾」(舊寫法) vs build_member_index (groupby 一次)。
+# 跑法：專案根目錄 PYTHONPATH=. python3 scripts/bench_member_index.py [--users 100000 --events 5000000]
+# 舊寫法要跑完 10 萬人會跑好幾個小時，所以只抽 --sample 人實測，再線性外推到全體。
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from recsys_offline.member_index import EMPTY, build_member_index
+from recsys_offline.synthetic_data import TEAMS
+
+
+# 向量化產生假事件 (格式與快照的 behavior_events 相同)，不走 synthetic_data 的逐筆迴圈
+def make_events(n_users: int, n_events: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    home = rng.integers(0, len(TEAMS), n_events)
+    away = (home + rng.integers(1, len(TEAMS), n_events)) % len(TEAMS)   # 主客隊不同
+    teams = np.array(TEAMS, dtype=object)
+    start = np.datetime64("2026-01-01T00:00:00")
+    return pd.DataFrame({
+        "member_id": rng.integers(1, n_users + 1, n_events),
+        "event_type": np.where(rng.random(n_events) < 0.3, "trade", "reservation"),
+        "game_id": rng.integers(1, 3001, n_events),
+        "team_home": teams[home],
+        "team_away": teams[away],
+        "created_at": start + rng.integers(0, 180 * 86400, n_events).astype("timedelta64[s]"),
+    })
+
+
+# 舊寫法：每人掃一次整張表 (與 ab_test 的 own() 改版前相同)
+def naive_own(ev: pd.DataFrame, uid: int):
+    e = ev[ev["member_id"] == uid]
+    tr = e[e["event_type"] == "trade"][["team_home", "team_away", "created_at"]].to_dict("records")
+    rs = e[e["event_type"] == "reservation"][["team_home", "team_away", "created_at"]].to_dict("records")
+    return tr, rs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=5_000_000)
+    parser.add_argument("--sample", type=int, default=20, help="舊寫法實測的人數 (再外推)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    ev = make_events(args.users, args.events)
+    print(f"產生事件 {len(ev):,} 筆 / 會員 {args.users:,} 人：{time.perf_counter() - t0:.1f}s")
+
+    # --- 舊寫法：抽樣實測 → 外推 ---
+    sample = list(range(1, args.sample + 1))
+    t0 = time.perf_counter()
+    for uid in sample:
+        naive_own(ev, uid)
+    per_user = (time.perf_counter() - t0) / len(sample)
+    print(f"逐人過濾：每人 {per_user * 1000:.1f} ms → 全體外推 {per_user * args.users / 60:.1f} 分鐘")
+
+    # --- 新寫法：建索引一次 + 每人查表 ---
+    t0 = time.perf_counter()
+    index = build_member_index(ev)
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for uid in range(1, args.users + 1):
+        me = index.get(uid, EMPTY)
+        me.trades, me.reservations
+    lookup = time.perf_counter() - t0
+    print(f"member index：建立 {build:.1f}s + 全體查表 {lookup * 1000:.0f} ms (共 {len(index):,} 位有行為的會員)")
+    print(f"加速比 ≈ {per_user * args.users / (build + lookup):.0f}x")
+
+    # 正確性：抽樣比對兩種寫法的輸出完全一致
+    for uid in sample:
+        me = index.get(uid, EMPTY)
+        assert naive_own(ev, uid) == (me.trades, me.reservations), uid
+    print("✅ 抽樣會員的 trades / reservations 與逐人過濾完全一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# bench_snapshot_load.py
+# 效能量測：快照「舊格式 (全字串) + 舊 loader」 vs 「categorical / typed 格式 + 新 loader」的載入時間與記憶體。
+# 跑法：專案根目錄 PYTHONPATH=. python3 scripts/bench_snapshot_load.py [--users 370000]
+# 合成快照平均每人約 3 筆事件 → 預設 37 萬人 ≈ 100 萬筆事件。每種量測都在獨立子行程跑，峰值 RSS 才不互相干擾。
+import argparse
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from recsys_offline.snapshot_loader import load_snapshot
+from recsys_offline.synthetic_data import generate_snapshot
+
+
+# 改版前的 loader (對照組)：字串欄位原樣讀入、逐列解析 favorites
+def legacy_load(snapshot_dir: Path):
+    events = pd.read_parquet(snapshot_dir / "behavior_events.parquet")
+    games = pd.read_parquet(snapshot_dir / "games.parquet")
+    fav_df = pd.read_parquet(snapshot_dir / "member_favorites.parquet")
+    events["created_at"] = pd.to_datetime(events["created_at"])
+    games["game_date"] = pd.to_datetime(games["game_date"]).dt.date
+    favorites = {int(r.member_id): json.loads(r.favorite_teams) for r in fav_df.itertuples()}
+    return events, favorites
+
+
+# 把新格式快照轉回改版前的「全字串」格式，當作對照組的輸入
+def write_legacy_copy(src: Path, dst: Path) -> None:
+    dst.mkdir(parents=True, exist_ok=True)
+    events = pd.read_parquet(src / "behavior_events.parquet")
+    for col in ("event_type", "team_home", "team_away"):
+        events[col] = events[col].astype(str).astype(object)
+    events["member_id"] = events["member_id"].astype("int64")
+    events["game_id"] = events["game_id"].astype("int64")
+    events["created_at"] = events["created_at"].astype(str)
+    events.to_parquet(dst / "behavior_events.parquet", index=False)
+
+    games = pd.read_parquet(src / "games.parquet")
+    games["game_date"] = games["game_date"].astype(str)
+    games.astype({c: object for c in ("team_home", "team_away", "stadium")}).to_parquet(dst / "games.parquet", index=False)
+    pd.read_parquet(src / "member_favorites.parquet").to_parquet(dst / "member_favorites.parquet", index=False)
+    (dst / "snapshot_meta.json").write_text((src / "snapshot_meta.json").read_text(encoding="utf-8"), encoding="utf-8")
+
+
+# 子行程的峰值 RSS (MB)。Linux 的 ru_maxrss 會沿用 fork 前父行程的高水位 → 先寫 clear_refs 歸零再讀 VmHWM
+def _reset_peak_rss() -> None:
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024      # 非 Linux：退回 ru_maxrss (KB)
+
+
+# 在子行程裡量一次：(秒數, events 佔用記憶體 MB, 載入期間峰值 RSS MB, 列數)
+def measure(kind: str, snapshot_dir: str):
+    _reset_peak_rss()
+    t0 = time.perf_counter()
+    if kind == "legacy":
+        events, _ = legacy_load(Path(snapshot_dir))
+    elif kind == "typed":
+        events = load_snapshot(Path(snapshot_dir)).events
+    else:   # typed + 欄位投影 + 列過濾：只拿評估最後 30 天需要的欄位
+        cutoff = events_cutoff(Path(snapshot_dir))
+        events = load_snapshot(Path(snapshot_dir), columns=["member_id", "event_type", "created_at"],
+                               filters=[("created_at", ">=", cutoff)]).events
+    secs = time.perf_counter() - t0
+    mem = events.memory_usage(deep=True).sum() / 2**20
+    peak = _peak_rss_mb()
+    return secs, mem, peak, len(events)
+
+
+def events_cutoff(snapshot_dir: Path) -> pd.Timestamp:
+    meta = json.loads((snapshot_dir / "snapshot_meta.json").read_text(encoding="utf-8"))
+    return pd.Timestamp(meta["reference_date"]) - pd.Timedelta(days=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=370_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        typed_dir, legacy_dir = Path(tmp) / "typed", Path(tmp) / "legacy"
+        t0 = time.perf_counter()
+        generate_snapshot(n_users=args.users, output_dir=typed_dir)
+        print(f"產生快照：{time.perf_counter() - t0:.1f}s")
+        write_legacy_copy(typed_dir, legacy_dir)
+
+        for label, path in (("typed", typed_dir), ("legacy", legacy_dir)):
+            size = (path / "behavior_events.parquet").stat().st_size / 2**20
+            print(f"  {label:6s} behavior_events.parquet：{size:.1f} MB")
+
+        print(f"{'':24s}{'載入秒數':>10s}{'events MB':>12s}{'峰值RSS MB':>12s}{'列數':>12s}")
+        for label, kind, path in (("舊格式 + 舊 loader", "legacy", legacy_dir),
+                                  ("新格式", "typed", typed_dir),
+                                  ("新格式 + 投影 / 過濾", "projected", typed_dir)):
+            # spawn：乾淨的子行程，不繼承父行程產生快照時的物件
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                secs, mem, peak, n = pool.submit(measure, kind, str(path)).result()
+            print(f"{label:24s}{secs:>10.2f}{mem:>12.1f}{peak:>12.0f}{n:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 # check_personalization.py (Step 1 開發時的歷史產物)
 # Step 2 驗證：用合成快照確認 per-user 個人化生效 (Step 2 已故意改變邏輯，不再比對新舊)。
 from datetime import date
+from recsys_offline.member_index import EMPTY, build_member_index
 from recsys_offline.snapshot_loader import load_snapshot
 from services.recommender import recommend, build_team_scores
 
@@ -17,14 +18,15 @@ games = [{"game_id": r.game_id, "game_date": r.game_date, "start_time": r.start_
          for r in future.itertuples()]
 hot_games = sorted(games, key=lambda g: g["trade_count"], reverse=True)[:15]
 
+# 每人行為索引：groupby 一次，之後每人查表
+index = build_member_index(ev)
+
 def own_behavior(uid):
-    e = ev[ev["member_id"] == uid]
-    tr = e[e["event_type"] == "trade"][["team_home", "team_away", "created_at"]].to_dict("records")
-    rs = e[e["event_type"] == "reservation"][["team_home", "team_away", "created_at"]].to_dict("records")
-    return tr, rs
+    me = index.get(uid, EMPTY)
+    return me.trades, me.reservations
 
 # 挑兩位有行為的會員，觀察結果是否「個人化且互不相同」
-sample = [u for u in snap.favorites if len(ev[ev["member_id"] == u]) >= 3][:2]
+sample = [u for u in snap.favorites if index.get(u, EMPTY).n_events >= 3][:2]
 for uid in sample:
     tr, rs = own_behavior(uid)
     ts = build_team_scores(snap.favorites[uid], tr, rs, today)
@@ -0,0 +1,46 @@
+# services/order_rows.py
+# 訂單列表 (buyerOrders / sellerOrders) 每一列回傳前的格式整理：純邏輯，不碰 DB / FastAPI，benchmarks/ 直接量。
+# 原本兩支 API 各寫一份，而且每一列都重建一次球場網址 dict；這裡改成模組層級常數、共用同一份。
+
+import json
+from datetime import date
+from typing import Any, Dict, List
+
+WEEKDAYS = ["一", "二", "三", "四", "五", "六", "日"]
+
+# 球場名稱 → Google Maps 網址 (找不到回 "#")
+STADIUM_URLS = {
+    "大巨蛋": "https://maps.app.goo.gl/m53dt8TAUQkWXBvD9",
+    "樂天桃園": "https://maps.app.goo.gl/otKHfBHksTKJk8uV8",
+    "台南": "https://maps.app.goo.gl/Y4SgmRbEBCehqaH89",
+    "天母": "https://maps.app.goo.gl/WGsmw7y38Apdkcsm7",
+    "新莊": "https://maps.app.goo.gl/evnUECyJsLx3rkaE8",
+    "澄清湖": "https://maps.app.goo.gl/T4wG6E4ED5jKnxaz6",
+    "洲際": "https://maps.app.goo.gl/U6ZfbxwGp1t9APvN7",
+    "嘉義市": "https://maps.app.goo.gl/rv8mNF2bnW5xuFcZ8",
+    "花蓮": "https://maps.app.goo.gl/UCvKfG29V7uEUc4G6",
+    "斗六": "https://maps.app.goo.gl/VmwmTQKSVQ5SBPVFA",
+    "台東": "https://maps.app.goo.gl/9yAJEH2JvA5utWfx5",
+}
+
+
+# 就地整理每一列 (與原本路由層的寫法相同)：
+# - start_time：timedelta → "HH:MM"
+# - game_date：先算星期幾再格式化成 "YYYY-MM-DD" (strftime 之後就沒有 .weekday() 了)
+# - stadium_url、評分 Decimal → float、image_urls JSON 字串 → list、note None → ""
+# rating_key：買家訂單是 "seller_rating"、賣家訂單是 "rating"
+def format_order_rows(rows: List[Dict[str, Any]], rating_key: str) -> List[Dict[str, Any]]:
+    for row in rows:
+        row["start_time"] = str(row["start_time"])[:5]
+
+        if isinstance(row["game_date"], date):
+            row["weekday"] = WEEKDAYS[row["game_date"].weekday()]
+            row["game_date"] = row["game_date"].strftime("%Y-%m-%d")
+        else:
+            row["weekday"] = "--"      # 若 game_date 不是 date 物件 (異常情況)，給預設值避免前端顯示錯誤
+
+        row["stadium_url"] = STADIUM_URLS.get(row["stadium"], "#")
+        row[rating_key] = float(row[rating_key]) if row[rating_key] is not None else None
+        row["image_urls"] = json.loads(row["image_urls"]) if row["image_urls"] else []
+        row["note"] = row["note"] if row["note"] else ""
+    return rows
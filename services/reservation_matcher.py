@@ -0,0 +1,34 @@
+# services/reservation_matcher.py
+# 上架票券 × 同場次預約的「條件比對」純邏輯：不碰 DB，models/ticket_model.py 上架時呼叫，benchmarks/ 直接量。
+# 原本在 create_tickets_and_collect_matches 的雙層迴圈裡對「每張票 × 每筆預約」都 json.loads + 切字串一次；
+# 改成每筆預約只解析一次價格區間，比對結果與順序 (票券在外層、預約在內層) 與原本相同。
+
+import json
+from typing import Any, Dict, List, Tuple
+
+
+# 預約的 price_ranges (JSON 字串，eg. '["401-699", "700-999"]') → [(401, 699), (700, 999)]
+# "0-0" 代表預約者沒設價格條件 (接受所有價格) → 回傳 None
+def parse_price_ranges(price_ranges: str):
+    ranges = []
+    for pr in json.loads(price_ranges):
+        lo, hi = map(int, pr.split("-"))
+        if lo == hi == 0:
+            return None
+        ranges.append((lo, hi))
+    return ranges
+
+
+# 回傳 [(預約, 票券), ...]：票券價格落在任一價格區間、且座位區相符 (預約的 "none" = 不限區域)
+def match_reservations(ticket_list: List[Dict[str, Any]],
+                       reservations: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    parsed = [(r, parse_price_ranges(r["price_ranges"])) for r in reservations]
+    matches = []
+    for ticket in ticket_list:
+        price, area = ticket["price"], ticket["seat_area"]
+        for r, ranges in parsed:
+            if r["seat_area"] != "none" and r["seat_area"] != area:
+                continue
+            if ranges is None or any(lo <= price <= hi for lo, hi in ranges):
+                matches.append((r, ticket))
+    return matches
@@ -0,0 +1,77 @@
+// auth_refresh.js
+// access token 是短效的 (預設 15 分鐘)：帶 Authorization 的請求收到 401 時，
+// 先用 localStorage 的 refresh_token 呼叫 /api/user/refresh 換一組新的 token，再用新的 access token 重送一次。
+// 換發失敗 (refresh token 過期 / 已撤銷) 就照原本流程回傳 401，頁面會清除 token 並顯示登入按鈕。
+// 每個頁面在 </head> 前載入，頁面裡的 fetch(...) 不用改。
+(function () {
+  const originalFetch = window.fetch.bind(window);
+  let refreshing = null; // 同時有多個請求 401 時只換發一次 (refresh token 是一次性的)
+
+  function saveTokens(data) {
+    localStorage.setItem("access_token", data.access_token);
+    if (data.refresh_token) {
+      localStorage.setItem("refresh_token", data.refresh_token);
+    } else {
+      localStorage.removeItem("refresh_token");
+    }
+  }
+
+  // 多個分頁共用同一個 refresh_token：另一個分頁先換發成功時，這裡送出的舊 token 會拿到 401，
+  // 此時 localStorage 已經是新的 token → 不能刪掉，改用新的 token 再試一次
+  async function refreshAccessToken(retried) {
+    const refreshToken = localStorage.getItem("refresh_token");
+    if (!refreshToken) return null;
+    const res = await originalFetch("/api/user/refresh", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!res.ok) {
+      if (localStorage.getItem("refresh_token") !== refreshToken) {
+        return retried ? null : refreshAccessToken(true);
+      }
+      localStorage.removeItem("refresh_token");
+      return null;
+    }
+    const data = await res.json();
+    saveTokens(data);
+    return data.access_token;
+  }
+
+  function authHeader(init) {
+    const headers = new Headers((init && init.headers) || {});
+    return headers.get("Authorization");
+  }
+
+  window.fetch = async function (input, init) {
+    const res = await originalFetch(input, init);
+    if (res.status !== 401 || !authHeader(init)) return res;
+
+    refreshing = refreshing || refreshAccessToken().finally(() => (refreshing = null));
+    const accessToken = await refreshing;
+    if (!accessToken) return res;
+
+    const headers = new Headers(init.headers);
+    headers.set("Authorization", "Bearer " + accessToken);
+    return originalFetch(input, { ...init, headers });
+  };
+
+  // 登入 / 註冊成功後保存兩個 token
+  window.saveAuthTokens = saveTokens;
+
+  // 登出：撤銷這個裝置的 refresh token，再清除本機 token
+  window.logout = async function () {
+    const refreshToken = localStorage.getItem("refresh_token");
+    localStorage.removeItem("access_token");
+    localStorage.removeItem("refresh_token");
+    if (refreshToken) {
+      try {
+        await originalFetch("/api/user/logout", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ refresh_token: refreshToken }),
+        });
+      } catch {}
+    }
+  };
+})();
@@ -0,0 +1,101 @@
+// notification_stream.js
+// 通知推播 (Server-Sent Events)：登入後連上 /api/notifications/stream，有新通知時直接插到鈴鐺列表最上面、更新未讀數，
+// 不用重新整理頁面或重新拉整個列表。
+// 連線前先用 access token 換一張一次性票券 (POST /api/notifications/stream_ticket)，EventSource 只帶 ?ticket=，JWT 不會出現在網址 / access log。
+// 連線中斷 / 伺服器在 access token 到期時結束連線 → 5 秒後重新載入列表 (fetch 會自動換發 token，見 auth_refresh.js)、換新票券再重連。
+// 需要頁面上有 #notifList、#notifCount，以及 loadNotifications() (各頁面原本就有)。
+// 也提供 appendLoadMore(ul, cursor)：通知列表一次只回最新一頁 (X-Next-Cursor 表示還有更舊的)，
+// 列表最後加一個「載入更多」，點了用 ?cursor= 取下一頁接在後面。
+(function () {
+  let source = null;
+  let failures = 0; // 連續幾次連不上 (eg. token 失效且換發失敗)；到 MAX_FAILURES 就停止重連
+  const MAX_FAILURES = 3;
+
+  function setBadge(unread) {
+    const badge = document.getElementById("notifCount");
+    if (!badge) return;
+    badge.textContent = unread != null ? unread : (parseInt(badge.textContent, 10) || 0) + 1;
+  }
+
+  function prependNotification(n) {
+    const ul = document.getElementById("notifList");
+    if (!ul) return;
+    const li = document.createElement("li");
+    li.textContent = n.message;
+    li.onclick = () => (location.href = n.url);
+    ul.prepend(li);
+  }
+
+  let opening = false;
+
+  function retryLater() {
+    if (++failures >= MAX_FAILURES) return;
+    setTimeout(async () => {
+      if (typeof loadNotifications === "function") await loadNotifications();
+      window.openNotificationStream();
+    }, 5000);
+  }
+
+  function appendNotification(ul, n) {
+    const li = document.createElement("li");
+    li.textContent = n.message;
+    li.onclick = () => (location.href = n.url);
+    ul.appendChild(li);
+  }
+
+  window.appendLoadMore = function (ul, cursor) {
+    if (!ul || !cursor) return;
+    const more = document.createElement("li");
+    more.className = "notif-load-more";
+    more.textContent = "載入更多";
+    more.onclick = async (e) => {
+      e.stopPropagation(); // 不要讓點擊冒泡到 document (會把下拉選單關掉)
+      more.textContent = "載入中…";
+      try {
+        const res = await fetch("/api/notifications?cursor=" + encodeURIComponent(cursor), {
+          headers: { Authorization: "Bearer " + localStorage.getItem("access_token") },
+        });
+        if (!res.ok) throw new Error(res.status);
+        more.remove();
+        (await res.json()).forEach((n) => appendNotification(ul, n));
+        window.appendLoadMore(ul, res.headers.get("X-Next-Cursor"));
+      } catch (err) {
+        more.textContent = "載入失敗，點此重試";
+      }
+    };
+    ul.appendChild(more);
+  };
+
+  window.openNotificationStream = async function () {
+    const token = localStorage.getItem("access_token");
+    if (!token || !window.EventSource || source || opening) return;
+    opening = true;
+    let ticket = null;
+    try {
+      // 經過 auth_refresh.js 的 fetch：access token 過期時會先換發再重送
+      const res = await fetch("/api/notifications/stream_ticket", {
+        method: "POST",
+        headers: { Authorization: "Bearer " + token },
+      });
+      if (res.ok) ticket = (await res.json()).ticket;
+    } catch (e) {
+      ticket = null;
+    }
+    opening = false;
+    if (!ticket) return retryLater();
+    source = new EventSource("/api/notifications/stream?ticket=" + encodeURIComponent(ticket));
+    source.onopen = () => (failures = 0);
+    source.addEventListener("unread", (e) => setBadge(JSON.parse(e.data).unread));
+    source.addEventListener("notification", (e) => {
+      const n = JSON.parse(e.data);
+      prependNotification(n);
+      setBadge(n.unread);
+    });
+    source.onerror = () => {
+      // 不用 EventSource 內建的自動重連：它會帶著同一張 (已用過的) 票券重連
+      source.close();
+      source = null;
+      retryLater();
+    };
+  };
+})();
@@ -30,6 +30,89 @@ def sample_password():
 
 
 
+# ============================================
+# 假的 Redis (記憶體 dict)：profile_cache / refresh_tokens / notification_counter / notification_stream 的測試共用
+# - 只實作專案用到的指令；TTL 不模擬 (ex / expire 直接忽略)
+# - 字串值一律存成 str (跟 decode_responses=True 的真 Redis 一樣)；set 型別存成 Python set
+# - Lua script：測試檔把「script 原文 → 等價的 Python 函數 fn(client, keys, args)」登記到 client.scripts
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.scripts = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, *keys):
+        return [self.data.get(k) for k in keys]
+
+    def getdel(self, key):
+        return self.data.pop(key, None)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def incr(self, key, n=1):
+        self.data[key] = str(int(self.data.get(key, 0)) + n)
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    def srem(self, key, member):
+        self.data.get(key, set()).discard(member)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def eval(self, script, numkeys, *keys_and_args):
+        return self.scripts[script](self, keys_and_args[:numkeys], keys_and_args[numkeys:])
+
+
+# pipeline：先記下指令，execute 時依序執行並回傳每個指令的結果
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+# 把所有 `from utils.redis_utils import get_redis_client` 的模組都換成回傳同一個 FakeRedis
+@pytest.fixture
+def fake_redis(monkeypatch):
+    from utils import redis_utils
+    client = FakeRedis()
+    real = redis_utils.get_redis_client
+    for module in list(sys.modules.values()):
+        if getattr(module, "get_redis_client", None) is real:
+            monkeypatch.setattr(module, "get_redis_client", lambda: client)
+    return client
+# ============================================
+
+
+
+
 
 
 # ============================================
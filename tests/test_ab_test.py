@@ -0,0 +1,40 @@
+# tests/test_ab_test.py
+# recsys_offline/ab_test.py 的單元測試：在小型合成快照上，結果 (分流人數 / 曝光 / 點擊 / z) 與 worker 數無關。
+
+from datetime import date
+
+import pytest
+
+# pandas / pyarrow 在 requirements-analytics.txt，CI 只裝 requirements.txt 時整個檔案略過
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from recsys_offline import ab_test
+from recsys_offline.snapshot_loader import load_snapshot
+from recsys_offline.synthetic_data import generate_snapshot
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    path = tmp_path_factory.mktemp("snapshot")
+    generate_snapshot(reference_date=date(2026, 6, 1), output_dir=path)
+    return load_snapshot(path)
+
+
+class TestSimulate:
+    def test_workers_do_not_change_results(self, snapshot, monkeypatch):
+        monkeypatch.setattr(ab_test, "load_snapshot", lambda: snapshot)
+
+        serial = ab_test.simulate(workers=1)
+        parallel = ab_test.simulate(workers=2)
+
+        assert serial == parallel
+
+    def test_same_shards_same_results_for_any_workers(self, snapshot, monkeypatch):
+        monkeypatch.setattr(ab_test, "load_snapshot", lambda: snapshot)
+
+        serial = ab_test.simulate(workers=1, n_shards=3)
+        parallel = ab_test.simulate(workers=3, n_shards=3)
+
+        assert serial == parallel
+        assert sum(serial["split"].values()) == len(snapshot.favorites)
@@ -0,0 +1,103 @@
+# tests/test_archive_events.py
+# recsys_offline/archive_events.py 的單元測試：月份運算、分區命名 / TO_DAYS 邊界、保留期 cutoff 與過期分區的挑選。
+# cutoff 算錯會直接 DROP 線上資料，所以跨年、月中、cutoff 當月的邊界都要測。
+
+from datetime import date
+
+import pytest
+
+# pandas / pyarrow 在 requirements-analytics.txt，CI 只裝 requirements.txt 時整個檔案略過
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from recsys_offline.archive_events import (
+    FUTURE_PARTITION, RETENTION_MONTHS, add_months, expired_partitions, from_days,
+    missing_future_months, month_start, partition_name, retention_cutoff, to_days,
+)
+
+
+def part(year, month, rows=0):
+    # 月分區 pYYYYMM 的上界是下個月 1 號 (VALUES LESS THAN)
+    start = date(year, month, 1)
+    return {"name": partition_name(start), "upper": add_months(start, 1), "rows": rows}
+
+
+FUTURE = {"name": FUTURE_PARTITION, "upper": None, "rows": 0}
+
+
+class TestMonthMath:
+    def test_month_start(self):
+        assert month_start(date(2026, 3, 31)) == date(2026, 3, 1)
+
+    def test_add_months_across_year_end(self):
+        assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+
+    def test_add_months_backwards_across_year_start(self):
+        assert add_months(date(2026, 2, 1), -5) == date(2025, 9, 1)
+
+    def test_add_months_zero(self):
+        assert add_months(date(2026, 7, 1), 0) == date(2026, 7, 1)
+
+
+class TestPartitionNaming:
+    def test_name_is_zero_padded(self):
+        assert partition_name(date(2026, 1, 1)) == "p202601"
+
+    def test_to_days_matches_mysql(self):
+        # MySQL 文件的範例：TO_DAYS('2007-10-07') = 733321
+        assert to_days(date(2007, 10, 7)) == 733321
+
+    def test_from_days_round_trip(self):
+        d = date(2028, 2, 29)
+
+        assert from_days(to_days(d)) == d
+
+
+class TestRetentionCutoff:
+    def test_keeps_current_month_plus_previous(self):
+        # 2026-06 → 保留 1 ~ 6 月 (共 6 個月)，12 月以前過期
+        assert RETENTION_MONTHS == 6
+        assert retention_cutoff(date(2026, 6, 15)) == date(2026, 1, 1)
+
+    def test_across_year_boundary(self):
+        assert retention_cutoff(date(2026, 2, 1)) == date(2025, 9, 1)
+
+    def test_same_for_any_day_of_month(self):
+        assert retention_cutoff(date(2026, 6, 1)) == retention_cutoff(date(2026, 6, 30))
+
+
+class TestExpiredPartitions:
+    def test_cutoff_month_is_kept(self):
+        # cutoff = 2026-01-01：p202512 (上界 2026-01-01) 過期，p202601 (cutoff 當月) 保留
+        partitions = [part(2025, 11), part(2025, 12), part(2026, 1), part(2026, 6), FUTURE]
+
+        expired = expired_partitions(partitions, retention_cutoff(date(2026, 6, 15)))
+
+        assert [p["name"] for p in expired] == ["p202511", "p202512"]
+
+    def test_future_partition_never_expires(self):
+        expired = expired_partitions([FUTURE], date(2100, 1, 1))
+
+        assert expired == []
+
+    def test_nothing_expired_within_retention(self):
+        partitions = [part(2026, m) for m in range(1, 7)] + [FUTURE]
+
+        assert expired_partitions(partitions, retention_cutoff(date(2026, 6, 1))) == []
+
+
+class TestMissingFutureMonths:
+    def test_fills_up_to_horizon_across_year_end(self):
+        partitions = [part(2026, 10), part(2026, 11), FUTURE]
+
+        months = missing_future_months(partitions, date(2027, 2, 1))
+
+        assert months == [date(2026, 12, 1), date(2027, 1, 1)]
+
+    def test_nothing_missing(self):
+        partitions = [part(2026, 12), FUTURE]
+
+        assert missing_future_months(partitions, date(2027, 1, 1)) == []
+
+    def test_unpartitioned_table(self):
+        assert missing_future_months([FUTURE], date(2027, 1, 1)) == []
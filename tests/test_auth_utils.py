@@ -2,7 +2,7 @@
 test_auth_utils.py
 Unit Tests for utils/auth_utils.py
 
-Test Coverage: 22 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+Test Coverage: 28 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
 Includes positive tests, negative tests, and boundary tests.
 
 Test Classes:
@@ -12,6 +12,9 @@ Test Classes:
 - TestVerifyPassword (4 tests)
   Password verification: correct passes, wrong fails, empty fails, case sensitive
 
+- TestPasswordAsync (2 tests)
+  Executor-backed variants: round trip matches the sync functions, configured bcrypt cost is used
+
 - TestCreateAccessToken (4 tests)
   Token creation: returns string, valid JWT format, contains user data, custom expiry
 
@@ -21,6 +24,9 @@ Test Classes:
 - TestGetCurrentUser (4 tests)
   Header validation: correct format, missing, invalid format, empty Bearer
 
+- TestTokenCache (4 tests)
+  Verified-token cache: results are copies, entries expire with the token, revocation hook, LRU bound
+
 Dependencies: conftest.py provides sample_password and sample_user_data fixtures
 """
 
@@ -30,19 +36,24 @@ Dependencies: conftest.py provides sample_password and sample_user_data fixtures
 # 依賴: conftest.py 提供的 sample_password 和 sample_user_data fixture
 
 
+import asyncio
 import pytest
 from datetime import timedelta
 from fastapi import HTTPException
 
 
-# 從 utils.auth_utils import 要測試的 5 個函數
+# 從 utils.auth_utils import 要測試的函數
 from utils.auth_utils import (
     hash_password,
     verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
     verify_token,
-    get_current_user
+    get_current_user,
+    set_revocation_check,
 )
+from utils import auth_utils
 
 
 # ==============================================
@@ -149,6 +160,30 @@ class TestVerifyPassword:
 
 
 
+# ==============================================
+# 測試 hash_password_async / verify_password_async 函數
+class TestPasswordAsync:
+    # async 版本: 把 bcrypt 丟到專用執行緒池跑 (async 路由用), 結果必須與 sync 版本完全相同
+
+    # 測試 1: async 雜湊出來的密碼, sync / async 驗證都要通過; 錯誤密碼要被拒絕
+    def test_async_round_trip(self, sample_password):
+        hashed = asyncio.run(hash_password_async(sample_password))
+
+        assert verify_password(sample_password, hashed) is True
+        assert asyncio.run(verify_password_async(sample_password, hashed)) is True
+        assert asyncio.run(verify_password_async("wrong_password", hashed)) is False
+
+    # 測試 2: 雜湊成本使用 BCRYPT_ROUNDS 設定 ($2b$<rounds>$...)
+    def test_uses_configured_rounds(self, sample_password):
+        from config.settings import BCRYPT_ROUNDS
+
+        hashed = hash_password(sample_password)
+        assert hashed.split("$")[2] == f"{BCRYPT_ROUNDS:02d}"
+# ==============================================
+
+
+
+
 # ==============================================
 # 測試 create_access_token 函數
 class TestCreateAccessToken:   
@@ -416,3 +451,54 @@ class TestGetCurrentUser:
 # ==============================================
 
 
+
+
+# ==============================================
+# 測試 verify_token 的「驗證過的 token 快取」
+class TestTokenCache:
+    # 快取只是省下重複的 JWT 解碼 + 驗簽: 結果必須與不快取時完全相同 (過期、撤銷都要照常回 401)
+
+    # 測試 1: 快取命中時回傳新的 dict, 呼叫端修改結果不會污染快取
+    def test_cached_result_is_a_copy(self, sample_user_data):
+        token = create_access_token(sample_user_data, expires_delta=timedelta(minutes=5))
+        first = verify_token(token)
+        first["user_id"] = 999
+
+        assert verify_token(token)["user_id"] == sample_user_data["id"]
+
+    # 測試 2: token 過期後, 即使還在快取裡也要回 401 (快取只保存到 exp)
+    def test_cached_token_expires(self, sample_user_data):
+        import time
+
+        token = create_access_token(sample_user_data, expires_delta=timedelta(seconds=1))
+        verify_token(token)
+        time.sleep(1.1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_token(token)
+        assert exc_info.value.status_code == 401
+        assert "過期" in exc_info.value.detail
+
+    # 測試 3: 撤銷檢查在快取命中時也會執行
+    def test_revocation_check_runs_on_cache_hit(self, sample_user_data):
+        token = create_access_token(sample_user_data, expires_delta=timedelta(minutes=5))
+        verify_token(token)
+
+        set_revocation_check(lambda payload: payload["id"] == sample_user_data["id"])
+        try:
+            with pytest.raises(HTTPException) as exc_info:
+                verify_token(token)
+            assert exc_info.value.status_code == 401
+        finally:
+            set_revocation_check(None)
+        assert verify_token(token)["user_id"] == sample_user_data["id"]
+
+    # 測試 4: 快取筆數有上限 (LRU), 超過就丟掉最久沒用的
+    def test_cache_is_bounded(self, monkeypatch, sample_user_data):
+        monkeypatch.setattr(auth_utils, "TOKEN_CACHE_SIZE", 3)
+        auth_utils.clear_token_cache()
+        for i in range(5):
+            verify_token(create_access_token({**sample_user_data, "id": i + 1},
+                                             expires_delta=timedelta(minutes=5)))
+        assert len(auth_utils._token_cache) == 3
+# ==============================================
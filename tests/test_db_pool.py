@@ -0,0 +1,269 @@
+# tests/test_db_pool.py
+# config/db_pool.py 的單元測試：用假連線 + 假時鐘，不需要 MySQL。
+# 重點：剛歸還的連線借出時不 ping、閒置超過門檻才 ping、超過最長存活時間就重建、歸還時只有交易中才 rollback；
+# 借光時依序排隊 (FIFO)、逾時丟 PoolError (event loop 上不排隊)、臨時 (overflow) 連線歸還即關。
+# 另外 utils/redis_utils.py 的 TimedBlockingPool：event loop 上借光同樣立刻失敗。
+
+import asyncio
+import threading
+import time
+
+import pytest
+import redis
+from mysql.connector.errors import PoolError
+
+from config.db_pool import ConnectionPool, ReplicaSet
+from utils.redis_utils import TimedBlockingPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.pings = 0
+        self.rollbacks = 0
+        self.closed = False
+        self.alive = True
+        self.in_transaction = False
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.alive:
+            raise OSError("gone")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(size=2, idle=30, lifetime=1800):
+    created = []
+
+    def factory():
+        created.append(FakeConnection())
+        return created[-1]
+
+    clock = Clock()
+    pool = ConnectionPool(factory, size=size, idle_check_seconds=idle,
+                          max_lifetime_seconds=lifetime, name="test", clock=clock)
+    return pool, created, clock
+
+
+class TestBorrow:
+    def test_recently_used_connection_is_not_pinged(self):
+        pool, created, clock = make_pool()
+        for _ in range(5):
+            entry = pool.acquire()
+            clock.now += 1
+            pool.release(entry)
+        assert len(created) == 1
+        assert created[0].pings == 0
+
+    def test_idle_connection_is_validated_and_replaced_when_dead(self):
+        pool, created, clock = make_pool()
+        pool.release(pool.acquire())
+        clock.now += 31
+        created[0].alive = False
+
+        entry = pool.acquire()
+        assert created[0].pings == 1 and created[0].closed
+        assert entry.raw is created[1]
+        assert pool.total_count == 1
+
+    def test_max_lifetime_recycles(self):
+        pool, created, clock = make_pool(lifetime=100)
+        first = pool.acquire()
+        clock.now += 101
+        pool.release(first)                     # 歸還時已過期 → 直接關掉
+        assert created[0].closed and pool.idle_count == 0
+        assert pool.acquire().raw is created[1]
+
+    def test_exhausted_pool_raises(self):
+        pool, _, _ = make_pool(size=1)
+        pool.acquire()
+        with pytest.raises(PoolError):
+            pool.acquire()
+
+
+class TestReturn:
+    def test_rollback_only_when_in_transaction(self):
+        pool, created, _ = make_pool()
+        entry = pool.acquire()
+        pool.release(entry)
+        assert created[0].rollbacks == 0
+
+        entry = pool.acquire()
+        entry.raw.in_transaction = True
+        pool.release(entry)
+        assert created[0].rollbacks == 1 and pool.idle_count == 1
+
+    def test_discard_frees_the_slot(self):
+        pool, created, _ = make_pool(size=1)
+        pool.release(pool.acquire(), discard=True)
+        assert created[0].closed and pool.total_count == 0
+        assert pool.acquire().raw is created[1]
+
+
+class TestSweep:
+    def test_sweep_checks_only_stale_connections(self):
+        pool, created, clock = make_pool(size=3)
+        a, b = pool.acquire(), pool.acquire()
+        pool.release(a)
+        clock.now += 40
+        pool.release(b)                         # b 剛歸還，a 已閒置 40 秒
+        created[0].alive = False
+
+        assert pool.sweep() == 1
+        assert created[0].closed and created[1].pings == 0
+        assert pool.idle_count == 1 and pool.total_count == 1
+
+
+class TestSizing:
+    def test_min_size_is_prefilled(self):
+        pool, created, _ = make_pool(size=4)
+        pool.min_size = 2
+        assert pool.fill() == 2
+        assert pool.idle_count == 2 and len(created) == 2
+
+    def test_overflow_connections_close_on_return(self):
+        pool, created, _ = make_pool(size=1)
+        pool.max_overflow = 1
+        a, b = pool.acquire(), pool.acquire()
+        assert pool.in_use_count == 2
+        pool.release(b)
+        pool.release(a)
+        assert pool.idle_count == 1 and pool.total_count == 1
+        assert sum(c.closed for c in created) == 1
+
+    def test_acquire_timeout(self):
+        pool, _, _ = make_pool(size=1)
+        pool.acquire()
+        with pytest.raises(PoolError):
+            pool.acquire(timeout=0.05)
+        assert pool.waiting_count == 0
+
+    def test_no_waiting_on_event_loop(self):
+        pool, _, _ = make_pool(size=1)
+        pool.acquire_timeout = 30
+        pool.acquire()
+
+        async def borrow():
+            start = time.monotonic()
+            with pytest.raises(PoolError):
+                pool.acquire()
+            return time.monotonic() - start
+
+        assert asyncio.run(borrow()) < 1
+        assert pool.waiting_count == 0
+
+    def test_waiters_are_served_in_fifo_order(self):
+        pool, _, _ = make_pool(size=1)
+        held = pool.acquire()
+        order = []
+
+        def borrow(tag):
+            entry = pool.acquire(timeout=5)
+            order.append(tag)
+            pool.release(entry)
+
+        threads = []
+        for tag in range(3):
+            t = threading.Thread(target=borrow, args=(tag,))
+            t.start()
+            threads.append(t)
+            while pool.waiting_count < tag + 1:     # 確定依序排進隊伍
+                time.sleep(0.001)
+        pool.release(held)
+        for t in threads:
+            t.join(5)
+        assert order == [0, 1, 2]
+
+    def test_discard_hands_slot_to_waiter(self):
+        pool, created, _ = make_pool(size=1)
+        held = pool.acquire()
+        result = []
+        t = threading.Thread(target=lambda: result.append(pool.acquire(timeout=5)))
+        t.start()
+        while pool.waiting_count < 1:
+            time.sleep(0.001)
+        pool.release(held, discard=True)
+        t.join(5)
+        assert result[0].raw is created[1]
+        assert pool.total_count == 1
+
+
+class TestReplicaSet:
+    def make_replicas(self, n=2, health_check=None):
+        pools = [make_pool()[0] for _ in range(n)]
+        clock = Clock()
+        return ReplicaSet(pools, retry_seconds=30, health_check=health_check, clock=clock), clock
+
+    def test_round_robin(self):
+        replicas, _ = self.make_replicas()
+        picked = []
+        for _ in range(4):
+            pool, entry = replicas.acquire()
+            picked.append(replicas.pools.index(pool))
+            pool.release(entry)
+        assert picked == [0, 1, 0, 1]
+
+    def test_unreachable_replica_is_skipped_until_retry(self):
+        replicas, clock = self.make_replicas()
+        replicas.pools[0]._factory = lambda: (_ for _ in ()).throw(OSError("refused"))
+        for _ in range(3):
+            pool, entry = replicas.acquire()
+            assert pool is replicas.pools[1]
+            pool.release(entry)
+        assert not replicas.is_healthy(0)
+        clock.now += 31
+        assert replicas.is_healthy(0)
+
+    def test_health_check_and_fallback(self):
+        replicas, _ = self.make_replicas(n=1, health_check=lambda conn: False)
+        assert replicas.check_health() == 1
+        assert replicas.acquire() is None            # 呼叫端改用主庫
+
+
+class TestReadRouting:
+    def test_readonly_goes_to_replica_unless_pinned(self, monkeypatch):
+        from config import database
+
+        primary, _, _ = make_pool()
+        replica_pool, _, _ = make_pool()
+        monkeypatch.setattr(database, "cnxpool", primary)
+        monkeypatch.setattr(database, "replicas", ReplicaSet([replica_pool]))
+
+        with database.get_connection(readonly=True):
+            assert replica_pool.in_use_count == 1 and primary.in_use_count == 0
+        with database.get_connection():
+            assert primary.in_use_count == 1
+
+        token = database.pin_to_primary()
+        try:
+            with database.get_connection(readonly=True):
+                assert primary.in_use_count == 1 and replica_pool.in_use_count == 0
+        finally:
+            database.unpin(token)
+
+
+class TestRedisPool:
+    def test_no_waiting_on_event_loop(self):
+        pool = TimedBlockingPool(host="localhost", max_connections=1, timeout=30)
+        pool.pool.get_nowait()                      # 唯一的名額被借走
+
+        async def borrow():
+            start = time.monotonic()
+            with pytest.raises(redis.ConnectionError):
+                pool.get_connection()
+            return time.monotonic() - start
+
+        assert asyncio.run(borrow()) < 1
@@ -0,0 +1,136 @@
+"""
+test_email_sender.py
+Unit Tests for the SQS -> SMTP Lambda consumer (lambda_functions/email_sender.py)
+
+Test Coverage: 6 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+open_smtp is replaced by a fake SMTP connection (no network); responses are scripted per recipient.
+
+Test Classes:
+- TestSessionReuse (2 tests)
+  One connection for the whole batch, dropped connection reconnects once and resends
+
+- TestBatchItemFailures (4 tests)
+  4xx reported for retry, 5xx / bad JSON dropped, SMTP down -> this and every remaining record reported
+"""
+
+
+import json
+import smtplib
+
+import pytest
+
+from lambda_functions import email_sender
+
+
+# ============================================
+# 假的 SMTP 連線：script = {收件人: 要拋出的例外}，每個例外只拋一次
+class FakeSMTP:
+    def __init__(self, server):
+        self.server = server
+
+    def send_message(self, msg):
+        error = self.server.script.pop(msg["To"], None)
+        if error is not None:
+            raise error
+        self.server.sent.append(msg["To"])
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeServer:
+    def __init__(self):
+        self.script = {}
+        self.sent = []
+        self.connects = 0
+        self.down = False
+
+    def open(self):
+        if self.down:
+            raise ConnectionRefusedError("smtp down")
+        self.connects += 1
+        return FakeSMTP(self)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeServer()
+    monkeypatch.setattr(email_sender, "open_smtp", fake.open)
+    return fake
+
+
+def make_event(n, bodies=None):
+    bodies = bodies or {}
+    return {"Records": [
+        {"messageId": f"m{i}", "body": bodies.get(i) or json.dumps(
+            {"type": "email", "payload": {"to": f"user{i}@example.com", "subject": "s", "body": "b"}})}
+        for i in range(n)
+    ]}
+
+
+def failed_ids(result):
+    return [f["itemIdentifier"] for f in result["batchItemFailures"]]
+# ============================================
+
+
+
+
+# ============================================
+class TestSessionReuse:
+
+    def test_one_connection_per_batch(self, server):
+        result = email_sender.lambda_handler(make_event(5), None)
+
+        assert server.connects == 1
+        assert len(server.sent) == 5
+        assert failed_ids(result) == []
+
+    def test_reconnects_after_disconnect(self, server):
+        server.script["user2@example.com"] = smtplib.SMTPServerDisconnected("idle timeout")
+
+        result = email_sender.lambda_handler(make_event(4), None)
+
+        assert server.connects == 2
+        assert server.sent == [f"user{i}@example.com" for i in range(4)]
+        assert failed_ids(result) == []
+# ============================================
+
+
+
+
+# ============================================
+class TestBatchItemFailures:
+
+    def test_transient_smtp_error_retried(self, server):
+        server.script["user1@example.com"] = smtplib.SMTPDataError(421, b"try again later")
+
+        result = email_sender.lambda_handler(make_event(3), None)
+
+        assert failed_ids(result) == ["m1"]
+        assert len(server.sent) == 2
+
+    def test_permanent_smtp_error_dropped(self, server):
+        server.script["user1@example.com"] = smtplib.SMTPDataError(554, b"rejected")
+
+        result = email_sender.lambda_handler(make_event(3), None)
+
+        assert failed_ids(result) == []
+        assert json.loads(result["body"])["failed"] == 1
+
+    def test_bad_json_dropped(self, server):
+        result = email_sender.lambda_handler(make_event(2, bodies={0: "not json"}), None)
+
+        assert failed_ids(result) == []
+        assert server.sent == ["user1@example.com"]
+
+    def test_smtp_down_returns_rest_of_batch(self, server):
+        server.down = True
+
+        result = email_sender.lambda_handler(make_event(3), None)
+
+        assert failed_ids(result) == ["m0", "m1", "m2"]
+        assert server.sent == []
+# ============================================
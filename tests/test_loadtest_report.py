@@ -0,0 +1,60 @@
+# tests/test_loadtest_report.py
+# loadtest/report.py 的單元測試：分位數摘要、絕對門檻、與上一次結果比較的相對回歸。
+
+from loadtest.report import check, summarize
+
+
+class FakeEntry:
+    def __init__(self, method, name, n, fails, p50, p95, p99):
+        self.method, self.name, self.num_requests, self.num_failures = method, name, n, fails
+        self._p = {0.50: p50, 0.95: p95, 0.99: p99}
+
+    def get_response_time_percentile(self, q):
+        return self._p[q]
+
+
+def row(name="GET /api/events", n=100, fails=0, p50=50, p95=200, p99=400):
+    return {"name": name, "requests": n, "failures": fails, "p50": p50, "p95": p95, "p99": p99}
+
+
+THRESHOLDS = {
+    "default": {"p95_ms": 500, "p99_ms": 1000, "fail_ratio": 0.01},
+    "endpoints": {"GET /api/events": {"p95_ms": 300}},
+}
+
+
+class TestSummarize:
+    def test_skips_unused_entries_and_sorts(self):
+        rows = summarize([FakeEntry("POST", "/api/tappay_pay", 10, 1, 100, 300, 500),
+                          FakeEntry("GET", "/api/events", 0, 0, 0, 0, 0),
+                          FakeEntry("GET", "/api/browse_tickets", 50, 0, 20, 80, 90)])
+        assert [r["name"] for r in rows] == ["GET /api/browse_tickets", "POST /api/tappay_pay"]
+        assert rows[1]["p95"] == 300
+
+
+class TestCheck:
+    def test_within_budget_passes(self):
+        assert check([row()], THRESHOLDS) == []
+
+    def test_endpoint_override_beats_default(self):
+        violations = check([row(p95=350)], THRESHOLDS)
+        assert len(violations) == 1 and "p95" in violations[0]
+
+    def test_fail_ratio_checked_even_with_few_samples(self):
+        assert check([row(n=5, fails=1, p95=9999)], THRESHOLDS) == [
+            "GET /api/events: 失敗率 20.00% > 1.00%"]
+
+    def test_regression_against_baseline(self):
+        baseline = [row(p95=100, p99=150)]
+        assert check([row(p95=110, p99=160)], THRESHOLDS, baseline) == []       # 10% 內
+        assert len(check([row(p95=180, p99=160)], THRESHOLDS, baseline)) == 1   # p95 慢 80%
+
+    def test_small_absolute_change_is_not_regression(self):
+        baseline = [row(p95=10, p99=12)]
+        assert check([row(p95=20, p99=25)], THRESHOLDS, baseline) == []
+
+    def test_zero_ms_baseline_does_not_divide_by_zero(self):
+        baseline = [row(p50=0, p95=0, p99=0)]
+        assert check([row(p50=0, p95=0, p99=0)], THRESHOLDS, baseline) == []
+        assert check([row(p95=200, p99=0)], THRESHOLDS, baseline) == [
+            "GET /api/events: p95 200ms 比上次 0ms 慢 200ms"]
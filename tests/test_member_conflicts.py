@@ -0,0 +1,117 @@
+"""
+test_member_conflicts.py
+Unit Tests for duplicate email / name handling (models/auth_model.py, routes/auth.py, routes/users.py)
+
+Test Coverage: 6 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+The unique indexes do the checking; the DB write is replaced by a stub that raises the IntegrityError MySQL would.
+
+Test Classes:
+- TestDuplicateMemberField (3 tests)
+  1062 on uq_members_email / uq_members_name maps to the field, other integrity errors -> None
+
+- TestRegisterConflict (2 tests)
+  POST /api/user/register: duplicate email / name -> 400 with the original messages
+
+- TestUpdateConflict (1 test)
+  PUT /api/user/profile: duplicate email -> 409
+"""
+
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError
+
+import routes.auth as auth_routes
+import routes.users as users_routes
+from models.auth_model import duplicate_member_field
+from utils.auth_utils import get_current_user
+
+
+# ============================================
+def dup_error(key: str) -> IntegrityError:
+    return IntegrityError(msg=f"Duplicate entry 'x' for key 'members.{key}'", errno=errorcode.ER_DUP_ENTRY)
+
+
+def raiser(err):
+    def fn(*args, **kwargs):
+        raise err
+    return fn
+
+
+async def fake_hash(password):
+    return "hashed"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = FastAPI()
+    app.include_router(auth_routes.router)
+    app.include_router(users_routes.router)
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": 1, "name": "a", "email": "a@example.com"}
+    monkeypatch.setattr(auth_routes, "hash_password_async", fake_hash)
+    return TestClient(app)
+
+
+REGISTER_BODY = {
+    "name": "新會員", "email": "new@example.com", "password": "secret123", "confirm_password": "secret123",
+    "phone": "0912345678",
+}
+# ============================================
+
+
+
+
+# ============================================
+class TestDuplicateMemberField:
+
+    def test_email(self):
+        assert duplicate_member_field(dup_error("uq_members_email")) == "email"
+
+    def test_name(self):
+        assert duplicate_member_field(dup_error("uq_members_name")) == "name"
+
+    def test_other_integrity_error(self):
+        fk_error = IntegrityError(msg="Cannot add or update a child row", errno=errorcode.ER_NO_REFERENCED_ROW_2)
+
+        assert duplicate_member_field(fk_error) is None
+# ============================================
+
+
+
+
+# ============================================
+class TestRegisterConflict:
+
+    def test_duplicate_email(self, client, monkeypatch):
+        monkeypatch.setattr(auth_routes, "create_member", raiser(dup_error("uq_members_email")))
+
+        res = client.post("/api/user/register", json=REGISTER_BODY)
+
+        assert res.status_code == 400
+        assert res.json()["detail"] == "此電子郵件已被註冊"
+
+    def test_duplicate_name(self, client, monkeypatch):
+        monkeypatch.setattr(auth_routes, "create_member", raiser(dup_error("uq_members_name")))
+
+        res = client.post("/api/user/register", json=REGISTER_BODY)
+
+        assert res.status_code == 400
+        assert res.json()["detail"] == "此姓名已被使用，請換一個"
+# ============================================
+
+
+
+
+# ============================================
+class TestUpdateConflict:
+
+    def test_duplicate_email(self, client, monkeypatch):
+        monkeypatch.setattr(users_routes, "update_member_profile", raiser(dup_error("uq_members_email")))
+
+        res = client.put("/api/user/profile", json={"email": "taken@example.com"})
+
+        assert res.status_code == 409
+        assert res.json()["detail"] == "此電子郵件已被其他帳號使用"
+# ============================================
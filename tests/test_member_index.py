@@ -0,0 +1,65 @@
+# tests/test_member_index.py
+# recsys_offline/member_index.py 的單元測試：索引結果必須與「逐人過濾」完全一致，
+# 否則離線評估 / A/B 模擬的數字會悄悄改變。
+
+from datetime import datetime
+
+import pytest
+
+# pandas / pyarrow 在 requirements-analytics.txt，CI 只裝 requirements.txt 時整個檔案略過
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from recsys_offline.member_index import EMPTY, build_member_index
+
+
+def make_events():
+    return pd.DataFrame([
+        {"member_id": 1, "event_type": "trade", "game_id": 10,
+         "team_home": "兄弟", "team_away": "猿", "created_at": datetime(2026, 6, 1)},
+        {"member_id": 2, "event_type": "reservation", "game_id": 11,
+         "team_home": "獅", "team_away": "龍", "created_at": datetime(2026, 6, 2)},
+        {"member_id": 1, "event_type": "reservation", "game_id": 12,
+         "team_home": "鷹", "team_away": "兄弟", "created_at": datetime(2026, 6, 3)},
+        {"member_id": 1, "event_type": "trade", "game_id": 13,
+         "team_home": "悍將", "team_away": "獅", "created_at": datetime(2026, 6, 4)},
+    ])
+
+
+# 舊寫法 (ab_test.own 改版前)：當作標準答案
+def naive_own(ev, uid):
+    e = ev[ev["member_id"] == uid]
+    tr = e[e["event_type"] == "trade"][["team_home", "team_away", "created_at"]].to_dict("records")
+    rs = e[e["event_type"] == "reservation"][["team_home", "team_away", "created_at"]].to_dict("records")
+    return tr, rs
+
+
+class TestBuildMemberIndex:
+    def test_matches_per_user_filtering(self):
+        ev = make_events()
+        index = build_member_index(ev)
+        for uid in (1, 2):
+            assert (index[uid].trades, index[uid].reservations) == naive_own(ev, uid)
+
+    def test_keeps_original_row_order_within_member(self):
+        index = build_member_index(make_events())
+        assert [t["team_home"] for t in index[1].trades] == ["兄弟", "悍將"]
+
+    def test_teams_cover_home_and_away(self):
+        index = build_member_index(make_events())
+        assert index[1].teams == {"兄弟", "猿", "鷹", "悍將", "獅"}
+        assert index[1].n_events == 3
+
+    def test_categorical_columns(self):
+        ev = make_events()
+        for col in ("event_type", "team_home", "team_away"):
+            ev[col] = ev[col].astype("category")
+        index = build_member_index(ev)
+        assert (index[1].trades, index[1].reservations) == naive_own(make_events(), 1)
+
+    def test_empty_events(self):
+        assert build_member_index(make_events().iloc[0:0]) == {}
+
+    def test_unknown_member_falls_back_to_empty(self):
+        index = build_member_index(make_events())
+        assert index.get(999, EMPTY).n_events == 0
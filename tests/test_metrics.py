@@ -0,0 +1,99 @@
+# tests/test_metrics.py
+# utils/metrics.py 的單元測試：Histogram 輸出格式、middleware 以「路由樣板」當 label、請求內的 DB 時間累計；
+# 以及 routes/metrics.py 的存取控制 (正式環境沒設 METRICS_TOKEN → 404)。
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.metrics as metrics_routes
+from utils import metrics
+from utils.metrics import Histogram, MetricsMiddleware, instrument_connection
+
+
+class FakeCursor:
+    def __init__(self):
+        self.closed = False
+        self.lastrowid = 42
+
+    def execute(self, operation, params=None):
+        pass
+
+    def fetchall(self):
+        return [{"id": 1}]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def cursor(self, dictionary=False):
+        return FakeCursor()
+
+    def commit(self):
+        pass
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/api/items/{item_id}")
+    def get_item(item_id: int):
+        conn = instrument_connection(FakeConnection())
+        with conn.cursor(dictionary=True) as cursor:
+            cursor.execute("SELECT * FROM items WHERE id = %s", (item_id,))
+            rows = cursor.fetchall()
+        return {"rows": rows, "lastrowid": cursor.lastrowid}
+
+    return app
+
+
+class TestHistogram:
+    def test_cumulative_buckets_and_escaping(self):
+        h = Histogram("test_latency_seconds", "test", ["route"], buckets=(0.1, 1.0))
+        for v in (0.05, 0.5, 0.5, 3.0):
+            h.observe(v, 'a"b')
+        text = "\n".join(h.render())
+        assert 'test_latency_seconds_bucket{route="a\\"b",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{route="a\\"b",le="1.0"} 3' in text
+        assert 'test_latency_seconds_bucket{route="a\\"b",le="+Inf"} 4' in text
+        assert 'test_latency_seconds_count{route="a\\"b"} 4' in text
+        assert h.snapshot('a"b') == (4, 4.05)
+
+
+class TestMiddleware:
+    def test_route_template_label_and_request_db_time(self):
+        client = TestClient(make_app())
+        before = metrics.REQUEST_DB_SECONDS.snapshot("/api/items/{item_id}") or (0, 0.0)
+        for item_id in (1, 2, 3):
+            resp = client.get(f"/api/items/{item_id}")
+            assert resp.json() == {"rows": [{"id": 1}], "lastrowid": 42}
+
+        count, _ = metrics.HTTP_REQUEST_SECONDS.snapshot("GET", "/api/items/{item_id}", "200")
+        assert count >= 3
+        assert metrics.REQUEST_DB_SECONDS.snapshot("/api/items/{item_id}")[0] == before[0] + 3
+        assert "/api/items/1" not in metrics.render_metrics()       # 原始路徑不會變成 label
+
+    def test_unmatched_route_is_grouped(self):
+        client = TestClient(make_app())
+        client.get("/no/such/path")
+        assert metrics.HTTP_REQUEST_SECONDS.snapshot("GET", metrics.UNMATCHED_ROUTE, "404")[0] >= 1
+
+
+class TestMetricsEndpoint:
+    def make_client(self, monkeypatch, token, debug):
+        monkeypatch.setattr(metrics_routes, "METRICS_TOKEN", token)
+        monkeypatch.setattr(metrics_routes, "DEBUG", debug)
+        app = FastAPI()
+        app.include_router(metrics_routes.router)
+        return TestClient(app)
+
+    def test_hidden_in_production_without_token(self, monkeypatch):
+        client = self.make_client(monkeypatch, None, debug=False)
+        assert client.get("/metrics").status_code == 404
+        assert client.get("/debug/query_stats").status_code == 404
+
+    def test_token_required_when_set(self, monkeypatch):
+        client = self.make_client(monkeypatch, "s3cret", debug=False)
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
@@ -0,0 +1,259 @@
+"""
+test_notifications.py
+Unit Tests for notification pagination / push (routes/notifications.py), utils/notification_counter.py
+and utils/notification_stream.py
+
+Test Coverage: 13 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+get_notifications / count_unread_notifications are replaced by stubs; Redis by the conftest.py FakeRedis
+(fake_redis, with the counter's Lua scripts emulated in Python).
+
+Test Classes:
+- TestPagination (3 tests)
+  Next-page cursor round trip, no header on the last page, malformed cursor -> 400
+
+- TestUnreadCounter (5 tests)
+  Miss seeds from COUNT(*) on the primary, incr counts each notification, incr skips unseeded counters,
+  incr during the COUNT is not lost, reset drops the counter
+
+- TestPush (5 tests)
+  Publish carries the delta + new unread count, hub fans out to that member only, ticket carries the token's exp,
+  SSE stream sends unread on connect and ends at exp, unknown / reused ticket -> 401
+"""
+
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import config.database as database
+import routes.notifications as notification_routes
+import utils.notification_counter as counter
+import utils.notification_stream as stream
+from utils.auth_utils import create_access_token, get_current_user
+
+
+# ============================================
+# notification_counter.py 的三個 Lua script，照同樣的邏輯在記憶體裡執行 (登記到 conftest 的 FakeRedis)
+def incr_if_exists(client, keys, args):
+    key, gen_key = keys
+    if key in client.data:
+        return client.incr(key, args[0])
+    client.incr(gen_key)
+    return None
+
+
+def seed_if_unchanged(client, keys, args):
+    key, gen_key = keys
+    if client.data.get(gen_key, "0") != args[1]:
+        return 0
+    client.set(key, args[0], nx=True)
+    return 1
+
+
+def reset(client, keys, args):
+    key, gen_key = keys
+    client.data.pop(key, None)
+    client.incr(gen_key)
+    return 1
+
+
+# 假的 asyncio pub/sub：訂閱成功、永遠沒有訊息 (測試直接呼叫 hub.dispatch 模擬收到訊息)
+class FakeAsyncPubSub:
+    async def psubscribe(self, pattern):
+        pass
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        await asyncio.sleep(timeout)
+
+    async def aclose(self):
+        pass
+
+
+class FakeAsyncClient:
+    def pubsub(self, ignore_subscribe_messages=True):
+        return FakeAsyncPubSub()
+
+    async def aclose(self):
+        pass
+
+
+# 25 筆通知, id 25 最新；其中 3 筆同一秒建立 (測 created_at 相同時用 id 排序)
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+ROWS = [{"id": i, "message": f"通知 {i}", "url": "/member_buy", "is_read": 0,
+         "created_at": NOW - timedelta(seconds=max(25 - i, 3))} for i in range(1, 26)]
+
+
+def fake_get_notifications(member_id, limit, before=None):
+    rows = sorted(ROWS, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    if before is not None:
+        rows = [r for r in rows if (r["created_at"], r["id"]) < before]
+    return rows[:limit]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = FastAPI()
+    app.include_router(notification_routes.router)
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": 7, "name": "a", "email": "a@example.com"}
+    monkeypatch.setattr(notification_routes, "get_notifications", fake_get_notifications)
+    return TestClient(app)
+
+
+@pytest.fixture
+def fake_redis(fake_redis):
+    fake_redis.scripts.update({counter.INCR_IF_EXISTS: incr_if_exists,
+                               counter.SEED_IF_UNCHANGED: seed_if_unchanged,
+                               counter.RESET: reset})
+    return fake_redis
+# ============================================
+
+
+
+
+# ============================================
+class TestPagination:
+
+    def test_pages_cover_everything_once(self, client):
+        seen, cursor = [], None
+
+        while True:
+            params = {"limit": 10} | ({"cursor": cursor} if cursor else {})
+            res = client.get("/api/notifications", params=params)
+            seen += [n["id"] for n in res.json()]
+            cursor = res.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert seen == list(range(25, 0, -1))
+
+    def test_last_page_has_no_cursor(self, client):
+        res = client.get("/api/notifications", params={"limit": 25})
+
+        assert len(res.json()) == 25
+        assert "X-Next-Cursor" not in res.headers
+
+    def test_bad_cursor(self, client):
+        res = client.get("/api/notifications", params={"cursor": "not-a-cursor"})
+
+        assert res.status_code == 400
+# ============================================
+
+
+
+
+# ============================================
+class TestUnreadCounter:
+
+    def test_miss_seeds_from_db(self, fake_redis, monkeypatch):
+        calls = []
+        monkeypatch.setattr(counter, "count_unread_notifications",
+                            lambda m: calls.append((m, database._primary_only.get())) or 4)
+
+        assert counter.get_unread_count(7) == 4
+        assert counter.get_unread_count(7) == 4
+        assert calls == [(7, True)]                     # 只查一次，而且走主庫
+
+    def test_incr_counts_each_notification(self, fake_redis):
+        fake_redis.data[counter.KEY_PREFIX + "7"] = "0"
+
+        counter.incr_unread([7, 7, 8])
+
+        assert counter.get_unread_count(7) == 2
+
+    def test_incr_skips_unseeded(self, fake_redis, monkeypatch):
+        monkeypatch.setattr(counter, "count_unread_notifications", lambda m: 5)
+
+        counter.incr_unread([7])              # 計數器還沒建立 → 不動，讀取時從資料庫重算
+
+        assert counter.get_unread_count(7) == 5
+
+    def test_incr_during_count_is_not_lost(self, fake_redis, monkeypatch):
+        def count_then_new_notification(member_id):
+            counter.incr_unread([member_id])        # COUNT 之後、寫入計數器之前又來一筆通知
+            return 3
+        monkeypatch.setattr(counter, "count_unread_notifications", count_then_new_notification)
+
+        assert counter.get_unread_count(7) == 3
+
+        monkeypatch.setattr(counter, "count_unread_notifications", lambda m: 4)
+        assert counter.get_unread_count(7) == 4       # 沒有把舊的 3 寫進去，重算後才建立計數器
+
+    def test_reset_drops_counter(self, fake_redis, monkeypatch):
+        fake_redis.data[counter.KEY_PREFIX + "7"] = "5"
+        monkeypatch.setattr(counter, "count_unread_notifications", lambda m: 1)
+
+        counter.reset_unread(7)                       # 標記已讀之後又新增了 1 筆 → 重算得到 1，不是 0
+
+        assert counter.get_unread_count(7) == 1
+# ============================================
+
+
+
+
+# ============================================
+class TestPush:
+
+    def test_publish_delta_with_unread(self, fake_redis):
+        fake_redis.data[counter.KEY_PREFIX + "7"] = "0"
+
+        stream.push_notifications([{"member_id": 7, "message": "訂單 #1 已出貨，請確認物流", "url": "/member_buy"}])
+
+        channel, message = fake_redis.published[0]
+        assert channel == "notif:7"
+        assert json.loads(message) == {"message": "訂單 #1 已出貨，請確認物流", "url": "/member_buy", "unread": 1}
+
+    def test_hub_fans_out_to_member_only(self):
+        hub = stream.NotificationHub(client_factory=FakeAsyncClient)
+
+        async def scenario():
+            async with hub.listen(7) as mine, hub.listen(8) as other:
+                hub.dispatch("notif:7", "hello")
+                got = await asyncio.wait_for(mine.get(), 1)
+                assert other.empty()
+            await hub.close()
+            return got
+
+        assert asyncio.run(scenario()) == "hello"
+        assert hub.listener_count == 0
+
+    def test_ticket_carries_token_exp(self, fake_redis):
+        app = FastAPI()
+        app.include_router(notification_routes.router)
+        token = create_access_token({"id": 7, "name": "a", "email": "a@example.com"}, timedelta(minutes=5))
+
+        res = TestClient(app).post("/api/notifications/stream_ticket", headers={"Authorization": f"Bearer {token}"})
+
+        member_id, expires_at = stream.redeem_stream_ticket(res.json()["ticket"])
+        assert member_id == 7
+        assert expires_at == pytest.approx(time.time() + 300, abs=5)
+        assert token not in json.dumps(fake_redis.data)
+
+    def test_stream_sends_unread_and_ends_at_exp(self, fake_redis, monkeypatch):
+        app = FastAPI()
+        app.include_router(notification_routes.router)
+        monkeypatch.setattr(notification_routes, "notification_hub", stream.NotificationHub(FakeAsyncClient))
+        monkeypatch.setattr(counter, "count_unread_notifications", lambda m: 3)
+        ticket = stream.issue_stream_ticket(7, time.time())         # token 已到期 → 送完未讀數就結束
+
+        res = TestClient(app).get("/api/notifications/stream", params={"ticket": ticket})
+
+        assert res.headers["content-type"].startswith("text/event-stream")
+        assert 'event: unread\ndata: {"unread": 3}' in res.text
+
+    def test_stream_rejects_unknown_or_used_ticket(self, fake_redis):
+        app = FastAPI()
+        app.include_router(notification_routes.router)
+        ticket = stream.issue_stream_ticket(7, time.time() + 60)
+        stream.redeem_stream_ticket(ticket)
+
+        reused = TestClient(app).get("/api/notifications/stream", params={"ticket": ticket})
+        unknown = TestClient(app).get("/api/notifications/stream", params={"ticket": "bad"})
+
+        assert reused.status_code == 401
+        assert unknown.status_code == 401
+# ============================================
@@ -0,0 +1,140 @@
+"""
+test_outbox.py
+Unit Tests for the notification outbox (models/outbox_model.py, utils/outbox_dispatcher.py)
+
+Test Coverage: 7 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+claim / mark functions and send_emails_async are replaced by stubs; enqueue uses a recording cursor (no DB).
+
+Test Classes:
+- TestEnqueue (1 test)
+  One multi-row INSERT, payload stored as JSON
+
+- TestRetryDelay (2 tests)
+  Exponential backoff capped at RETRY_MAX_SECONDS, None once MAX_ATTEMPTS is reached
+
+- TestDrain (4 tests)
+  Delivered rows marked sent in one call, failed send rescheduled with backoff, exception on the last attempt -> failed,
+  lease renewed while a slow batch is still sending
+"""
+
+
+import asyncio
+import json
+import time
+
+import pytest
+
+import utils.outbox_dispatcher as dispatcher
+from models.outbox_model import enqueue_emails
+
+
+# ============================================
+class RecordingCursor:
+    def __init__(self):
+        self.calls = []
+
+    def executemany(self, sql, rows):
+        self.calls.append((sql, rows))
+
+
+def make_row(outbox_id, attempts=1, to=None):
+    return {"id": outbox_id, "kind": "email", "attempts": attempts,
+            "payload": {"to": to or f"user{outbox_id}@example.com", "subject": "s", "body": "b"}}
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    state = {"rows": [], "sent": [], "failed": [], "renewed": [], "fail_to": set(), "raise_to": set(), "send_seconds": 0}
+
+    def fake_send(emails):
+        time.sleep(state["send_seconds"])
+        if any(e["to"] in state["raise_to"] for e in emails):
+            raise RuntimeError("boom")
+        return [e["to"] not in state["fail_to"] for e in emails]
+
+    monkeypatch.setattr(dispatcher, "claim_outbox_batch", lambda limit, lease: state["rows"][:limit])
+    monkeypatch.setattr(dispatcher, "extend_outbox_lease", lambda ids, lease: state["renewed"].append(list(ids)))
+    monkeypatch.setattr(dispatcher, "mark_outbox_sent", lambda ids: state["sent"].append(list(ids)))
+    monkeypatch.setattr(dispatcher, "mark_outbox_failed", lambda i, err, delay: state["failed"].append((i, delay)))
+    monkeypatch.setattr(dispatcher, "send_emails_async", fake_send)
+    return state
+# ============================================
+
+
+
+
+# ============================================
+class TestEnqueue:
+
+    def test_single_insert_with_json_payload(self):
+        cursor = RecordingCursor()
+        emails = [{"to": "a@example.com", "subject": "付款通知", "body": "x"},
+                  {"to": "b@example.com", "subject": "付款通知", "body": "y"}]
+
+        enqueue_emails(cursor, emails)
+
+        sql, rows = cursor.calls[0]
+        assert len(cursor.calls) == 1
+        assert "notification_outbox" in sql
+        assert [json.loads(r[0]) for r in rows] == emails
+# ============================================
+
+
+
+
+# ============================================
+class TestRetryDelay:
+
+    def test_backoff_doubles_and_caps(self, monkeypatch):
+        monkeypatch.setattr(dispatcher, "MAX_ATTEMPTS", 20)
+
+        assert [dispatcher.retry_delay(n) for n in (1, 2, 3)] == [30, 60, 120]
+        assert dispatcher.retry_delay(15) == dispatcher.RETRY_MAX_SECONDS
+
+    def test_gives_up_at_max_attempts(self):
+        assert dispatcher.retry_delay(dispatcher.MAX_ATTEMPTS) is None
+# ============================================
+
+
+
+
+# ============================================
+class TestDrain:
+
+    def test_delivered_rows_marked_sent(self, outbox):
+        outbox["rows"] = [make_row(1), make_row(2), make_row(3)]
+
+        claimed = asyncio.run(dispatcher.drain_outbox_once(batch_size=10, lease_seconds=60))
+
+        assert claimed == 3
+        assert outbox["sent"] == [[1, 2, 3]]
+        assert outbox["failed"] == []
+
+    def test_failed_send_rescheduled(self, outbox):
+        outbox["rows"] = [make_row(1), make_row(2, attempts=2, to="down@example.com")]
+        outbox["fail_to"] = {"down@example.com"}
+
+        asyncio.run(dispatcher.drain_outbox_once(batch_size=10, lease_seconds=60))
+
+        assert outbox["sent"] == [[1]]
+        assert outbox["failed"] == [(2, dispatcher.retry_delay(2))]
+
+    def test_exception_on_last_attempt_gives_up(self, outbox):
+        outbox["rows"] = [make_row(1, attempts=dispatcher.MAX_ATTEMPTS, to="boom@example.com")]
+        outbox["raise_to"] = {"boom@example.com"}
+
+        asyncio.run(dispatcher.drain_outbox_once(batch_size=10, lease_seconds=60))
+
+        assert outbox["sent"] == [[]]
+        assert outbox["failed"] == [(1, None)]
+
+    def test_lease_renewed_during_slow_delivery(self, outbox):
+        outbox["rows"] = [make_row(1), make_row(2)]
+        outbox["send_seconds"] = 0.25              # 租約 0.3 秒 → 每 0.1 秒續租
+
+        asyncio.run(dispatcher.drain_outbox_once(batch_size=10, lease_seconds=0.3))
+
+        assert len(outbox["renewed"]) >= 2
+        assert outbox["renewed"][0] == [1, 2]
+        assert outbox["sent"] == [[1, 2]]
+# ============================================
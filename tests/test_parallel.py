@@ -0,0 +1,54 @@
+# tests/test_parallel.py
+# recsys_offline/parallel.py 的單元測試：切 shard 的規則與「平行 = 單行程」的保證。
+
+import pytest
+
+# pandas / pyarrow 在 requirements-analytics.txt，CI 只裝 requirements.txt 時整個檔案略過
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from recsys_offline.parallel import make_shards, run_sharded, shard_seeds
+
+
+# 模組層級函式才能送進子行程：回傳這個 shard 每位會員的事件數與種子
+def count_events(events, shard, context):
+    sizes = events.groupby("member_id").size()
+    return [(uid, int(sizes.get(uid, 0)) * context, shard.seed) for uid in shard.members]
+
+
+class TestMakeShards:
+    def test_covers_all_members_in_order(self):
+        members = list(range(1, 11))
+        shards = make_shards(members, 3)
+        assert [m for s in shards for m in s.members] == members
+        assert [len(s.members) for s in shards] == [4, 3, 3]
+
+    def test_single_shard_keeps_base_seed(self):
+        assert [s.seed for s in make_shards([1, 2, 3, 4], 1, seed=7)] == [7]
+
+    def test_spawned_seeds_are_deterministic_and_distinct(self):
+        shards = make_shards([1, 2, 3, 4], 2, seed=7)
+        assert [s.seed for s in shards] == shard_seeds(7, 2)
+        assert len(set(shard_seeds(7, 4))) == 4
+        assert not set(shard_seeds(7, 4)) & set(shard_seeds(8, 4))     # 相鄰的 SEED 不共用種子
+
+    def test_more_shards_than_members(self):
+        assert len(make_shards([1, 2], 8)) == 2
+
+    def test_empty_members(self):
+        assert make_shards([], 4) == []
+
+
+class TestRunSharded:
+    def test_parallel_matches_serial(self):
+        events = pd.DataFrame({"member_id": [1, 2, 2, 3, 3, 3, 4], "game_id": range(7)})
+        shards = make_shards([1, 2, 3, 4], 3, seed=7)
+        serial = run_sharded(count_events, events, shards, context=10, workers=1)
+        parallel = run_sharded(count_events, events, shards, context=10, workers=2)
+        assert serial == parallel
+        seeds = shard_seeds(7, 3)
+        assert [row for part in serial for row in part][:3] == [(1, 10, seeds[0]), (2, 20, seeds[0]), (3, 30, seeds[1])]
+
+    def test_no_shards(self):
+        events = pd.DataFrame({"member_id": [1], "game_id": [1]})
+        assert run_sharded(count_events, events, [], context=1, workers=4) == []
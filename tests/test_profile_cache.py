@@ -0,0 +1,118 @@
+"""
+test_profile_cache.py
+Unit Tests for utils/profile_cache.py
+
+Test Coverage: 7 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+Redis is replaced by the in-memory FakeRedis (conftest.py fake_redis); get_user_profile is replaced by a counting stub (no DB).
+
+Test Classes:
+- TestBuildProfile (2 tests)
+  favorite_teams decoded once, bad JSON -> [], avg_rating Decimal -> float, datetimes -> ISO strings
+
+- TestCacheAside (5 tests)
+  Hit skips the DB, miss fills from the primary, stale fill does not overwrite write-through, rating invalidation,
+  Redis down falls back to DB
+"""
+
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import config.database as database
+import utils.profile_cache as profile_cache
+
+
+# ============================================
+def make_row(**overrides):
+    row = {
+        "id": 123, "name": "測試使用者", "email": "test@example.com", "phone": "0912345678",
+        "city": "台北市", "favorite_teams": '["中信兄弟", "樂天桃猿"]',
+        "created_at": datetime(2025, 6, 1, 12, 0), "updated_at": datetime(2025, 6, 2, 8, 30),
+        "avg_rating": Decimal("4.5000"),
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def db(monkeypatch):
+    state = {"row": make_row(), "calls": 0, "primary": []}
+
+    def fake_get_user_profile(user_id):
+        state["calls"] += 1
+        state["primary"].append(database._primary_only.get())
+        return dict(state["row"])
+    monkeypatch.setattr(profile_cache, "get_user_profile", fake_get_user_profile)
+    return state
+# ============================================
+
+
+
+
+# ============================================
+class TestBuildProfile:
+
+    def test_converts_fields(self):
+        profile = profile_cache.build_profile(make_row())
+
+        assert profile["favorite_teams"] == ["中信兄弟", "樂天桃猿"]
+        assert profile["avg_rating"] == 4.5
+        assert profile["created_at"] == "2025-06-01T12:00:00"
+
+    def test_bad_json_and_no_rating(self):
+        profile = profile_cache.build_profile(make_row(favorite_teams="not json", avg_rating=None))
+
+        assert profile["favorite_teams"] == []
+        assert profile["avg_rating"] is None
+# ============================================
+
+
+
+
+# ============================================
+class TestCacheAside:
+
+    def test_hit_skips_db(self, db, fake_redis):
+        first = profile_cache.get_member_profile(123)
+
+        second = profile_cache.get_member_profile(123)
+
+        assert first == second
+        assert db["calls"] == 1
+
+    def test_miss_fills_from_primary(self, db, fake_redis):
+        profile_cache.invalidate_member_profile(123)         # 剛寫入評分 → 下一次讀取重新計算
+
+        profile_cache.get_member_profile(123)
+
+        assert db["primary"] == [True]
+        assert database._primary_only.get() is False
+
+    def test_fill_does_not_overwrite_write_through(self, db, fake_redis):
+        db["row"] = make_row(name="新名字")
+        profile_cache.refresh_member_profile(123)
+
+        profile_cache._store(123, profile_cache.build_profile(make_row()), only_if_missing=True)   # 比較慢的舊資料
+
+        assert profile_cache.get_member_profile(123)["name"] == "新名字"
+
+    def test_invalidate_recomputes_rating(self, db, fake_redis):
+        profile_cache.get_member_profile(123)
+        db["row"] = make_row(avg_rating=Decimal("3.0"))
+
+        profile_cache.invalidate_member_profile(123)
+
+        assert profile_cache.get_member_profile(123)["avg_rating"] == 3.0
+
+    def test_redis_down_falls_back_to_db(self, db, monkeypatch):
+        def broken():
+            raise ConnectionError("redis down")
+        monkeypatch.setattr(profile_cache, "get_redis_client", broken)
+
+        profile = profile_cache.get_member_profile(123)
+
+        assert profile["name"] == "測試使用者"
+        assert db["calls"] == 1
+# ============================================
@@ -0,0 +1,60 @@
+# tests/test_query_stats.py
+# utils/query_stats.py 的單元測試：SQL 指紋正規化、top-N 排序、視窗輪替。
+
+from utils import query_stats
+from utils.query_stats import dump_and_roll, fingerprint, record_query, top_queries
+
+
+class TestFingerprint:
+    def test_placeholders_and_literals_collapse(self):
+        a = fingerprint("SELECT id FROM ratings WHERE order_id = %s AND rater_id = %s")
+        b = fingerprint("select id  from ratings\n WHERE order_id = 12 AND rater_id = 'x''y'")
+        assert a == b == "select id from ratings where order_id = ? and rater_id = ?"
+
+    def test_in_lists_and_multi_row_values(self):
+        assert fingerprint("SELECT * FROM t WHERE seat_area IN (%s, %s, %s)") == \
+            fingerprint("SELECT * FROM t WHERE seat_area IN (%s)") == "select * from t where seat_area in (?+)"
+        assert fingerprint("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')") == \
+            fingerprint("INSERT INTO t (a, b) VALUES (%s, %s)")
+
+    def test_identifiers_with_digits_and_comments(self):
+        fp = fingerprint("SELECT t1.id -- 註解 2\nFROM p202606 t1 /* hint 3 */ LIMIT 5")
+        assert fp == "select t1.id from p202606 t1 limit ?"
+
+    def test_memoized_per_sql_text(self):
+        query_stats._fingerprint_text.cache_clear()
+        sql = "SELECT id FROM tickets WHERE game_id = %s"
+
+        fingerprint(sql)
+        fingerprint(sql)
+        fingerprint(sql.encode())
+
+        info = query_stats._fingerprint_text.cache_info()
+        assert (info.hits, info.misses) == (2, 1)
+
+
+class TestWindows:
+    def test_top_n_and_roll(self):
+        dump_and_roll()                                  # 從乾淨的視窗開始
+        for i in range(5):
+            record_query(f"SELECT * FROM orders WHERE buyer_id = {i}", 0.002)
+        record_query("SELECT * FROM games WHERE id = 1", 0.050)
+
+        current = top_queries(1)["current"]
+        assert current["by_count"][0]["fingerprint"] == "select * from orders where buyer_id = ?"
+        assert current["by_count"][0]["count"] == 5
+        assert current["by_max_time"][0]["fingerprint"] == "select * from games where id = ?"
+
+        finished = dump_and_roll()
+        assert finished["distinct_queries"] == 2
+        stats = top_queries()
+        assert stats["current"]["distinct_queries"] == 0
+        assert stats["previous"]["distinct_queries"] == 2
+
+    def test_fingerprint_cap(self, monkeypatch):
+        dump_and_roll()
+        monkeypatch.setattr(query_stats, "MAX_FINGERPRINTS", 2)
+        for table in ("a", "b", "c", "d"):
+            record_query(f"SELECT * FROM {table}", 0.001)
+        names = {r["fingerprint"] for r in top_queries()["current"]["by_count"]}
+        assert names == {"select * from a", "select * from b", query_stats.OTHER}
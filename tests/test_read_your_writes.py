@@ -0,0 +1,103 @@
+"""
+test_read_your_writes.py
+Unit Tests for utils/read_your_writes.py (read-your-writes stickiness for read-replica routing)
+
+Test Coverage: 5 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+The asyncio Redis client is replaced by an in-memory fake; tokens are real JWTs from create_access_token.
+
+Test Classes:
+- TestWriterKey (2 tests)
+  Keyed on the verified member id (same key after a token refresh), invalid token -> None
+
+- TestStickiness (3 tests)
+  Local LRU never grows past LOCAL_MAX_KEYS, marker seen by another worker through Redis,
+  Redis hanging -> primary after REDIS_TIMEOUT_SECONDS without blocking the loop
+
+Dependencies: conftest.py provides sample_user_data fixture
+"""
+
+
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+
+import utils.read_your_writes as ryw
+from utils.auth_utils import create_access_token
+
+
+# ============================================
+# 假的 asyncio Redis：hang=True 時每個指令都卡住 (模擬 Redis 沒回應)
+class FakeAsyncRedis:
+    def __init__(self, hang=False):
+        self.data = {}
+        self.hang = hang
+
+    async def set(self, key, value, px=None):
+        if self.hang:
+            await asyncio.sleep(10)
+        self.data[key] = str(value)
+
+    async def exists(self, key):
+        if self.hang:
+            await asyncio.sleep(10)
+        return int(key in self.data)
+
+
+@pytest.fixture
+def fake_async_redis(monkeypatch):
+    client = FakeAsyncRedis()
+    monkeypatch.setattr(ryw, "_redis", lambda: client)
+    monkeypatch.setattr(ryw, "_local", ryw.OrderedDict())
+    return client
+# ============================================
+
+
+
+
+# ============================================
+class TestWriterKey:
+
+    def test_same_member_same_key_across_tokens(self, sample_user_data):
+        first = create_access_token(sample_user_data, timedelta(minutes=15))
+        refreshed = create_access_token(sample_user_data, timedelta(minutes=16))
+
+        assert first != refreshed
+        assert ryw.writer_key(f"Bearer {first}") == ryw.writer_key(f"Bearer {refreshed}") == str(sample_user_data["id"])
+
+    def test_invalid_token_is_none(self):
+        assert ryw.writer_key("Bearer not-a-jwt") is None
+        assert ryw.writer_key(None) is None
+# ============================================
+
+
+
+
+# ============================================
+class TestStickiness:
+
+    def test_local_lru_is_bounded(self, fake_async_redis, monkeypatch):
+        monkeypatch.setattr(ryw, "LOCAL_MAX_KEYS", 2)
+
+        for key in ("1", "2", "3"):
+            asyncio.run(ryw.mark_recent_writer(key))
+
+        assert list(ryw._local) == ["2", "3"]
+
+    def test_other_worker_sees_marker_in_redis(self, fake_async_redis):
+        asyncio.run(ryw.mark_recent_writer("7"))
+        ryw._local.clear()                           # 另一個 worker：本機沒有記錄
+
+        assert asyncio.run(ryw.is_recent_writer("7")) is True
+        assert asyncio.run(ryw.is_recent_writer("8")) is False
+
+    def test_redis_hang_falls_back_to_primary(self, fake_async_redis):
+        fake_async_redis.hang = True
+
+        start = time.monotonic()
+        recent = asyncio.run(ryw.is_recent_writer("8"))
+
+        assert recent is True
+        assert time.monotonic() - start < 1
+# ============================================
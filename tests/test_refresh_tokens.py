@@ -0,0 +1,198 @@
+"""
+test_refresh_tokens.py
+Unit Tests for utils/refresh_tokens.py POST /api/user/refresh (routes/auth.py) and
+PUT /api/user/profile password / email change (routes/users.py)
+
+Test Coverage: 10 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+Redis is replaced by the in-memory FakeRedis (conftest.py fake_redis).
+
+Test Classes:
+- TestRotate (4 tests)
+  Rotation: returns member id + new token (no email / name stored), old token single-use, reuse after grace revokes all, unknown token 401
+
+- TestRevoke (2 tests)
+  Logout: one token, every token of a member
+
+- TestRedisDown (1 test)
+  Redis errors during refresh surface as 503 (never silently accepted)
+
+- TestRefreshApi (2 tests)
+  Returns a new pair and consumes the old token; a failed member read (500) leaves the old token usable
+
+- TestProfileChange (1 test)
+  Password change revokes every refresh token and returns a new pair for the device that made the change
+
+Dependencies: conftest.py provides sample_user_data and fake_redis fixtures
+"""
+
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import routes.auth as auth_routes
+import routes.users as users_routes
+import utils.refresh_tokens as refresh_tokens
+from utils.auth_utils import get_current_user
+
+
+# ============================================
+class TestRotate:
+
+    def test_returns_member_id_and_new_token(self, fake_redis, sample_user_data):
+        token = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+
+        user_id, new_token = refresh_tokens.rotate_refresh_token(token)
+
+        assert user_id == sample_user_data["id"]
+        assert new_token != token
+        assert refresh_tokens.rotate_refresh_token(new_token)[0] == sample_user_data["id"]
+        assert all("email" not in v for v in fake_redis.data.values() if isinstance(v, str))
+
+    def test_old_token_is_single_use(self, fake_redis, sample_user_data):
+        token = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+        refresh_tokens.rotate_refresh_token(token)
+
+        with pytest.raises(HTTPException) as exc_info:
+            refresh_tokens.rotate_refresh_token(token)
+
+        assert exc_info.value.status_code == 401
+
+    def test_reuse_after_grace_revokes_all(self, fake_redis, sample_user_data, monkeypatch):
+        token = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+        other_device = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+        _, rotated = refresh_tokens.rotate_refresh_token(token)
+        monkeypatch.setattr(refresh_tokens, "REFRESH_REUSE_GRACE_SECONDS", -1)
+
+        with pytest.raises(HTTPException):
+            refresh_tokens.rotate_refresh_token(token)      # 舊 token 被重送 → 視為外洩
+
+        for t in (rotated, other_device):
+            with pytest.raises(HTTPException) as exc_info:
+                refresh_tokens.rotate_refresh_token(t)
+            assert exc_info.value.status_code == 401
+
+    def test_unknown_token_is_401(self, fake_redis):
+        with pytest.raises(HTTPException) as exc_info:
+            refresh_tokens.rotate_refresh_token("not-a-token")
+
+        assert exc_info.value.status_code == 401
+# ============================================
+
+
+
+
+# ============================================
+class TestRevoke:
+
+    def test_logout_revokes_one_token(self, fake_redis, sample_user_data):
+        token = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+        other_device = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+
+        refresh_tokens.revoke_refresh_token(token)
+
+        with pytest.raises(HTTPException):
+            refresh_tokens.rotate_refresh_token(token)
+        assert refresh_tokens.rotate_refresh_token(other_device)[0] == sample_user_data["id"]
+
+    def test_revoke_all(self, fake_redis, sample_user_data):
+        tokens = [refresh_tokens.issue_refresh_token(sample_user_data["id"]) for _ in range(3)]
+
+        revoked = refresh_tokens.revoke_all_refresh_tokens(sample_user_data["id"])
+
+        assert revoked == 3
+        for t in tokens:
+            with pytest.raises(HTTPException):
+                refresh_tokens.rotate_refresh_token(t)
+# ============================================
+
+
+
+
+# ============================================
+class TestRedisDown:
+
+    def test_redis_error_is_503(self, monkeypatch):
+        def broken():
+            raise ConnectionError("redis down")
+        monkeypatch.setattr(refresh_tokens, "get_redis_client", broken)
+
+        with pytest.raises(HTTPException) as exc_info:
+            refresh_tokens.rotate_refresh_token("any")
+
+        assert exc_info.value.status_code == 503
+# ============================================
+
+
+
+
+# ============================================
+@pytest.fixture
+def api(fake_redis, sample_user_data, monkeypatch):
+    state = {"fail": False}
+
+    def fake_get_member_profile(user_id):
+        if state["fail"]:
+            raise ConnectionError("db down")
+        return dict(sample_user_data)
+    monkeypatch.setattr(auth_routes, "get_member_profile", fake_get_member_profile)
+    app = FastAPI()
+    app.include_router(auth_routes.router)
+    state["client"] = TestClient(app)
+    return state
+
+
+class TestRefreshApi:
+
+    def test_returns_new_pair_and_consumes_old(self, api, sample_user_data):
+        token = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+
+        res = api["client"].post("/api/user/refresh", json={"refresh_token": token})
+
+        assert res.status_code == 200
+        assert res.json()["refresh_token"] != token
+        assert refresh_tokens.refresh_token_owner(token) is None
+
+    def test_failed_member_read_keeps_old_token(self, api, sample_user_data):
+        token = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+        api["fail"] = True
+
+        failed = api["client"].post("/api/user/refresh", json={"refresh_token": token})
+        api["fail"] = False
+        retried = api["client"].post("/api/user/refresh", json={"refresh_token": token})
+
+        assert failed.status_code == 500
+        assert retried.status_code == 200
+# ============================================
+
+
+
+
+# ============================================
+async def fake_hash(password):
+    return "hashed"
+
+
+class TestProfileChange:
+
+    def test_password_change_returns_new_pair(self, fake_redis, sample_user_data, monkeypatch):
+        profile = dict(sample_user_data, phone="0912345678", city=None, favorite_teams=[],
+                       created_at="2026-01-01T00:00:00", updated_at="2026-01-01T00:00:00")
+        monkeypatch.setattr(users_routes, "hash_password_async", fake_hash)
+        monkeypatch.setattr(users_routes, "update_member_profile", lambda clause, vals: None)
+        monkeypatch.setattr(users_routes, "refresh_member_profile", lambda user_id: profile)
+        app = FastAPI()
+        app.include_router(users_routes.router)
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": sample_user_data["id"]}
+        this_device = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+        other_device = refresh_tokens.issue_refresh_token(sample_user_data["id"])
+
+        res = TestClient(app).put("/api/user/profile", json={"password": "newsecret"})
+
+        body = res.json()
+        assert res.status_code == 200
+        assert body["access_token"]
+        assert refresh_tokens.refresh_token_owner(body["refresh_token"]) == sample_user_data["id"]
+        assert refresh_tokens.refresh_token_owner(this_device) is None
+        assert refresh_tokens.refresh_token_owner(other_device) is None
+# ============================================
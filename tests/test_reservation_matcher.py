@@ -0,0 +1,37 @@
+# tests/test_reservation_matcher.py
+# services/reservation_matcher.py 的單元測試：價格區間 / 座位區的比對規則，以及回傳順序 (票券在外層、預約在內層)。
+
+from services.reservation_matcher import match_reservations, parse_price_ranges
+
+
+def reservation(rid, price_ranges, seat_area):
+    return {"id": rid, "member_id": rid, "price_ranges": price_ranges, "seat_area": seat_area,
+            "email": f"user{rid}@example.com"}
+
+
+class TestParsePriceRanges:
+    def test_ranges(self):
+        assert parse_price_ranges('["401-699", "700-999"]') == [(401, 699), (700, 999)]
+
+    def test_zero_means_any_price(self):
+        assert parse_price_ranges('["0-0"]') is None
+        assert parse_price_ranges('["401-699", "0-0"]') is None
+
+
+class TestMatchReservations:
+    def test_price_and_area_rules(self):
+        reservations = [
+            reservation(1, '["0-0"]', "none"),          # 不限價格、不限區域
+            reservation(2, '["401-699"]', "內野"),
+            reservation(3, '["700-999"]', "內野"),      # 價格不符
+            reservation(4, '["401-699"]', "外野"),      # 區域不符
+            reservation(5, '["0-400", "500-500"]', "none"),   # 區間含端點
+        ]
+        matches = match_reservations([{"price": 500, "seat_area": "內野"}], reservations)
+        assert [r["id"] for r, _ in matches] == [1, 2, 5]
+
+    def test_ticket_major_order(self):
+        tickets = [{"price": 300, "seat_area": "外野"}, {"price": 800, "seat_area": "內野"}]
+        reservations = [reservation(1, '["0-0"]', "none"), reservation(2, '["0-400"]', "外野")]
+        pairs = [(t["price"], r["id"]) for r, t in match_reservations(tickets, reservations)]
+        assert pairs == [(300, 1), (300, 2), (800, 1)]
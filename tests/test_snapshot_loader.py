@@ -0,0 +1,84 @@
+# tests/test_snapshot_loader.py
+# recsys_offline/snapshot_loader.py 的單元測試：快照寫入 / 讀回，以及 base + delta part 的合併規則 (含 90 天窗口前移)。
+
+from datetime import date
+
+import pytest
+
+# pandas / pyarrow 在 requirements-analytics.txt，CI 只裝 requirements.txt 時整個檔案略過
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from recsys_offline.snapshot_loader import SnapshotWriter, load_snapshot, write_snapshot
+
+GAMES = pd.DataFrame({
+    "game_id": [1, 2], "game_date": [date(2026, 6, 1), date(2026, 6, 2)], "start_time": ["18:35:00"] * 2,
+    "team_home": ["中信兄弟", "樂天桃猿"], "team_away": ["味全龍", "富邦悍將"], "stadium": ["天母", "新莊"],
+})
+EVENTS = pd.DataFrame({
+    "member_id": [1, 2], "event_type": ["trade", "reservation"], "game_id": [1, 2],
+    "team_home": ["中信兄弟", "樂天桃猿"], "team_away": ["味全龍", "富邦悍將"],
+    "created_at": pd.to_datetime(["2026-05-20 10:00:00", "2026-05-21 11:00:00"]),
+})
+FAVORITES = pd.DataFrame({"member_id": [1, 2], "favorite_teams": ['["中信兄弟"]', '["樂天桃猿"]']})
+
+
+def write_delta(snapshot_dir, part, games, events, favorites, meta):
+    with SnapshotWriter(snapshot_dir, games, part=part) as writer:
+        writer.write_events(events)
+        writer.write_favorites(favorites)
+        writer.commit({**meta, "deltas": meta.get("deltas", []) + [{"part": part}]})
+
+
+class TestSnapshotRoundTrip:
+    def test_typed_columns(self, tmp_path):
+        write_snapshot(tmp_path, EVENTS, GAMES, FAVORITES, {"reference_date": "2026-06-01"})
+        snap = load_snapshot(tmp_path)
+        assert str(snap.events["event_type"].dtype) == "category"
+        assert snap.events["member_id"].dtype == "int32"
+        assert snap.games["game_date"].tolist() == [date(2026, 6, 1), date(2026, 6, 2)]
+        assert snap.favorites == {1: ["中信兄弟"], 2: ["樂天桃猿"]}
+        assert not list(tmp_path.glob("*.tmp"))
+
+
+class TestDeltaParts:
+    def test_merge_base_and_delta(self, tmp_path):
+        meta = {"reference_date": "2026-06-01"}
+        write_snapshot(tmp_path, EVENTS, GAMES, FAVORITES, meta)
+        new_game = pd.DataFrame({"game_id": [3], "game_date": [date(2026, 6, 3)], "start_time": ["17:05:00"],
+                                 "team_home": ["台鋼雄鷹"], "team_away": ["中信兄弟"], "stadium": ["洲際"]})
+        new_events = pd.DataFrame({"member_id": [1, 3], "event_type": ["trade", "trade"], "game_id": [2, 3],
+                                   "team_home": ["樂天桃猿", "台鋼雄鷹"], "team_away": ["富邦悍將", "中信兄弟"],
+                                   "created_at": pd.to_datetime(["2026-05-30 09:00:00"] * 2)})
+        new_favs = pd.DataFrame({"member_id": [2, 3], "favorite_teams": ['["味全龍"]', '["台鋼雄鷹"]']})
+        write_delta(tmp_path, "delta-0001", new_game, new_events, new_favs, meta)
+
+        snap = load_snapshot(tmp_path)
+        assert len(snap.events) == 4
+        assert snap.games["game_id"].tolist() == [1, 2, 3]
+        assert snap.favorites == {1: ["中信兄弟"], 2: ["味全龍"], 3: ["台鋼雄鷹"]}     # 較新的 part 為準
+        assert "台鋼雄鷹" in snap.teams
+        assert snap.events["team_home"].cat.categories.tolist() == snap.teams
+
+    def test_unlisted_part_is_ignored(self, tmp_path):
+        write_snapshot(tmp_path, EVENTS, GAMES, FAVORITES, {"reference_date": "2026-06-01"})
+        EVENTS.to_parquet(tmp_path / "behavior_events.delta-0009.parquet", index=False)   # 沒登記在 meta
+        assert len(load_snapshot(tmp_path).events) == 2
+
+    def test_new_base_drops_old_deltas(self, tmp_path):
+        meta = {"reference_date": "2026-06-01"}
+        write_snapshot(tmp_path, EVENTS, GAMES, FAVORITES, meta)
+        write_delta(tmp_path, "delta-0001", GAMES, EVENTS, FAVORITES, meta)
+        write_snapshot(tmp_path, EVENTS, GAMES, FAVORITES, meta)
+        assert not list(tmp_path.glob("*.delta-*.parquet"))
+        assert len(load_snapshot(tmp_path).events) == 2
+
+    def test_window_moves_forward_with_delta(self, tmp_path):
+        write_snapshot(tmp_path, EVENTS, GAMES, FAVORITES, {"reference_date": "2026-08-19", "window_start": "2026-05-21"})
+        newer = EVENTS.assign(created_at=pd.to_datetime(["2026-08-20 09:00:00"] * 2))
+        write_delta(tmp_path, "delta-0001", GAMES, newer, FAVORITES,
+                    {"reference_date": "2026-08-20", "window_start": "2026-05-22"})
+
+        snap = load_snapshot(tmp_path, columns=["member_id", "event_type"],
+                             filters=[("event_type", "==", "trade")])
+        assert snap.events["member_id"].tolist() == [1]       # base 的兩筆都已滑出窗口，只剩 delta 的 trade
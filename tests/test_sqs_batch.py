@@ -0,0 +1,154 @@
+"""
+test_sqs_batch.py
+Unit Tests for batched SQS sends (utils/sqs_utils.send_emails_to_queue, utils/email_utils.send_emails_async)
+
+Test Coverage: 6 test functions using pytest framework with AAA pattern (Arrange-Act-Assert)
+TestLocalQueue runs against moto's in-process SQS (skipped when moto is not installed, see requirements-perf.txt);
+the other classes use a fake client that fails chosen entries.
+
+Test Classes:
+- TestChunking (2 tests)
+  At most 10 entries per batch, a batch is also cut before it exceeds SQS_BATCH_MAX_BYTES
+
+- TestLocalQueue (1 test)
+  23 emails -> 3 send_message_batch calls, every message lands on the queue in the send_email_to_queue format
+
+- TestPartialFailure (3 tests)
+  AWS-side entry failure resent once, sender fault not resent, SMTP fallback only for the entries SQS rejected
+"""
+
+
+import json
+
+import pytest
+
+import utils.email_utils as email_utils
+import utils.sqs_utils as sqs_utils
+
+
+QUEUE_URL = "https://sqs.ap-northeast-1.amazonaws.com/123456789012/email-queue"
+
+
+# ============================================
+def make_emails(n):
+    return [{"to": f"user{i}@example.com", "subject": "Pitch-A-Seat 預約通知", "body": f"第 {i} 封"} for i in range(n)]
+
+
+# 假的 SQS client：fail = {收件人: SenderFault}，該收件人的 entry 回 Failed (每個收件人只失敗 times 次)
+class FakeSQS:
+    def __init__(self, fail=None, times=1):
+        self.fail = dict(fail or {})
+        self.times = times
+        self.failures = {}
+        self.calls = []
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.calls.append([e["Id"] for e in Entries])
+        ok, failed = [], []
+        for entry in Entries:
+            to = json.loads(entry["MessageBody"])["payload"]["to"]
+            if to in self.fail and self.failures.get(to, 0) < self.times:
+                self.failures[to] = self.failures.get(to, 0) + 1
+                failed.append({"Id": entry["Id"], "SenderFault": self.fail[to], "Code": "X", "Message": "x"})
+            else:
+                ok.append({"Id": entry["Id"], "MessageId": f"m{entry['Id']}"})
+        return {"Successful": ok, "Failed": failed}
+
+
+@pytest.fixture
+def use_client(monkeypatch):
+    monkeypatch.setattr(sqs_utils, "SQS_EMAIL_QUEUE_URL", QUEUE_URL)
+
+    def use(client):
+        monkeypatch.setattr(sqs_utils, "_sqs_client", client)
+        return client
+    return use
+# ============================================
+
+
+
+
+# ============================================
+class TestChunking:
+
+    def test_ten_entries_per_batch(self):
+        entries = [(i, "x") for i in range(25)]
+
+        sizes = [len(batch) for batch in sqs_utils._chunk_entries(entries)]
+
+        assert sizes == [10, 10, 5]
+
+    def test_byte_limit(self, monkeypatch):
+        monkeypatch.setattr(sqs_utils, "SQS_BATCH_MAX_BYTES", 100)
+        entries = [(i, "x" * 40) for i in range(5)]
+
+        sizes = [len(batch) for batch in sqs_utils._chunk_entries(entries)]
+
+        assert sizes == [2, 2, 1]
+# ============================================
+
+
+
+
+# ============================================
+class TestLocalQueue:
+
+    def test_all_messages_land_on_queue(self, use_client, monkeypatch):
+        moto = pytest.importorskip("moto")
+        import boto3
+        for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            monkeypatch.setenv(key, "testing")
+
+        with moto.mock_aws():
+            client = boto3.client("sqs", region_name="ap-northeast-1")
+            queue_url = client.create_queue(QueueName="email-queue")["QueueUrl"]
+            monkeypatch.setattr(sqs_utils, "SQS_EMAIL_QUEUE_URL", queue_url)
+            use_client(client)
+            emails = make_emails(23)
+
+            results = sqs_utils.send_emails_to_queue(emails)
+
+            received = []
+            while True:
+                batch = client.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get("Messages", [])
+                if not batch:
+                    break
+                received += [json.loads(m["Body"]) for m in batch]
+
+        assert results == [True] * 23
+        assert sorted(m["payload"]["to"] for m in received) == sorted(e["to"] for e in emails)
+        assert all(m["type"] == "email" for m in received)
+# ============================================
+
+
+
+
+# ============================================
+class TestPartialFailure:
+
+    def test_transient_failure_resent_once(self, use_client):
+        client = use_client(FakeSQS(fail={"user3@example.com": False}))
+
+        results = sqs_utils.send_emails_to_queue(make_emails(12))
+
+        assert results == [True] * 12
+        assert client.calls[-1] == ["3"]             # 第二輪只重送失敗的那一則
+
+    def test_sender_fault_not_resent(self, use_client):
+        client = use_client(FakeSQS(fail={"user3@example.com": True}))
+
+        results = sqs_utils.send_emails_to_queue(make_emails(12))
+
+        assert results == [i != 3 for i in range(12)]
+        assert len(client.calls) == 2                 # 10 + 2，沒有重送
+
+    def test_smtp_fallback_only_for_failed(self, use_client, monkeypatch):
+        use_client(FakeSQS(fail={"user1@example.com": True}))
+        smtp = []
+        monkeypatch.setattr(email_utils, "send_email", lambda to, subject, body: smtp.append(to) or True)
+
+        results = email_utils.send_emails_async(make_emails(3))
+
+        assert results == [True, True, True]
+        assert smtp == ["user1@example.com"]
+# ============================================
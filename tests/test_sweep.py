@@ -0,0 +1,76 @@
+# tests/test_sweep.py
+# recsys_offline/sweep.py 的單元測試：grid 展開、random search 可重現、排名與同分順序，
+# 以及 sweep() 在小型合成快照上的結果 (切幾個 shard 都一樣)。
+
+from datetime import date
+
+import pytest
+
+# pandas / pyarrow 在 requirements-analytics.txt，CI 只裝 requirements.txt 時整個檔案略過
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from recsys_offline import sweep as sweep_module
+from recsys_offline.evaluate import K
+from recsys_offline.snapshot_loader import load_snapshot
+from recsys_offline.sweep import RANDOM_SPACE, grid_configs, random_configs, rank_results, sweep
+from recsys_offline.synthetic_data import generate_snapshot
+from services.recommender import DEFAULT_PARAMS
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory):
+    path = tmp_path_factory.mktemp("snapshot")
+    generate_snapshot(reference_date=date(2026, 6, 1), output_dir=path)
+    return load_snapshot(path)
+
+
+class TestGridConfigs:
+    def test_cartesian_product_keeps_other_fields(self):
+        configs = grid_configs({"decay_rate": [0.01, 0.02], "popularity_weight": [0.0, 0.1, 0.2]})
+        assert len(configs) == 6
+        assert [(c.decay_rate, c.popularity_weight) for c in configs[:3]] == [(0.01, 0.0), (0.01, 0.1), (0.01, 0.2)]
+        assert {c.trade_weight for c in configs} == {DEFAULT_PARAMS.trade_weight}
+
+    def test_default_grid_contains_default_params(self):
+        assert DEFAULT_PARAMS in grid_configs()
+
+
+class TestRandomConfigs:
+    def test_same_seed_same_configs(self):
+        assert random_configs(20, seed=3) == random_configs(20, seed=3)
+        assert random_configs(20, seed=3) != random_configs(20, seed=4)
+
+    def test_baseline_first_and_values_in_range(self):
+        configs = random_configs(50)
+        assert configs[0] == DEFAULT_PARAMS
+        for params in configs[1:]:
+            for key, (low, high, _) in RANDOM_SPACE.items():
+                assert low <= getattr(params, key) <= high
+
+
+class TestRankResults:
+    def test_precision_then_hit_rate_then_input_order(self):
+        configs = grid_configs({"decay_rate": [0.01, 0.02, 0.03, 0.04]})
+        scores = {"cfg0": [(0.2, 1), (0.0, 0)], "cfg1": [(0.4, 1), (0.0, 0)],
+                  "cfg2": [(0.2, 1), (0.0, 1)], "cfg3": [(0.2, 1), (0.0, 0)]}
+
+        table = rank_results(configs, scores, n_users=2)
+
+        assert table["decay_rate"].tolist() == [0.02, 0.03, 0.01, 0.04]   # 同分 (cfg0 / cfg3) 維持原順序
+        assert table["rank"].tolist() == [1, 2, 3, 4]
+        assert table[f"precision@{K}"].iloc[0] == pytest.approx(0.2)
+        assert table["is_default"].tolist() == [False, False, True, False]
+
+
+class TestSweep:
+    def test_shards_do_not_change_results(self, snapshot, monkeypatch):
+        monkeypatch.setattr(sweep_module, "load_snapshot", lambda: snapshot)
+        configs = grid_configs({"decay_rate": [0.01, 0.05], "popularity_weight": [0.0, 0.1]})
+
+        single = sweep(configs + [DEFAULT_PARAMS], workers=1, n_shards=1)
+        sharded = sweep(configs, workers=1, n_shards=3)
+
+        assert len(single) == 4                                  # 重複的組合只算一次
+        pd.testing.assert_frame_equal(single, sharded)
+        assert single["is_default"].sum() == 1
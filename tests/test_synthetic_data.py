@@ -0,0 +1,51 @@
+# tests/test_synthetic_data.py
+# recsys_offline/synthetic_data.py 大規模產生器的單元測試：可重現、表與表之間的關聯正確、SQL 跳脫。
+
+from datetime import date
+
+import pytest
+
+# pandas / pyarrow 在 requirements-analytics.txt，CI 只裝 requirements.txt 時整個檔案略過
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from recsys_offline.synthetic_data import ScaleParams, _sql_literals, generate_dataset
+
+REF = date(2026, 6, 1)
+SMALL = ScaleParams(n_users=500, n_games=120, seed=7)
+
+
+class TestGenerateDataset:
+    def test_same_seed_same_data(self):
+        a, b = generate_dataset(SMALL, REF), generate_dataset(SMALL, REF)
+        for table in a:
+            pd.testing.assert_frame_equal(a[table], b[table])
+
+    def test_foreign_keys_are_valid(self):
+        ds = generate_dataset(SMALL, REF)
+        member_ids, game_ids = set(ds["members"]["id"]), set(ds["games"]["id"])
+        tickets, orders = ds["tickets_for_sale"], ds["orders"]
+        assert set(tickets["game_id"]) <= game_ids
+        assert set(tickets["seller_id"]) <= member_ids
+        assert set(ds["reservations"]["member_id"]) <= member_ids
+        assert set(ds["reservations"]["game_id"]) <= game_ids
+        assert set(orders["ticket_id"]) <= set(tickets[tickets["is_sold"] == 1]["id"])
+        assert (orders["buyer_id"] != orders["seller_id"]).all()
+
+    def test_trades_happen_before_their_game(self):
+        ds = generate_dataset(SMALL, REF)
+        games = ds["games"].set_index("id")["game_date"]
+        ticket_game = ds["tickets_for_sale"].set_index("id")["game_id"]
+        orders = ds["orders"]
+        game_dates = games.loc[ticket_game.loc[orders["ticket_id"]].to_numpy()].to_numpy()
+        assert (orders["created_at"].to_numpy() <= game_dates + pd.Timedelta(hours=9)).all()
+
+
+class TestSqlLiterals:
+    def test_escapes_quotes_and_backslashes(self):
+        assert _sql_literals(pd.Series(["O'Brien", "a\\b", None])) == ["'O\\'Brien'", "'a\\\\b'", "NULL"]
+
+    def test_numbers_and_datetimes(self):
+        assert _sql_literals(pd.Series([1, 2])) == ["1", "2"]
+        ts = pd.Series(pd.to_datetime(["2026-06-01 18:35:00", None]))
+        assert _sql_literals(ts) == ["'2026-06-01 18:35:00'", "NULL"]
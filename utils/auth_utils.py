@@ -3,20 +3,42 @@ auth_utils.py
 Authentication Utilities: JWT & Password Handling
 
 Functions:
-- hash_password(password)                   - Hash password using bcrypt
+- hash_password(password)                   - Hash password using bcrypt (cost = BCRYPT_ROUNDS)
 - verify_password(password, hashed)         - Verify password against hash
+- hash_password_async(password)             - hash_password run on the dedicated bcrypt thread pool (for async routes)
+- verify_password_async(password, hashed)   - verify_password run on the dedicated bcrypt thread pool (for async routes)
 - create_access_token(data, expires_delta)  - Generate JWT token
-- verify_token(token)                       - Decode and validate JWT token
+- verify_token(token)                       - Decode and validate JWT token (served from the verified-token cache when possible)
+- token_expires_at(token)                   - exp of a valid token (unix seconds); None if the token has no exp
+- revoke_token(token)                       - Drop one token from the verified-token cache
+- clear_token_cache()                       - Drop every cached token (eg. after rotating JWT_SECRET_KEY)
+- set_revocation_check(fn)                  - Register fn(payload) -> bool; True = token revoked, checked on every request
 - get_current_user(authorization)           - Extract user info from Authorization header
+
+Design:
+- bcrypt costs ~250ms of CPU per call; calling it directly in an `async def` route blocks the event loop,
+  so every other request on the worker waits. The async variants run it on a small dedicated
+  ThreadPoolExecutor (BCRYPT_MAX_CONCURRENCY threads): bcrypt releases the GIL while hashing,
+  so the loop keeps serving, and extra logins queue instead of exhausting CPU / the default threadpool
+- A page load sends the same bearer token on many requests; verify_token keeps a bounded LRU
+  (TOKEN_CACHE_SIZE) of decoded payloads keyed by sha256(token), each valid only until the token's exp.
+  Callers always get a fresh dict, so mutating the result never touches the cache
 """
 
 
+import asyncio
 import bcrypt
+import hashlib
 import jwt
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Tuple
 from fastapi import HTTPException, Header
 from config.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config.settings import BCRYPT_ROUNDS, BCRYPT_MAX_CONCURRENCY, TOKEN_CACHE_SIZE
 
 
 
@@ -29,7 +51,7 @@ from config.settings import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
 def hash_password(password: str) -> str:
     #將「使用者註冊的明碼密碼」經salt雜湊後得出亂碼(bytes)，再用.decode("utf-8")轉回字串回傳，方便以字串形式將雜湊後的密碼亂碼存入資料庫
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 # ================================================
@@ -60,6 +82,26 @@ def verify_password(password: str, hashed: str) -> bool:
 
 
 
+# ================================================
+# async 路由用的版本：bcrypt 丟到專用執行緒池跑，不卡 event loop
+# 專用池 (而不是 asyncio.to_thread 的預設池)：同時最多 BCRYPT_MAX_CONCURRENCY 個 bcrypt，
+# 登入尖峰時多的請求在池的佇列裡排隊，不會佔滿預設池 (sync 路由、DB 查詢也在用) 或把 CPU 吃光
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_CONCURRENCY, thread_name_prefix="bcrypt")
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, verify_password, password, hashed)
+# ================================================
+
+
+
+
+
+
 # ================================================
 # 函數功能: 生成一個 JWT Token (str)
 # 參數: 1. 會員資料 (id, email, name)  2. Token 有效時間 
@@ -101,9 +143,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 # ================================================
 # 函數功能: 將 JWT Token 字串解析出簽名前的 原始 payload 內容 
-# 參數: 去除 Bearer 前綴的 JWT Token 字串 (get_current_user 函數呼叫 verify_token 函數時傳入的參數)
-# 回傳值: 會員資訊 dict (id, email, name)
-def verify_token(token: str) -> Dict[str, Any]:
+# 參數: 去除 Bearer 前綴的 JWT Token 字串 (verify_token 快取沒命中時呼叫)
+# 回傳值: 完整 payload dict (id, email, name, exp ...)
+def _decode_token(token: str) -> Dict[str, Any]:
     try:
         # 1. 解析 JWT Token 得出簽名前的原始 payload 內容
         # 正確解碼後，payload 會是: {'id': 123,'email': 'test@example.com','name': 'Tom', 'exp': 1769913930}, 是一個 dictionary
@@ -116,8 +158,8 @@ def verify_token(token: str) -> Dict[str, Any]:
         if user_id is None:
             raise HTTPException(status_code=401, detail="Token payload invalid")
 
-        # 4. 透過取出的 payload 內容, 組出會員資訊 dict
-        return {"user_id": user_id, "name": payload.get("name"), "email": payload.get("email")}
+        # 4. 回傳完整 payload (verify_token 會再組出會員資訊 dict)
+        return payload
     except jwt.ExpiredSignatureError:
         # 若 payload 中的 exp 時間已過期, jwt.decode 這個 PyJWT 內建函數會檢查到並拋出 ExpiredSignatureError (PyJWT套件內建功能)
         raise HTTPException(status_code=401, detail="Token 已過期，請重新登入")
@@ -130,6 +172,78 @@ def verify_token(token: str) -> Dict[str, Any]:
 
 
 
+# ================================================
+# 驗證過的 token 快取 (LRU)：同一個 token 一次頁面載入會送好幾個請求，只有第一次需要完整解碼 + HMAC 驗簽
+# - key：sha256(token) (不在記憶體裡留原始 token)；value：(exp, payload)
+# - 只快取到 token 的 exp 為止 (與 jwt.decode 相同：exp > 現在時間才有效)；過期的項目在下次查到時移除並重新解碼 (→ 401 已過期)
+# - 撤銷：revoke_token / clear_token_cache 把快取丟掉；set_revocation_check 註冊的檢查每次請求都會跑 (快取命中也跑)
+_token_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+_revocation_check: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+
+def _cache_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def revoke_token(token: str) -> None:
+    with _token_cache_lock:
+        _token_cache.pop(_cache_key(token), None)
+
+
+def clear_token_cache() -> None:
+    with _token_cache_lock:
+        _token_cache.clear()
+
+
+def set_revocation_check(fn: Optional[Callable[[Dict[str, Any]], bool]]) -> None:
+    global _revocation_check
+    _revocation_check = fn
+
+
+def _cached_payload(token: str) -> Dict[str, Any]:
+    if TOKEN_CACHE_SIZE <= 0:
+        return _decode_token(token)
+
+    key = _cache_key(token)
+    with _token_cache_lock:
+        hit = _token_cache.get(key)
+        if hit is not None:
+            if hit[0] > time.time():
+                _token_cache.move_to_end(key)
+                return hit[1]
+            del _token_cache[key]                   # 已過期 → 重新解碼，由 jwt.decode 丟出「已過期」
+
+    payload = _decode_token(token)
+    exp = payload.get("exp")
+    if exp is not None:                             # 沒有 exp 的 token 不快取 (無法判斷何時失效)
+        with _token_cache_lock:
+            _token_cache[key] = (float(exp), payload)
+            _token_cache.move_to_end(key)
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)    # 丟掉最久沒用的
+    return payload
+
+
+# 函數功能: 驗證 JWT Token 並回傳會員資訊 (所有需要登入的 API 都會經過這裡)
+# 回傳值: 會員資訊 dict (id, email, name)；每次都是新的 dict，呼叫端修改不會影響快取
+def verify_token(token: str) -> Dict[str, Any]:
+    payload = _cached_payload(token)
+    if _revocation_check is not None and _revocation_check(payload):
+        raise HTTPException(status_code=401, detail="Token 已失效，請重新登入")
+    return {"user_id": payload["id"], "name": payload.get("name"), "email": payload.get("email")}
+
+
+# 函數功能: 取得 token 的到期時間 (exp, unix 秒)；token 無效時與 verify_token 一樣 raise 401
+# 用途: 長連線 (SSE) 要在 token 到期時結束，而不是從連上開始算固定秒數
+def token_expires_at(token: str) -> Optional[float]:
+    exp = _cached_payload(token).get("exp")
+    return float(exp) if exp is not None else None
+# ================================================
+
+
+
+
 # ================================================
 # 函數功能: 從呼叫此函數的 HTTP 請求的 Header 中取出 JWT Token 字串 (去除 Bearer), 再將此 Token 字串傳入 verify_token函數來比對「此登入的使用者身份是否合法」
 
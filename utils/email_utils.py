@@ -3,17 +3,19 @@ email_utils.py
 Email Utility Module
 
 Functions:
-- send_email_async(to, subject, body)  - Send email asynchronously via SQS (with sync fallback)
-- send_email(to, subject, body)        - Send email synchronously via SMTP (used as fallback)
+- send_email_async(to, subject, body)  - Send email asynchronously via SQS (with sync fallback); True = queued or sent
+- send_emails_async(emails)            - Batch version: SQS send_message_batch, SMTP fallback only for the entries that failed
+- send_email(to, subject, body)        - Send email synchronously via SMTP (used as fallback); True = sent
 """
 
 
 
 import smtplib # 引入 smtplib (Python 內建的 SMTP 客戶端), 用來與信件伺服器（eg. Gmail SMTP）連線並送出信件
 from email.message import EmailMessage # 從 email (Python內建的標準函式庫) 的 message 模組 引入 EmailMessage類別, 用來建立 Email物件 
+from typing import Dict, List
 from config.settings import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, SQS_EMAIL_QUEUE_URL  # 從 settings 模組讀取寄信用的環境變數設定: SMTP 伺服器位址、SMTP 連線 PORT、登入 SMTP 的帳號、登入 SMTP 的應用程式密碼(應用程式密碼 App Password, 非一般登入密碼為第三方應用程式產生的密碼) 
 
-from utils.sqs_utils import send_email_to_queue
+from utils.sqs_utils import send_email_to_queue, send_emails_to_queue
 
 
 # 取得此模組專屬的 logger（繼承 app.py 中 basicConfig 設定的 root logger）
@@ -32,9 +34,10 @@ logger = logging.getLogger(__name__)
 # 2. SQS 發送任務失敗 (if not success): 「寄信任務」無法進入 SQS queue, 直接呼叫send_email函數, 執行「同步寄信動作」
 
 # 參數: (1) to: 收件人 Email; (2) subject: 信件主旨; (3) body: 信件內容 
-# 無回傳值: 若執行成功, 就結束函數後返回呼叫端, 最後返回到 API 層 ; 若執行失敗, 就記 warning log後, Fallback 到 send_email同步寄信函數
+# 回傳值: True = 已進 SQS Queue 或 fallback 同步寄出; False = 兩條路都失敗 (通知 outbox 的 dispatcher 據此決定要不要重試, 見 utils/outbox_dispatcher.py)
+# 永不 raise: 若 SQS 失敗, 就記 warning log後, Fallback 到 send_email同步寄信函數
 
-def send_email_async(to: str, subject: str, body: str) -> None:
+def send_email_async(to: str, subject: str, body: str) -> bool:
     # 呼叫 send_email_to_queue 函數, 將寄信任務發送到 SQS Queue 裡 
     # 「發送到 SQS」是同步操作，「Lambda 實際寄信」才是非同步（背景執行）
     success = send_email_to_queue(to, subject, body)
@@ -47,7 +50,8 @@ def send_email_async(to: str, subject: str, body: str) -> None:
 
         # 這時候 fallback 到同步發送: 如果發送任務到 SQS 的動作失敗，就改用原本的同步寄信函數send_email執行同步寄信動作
         logger.warning(f"SQS 發送失敗，fallback 到同步發送: {to}")
-        send_email(to, subject, body)
+        return send_email(to, subject, body)
+    return True
 
 # 設計原則: 1. SQS 正常時: 快速執行任務後, API 可更快回應, 實際寄信動作由背景處理  2. SQS 異常時: 直接降級成同步寄信, 功能不中斷
 # ================================================
@@ -55,6 +59,25 @@ def send_email_async(to: str, subject: str, body: str) -> None:
 
 
 
+# ================================================
+# 批次版的 send_email_async (outbox dispatcher 一次寄一批)
+# 1. 整批用 send_emails_to_queue 送進 SQS (每 10 則一次 send_message_batch, 各批次同時送出)
+# 2. 只有「沒進 SQS 的那幾封」才 fallback 到 send_email 同步寄信, 其他封不受影響
+# 參數: emails: [{"to": ..., "subject": ..., "body": ...}, ...]
+# 回傳值: 與 emails 等長的 bool 列表 (True = 已進 SQS Queue 或 fallback 同步寄出); 永不 raise
+def send_emails_async(emails: List[Dict[str, str]]) -> List[bool]:
+    results = send_emails_to_queue(emails)
+    for index, queued in enumerate(results):
+        if not queued:
+            email = emails[index]
+            logger.warning(f"SQS 發送失敗，fallback 到同步發送: {email['to']}")
+            results[index] = send_email(email["to"], email["subject"], email["body"])
+    return results
+# ================================================
+
+
+
+
 
 
 
@@ -63,8 +86,8 @@ def send_email_async(to: str, subject: str, body: str) -> None:
 # ================================================
 # 同步寄信函數
 # 參數: (1) to: 收件人 Email; (2) subject: 信件主旨; (3) body: 信件內容 
-# 無回傳值: 若成功, 就記info log後返回呼叫端, 最後返回到 API 層 ; 若失敗, 就記 exception log (不raise), 記完log就返回呼叫端, 最後返回到 API 層 
-def send_email(to: str, subject: str, body: str) -> None:
+# 回傳值: 若成功, 就記info log後回傳 True ; 若失敗, 就記 exception log (不raise), 記完log就回傳 False 
+def send_email(to: str, subject: str, body: str) -> bool:
     # 若 send_email_async 執行失敗, 就 Fallback 到這個同步寄信函數 (best-effort 原則): 
     # (1)寄信成功：記一筆 info log 
     # (2)寄信失敗：記一筆 exception log, 但不 raise 例外, 讓交易流程照常進行 (不被寄信這個輔助功能影響核心交易流程)
@@ -87,6 +110,7 @@ def send_email(to: str, subject: str, body: str) -> None:
             smtp.send_message(msg)
         
         logger.info(f"Email 已成功寄送至 {to}，subject={subject!r}")  # 若前面寄信動作都成功, 記一筆 info log
+        return True
 
     except Exception as e:      
         # 若前面寄信動作任一步出錯 (eg. 連線失敗、登入失敗、寄信失敗), 就用 exception log 記錄錯誤 + stack trace. 但不 raise, 呼叫端(商業邏輯) 能繼續執行, 不讓寄信功能錯誤而影響網站核心功能
@@ -105,6 +129,7 @@ def send_email(to: str, subject: str, body: str) -> None:
                 "email_subject": subject,
             },
         )
+        return False
 
 
 # logger.exception 會自動帶上 stack trace, 方便看錯誤流程
@@ -0,0 +1,391 @@
+"""
+metrics.py
+Request-Level Metrics (Prometheus text exposition format)
+
+Functions:
+- observe_db_query(sql, seconds)    - Record one SQL statement (global histogram + current request's DB time + query_stats)
+- observe_db_pool_wait(seconds)     - Record time spent borrowing a connection from the MySQL pool
+- observe_redis(command, seconds)   - Record one Redis command (global histogram + current request's Redis time)
+- instrument_connection(conn)       - Wrap a DB connection so every cursor execute / fetch is timed
+- route_template(scope)             - Route path template for an ASGI scope, eg. "/api/browse_tickets"
+- render_metrics()                  - Render every registered metric in Prometheus text format
+
+Classes:
+- Counter / Gauge / Histogram       - Minimal thread-safe metric types with labels
+- MetricsMiddleware                 - Pure ASGI middleware: per-route latency + per-request DB / Redis / pool-wait time
+
+Design:
+- No third-party dependency: the app runs as a single uvicorn process, so an in-process registry is enough
+- Per-request DB / Redis time is accumulated in a ContextVar dict set by the middleware;
+  sync code run in the threadpool sees the same dict because Starlette copies the context
+- Labels use the route template (not the raw path) to keep series cardinality bounded
+"""
+
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+
+from utils.query_stats import record_query
+
+
+# ================================================
+# 指標型別：Counter / Gauge / Histogram (label 值的 tuple → 數值)
+# 預設 bucket (秒)：從 1ms 到 10s，涵蓋「Redis 單一指令」到「最慢的 API」
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    # 值在輸出 (scrape) 時才計算，eg. 連線池目前的閒置 / 借出數，不用在每次借還時更新
+    def set_function(self, *labels: str, fn: Callable[[], float]) -> None:
+        with self._lock:
+            self._functions[labels] = fn
+
+    def value(self, *labels: str) -> float:
+        fn = self._functions.get(labels)
+        return fn() if fn else super().value(*labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            functions = list(self._functions.items())
+        for labels, fn in functions:
+            try:
+                self.set(*labels, value=fn())
+            except Exception:
+                pass                    # 取值失敗就保留上一次的數值
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每個 series：[各 bucket 的「非累積」次數 ..., +Inf 次數, 總和]，輸出時才累加
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        idx = bisect_left(self.buckets, value)     # 第一個 >= value 的上界 (le 語意)；超過最大值 → +Inf
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def snapshot(self, *labels: str) -> Optional[Tuple[int, float]]:
+        series = self._series.get(labels)
+        return (int(sum(series[:-1])), series[-1]) if series else None     # (次數, 總和)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self._header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, labels)} {_fmt(series[-1])}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _REGISTRY for line in metric.render()) + "\n"
+# ================================================
+
+
+
+
+# ================================================
+# 本服務的指標
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"])
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled")
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Total DB time (queries + fetches + commits) spent by one request",
+    ["route"])
+REQUEST_POOL_WAIT_SECONDS = Histogram(
+    "http_request_db_pool_wait_seconds", "Total time one request spent borrowing pooled DB connections",
+    ["route"])
+REQUEST_REDIS_SECONDS = Histogram(
+    "http_request_redis_seconds", "Total Redis time spent by one request",
+    ["route"])
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Duration of one SQL statement by verb", ["verb"])
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds", "Time to borrow (and health-check) a connection from the MySQL pool")
+DB_POOL_CONNECTIONS_OPENED = Counter(
+    "db_pool_connections_opened_total", "MySQL connections opened by the pool")
+DB_POOL_CONNECTIONS_CLOSED = Counter(
+    "db_pool_connections_closed_total", "MySQL connections closed by the pool (lifetime / stale / broken / shutdown)",
+    ["reason"])
+POOL_CONNECTIONS_IN_USE = Gauge(
+    "pool_connections_in_use", "Connections currently borrowed from a pool", ["pool"])
+POOL_CONNECTIONS_IDLE = Gauge(
+    "pool_connections_idle", "Open connections currently idle in a pool", ["pool"])
+POOL_ACQUIRE_TIMEOUTS = Counter(
+    "pool_acquire_timeouts_total", "Borrow attempts that gave up after the pool's acquire timeout", ["pool"])
+REDIS_POOL_WAIT_SECONDS = Histogram(
+    "redis_pool_wait_seconds", "Time to borrow a connection from the Redis pool")
+DB_READONLY_ROUTED = Counter(
+    "db_readonly_connections_total",
+    "Read-only connection borrows by target (replica / primary_sticky / primary_fallback)", ["target"])
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_duration_seconds", "Duration of one Redis command", ["command"])
+# ================================================
+
+
+
+
+# ================================================
+# 每個請求的累計時間：middleware 在請求開始時放一個 dict，DB / Redis 的計時把秒數加進去
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+SQL_VERBS = {"select", "insert", "update", "delete", "replace", "with", "commit", "rollback"}
+
+
+def _add_to_request(kind: str, seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[kind] += seconds
+
+
+def _sql_verb(sql) -> str:
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode("utf-8", "replace")
+    words = str(sql).split(None, 1)
+    verb = words[0].lower() if words else ""
+    return verb if verb in SQL_VERBS else "other"
+
+
+def observe_db_query(sql, seconds: float) -> None:
+    DB_QUERY_SECONDS.observe(seconds, _sql_verb(sql))
+    _add_to_request("db", seconds)
+    record_query(sql, seconds)          # 指紋 / 慢查詢統計 (utils/query_stats.py)
+
+
+def observe_db_pool_wait(seconds: float) -> None:
+    DB_POOL_WAIT_SECONDS.observe(seconds)
+    _add_to_request("pool_wait", seconds)
+
+
+def observe_redis(command: str, seconds: float) -> None:
+    REDIS_COMMAND_SECONDS.observe(seconds, str(command).lower())
+    _add_to_request("redis", seconds)
+# ================================================
+
+
+
+
+# ================================================
+# DB 連線 / cursor 的計時包裝：config.database.get_connection() 借出連線後包一層再交給呼叫者
+# 其餘屬性 (lastrowid、rowcount、description...) 都原樣轉給底層物件
+class TimedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._last_sql = ""
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._last_sql = operation
+        start = perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            observe_db_query(operation, perf_counter() - start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._last_sql = operation
+        start = perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            observe_db_query(operation, perf_counter() - start)
+
+    # 非 buffered cursor 的結果是 fetch 時才從網路讀 → 也算進 DB 時間 (只加到請求累計，不另算一次 query)
+    def _timed_fetch(self, method, *args):
+        start = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            _add_to_request("db", perf_counter() - start)
+
+    def fetchone(self):
+        return self._timed_fetch(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._timed_fetch(self._cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self._timed_fetch(self._cursor.fetchmany, *args)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        start = perf_counter()
+        try:
+            return self._conn.commit()
+        finally:
+            observe_db_query("COMMIT", perf_counter() - start)
+
+    def rollback(self):
+        start = perf_counter()
+        try:
+            return self._conn.rollback()
+        finally:
+            observe_db_query("ROLLBACK", perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def instrument_connection(conn) -> TimedConnection:
+    return TimedConnection(conn)
+# ================================================
+
+
+
+
+# ================================================
+# ASGI middleware：記錄每個請求的總延遲，以及這個請求花在 DB / 連線池 / Redis 的時間
+# 寫成純 ASGI (不用 BaseHTTPMiddleware)：不會把 response body 包進額外的 task / queue，串流回應也不受影響
+UNMATCHED_ROUTE = "<unmatched>"          # 404 之類沒對到路由的請求，全部歸到同一個 label (避免 label 爆量)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")           # Starlette 比對到路由後會把 route 物件放進 scope
+    if route is None:                    # 舊版 Starlette 沒有 scope["route"] → 自己比對一次
+        for candidate in getattr(scope.get("app"), "routes", []):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {"db": 0.0, "redis": 0.0, "pool_wait": 0.0}
+        token = _request_timings.set(timings)
+        status = 500                     # 沒送出 response 就拋例外 → 記成 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            _request_timings.reset(token)
+
+            route = route_template(scope)
+            HTTP_REQUEST_SECONDS.observe(elapsed, scope["method"], route, str(status))
+            REQUEST_DB_SECONDS.observe(timings["db"], route)
+            REQUEST_POOL_WAIT_SECONDS.observe(timings["pool_wait"], route)
+            REQUEST_REDIS_SECONDS.observe(timings["redis"], route)
+# ================================================
@@ -0,0 +1,120 @@
+"""
+notification_counter.py
+Unread Notification Counter in Redis (O(1) unread badge)
+
+Functions:
+- incr_unread(member_ids)           - +1 per new notification (after the INSERT commits); returns the new counts
+- reset_unread(member_id)           - Drop the counter after mark_all_notifications_read (next read recounts)
+- get_unread_count(member_id)       - Read the counter; on a miss, COUNT(*) once from the primary and seed it
+
+Design:
+- Key: notif_unread:{member_id} -> integer, TTL = UNREAD_TTL_SECONDS (an occasional recount bounds any drift)
+- incr only touches counters that already exist (Lua INCRBY-if-exists): incrementing a missing key would
+  start from 0 and hide the notifications inserted before it was seeded; the next read recounts instead
+- Seeding cannot lose an incr that lands between the COUNT and the SET: every incr on a missing counter and
+  every reset bumps notif_unread_gen:{member_id}; the seed is one Lua script that writes the count only if the
+  generation is still the one read before counting, otherwise the next read recounts
+- Reset deletes instead of writing 0: a notification inserted between the UPDATE ... is_read and the reset
+  would otherwise be zeroed out of the badge
+- Redis errors never fail the write path; reads fall back to COUNT(*)
+"""
+
+
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from config.database import pin_to_primary, unpin
+from models.notification_model import count_unread_notifications
+from utils.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+# ================================================
+KEY_PREFIX = "notif_unread:"
+GEN_PREFIX = "notif_unread_gen:"
+UNREAD_TTL_SECONDS = 24 * 3600
+
+# KEYS[1] = 計數器, KEYS[2] = 世代, ARGV[1] = 增加幾筆, ARGV[2] = TTL
+# 計數器不存在就不動 (下次讀取時從資料庫重算)，但世代 +1 → 正在重算中的那次讀取不會把舊的 COUNT 寫進去
+INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return nil
+"""
+
+# KEYS[1] = 計數器, KEYS[2] = 世代, ARGV[1] = COUNT 結果, ARGV[2] = COUNT 前讀到的世代, ARGV[3] = TTL
+# 世代沒變 (COUNT 期間沒有 incr / reset) 才寫入；回傳 1 = 已寫入
+SEED_IF_UNCHANGED = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3], 'NX')
+return 1
+"""
+
+# KEYS[1] = 計數器, KEYS[2] = 世代, ARGV[1] = TTL
+RESET = """
+redis.call('DEL', KEYS[1])
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+def _keys(member_id: int):
+    return KEY_PREFIX + str(member_id), GEN_PREFIX + str(member_id)
+
+
+# 回傳值: {member_id: 更新後的未讀數}；計數器不存在或 Redis 出錯 → None (不知道確切數字)
+def incr_unread(member_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+    counts = Counter(member_ids)        # 同一個會員這次可能收到多筆通知 (eg. 一次上架多張票都符合他的預約)
+    if not counts:
+        return {}
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        for member_id, n in counts.items():
+            pipe.eval(INCR_IF_EXISTS, 2, *_keys(member_id), n, UNREAD_TTL_SECONDS)
+        results = pipe.execute()
+        return {member_id: (int(v) if v is not None else None) for member_id, v in zip(counts, results)}
+    except Exception as e:
+        logger.warning(f"未讀通知計數器更新失敗 (member_ids={list(counts)}): {e}")
+        return dict.fromkeys(counts)
+
+
+def reset_unread(member_id: int) -> None:
+    try:
+        get_redis_client().eval(RESET, 2, *_keys(member_id), UNREAD_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"未讀通知計數器清除失敗 (member_id={member_id}，最多 {UNREAD_TTL_SECONDS} 秒後過期): {e}")
+
+
+def get_unread_count(member_id: int) -> int:
+    key, gen_key = _keys(member_id)
+    seen = None                         # COUNT 前的世代；Redis 讀取失敗 → 不知道世代，不寫入計數器
+    try:
+        cached, gen = get_redis_client().mget(key, gen_key)
+        if cached is not None:
+            return int(cached)
+        seen = gen or "0"
+    except Exception as e:
+        logger.warning(f"未讀通知計數器讀取失敗，降級查詢資料庫 (member_id={member_id}): {e}")
+
+    # 主庫：剛 INSERT / 標記已讀的通知，副本可能還沒同步到 → 用舊數字建立計數器會一直錯到 TTL 到期
+    token = pin_to_primary()
+    try:
+        count = count_unread_notifications(member_id)
+    finally:
+        unpin(token)
+    if seen is None:
+        return count
+    try:
+        get_redis_client().eval(SEED_IF_UNCHANGED, 2, key, gen_key, count, seen, UNREAD_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"未讀通知計數器寫入失敗 (member_id={member_id}): {e}")
+    return count
+# ================================================
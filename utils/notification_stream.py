@@ -0,0 +1,165 @@
+"""
+notification_stream.py
+Push Channel for Notifications (Redis pub/sub -> Server-Sent Events)
+
+Functions:
+- push_notifications(notifications)     - After the INSERT INTO notifications commits: bump unread counters and publish
+- issue_stream_ticket(member_id, exp)   - Short-lived single-use ticket for opening the SSE stream
+- redeem_stream_ticket(ticket)          - Consume a ticket, return (member id, access token exp); None if unknown / used
+
+Classes:
+- NotificationHub                       - Per-worker subscriber that fans Redis messages out to connected SSE clients
+
+Design:
+- Channel per member: notif:{member_id}; payload is the delta only
+  {"message", "url", "unread"} (unread = new counter value, or null when unknown)
+- Each uvicorn worker keeps ONE pub/sub connection (PSUBSCRIBE notif:*) no matter how many browsers are
+  connected, and hands messages to the local listeners of that member; notifications are human-rate,
+  so every worker seeing every message is cheap
+- Pub/sub is fire-and-forget: a client that is disconnected (or too slow, queue full) misses the push,
+  and reloads the list on reconnect. The DB stays the source of truth
+- EventSource cannot send headers, so the browser trades its access token (Authorization header) for a
+  random ticket and opens the stream with ?ticket=. The ticket lives STREAM_TICKET_SECONDS, works once (GETDEL)
+  and Redis keeps only sha256(ticket), so a URL in an access log is useless; the JWT never goes in a URL
+"""
+
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import secrets
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from utils.notification_counter import incr_unread
+from utils.redis_utils import create_async_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+# ================================================
+CHANNEL_PREFIX = "notif:"
+QUEUE_SIZE = 100                # 每個連線最多暫存幾則還沒送出的通知 (超過就丟掉，前端重連時會重新載入列表)
+RECONNECT_SECONDS = 1.0
+
+
+# notifications: [{"member_id": ..., "message": ..., "url": ...}, ...] (每筆 = 一列 INSERT INTO notifications)
+# 永不 raise：推播只是加速，失敗時前端下次載入頁面 / 點鈴鐺就會看到
+def push_notifications(notifications: Iterable[Dict[str, Any]]) -> None:
+    notifications = list(notifications)
+    if not notifications:
+        return
+    unread = incr_unread(n["member_id"] for n in notifications)
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        for n in notifications:
+            payload = {"message": n["message"], "url": n["url"], "unread": unread.get(n["member_id"])}
+            pipe.publish(CHANNEL_PREFIX + str(n["member_id"]), json.dumps(payload, ensure_ascii=False))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"通知推播發布失敗 (members={[n['member_id'] for n in notifications]}): {e}")
+# ================================================
+
+
+
+
+# ================================================
+# 推播連線的一次性票券：stream_ticket:{sha256(ticket)} -> JSON {"id", "exp"} (exp = 換票時 access token 的到期時間)
+STREAM_TICKET_PREFIX = "stream_ticket:"
+STREAM_TICKET_SECONDS = 30      # 換到票之後要在幾秒內連上
+
+
+def _ticket_key(ticket: str) -> str:
+    return STREAM_TICKET_PREFIX + hashlib.sha256(ticket.encode("utf-8")).hexdigest()
+
+
+def issue_stream_ticket(member_id: int, expires_at: Optional[float]) -> str:
+    ticket = secrets.token_urlsafe(32)
+    get_redis_client().set(_ticket_key(ticket), json.dumps({"id": member_id, "exp": expires_at}),
+                           ex=STREAM_TICKET_SECONDS)
+    return ticket
+
+
+# 回傳值: (member_id, access token 的 exp)；票券不存在 / 已過期 / 已用過 → None
+def redeem_stream_ticket(ticket: str) -> Optional[Tuple[int, Optional[float]]]:
+    data = get_redis_client().getdel(_ticket_key(ticket))
+    if data is None:
+        return None
+    grant = json.loads(data)
+    return grant["id"], grant["exp"]
+# ================================================
+
+
+
+
+# ================================================
+class NotificationHub:
+    def __init__(self, client_factory=create_async_client):
+        self._client_factory = client_factory
+        self._listeners: Dict[int, Set[asyncio.Queue]] = {}
+        self._reader = None
+
+    @property
+    def listener_count(self) -> int:
+        return sum(len(queues) for queues in self._listeners.values())
+
+    # 一個 SSE 連線 = 一個 queue；第一個連線進來時才啟動背景訂閱
+    @contextlib.asynccontextmanager
+    async def listen(self, member_id: int):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._listeners.setdefault(member_id, set()).add(queue)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._run())
+        try:
+            yield queue
+        finally:
+            queues = self._listeners.get(member_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._listeners[member_id]
+
+    def dispatch(self, channel: str, data: str) -> None:
+        try:
+            member_id = int(channel[len(CHANNEL_PREFIX):])
+        except ValueError:
+            return
+        for queue in self._listeners.get(member_id, ()):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                logger.warning(f"通知推播佇列已滿，丟棄一則 (member_id={member_id})")
+
+    # 背景訂閱：連線斷掉就等 RECONNECT_SECONDS 後重連 (斷線期間的推播會漏掉，由前端重新載入補上)
+    async def _run(self) -> None:
+        while True:
+            client = self._client_factory()
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"通知推播訂閱中斷，{RECONNECT_SECONDS} 秒後重連: {e}")
+                await asyncio.sleep(RECONNECT_SECONDS)
+            finally:
+                with contextlib.suppress(Exception):
+                    await pubsub.aclose()
+                with contextlib.suppress(Exception):
+                    await client.aclose()
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+            self._reader = None
+
+
+notification_hub = NotificationHub()
+# ================================================
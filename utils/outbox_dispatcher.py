@@ -0,0 +1,130 @@
+"""
+outbox_dispatcher.py
+Background Dispatcher for the Notification Outbox (models/outbox_model.py)
+
+Functions:
+- drain_outbox_once(batch_size, lease_seconds)   - Claim one batch, send it, record the outcome; returns rows claimed
+- run_outbox_dispatcher(poll, batch, lease)      - asyncio loop started in app lifespan (one per uvicorn worker)
+- retry_delay(attempts)                          - Exponential backoff for a failed send
+
+Design:
+- Request handlers only INSERT the email intent in their own transaction; this loop does the SQS / SMTP I/O,
+  so email latency never shows up in API latency and a crash between commit and send loses nothing
+- Delivery goes through send_emails_async: one SQS send_message_batch per 10 rows, SMTP fallback only for the
+  rows SQS rejected; rows are marked sent only after their own entry succeeds
+- At-least-once: a worker that dies mid-batch leaves its rows leased; they are picked up again when the lease
+  (OUTBOX_LEASE_SECONDS) expires, so a rare duplicate email is possible, a lost one is not
+- The lease is renewed every lease / 3 seconds while a batch is being delivered, so a slow batch (SQS down,
+  every row falling back to sequential SMTP) is not re-claimed by another worker mid-send
+- Several workers drain concurrently; claim uses FOR UPDATE SKIP LOCKED so they never block or double-claim
+- A full batch is followed immediately by the next one; the loop only sleeps when the outbox is (nearly) empty
+"""
+
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from models.outbox_model import (claim_outbox_batch, extend_outbox_lease, mark_outbox_failed, mark_outbox_sent,
+                                 purge_sent_outbox)
+from utils.email_utils import send_emails_async
+
+logger = logging.getLogger(__name__)
+
+
+# ================================================
+MAX_ATTEMPTS = 5                # 寄 5 次都失敗就標記 failed，不再重試
+RETRY_BASE_SECONDS = 30         # 第 n 次失敗後等 30 × 2^(n-1) 秒 (30s, 1m, 2m, 4m)
+RETRY_MAX_SECONDS = 3600
+SENT_RETENTION_DAYS = 7         # 已寄出的紀錄保留幾天
+PURGE_INTERVAL_SECONDS = 3600
+
+
+# 回傳值: 下次重試前要等幾秒；None = 已達 MAX_ATTEMPTS，不再重試
+def retry_delay(attempts: int) -> Optional[int]:
+    if attempts >= MAX_ATTEMPTS:
+        return None
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+# 整批投遞 (在 thread 內執行：send_emails_async 是同步 I/O)；回傳值與 rows 等長，True = 已送出
+def _deliver(rows: List[Dict[str, Any]]) -> List[bool]:
+    results = [False] * len(rows)
+    emails = [(i, row["payload"]) for i, row in enumerate(rows) if row["kind"] == "email"]
+    for row in rows:
+        if row["kind"] != "email":
+            logger.warning(f"未知的 outbox 類型，略過 (id={row['id']}, kind={row['kind']})")
+    if emails:
+        sent = send_emails_async([payload for _, payload in emails])
+        for (i, _), ok in zip(emails, sent):
+            results[i] = ok
+    return results
+
+
+# 寄送期間每 lease_seconds / 3 秒續租一次，直到 _deliver 結束 (續租失敗只記 log，不影響寄送)
+async def _deliver_with_lease(rows: List[Dict[str, Any]], lease_seconds: int) -> List[bool]:
+    ids = [row["id"] for row in rows]
+    delivery = asyncio.ensure_future(asyncio.to_thread(_deliver, rows))
+    while True:
+        done, _ = await asyncio.wait({delivery}, timeout=lease_seconds / 3)
+        if done:
+            return delivery.result()
+        try:
+            await asyncio.to_thread(extend_outbox_lease, ids, lease_seconds)
+        except Exception as e:
+            logger.warning(f"outbox 續租失敗: {e}")
+# ================================================
+
+
+
+
+# ================================================
+async def drain_outbox_once(batch_size: int, lease_seconds: int) -> int:
+    rows = await asyncio.to_thread(claim_outbox_batch, batch_size, lease_seconds)
+    if not rows:
+        return 0
+
+    try:
+        results = await _deliver_with_lease(rows, lease_seconds)
+        error = "SQS 與 SMTP 皆寄送失敗"
+    except Exception as e:        # send_emails_async 設計上不 raise；萬一 raise，整批當作失敗、依退避重試
+        results = [False] * len(rows)
+        error = repr(e)
+
+    sent = [row["id"] for row, ok in zip(rows, results) if ok]
+    await asyncio.to_thread(mark_outbox_sent, sent)
+
+    for row, ok in zip(rows, results):
+        if ok:
+            continue
+        delay = retry_delay(row["attempts"])
+        if delay is None:
+            logger.error(f"outbox 寄送失敗已達 {MAX_ATTEMPTS} 次，放棄 (id={row['id']}): {error}")
+        await asyncio.to_thread(mark_outbox_failed, row["id"], error, delay)
+
+    return len(rows)
+
+
+# 背景迴圈：一批滿了就馬上取下一批，不滿 (outbox 快清空了) 才休息 poll_seconds 秒
+async def run_outbox_dispatcher(poll_seconds: float, batch_size: int, lease_seconds: int) -> None:
+    last_purge = time.monotonic()
+    while True:
+        try:
+            claimed = await drain_outbox_once(batch_size, lease_seconds)
+        except Exception as e:        # 資料庫暫時連不上等：等下一輪再試，未寄出的項目還在 outbox 裡
+            logger.warning(f"outbox 派送失敗: {e}")
+            claimed = 0
+
+        if time.monotonic() - last_purge >= PURGE_INTERVAL_SECONDS:
+            last_purge = time.monotonic()
+            try:
+                deleted = await asyncio.to_thread(purge_sent_outbox, SENT_RETENTION_DAYS)
+                if deleted:
+                    logger.info(f"outbox 清除 {deleted} 筆已寄出的舊紀錄")
+            except Exception as e:
+                logger.warning(f"outbox 清除舊紀錄失敗: {e}")
+
+        if claimed < batch_size:
+            await asyncio.sleep(poll_seconds)
+# ================================================
@@ -0,0 +1,106 @@
+"""
+profile_cache.py
+Member Profile Read Model Cached in Redis (shared by /api/user/auth and /api/user/profile)
+
+Functions:
+- build_profile(row)                    - DB row -> cached dict (favorite_teams decoded, avg_rating float, ISO datetimes)
+- get_member_profile(user_id)           - Cache-aside read: Redis hit, or one primary DB query that fills the cache
+- refresh_member_profile(user_id)       - Write-through after the member updates their profile (reads the primary)
+- invalidate_member_profile(user_id)    - Drop the entry when avg_rating changes (new rating for this seller)
+
+Design:
+- Key: member_profile:{id} -> JSON, TTL = PROFILE_CACHE_TTL_SECONDS (bounds staleness if an invalidation is lost)
+- favorite_teams is JSON-decoded once when the entry is built, not on every read
+- Cache fills use SET NX so a slow miss cannot overwrite a newer write-through entry
+- Every fill reads the primary, never a replica: a miss right after invalidate_member_profile (new rating)
+  must not cache a lagging replica's avg_rating for a whole TTL. Misses are rare, so the primary cost is small
+- Redis errors never fail the request: reads fall back to the DB, writes / invalidations are logged
+"""
+
+
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config.database import pin_to_primary, unpin
+from config.settings import PROFILE_CACHE_TTL_SECONDS
+from models.user_model import get_user_profile
+from utils.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+# ================================================
+KEY_PREFIX = "member_profile:"
+
+
+def build_profile(row: Dict[str, Any]) -> Dict[str, Any]:
+    profile = dict(row)
+    try:
+        profile["favorite_teams"] = json.loads(row["favorite_teams"]) if row["favorite_teams"] else []
+    except json.JSONDecodeError as e:
+        logger.warning(f"favorite_teams JSON 解析錯誤 (user_id={row['id']}): {e}")
+        profile["favorite_teams"] = []
+    profile["avg_rating"] = float(row["avg_rating"]) if row.get("avg_rating") is not None else None
+    for field in ("created_at", "updated_at"):
+        if isinstance(profile.get(field), datetime):
+            profile[field] = profile[field].isoformat()
+    return profile
+
+
+def _store(user_id: int, profile: Dict[str, Any], only_if_missing: bool) -> None:
+    try:
+        get_redis_client().set(KEY_PREFIX + str(user_id), json.dumps(profile, ensure_ascii=False),
+                               ex=PROFILE_CACHE_TTL_SECONDS, nx=only_if_missing)
+    except Exception as e:
+        logger.warning(f"會員資料快取寫入失敗 (user_id={user_id}): {e}")
+
+
+# 寫進快取的資料一律從主庫讀：副本落後時 (eg. 剛寫入評分、剛改資料) 讀到的舊值會被快取整個 TTL
+def _read_primary(user_id: int) -> Optional[Dict[str, Any]]:
+    token = pin_to_primary()
+    try:
+        return get_user_profile(user_id)
+    finally:
+        unpin(token)
+# ================================================
+
+
+
+
+# ================================================
+# 回傳會員資料 dict；會員不存在回傳 None (不快取不存在的會員)
+def get_member_profile(user_id: int) -> Optional[Dict[str, Any]]:
+    try:
+        cached = get_redis_client().get(KEY_PREFIX + str(user_id))
+        if cached:
+            return json.loads(cached)
+    except Exception as e:
+        logger.warning(f"會員資料快取讀取失敗，降級查詢資料庫 (user_id={user_id}): {e}")
+
+    row = _read_primary(user_id)
+    if not row:
+        return None
+    profile = build_profile(row)
+    _store(user_id, profile, only_if_missing=True)
+    return profile
+
+
+# 更新個人資料後呼叫：從主庫讀回最新資料並覆寫快取 (副本可能還沒同步到剛剛的 UPDATE)
+def refresh_member_profile(user_id: int) -> Optional[Dict[str, Any]]:
+    row = _read_primary(user_id)
+    if not row:
+        return None
+    profile = build_profile(row)
+    _store(user_id, profile, only_if_missing=False)
+    return profile
+
+
+# 新評分寫入後呼叫：賣家的 avg_rating 變了，下次讀取時重新計算
+def invalidate_member_profile(user_id: int) -> None:
+    try:
+        get_redis_client().delete(KEY_PREFIX + str(user_id))
+    except Exception as e:
+        logger.warning(f"會員資料快取清除失敗 (user_id={user_id}，最多 {PROFILE_CACHE_TTL_SECONDS} 秒後過期): {e}")
+# ================================================
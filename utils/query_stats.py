@@ -0,0 +1,164 @@
+"""
+query_stats.py
+SQL Fingerprinting & Slow-Query Statistics (in-process, no MySQL slow log needed)
+
+Functions:
+- fingerprint(sql)                 - Normalize a SQL statement: literals / placeholders -> ?, IN lists collapsed, whitespace squeezed
+- record_query(sql, seconds)       - Add one execution to the current window (called by utils.metrics for every cursor execute)
+- top_queries(n)                   - Current window's top-N by total time / count / max time, plus the slowest single executions
+- dump_and_roll(n)                 - Log the current window's top-N and start a new window
+- run_periodic_dump(interval, n)   - asyncio loop that calls dump_and_roll every `interval` seconds (started in app lifespan)
+
+Design:
+- Stats are kept per fingerprint, so "the same query with different ids" is one row
+- Windows roll on every dump: the debug endpoint shows the current window and the last completed one
+- Fingerprint count is capped (MAX_FINGERPRINTS); extra statements are folded into one "<other>" row
+- Executions slower than SLOW_QUERY_MS are also logged immediately (slow-query log)
+- fingerprint() is memoized on the SQL text (LRU, MAX_FINGERPRINTS entries): model SQL strings are constants,
+  so the regex passes run once per distinct statement, not on every cursor execute
+"""
+
+
+import asyncio
+import functools
+import heapq
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config.settings import SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)   # 正式環境 root 是 WARNING；定期摘要 (INFO) 仍要寫進 log
+
+
+MAX_FINGERPRINTS = 2000     # 動態組 SQL (eg. IN 清單長度不同) 已被正規化，正常不會超過幾百種
+SLOWEST_KEEP = 50           # 每個視窗保留最慢的幾次單筆執行
+OTHER = "<other>"
+
+
+# ================================================
+# SQL 正規化：把「只差在參數值」的 SQL 變成同一個指紋
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_LIST = re.compile(r"\bvalues\s*\(.*?\)(?:\s*,\s*\(.*?\))*", re.I | re.S)
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql) -> str:
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode("utf-8", "replace")
+    return _fingerprint_text(str(sql))
+
+
+# 每次 cursor.execute 都會呼叫：同一段 SQL 文字 (參數走 %s，文字本身是常數) 只正規化一次
+@functools.lru_cache(maxsize=MAX_FINGERPRINTS)
+def _fingerprint_text(sql: str) -> str:
+    text = _COMMENT.sub(" ", sql)
+    text = _STRING.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("IN (?+)", text)
+    text = _VALUES_LIST.sub("VALUES (?+)", text)      # multi-row INSERT 不論幾列都算同一種
+    return _SPACES.sub(" ", text).strip().lower()
+# ================================================
+
+
+
+
+# ================================================
+# 一個統計視窗：每個指紋的次數 / 總時間 / 最大值，以及最慢的 N 次單筆執行
+class _Window:
+    def __init__(self):
+        self.started_at = time.time()
+        self.stats: Dict[str, List[float]] = {}     # 指紋 → [count, total_seconds, max_seconds]
+        self.slowest: List[tuple] = []              # min-heap of (seconds, seq, fingerprint, at)
+        self._seq = 0
+
+    def add(self, fp: str, seconds: float) -> None:
+        if fp not in self.stats and len(self.stats) >= MAX_FINGERPRINTS:
+            fp = OTHER
+        row = self.stats.get(fp)
+        if row is None:
+            row = self.stats[fp] = [0, 0.0, 0.0]
+        row[0] += 1
+        row[1] += seconds
+        if seconds > row[2]:
+            row[2] = seconds
+
+        self._seq += 1
+        item = (seconds, self._seq, fp, time.time())
+        if len(self.slowest) < SLOWEST_KEEP:
+            heapq.heappush(self.slowest, item)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def top(self, n: int) -> Dict[str, Any]:
+        rows = [{"fingerprint": fp, "count": int(c), "total_ms": round(t * 1000, 2),
+                 "avg_ms": round(t / c * 1000, 3), "max_ms": round(m * 1000, 2)}
+                for fp, (c, t, m) in self.stats.items()]
+        return {
+            "window_started_at": self.started_at,
+            "window_seconds": round(time.time() - self.started_at, 1),
+            "distinct_queries": len(rows),
+            "by_total_time": sorted(rows, key=lambda r: r["total_ms"], reverse=True)[:n],
+            "by_count": sorted(rows, key=lambda r: r["count"], reverse=True)[:n],
+            "by_max_time": sorted(rows, key=lambda r: r["max_ms"], reverse=True)[:n],
+            "slowest_executions": [
+                {"fingerprint": fp, "ms": round(s * 1000, 2), "at": at}
+                for s, _, fp, at in sorted(self.slowest, reverse=True)[:n]],
+        }
+
+
+_lock = threading.Lock()
+_current = _Window()
+_previous: Optional[_Window] = None
+# ================================================
+
+
+
+
+# ================================================
+def record_query(sql, seconds: float) -> None:
+    fp = fingerprint(sql)
+    with _lock:
+        _current.add(fp, seconds)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning(f"slow query {seconds * 1000:.0f}ms: {fp[:300]}")
+
+
+def top_queries(n: int = 10) -> Dict[str, Any]:
+    with _lock:
+        return {"current": _current.top(n), "previous": _previous.top(n) if _previous else None}
+
+
+# 把目前視窗的 top-N 寫進 log，然後開新視窗 (rolling)；回傳剛結束的視窗摘要
+def dump_and_roll(n: int = 10) -> Dict[str, Any]:
+    global _current, _previous
+    with _lock:
+        finished, _current = _current, _Window()
+        _previous = finished
+        summary = finished.top(n)
+
+    if summary["distinct_queries"]:
+        lines = [f"query stats: {summary['distinct_queries']} distinct queries in {summary['window_seconds']}s"]
+        for r in summary["by_total_time"]:
+            lines.append(f"  total={r['total_ms']:.0f}ms count={r['count']} avg={r['avg_ms']:.1f}ms "
+                         f"max={r['max_ms']:.0f}ms  {r['fingerprint'][:200]}")
+        logger.info("\n".join(lines))
+    return summary
+
+
+async def run_periodic_dump(interval_seconds: float, n: int = 10) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            dump_and_roll(n)
+        except Exception as e:        # 統計只是輔助功能，出錯不影響服務
+            logger.warning(f"query stats dump 失敗: {e}")
+# ================================================
@@ -0,0 +1,140 @@
+"""
+read_your_writes.py
+Read-Your-Writes Stickiness for Read-Replica Routing
+
+Functions:
+- writer_key(authorization)         - Verified member id of the Authorization header (None if missing / invalid)
+- mark_recent_writer(key)           - Remember that this member just wrote (local LRU + Redis, DB_REPLICA_STICKY_SECONDS)
+- is_recent_writer(key)             - Did this member write within the sticky window?
+
+Classes:
+- ReadYourWritesMiddleware          - Pure ASGI middleware that pins DB reads to the primary when needed
+
+Design:
+- Only active when DB_REPLICA_HOSTS is set; otherwise the middleware is a pass-through
+- Non-GET requests: every read inside the request goes to the primary (validation reads before a write)
+- After a successful non-GET request with an Authorization header, the same member's reads stay on the
+  primary for DB_REPLICA_STICKY_SECONDS, so they see their own order / ticket / profile change immediately
+- Keyed on the member id from the verified token (not the token itself): stickiness survives a token
+  refresh and is shared by every tab / device of that member
+- The marker is written to Redis so it holds across uvicorn workers; a bounded local LRU avoids the Redis
+  round trip for the worker that handled the write. Redis is reached through the asyncio client with a
+  short timeout, so a slow or dead Redis never blocks the event loop; if it fails, reads go to the primary
+"""
+
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException
+
+from config.database import pin_to_primary, replicas, unpin
+from config.settings import DB_REPLICA_STICKY_SECONDS
+from utils.auth_utils import verify_token
+from utils.redis_utils import create_async_client
+
+logger = logging.getLogger(__name__)
+
+
+# ================================================
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+KEY_PREFIX = "db_primary:"
+LOCAL_MAX_KEYS = 10000          # 本機記錄的上限 (LRU：超過就丟掉最久沒寫入的會員)
+REDIS_TIMEOUT_SECONDS = 0.1     # 查 / 寫 Redis 標記最多等多久；逾時當作「不確定」→ 走主庫
+
+_local: "OrderedDict[str, float]" = OrderedDict()   # 會員 id → 黏在主庫直到 (time.monotonic)
+_local_lock = threading.Lock()
+
+# asyncio 版 Redis client：綁定建立它的 event loop (每個 uvicorn worker 一個 loop)；loop 換了 (eg. 測試) 就重建
+_async_client = None
+_async_loop = None
+
+
+def _redis():
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client, _async_loop = create_async_client(), loop
+    return _async_client
+
+
+# token 無效 / 過期 → None (當作未登入：讀副本；真正的 401 由路由的 get_current_user 回)
+# verify_token 有快取，同一個 token 第二次起不再解碼
+def writer_key(authorization: Optional[str]) -> Optional[str]:
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        return str(verify_token(authorization.replace("Bearer ", "").strip())["user_id"])
+    except HTTPException:
+        return None
+
+
+async def mark_recent_writer(key: str) -> None:
+    with _local_lock:
+        _local[key] = time.monotonic() + DB_REPLICA_STICKY_SECONDS
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_MAX_KEYS:
+            _local.popitem(last=False)
+    try:
+        await asyncio.wait_for(_redis().set(KEY_PREFIX + key, 1, px=int(DB_REPLICA_STICKY_SECONDS * 1000)),
+                               REDIS_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f"read-your-writes 標記寫入 Redis 失敗 (其他 worker 可能讀到副本舊資料): {e!r}")
+
+
+async def is_recent_writer(key: str) -> bool:
+    with _local_lock:
+        until = _local.get(key)
+        if until is not None and until <= time.monotonic():
+            del _local[key]
+            until = None
+    if until is not None:
+        return True
+    try:
+        return bool(await asyncio.wait_for(_redis().exists(KEY_PREFIX + key), REDIS_TIMEOUT_SECONDS))
+    except Exception:
+        return True             # 不確定 → 走主庫 (寧可多打主庫，也不要讓使用者看不到剛寫入的資料)
+# ================================================
+
+
+
+
+# ================================================
+# 放在 MetricsMiddleware 之後 (內層)；只看 method / Authorization header / 回應狀態碼
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not len(replicas):
+            await self.app(scope, receive, send)
+            return
+
+        authorization = None
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        key = writer_key(authorization)
+        is_write = scope["method"] not in SAFE_METHODS
+
+        if not is_write and (key is None or not await is_recent_writer(key)):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and is_write and key is not None \
+                    and message["status"] < 400:
+                await mark_recent_writer(key)       # 在回應送出前標記：前端收到回應後馬上重新整理也讀得到
+            await send(message)
+
+        token = pin_to_primary()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            unpin(token)
+# ================================================
@@ -3,12 +3,20 @@ redis_utils.py
 Redis Connection Utility Module
 
 Functions:
-- get_redis_client()  - Get Redis client from connection pool
+- get_redis_client()      - Get Redis client from connection pool
+- create_async_client()   - Standalone redis.asyncio client (long-lived pub/sub subscriber, utils/notification_stream.py)
+
+Classes:
+- TimedRedis          - redis.Redis subclass that times every command for /metrics (utils/metrics.py)
+- TimedBlockingPool   - redis.BlockingConnectionPool that records borrow wait time / timeouts for /metrics
 
 Architecture:
 - Uses connection pool to manage Redis connections efficiently
 - Connections are automatically returned to pool after use
-- Supports concurrent access with configurable max connections
+- Max connections and borrow timeout come from config/settings.py (REDIS_POOL_MAX_CONNECTIONS / REDIS_POOL_TIMEOUT);
+  when the pool is exhausted, callers queue (FIFO) instead of failing immediately
+- Only callers running in a worker thread queue; a borrow made on the asyncio event loop (async routes call
+  get_redis_client() directly) fails at once when the pool is exhausted, so one slow borrow never stalls the worker
 - Production environment uses SSL + AUTH token for AWS ElastiCache
 - Development environment connects without SSL/password for local Docker Redis
 """
@@ -16,9 +24,16 @@ Architecture:
 
 # 載入 redis-py 套件，用來連線到 AWS Redis 服務
 import redis
+from queue import LifoQueue
+from time import perf_counter
+
+from utils.metrics import (observe_redis, POOL_ACQUIRE_TIMEOUTS, POOL_CONNECTIONS_IDLE, POOL_CONNECTIONS_IN_USE,
+                           REDIS_POOL_WAIT_SECONDS)
 
 # 從 settings 模組載入環境變數設定: ENV 變數 (當前環境: development / production) & REDIS 連線設定 
 from config.settings import REDIS_HOST, REDIS_PORT, REDIS_PASSWORD, ENV
+from config.settings import REDIS_POOL_MAX_CONNECTIONS, REDIS_POOL_TIMEOUT
+from config.db_pool import on_event_loop
 
 
 
@@ -38,7 +53,8 @@ pool_config = {
     "host": REDIS_HOST,         # Redis 伺服器位址（IP 或域名）
     "port": REDIS_PORT,         # Redis 伺服器 Port（預設 6379）
     "decode_responses": True,   # 自動將 Redis 預設回應 (bytes) 解碼為 str (優點: 不需要每次都手動 .decode("utf-8")、可直接用 json.loads() 解析)
-    "max_connections": 10,      # 連線池最多保持 10 條連線
+    "max_connections": REDIS_POOL_MAX_CONNECTIONS,   # 連線池最多保持幾條連線 (預設 20，每個 worker 各一個池)
+    "timeout": REDIS_POOL_TIMEOUT,                   # 連線都被借走時，最多排隊等幾秒 (逾時丟 redis.ConnectionError，呼叫端會降級查 DB)
 }
 
 
@@ -59,8 +75,45 @@ if IS_PRODUCTION and REDIS_PASSWORD:
 
 
 # 執行到這裡，pool_config 會是：
-# 本機環境：{"host": ..., "port": ..., "decode_responses": True, "max_connections": 10}
-# 生產環境：{"host": ..., "port": ..., "decode_responses": True, "max_connections": 10, "password": ..., "ssl": True, "ssl_cert_reqs": None}
+# 本機環境：{"host": ..., "port": ..., "decode_responses": True, "max_connections": 20, "timeout": 2}
+# 生產環境：{"host": ..., "port": ..., "decode_responses": True, "max_connections": 20, "timeout": 2, "password": ..., "ssl": True, "ssl_cert_reqs": None}
+# ============================================
+
+
+
+
+# ============================================
+# 連線池內部的佇列：在 event loop 上借連線時不等待 (queue.get 是 blocking，會卡住同一個 worker 的所有請求)，
+# 借光就直接丟 "No connection available"，呼叫端照原本的方式降級查 DB；threadpool 裡的借用照常排隊 REDIS_POOL_TIMEOUT 秒
+class _LoopAwareQueue(LifoQueue):
+    def get(self, block=True, timeout=None):
+        if block and on_event_loop():
+            block = False
+        return super().get(block, timeout)
+
+
+# 借連線的計時包裝：等待時間、逾時次數、借用中 / 閒置連線數 (/metrics，pool="redis")
+# BlockingConnectionPool 的等待是 queue.get(timeout)，排隊者依先來後到被喚醒
+class TimedBlockingPool(redis.BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("queue_class", _LoopAwareQueue)
+        super().__init__(*args, **kwargs)
+        POOL_CONNECTIONS_IDLE.set_function("redis", fn=self.idle_count)
+        POOL_CONNECTIONS_IN_USE.set_function("redis", fn=lambda: len(self._connections) - self.idle_count())
+
+    def idle_count(self) -> int:
+        return sum(1 for c in list(self.pool.queue) if c is not None)    # None = 還沒建立的名額
+
+    def get_connection(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as e:
+            if "No connection available" in str(e):
+                POOL_ACQUIRE_TIMEOUTS.inc("redis")
+            raise
+        finally:
+            REDIS_POOL_WAIT_SECONDS.observe(perf_counter() - start)
 # ============================================
 
 
@@ -70,13 +123,13 @@ if IS_PRODUCTION and REDIS_PASSWORD:
 # 第四段：用 **pool_config 展開 dict 作為參數
 
 # 建立連線池物件 (import redis_utils 模組時就建立) (此時還沒建立 Redis 客戶端物件和連線)
-# 使用 redis.ConnectionPool() 方法建立連線池物件
-REDIS_POOL = redis.ConnectionPool(**pool_config)
+# 使用 BlockingConnectionPool：連線借光時排隊等待 (原本的 redis.ConnectionPool 借光會立刻丟 "Too many connections")
+REDIS_POOL = TimedBlockingPool(**pool_config)
 
 # ** 是「展開運算子」，把 dict 變成 「key=value」 參數
 # 等同於：
-# 本機：redis.ConnectionPool(host=..., port=..., decode_responses=True, max_connections=10)
-# 生產：redis.ConnectionPool(host=..., port=..., decode_responses=True, max_connections=10, password=..., ssl=True, ssl_cert_reqs=None)
+# 本機：TimedBlockingPool(host=..., port=..., decode_responses=True, max_connections=20, timeout=2)
+# 生產：TimedBlockingPool(host=..., port=..., decode_responses=True, max_connections=20, timeout=2, password=..., ssl=True, ssl_cert_reqs=None)
 # ============================================
 
 
@@ -85,7 +138,7 @@ REDIS_POOL = redis.ConnectionPool(**pool_config)
 
 
 # ================================================
-# 呼叫此函數時, 建立 Redis 客戶端物件 (呼叫端此時可取得 Redis 客戶端物件) (但還沒建立網路連線), 直到呼叫端「使用此物件執行 Redis 操作 (eg. get、set、setex等)」時, 才會建立網路連線 (去連線池拿閒置連線, 或若連線不夠就建立新連線, 上限是「同時有十條連線在池中」)
+# 呼叫此函數時, 建立 Redis 客戶端物件 (呼叫端此時可取得 Redis 客戶端物件) (但還沒建立網路連線), 直到呼叫端「使用此物件執行 Redis 操作 (eg. get、set、setex等)」時, 才會建立網路連線 (去連線池拿閒置連線, 或若連線不夠就建立新連線, 上限是 REDIS_POOL_MAX_CONNECTIONS 條，借光時排隊等 REDIS_POOL_TIMEOUT 秒)
 # 回傳值 : Redis 客戶端物件
 
 # 「建立 Redis 客戶端物件」作法: 
@@ -93,7 +146,25 @@ REDIS_POOL = redis.ConnectionPool(**pool_config)
 # redis.Redis(connection_pool=REDIS_POOL): 建立 Redis 客戶端物件時就指定使用 REDIS_POOL 連線池來管理連線 (不用每次都建立新連線, 提高效率). 之後使用 Redis 操作 (eg. get、set、setex)時, 就能直接從池中取出已建立的連線來操作 Redis
 # 每操作完一次 Redis  (eg. cached_data = redis_client.get(cache_key)這個動作)，就自動將連線歸還到池中, 之後其他請求即可重複使用同一條連線 (原理: redis-py 的連線池會在每次操作完成後，自動把連線放回池中)
 def get_redis_client():    
-    return redis.Redis(connection_pool=REDIS_POOL)
+    return TimedRedis(connection_pool=REDIS_POOL)
+
+
+# pub/sub 訂閱會一直佔住一條連線，不能從上面的連線池借 (會少一個名額給一般請求)；
+# 用同樣的連線設定 (host / SSL / 密碼) 另外建立 asyncio 客戶端，在 event loop 上等訊息
+def create_async_client():
+    import redis.asyncio
+    config = {k: v for k, v in pool_config.items() if k not in ("max_connections", "timeout")}
+    return redis.asyncio.Redis(**config)
+
+
+# 每個 Redis 指令 (get / setex / delete ...) 都經過 execute_command → 在這裡計時，記到 /metrics 與「這個請求的 Redis 時間」
+class TimedRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        start = perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            observe_redis(args[0] if args else "unknown", perf_counter() - start)
 # ================================================
 
 
@@ -0,0 +1,127 @@
+"""
+refresh_tokens.py
+Refresh Tokens Stored in Redis (rotation, logout, revoke-all)
+
+Functions:
+- issue_refresh_token(user_id)          - Create an opaque refresh token for a member and store it
+- refresh_token_owner(token)            - Member id of a live refresh token without consuming it (None if unknown / used)
+- rotate_refresh_token(token)           - Consume a refresh token, return (member id, new refresh token); reuse revokes all
+- revoke_refresh_token(token)           - Logout: delete one refresh token
+- revoke_all_refresh_tokens(user_id)    - Logout everywhere: delete every refresh token of a member
+
+Design:
+- Access tokens (JWT) are short-lived (ACCESS_TOKEN_EXPIRE_MINUTES) and verified statelessly, so the hot
+  auth path never touches Redis; revocation takes effect when the access token expires and refresh fails
+- Refresh tokens are random strings (not JWT); Redis keeps only sha256(token), never the token itself
+- Each refresh token is single-use (GETDEL). Presenting an already-used token outside a short grace window
+  (concurrent refresh from two tabs) is treated as theft and revokes every refresh token of that member
+- Only the member id is stored: /api/user/refresh re-reads email / name, so a profile change shows up in the
+  next access token; a password or email change revokes every refresh token (routes/users.py)
+
+Redis keys (TTL = REFRESH_TOKEN_EXPIRE_DAYS):
+- refresh:{hash}        -> JSON {"id"}
+- refresh_user:{id}     -> set of hashes (for revoke-all)
+- refresh_used:{hash}   -> "{id}:{used_at}" tombstone for reuse detection
+"""
+
+
+import hashlib
+import json
+import logging
+import secrets
+import time
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+from config.settings import REFRESH_TOKEN_EXPIRE_DAYS, REFRESH_REUSE_GRACE_SECONDS
+from utils.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+# ================================================
+TTL_SECONDS = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _store(client, user_id: int) -> str:
+    token = secrets.token_urlsafe(32)
+    h = _hash(token)
+    pipe = client.pipeline()
+    pipe.set(f"refresh:{h}", json.dumps({"id": user_id}), ex=TTL_SECONDS)
+    pipe.sadd(f"refresh_user:{user_id}", h)
+    pipe.expire(f"refresh_user:{user_id}", TTL_SECONDS)
+    pipe.execute()
+    return token
+# ================================================
+
+
+
+
+# ================================================
+def issue_refresh_token(user_id: int) -> str:
+    return _store(get_redis_client(), user_id)
+
+
+# 只讀不刪：/api/user/refresh 先用它確認會員、讀完會員資料後才輪替 (讀取失敗時舊 token 仍可重試，不會被用掉)
+# Redis 連不上 → 503 (同 rotate_refresh_token)
+def refresh_token_owner(token: str) -> Optional[int]:
+    try:
+        data = get_redis_client().get(f"refresh:{_hash(token)}")
+    except Exception as e:
+        logger.error(f"refresh token 查詢失敗 (Redis)：{e}")
+        raise HTTPException(status_code=503, detail="系統忙碌，請稍後再試")
+    return json.loads(data)["id"] if data is not None else None
+
+
+# 回傳 (會員 id, 新的 refresh token)；舊的 token 立即失效
+# Redis 連不上 → 503 (不能「放行」：無法確認 token 是否已被撤銷)
+def rotate_refresh_token(token: str) -> Tuple[int, str]:
+    h = _hash(token)
+    try:
+        client = get_redis_client()
+        data = client.getdel(f"refresh:{h}")            # 原子性地取出並刪除：同一個 token 只有一個請求能換到新 token
+        if data is None:
+            used = client.get(f"refresh_used:{h}")
+            if used:
+                user_id, used_at = used.split(":")
+                if time.time() - float(used_at) > REFRESH_REUSE_GRACE_SECONDS:
+                    logger.warning(f"refresh token 被重複使用，撤銷會員 {user_id} 的所有 refresh token")
+                    revoke_all_refresh_tokens(int(user_id))
+            raise HTTPException(status_code=401, detail="登入已過期，請重新登入")
+
+        user_id = json.loads(data)["id"]               # 舊版存的 {"id", "email", "name"} 也只取 id
+        pipe = client.pipeline()
+        pipe.set(f"refresh_used:{h}", f"{user_id}:{time.time()}", ex=TTL_SECONDS)
+        pipe.srem(f"refresh_user:{user_id}", h)
+        pipe.execute()
+        return user_id, _store(client, user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"refresh token 換發失敗 (Redis)：{e}")
+        raise HTTPException(status_code=503, detail="系統忙碌，請稍後再試")
+
+
+def revoke_refresh_token(token: str) -> None:
+    h = _hash(token)
+    client = get_redis_client()
+    data = client.getdel(f"refresh:{h}")
+    if data:
+        client.srem(f"refresh_user:{json.loads(data)['id']}", h)
+
+
+def revoke_all_refresh_tokens(user_id: int) -> int:
+    client = get_redis_client()
+    hashes = client.smembers(f"refresh_user:{user_id}")
+    pipe = client.pipeline()
+    for h in hashes:
+        pipe.delete(f"refresh:{h}")
+    pipe.delete(f"refresh_user:{user_id}")
+    pipe.execute()
+    return len(hashes)
+# ================================================
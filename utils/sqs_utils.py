@@ -5,12 +5,21 @@ AWS SQS Utility Module
 Functions:
 - get_sqs_client()        - Get SQS client (singleton pattern)
 - send_email_to_queue()   - Send email task to SQS Queue
+- send_emails_to_queue()  - Send many email tasks with send_message_batch; one bool per email
+
+Design (batch):
+- Up to 10 messages / 256 KB per send_message_batch call (SQS limits); batches go out concurrently
+  on a small thread pool (boto3 clients are thread-safe)
+- Each entry succeeds or fails on its own: entries that failed on the AWS side (SenderFault=False)
+  are resent once, the rest are reported as False so the caller can fall back for just those emails
 """
 
 
 
 import boto3  # AWS 官方 Python SDK，用來操作所有 AWS 服務
 import json   # 用來把 Python dict 轉成 JSON 字串
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Set, Tuple
 
 # 從 settings 模組讀取操作 SQS 的環境變數設定 (SQS_EMAIL_QUEUE_URL: 具體會發到哪個 Queue 的 SQS Queue URL)
 from config.settings import (
@@ -153,6 +162,97 @@ def send_email_to_queue(to: str, subject: str, body: str) -> bool:
 
 
 
+# ================================================
+# 批次發送：一次送很多封信的任務 (outbox dispatcher 一批最多 OUTBOX_BATCH_SIZE 封)
+# 逐封 send_message = 每封一次 HTTPS 往返；send_message_batch 一次最多 10 則，再把各批次同時送出
+SQS_BATCH_MAX_ENTRIES = 10          # SQS 上限：一次 send_message_batch 最多 10 則
+SQS_BATCH_MAX_BYTES = 256 * 1024    # SQS 上限：一次 send_message_batch 的訊息總大小
+SQS_BATCH_CONCURRENCY = 4           # 同時送出幾個批次 (boto3 預設連線池 10 條，夠用)
+
+
+# 依「則數」與「總大小」兩個上限切批次；entries: [(原始位置, 訊息字串), ...]
+def _chunk_entries(entries: List[Tuple[int, str]]) -> Iterator[List[Tuple[int, str]]]:
+    batch, size = [], 0
+    for index, message in entries:
+        n = len(message.encode("utf-8"))
+        if batch and (len(batch) == SQS_BATCH_MAX_ENTRIES or size + n > SQS_BATCH_MAX_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append((index, message))
+        size += n
+    if batch:
+        yield batch
+
+
+# 送出一個批次；Entry Id 用原始位置，回應的 Successful / Failed 依 Id 對回每一封信
+# 回傳值: (成功的位置, 值得重送的位置 = AWS 端暫時性失敗)；整個呼叫失敗 (botocore 已自動重試過) → 全部算失敗、不再重送
+def _send_batch(sqs, batch: List[Tuple[int, str]]) -> Tuple[Set[int], Set[int]]:
+    try:
+        response = sqs.send_message_batch(
+            QueueUrl=SQS_EMAIL_QUEUE_URL,
+            Entries=[{"Id": str(index), "MessageBody": message} for index, message in batch],
+        )
+    except Exception:
+        logger.exception("批次發送到 SQS 失敗", extra={"batch_size": len(batch)})
+        return set(), set()
+
+    sent = {int(entry["Id"]) for entry in response.get("Successful", [])}
+    retryable = set()
+    for entry in response.get("Failed", []):
+        logger.warning(
+            f"SQS 批次中單筆失敗: id={entry['Id']} code={entry.get('Code')} "
+            f"sender_fault={entry.get('SenderFault')} {entry.get('Message')}"
+        )
+        if not entry.get("SenderFault"):
+            retryable.add(int(entry["Id"]))
+    return sent, retryable
+
+
+# 參數: emails: [{"to": ..., "subject": ..., "body": ...}, ...]
+# 回傳值: 與 emails 等長的 bool 列表，第 i 個 = 第 i 封是否成功進入 SQS Queue (跟 send_email_to_queue 一樣永不 raise)
+def send_emails_to_queue(emails: List[Dict[str, str]]) -> List[bool]:
+    results = [False] * len(emails)
+    if not emails:
+        return results
+    if not SQS_EMAIL_QUEUE_URL:
+        logger.warning("SQS_EMAIL_QUEUE_URL 未設定，改用同步發送")
+        return results
+
+    try:
+        sqs = get_sqs_client()
+    except Exception:
+        logger.exception("建立 SQS client 失敗")
+        return results
+
+    # 訊息格式與 send_email_to_queue 相同，Lambda 端不用改
+    messages = {
+        index: json.dumps({"type": "email", "payload": {"to": e["to"], "subject": e["subject"], "body": e["body"]}},
+                          ensure_ascii=False)
+        for index, e in enumerate(emails)
+    }
+    pending = list(messages.items())
+
+    for _ in range(2):      # 第二輪只重送 AWS 端暫時性失敗 (SenderFault=False) 的項目
+        batches = list(_chunk_entries(pending))
+        with ThreadPoolExecutor(max_workers=min(SQS_BATCH_CONCURRENCY, len(batches))) as pool:
+            outcomes = list(pool.map(lambda batch: _send_batch(sqs, batch), batches))
+
+        retry = set()
+        for sent, retryable in outcomes:
+            for index in sent:
+                results[index] = True
+            retry |= retryable
+        pending = [(index, messages[index]) for index in sorted(retry)]
+        if not pending:
+            break
+
+    logger.info(f"Email 任務已批次送入 SQS: {sum(results)}/{len(emails)}")
+    return results
+# ================================================
+
+
+
+
 
 # ----------------------------
 